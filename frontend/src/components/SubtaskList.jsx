@@ -11,13 +11,9 @@ const SubtaskList = ({ subtasks, taskId }) => {
   const queryClient = useQueryClient()
 
   const toggleSubtaskMutation = useMutation({
-    mutationFn: async (subtask) => {
-      // A API não tem endpoint específico para toggle, então vamos usar PUT
-      return api.put(`/subtasks/${subtask.id}/`, {
-        ...subtask,
-        completed: !subtask.completed
-      })
-    },
+    mutationFn: (subtask) => api.post(`/tasks/subtasks/${subtask.id}/toggle/`, {
+      completed: !subtask.completed
+    }),
     onSuccess: () => {
       queryClient.invalidateQueries(['subtasks', taskId])
       queryClient.invalidateQueries(['tasks'])
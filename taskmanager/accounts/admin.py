@@ -1,3 +1,29 @@
 from django.contrib import admin
+from .models import AccountDeletion, CalendarFeed, UserShard
 
-# Register your models here.
+
+@admin.register(AccountDeletion)
+class AccountDeletionAdmin(admin.ModelAdmin):
+    list_display = ['user', 'requested_at']
+    list_select_related = ['user']
+    search_fields = ['user__username', 'user__email']
+    readonly_fields = ['user', 'requested_at']
+
+
+@admin.register(UserShard)
+class UserShardAdmin(admin.ModelAdmin):
+    list_display = ['user', 'database', 'moving', 'updated_at']
+    list_filter = ['database', 'moving']
+    list_select_related = ['user']
+    search_fields = ['=user__username']
+    readonly_fields = ['updated_at']
+    autocomplete_fields = ['user']
+
+
+@admin.register(CalendarFeed)
+class CalendarFeedAdmin(admin.ModelAdmin):
+    list_display = ['user', 'created_at']
+    list_select_related = ['user']
+    search_fields = ['=user__username']
+    readonly_fields = ['token', 'created_at']
+    autocomplete_fields = ['user']
@@ -0,0 +1,33 @@
+"""
+Autenticação do DRF que também seleciona o banco (fragmento) do usuário.
+"""
+from rest_framework import authentication, status
+from rest_framework.exceptions import APIException
+from rest_framework.permissions import SAFE_METHODS
+
+from taskmanager import sharding
+
+
+class ShardMoving(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Seus dados estão sendo migrados. Tente novamente em alguns segundos.'
+    default_code = 'shard_moving'
+    wait = 5
+
+
+class ShardAuthenticationMixin:
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is not None:
+            _, moving = sharding.activate_user_shard(result[0].pk)
+            if moving and request.method not in SAFE_METHODS:
+                raise ShardMoving()
+        return result
+
+
+class TokenAuthentication(ShardAuthenticationMixin, authentication.TokenAuthentication):
+    pass
+
+
+class SessionAuthentication(ShardAuthenticationMixin, authentication.SessionAuthentication):
+    pass
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.5 on 2026-10-19 15:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('database', models.CharField(help_text='Alias do banco em TASK_SHARD_DATABASES', max_length=50, verbose_name='Banco de dados')),
+                ('moving', models.BooleanField(default=False, help_text='Escritas do usuário ficam bloqueadas durante a troca de banco', verbose_name='Em migração')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='shard', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Fragmento do Usuário',
+                'verbose_name_plural': 'Fragmentos dos Usuários',
+            },
+        ),
+    ]
@@ -1,3 +1,90 @@
 from django.db import models
+from django.contrib.auth.models import User
 
-# Create your models here.
+
+class AccountDeletion(models.Model):
+    """
+    Conta aguardando exclusão em segundo plano.
+    O usuário é desativado na solicitação e removido pelo processamento de exclusões.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='deletion_request',
+        verbose_name="Usuário"
+    )
+    requested_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Solicitada em"
+    )
+
+    class Meta:
+        verbose_name = "Exclusão de Conta"
+        verbose_name_plural = "Exclusões de Conta"
+        ordering = ['requested_at']
+
+    def __str__(self):
+        return f"Exclusão de {self.user.username}"
+
+
+class UserShard(models.Model):
+    """
+    Banco de dados (fragmento) onde ficam os dados do usuário.
+    Usuários sem registro aqui ficam em `default`.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shard',
+        verbose_name="Usuário"
+    )
+    database = models.CharField(
+        max_length=50,
+        verbose_name="Banco de dados",
+        help_text="Alias do banco em TASK_SHARD_DATABASES"
+    )
+    moving = models.BooleanField(
+        default=False,
+        verbose_name="Em migração",
+        help_text="Escritas do usuário ficam bloqueadas durante a troca de banco"
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Atualizado em"
+    )
+
+    class Meta:
+        verbose_name = "Fragmento do Usuário"
+        verbose_name_plural = "Fragmentos dos Usuários"
+
+    def __str__(self):
+        return f"{self.user.username} -> {self.database}"
+
+
+class CalendarFeed(models.Model):
+    """
+    Token do feed iCalendar (`.ics`) do usuário. O feed é lido por aplicativos
+    de calendário, sem autenticação; o token na URL identifica o usuário.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='calendar_feed',
+        verbose_name="Usuário"
+    )
+    token = models.CharField(
+        max_length=64,
+        unique=True,
+        verbose_name="Token"
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Criado em"
+    )
+
+    class Meta:
+        verbose_name = "Feed de Calendário"
+        verbose_name_plural = "Feeds de Calendário"
+
+    def __str__(self):
+        return f"Feed de {self.user.username}"
@@ -61,17 +61,17 @@ class UserProfileSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'username', 'date_joined')
 
     def get_tasks_count(self, obj):
-        return obj.tasks.count()
+        return obj.tasks.count() + obj.archived_tasks.count()
 
     def get_completed_tasks_count(self, obj):
-        return obj.tasks.filter(completed=True).count()
+        return obj.tasks.filter(completed=True).count() + obj.archived_tasks.count()
 
     def get_categories_count(self, obj):
-        return obj.categories.count()
+        return obj.categories.filter(deletion_requested_at__isnull=True).count()
 
     def get_tags_count(self, obj):
         return obj.tags.count()
 
     def get_lists_count(self, obj):
-        return obj.task_lists.count()
+        return obj.task_lists.filter(deletion_requested_at__isnull=True).count()
 
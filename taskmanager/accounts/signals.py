@@ -0,0 +1,30 @@
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_migrate, post_save
+from django.dispatch import receiver
+
+from taskmanager import sharding
+
+
+@receiver(post_save, sender=User, dispatch_uid='accounts.place_user_shard')
+def place_user_shard(sender, instance, created, raw, using, **kwargs):
+    """
+    Define o fragmento de novos usuários (por hash do ID) e mantém a cópia
+    da linha do usuário atualizada no seu fragmento.
+    """
+    if raw or using != DEFAULT_DB_ALIAS or not sharding.is_sharded():
+        return
+    from .models import UserShard
+    if created:
+        alias = sharding.hashed_shard(instance.pk)
+        UserShard.objects.create(user=instance, database=alias)
+    else:
+        alias = sharding.shard_for_user(instance.pk)
+    sharding.mirror_user(instance, alias)
+
+
+@receiver(post_migrate, dispatch_uid='accounts.reserve_shard_id_range')
+def reserve_shard_id_range(sender, using, **kwargs):
+    """Reserva o bloco de IDs do fragmento para os modelos fragmentados"""
+    if sender.label in sharding.SHARDED_APPS:
+        sharding.reserve_id_range(using, sender.get_models(include_auto_created=True))
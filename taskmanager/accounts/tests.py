@@ -1,3 +1,59 @@
+from django.contrib.auth.models import User
 from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from jobs.models import Job
+from .models import AccountDeletion, CalendarFeed
+
+
+class AccountTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('ana', password='senha-segura-1')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+
+class CalendarFeedTokenTests(AccountTestCase):
+    def test_regeneration_revokes_previous_url(self):
+        self.assertEqual(self.client.get('/api/auth/calendar-feed/').status_code, 404)
+        first = self.client.post('/api/auth/calendar-feed/').data['url']
+
+        second = self.client.post('/api/auth/calendar-feed/').data['url']
+
+        self.assertNotEqual(first, second)
+        self.assertEqual(self.client.get('/api/auth/calendar-feed/').data['url'], second)
+        self.assertEqual(APIClient().get(first).status_code, 404)
+        self.assertEqual(APIClient().get(second).status_code, 200)
+
+    def test_revoked_feed_is_not_found(self):
+        url = self.client.post('/api/auth/calendar-feed/').data['url']
+
+        self.assertEqual(self.client.delete('/api/auth/calendar-feed/').status_code, 204)
+
+        self.assertEqual(APIClient().get(url).status_code, 404)
+
+
+class AccountDeletionTests(AccountTestCase):
+    def test_delete_deactivates_and_schedules_purge(self):
+        Token.objects.create(user=self.user)
+        CalendarFeed.objects.create(user=self.user, token='token-do-feed')
+
+        response = self.client.delete('/api/auth/user/')
+
+        self.assertEqual(response.status_code, 202)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertTrue(AccountDeletion.objects.filter(user=self.user).exists())
+        self.assertFalse(Token.objects.filter(user=self.user).exists())
+        self.assertFalse(CalendarFeed.objects.filter(user=self.user).exists())
+        self.assertEqual(Job.objects.get().name, 'accounts.purge')
+
+    def test_deleted_account_cannot_log_in(self):
+        self.client.delete('/api/auth/user/')
+
+        response = APIClient().post(
+            '/api/auth/login/', {'username': 'ana', 'password': 'senha-segura-1'}, format='json'
+        )
+
+        self.assertEqual(response.status_code, 400)
@@ -11,6 +11,7 @@ urlpatterns = [
     path('logout/', views.LogoutView.as_view(), name='logout'),
     path('register/', views.RegisterView.as_view(), name='register'),
     path('user/', views.UserProfileView.as_view(), name='user-profile'),
+    path('calendar-feed/', views.CalendarFeedView.as_view(), name='calendar-feed-token'),
     
     # Include router URLs
     path('', include(router.urls)),
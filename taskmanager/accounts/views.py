@@ -1,3 +1,5 @@
+import secrets
+
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
@@ -5,6 +7,10 @@ from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
 from rest_framework.views import APIView
 from django.contrib.auth import login, logout
+from django.urls import reverse
+from jobs import queue
+from tasks.deletion import request_account_deletion
+from .models import CalendarFeed
 from .serializers import UserRegistrationSerializer, UserLoginSerializer, UserProfileSerializer
 
 
@@ -76,3 +82,37 @@ class UserProfileView(APIView):
                 'user': serializer.data
             })
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    def delete(self, request):
+        """Desativa a conta e agenda a exclusão de todos os seus dados"""
+        request_account_deletion(request.user)
+        queue.enqueue('accounts.purge', user_id=request.user.pk, unique=True)
+        logout(request)
+        return Response({
+            'message': 'Exclusão da conta agendada'
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class CalendarFeedView(APIView):
+    """Endereço do feed iCalendar do usuário: consultar, gerar (ou trocar) e revogar"""
+    permission_classes = [IsAuthenticated]
+
+    def feed_data(self, request, feed):
+        url = reverse('calendar-feed', args=[feed.token])
+        return {'url': request.build_absolute_uri(url), 'created_at': feed.created_at}
+
+    def get(self, request):
+        feed = CalendarFeed.objects.filter(user=request.user).first()
+        if feed is None:
+            return Response({'error': 'Feed de calendário não gerado'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(self.feed_data(request, feed))
+
+    def post(self, request):
+        """Gera o endereço; se já existir, o anterior deixa de funcionar"""
+        CalendarFeed.objects.filter(user=request.user).delete()
+        feed = CalendarFeed.objects.create(user=request.user, token=secrets.token_urlsafe(32))
+        return Response(self.feed_data(request, feed), status=status.HTTP_201_CREATED)
+
+    def delete(self, request):
+        CalendarFeed.objects.filter(user=request.user).delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -1,18 +1,37 @@
 from django.contrib import admin
+from reports.rollups import fold_category
+from tasks.annotations import annotated_completion_percentage, task_count_annotations
 from .models import Category
 
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
     list_display = ['name', 'user', 'color', 'tasks_count', 'completion_percentage', 'created_at']
-    list_filter = ['user', 'created_at']
-    search_fields = ['name', 'description']
+    list_filter = ['created_at']
+    search_fields = ['name', 'description', '=user__username']
     readonly_fields = ['created_at', 'updated_at']
-    
+    autocomplete_fields = ['user']
+
+    def get_queryset(self, request):
+        annotations = task_count_annotations('category')
+        return super().get_queryset(request).select_related('user').annotate(
+            **annotations['completion_percentage']
+        )
+
     def tasks_count(self, obj):
-        return obj.get_tasks_count()
+        return obj._tasks_count
     tasks_count.short_description = 'Tarefas'
-    
+    tasks_count.admin_order_field = '_tasks_count'
+
     def completion_percentage(self, obj):
-        return f"{obj.get_completion_percentage()}%"
+        return f"{annotated_completion_percentage(obj)}%"
     completion_percentage.short_description = 'Conclusão'
+
+    def delete_model(self, request, obj):
+        fold_category(obj.pk)
+        super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        for category_id in queryset.values_list('pk', flat=True):
+            fold_category(category_id)
+        super().delete_queryset(request, queryset)
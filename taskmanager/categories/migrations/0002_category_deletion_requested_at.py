@@ -0,0 +1,32 @@
+# Generated by Django 5.2.5 on 2026-10-19 15:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='category',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='deletion_requested_at',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Preenchido quando a categoria aguarda exclusão em segundo plano', null=True, verbose_name='Exclusão solicitada em'),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(condition=models.Q(('deletion_requested_at__isnull', False)), fields=['deletion_requested_at'], name='category_pending_deletion_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='category',
+            constraint=models.UniqueConstraint(condition=models.Q(('deletion_requested_at__isnull', True)), fields=('user', 'name'), name='category_unique_user_name'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+"""
+Índice GIN de trigramas em `categories_category.name` para o autocompletar
+(`/api/autocomplete/`). Só existe no PostgreSQL; nos demais bancos o
+autocompletar usa o índice em memória.
+"""
+from django.db import migrations
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS category_name_trgm_idx ON categories_category USING gin (name gin_trgm_ops)'
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS category_name_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0002_category_deletion_requested_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -37,6 +37,13 @@ class Category(models.Model):
         verbose_name="Usuário",
         help_text="Usuário proprietário da categoria"
     )
+    deletion_requested_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="Exclusão solicitada em",
+        help_text="Preenchido quando a categoria aguarda exclusão em segundo plano"
+    )
     created_at = models.DateTimeField(
         auto_now_add=True,
         verbose_name="Criado em"
@@ -50,18 +57,32 @@ class Category(models.Model):
         verbose_name = "Categoria"
         verbose_name_plural = "Categorias"
         ordering = ['name']
-        unique_together = ['user', 'name']  # Nome único por usuário
+        constraints = [
+            # Nome único por usuário, desconsiderando registros aguardando exclusão
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                condition=models.Q(deletion_requested_at__isnull=True),
+                name='category_unique_user_name',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['deletion_requested_at'],
+                condition=models.Q(deletion_requested_at__isnull=False),
+                name='category_pending_deletion_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.user.username})"
 
     def get_tasks_count(self):
         """Retorna o número de tarefas nesta categoria"""
-        return self.tasks.count()
+        return self.tasks.count() + self.archived_tasks.count()
 
     def get_completed_tasks_count(self):
         """Retorna o número de tarefas concluídas nesta categoria"""
-        return self.tasks.filter(completed=True).count()
+        return self.tasks.filter(completed=True).count() + self.archived_tasks.count()
 
     def get_completion_percentage(self):
         """Retorna a porcentagem de conclusão das tarefas desta categoria"""
@@ -1,8 +1,11 @@
 from rest_framework import serializers
+from taskmanager import autocomplete
+from taskmanager.sparse_fields import SparseFieldsetMixin
+from tasks.annotations import annotated, annotated_completion_percentage
 from .models import Category
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer para categorias"""
     tasks_count = serializers.SerializerMethodField()
     completed_tasks_count = serializers.SerializerMethodField()
@@ -15,21 +18,30 @@ class CategorySerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
     def get_tasks_count(self, obj):
-        return obj.get_tasks_count()
+        return annotated(obj, 'tasks_count', obj.get_tasks_count)
 
     def get_completed_tasks_count(self, obj):
-        return obj.get_completed_tasks_count()
+        return annotated(obj, 'completed_tasks_count', obj.get_completed_tasks_count)
 
     def get_completion_percentage(self, obj):
-        return obj.get_completion_percentage()
+        return annotated_completion_percentage(obj)
 
     def create(self, validated_data):
         validated_data['user'] = self.context['request'].user
-        return Category.objects.create(**validated_data)
+        instance = Category.objects.create(**validated_data)
+        autocomplete.invalidate(instance.user_id)
+        return instance
+
+    def update(self, instance, validated_data):
+        name = instance.name
+        instance = super().update(instance, validated_data)
+        if instance.name != name:
+            autocomplete.invalidate(instance.user_id)
+        return instance
 
     def validate_name(self, value):
         user = self.context['request'].user
-        if Category.objects.filter(user=user, name=value).exists():
+        if Category.objects.filter(user=user, name=value, deletion_requested_at__isnull=True).exists():
             if not self.instance or self.instance.name != value:
                 raise serializers.ValidationError("Já existe uma categoria com este nome.")
         return value
@@ -1,3 +1,39 @@
+from django.contrib.auth.models import User
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from jobs import handlers
+from jobs.models import Job
+from tasks.models import Task
+from .models import Category
+
+
+class CategoryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('ana', password='senha-segura-1')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.category = Category.objects.create(user=self.user, name='Trabalho')
+        self.task = Task.objects.create(user=self.user, title='Relatório', category=self.category)
+
+    def test_destroy_hides_category_and_schedules_purge(self):
+        response = self.client.delete(f'/api/categories/{self.category.pk}/')
+
+        self.assertEqual(response.status_code, 202)
+        job = Job.objects.get()
+        self.assertEqual((job.name, job.arguments), ('categories.purge', {'category_id': self.category.pk}))
+        self.assertEqual(self.client.get('/api/categories/').data['count'], 0)
+
+    def test_purge_job_unlinks_tasks(self):
+        self.client.delete(f'/api/categories/{self.category.pk}/')
+
+        result = handlers.purge_category(self.user.pk, self.category.pk)
+
+        self.assertEqual(result, {'categories': 1})
+        self.task.refresh_from_db()
+        self.assertIsNone(self.task.category_id)
+        self.assertFalse(Category.objects.exists())
+
+    def test_purge_job_ignores_category_not_pending_deletion(self):
+        self.assertEqual(handlers.purge_category(self.user.pk, self.category.pk), {'categories': 0})
+        self.assertTrue(Category.objects.filter(pk=self.category.pk).exists())
@@ -1,13 +1,30 @@
 from rest_framework import viewsets
 from rest_framework.permissions import IsAuthenticated
+from taskmanager.sparse_fields import SparseQuerysetMixin
+from jobs import queue
+from jobs.views import accepted_response
+from tasks.annotations import task_count_annotations
 from .models import Category
 from .serializers import CategorySerializer
+from tasks.deletion import request_deletion
 
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(SparseQuerysetMixin, viewsets.ModelViewSet):
     """ViewSet para categorias"""
     serializer_class = CategorySerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return Category.objects.filter(user=self.request.user)
+        queryset = Category.objects.filter(user=self.request.user, deletion_requested_at__isnull=True)
+        return self.optimize_queryset(queryset)
+
+    def get_field_annotations(self):
+        return task_count_annotations('category')
+
+    def destroy(self, request, *args, **kwargs):
+        """Agenda a exclusão; as tarefas são desvinculadas em segundo plano"""
+        category = self.get_object()
+        request_deletion(category)
+        job = queue.enqueue('categories.purge', user_id=request.user.pk,
+                            arguments={'category_id': category.pk})
+        return accepted_response(request, job, 'Exclusão da categoria agendada')
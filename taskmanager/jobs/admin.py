@@ -0,0 +1,15 @@
+from django.contrib import admin
+from taskmanager.admin_utils import EstimatedCountPaginator
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['name', 'status', 'user', 'priority', 'attempts', 'run_at', 'finished_at']
+    list_filter = ['status', 'name', 'created_at']
+    list_select_related = ['user']
+    search_fields = ['name', '=user__username']
+    readonly_fields = ['created_at', 'started_at', 'finished_at', 'locked_by', 'locked_until']
+    autocomplete_fields = ['user']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
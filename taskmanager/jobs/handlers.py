@@ -0,0 +1,54 @@
+"""
+Tarefas executáveis pelo `runworker`. Trabalhos de um usuário recebem
+`user_id` e rodam no banco do usuário; o retorno é gravado em `Job.result`.
+
+As exclusões conferem se ainda estão pendentes: o `process_pending_deletions`
+continua processando o que ficar para trás, e os dois podem se cruzar.
+"""
+from accounts.models import AccountDeletion
+from categories.models import Category
+from lists.models import TaskList
+from reports.rollups import rebuild_rollups
+from tasks import deletion, suggestions
+from .queue import register
+
+
+@register('lists.purge')
+def purge_task_list(user_id, task_list_id):
+    pending = TaskList.objects.filter(
+        pk=task_list_id, user_id=user_id, deletion_requested_at__isnull=False
+    )
+    if not pending.exists():
+        return {'lists': 0}
+    deletion.purge_task_list(task_list_id)
+    return {'lists': 1}
+
+
+@register('categories.purge')
+def purge_category(user_id, category_id):
+    pending = Category.objects.filter(
+        pk=category_id, user_id=user_id, deletion_requested_at__isnull=False
+    )
+    if not pending.exists():
+        return {'categories': 0}
+    deletion.purge_category(category_id)
+    return {'categories': 1}
+
+
+# A conta já está desativada: ninguém aguarda, então cede a vez aos demais
+@register('accounts.purge', priority=-10)
+def purge_account(user_id):
+    if not AccountDeletion.objects.filter(user_id=user_id).exists():
+        return {'accounts': 0}
+    deletion.purge_user(user_id)
+    return {'accounts': 1}
+
+
+@register('reports.rebuild_rollups')
+def rebuild_productivity_rollups(user_id):
+    return {'processed': rebuild_rollups(user_id=user_id)}
+
+
+@register('tasks.rebuild_suggestions')
+def rebuild_task_suggestions(user_id):
+    return {'processed': suggestions.rebuild_user(user_id)}
@@ -0,0 +1,69 @@
+import signal
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from jobs.queue import get_config
+from jobs.worker import Worker
+
+
+class Command(BaseCommand):
+    help = 'Executa os trabalhos em segundo plano (processos x threads; --once esvazia a fila e sai)'
+
+    def add_arguments(self, parser):
+        config = get_config()
+        parser.add_argument(
+            '--processes', type=int, default=config['PROCESSES'],
+            help='Processos de worker (mais de um: este processo só supervisiona)'
+        )
+        parser.add_argument(
+            '--threads', type=int, default=config['THREADS'],
+            help='Trabalhos simultâneos por processo'
+        )
+        parser.add_argument('--once', action='store_true', help='Executa o que está pronto e sai')
+
+    def handle(self, *args, **options):
+        if options['processes'] > 1:
+            return self.supervise(options)
+
+        worker = Worker(threads=options['threads'])
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: worker.stop())
+        self.stdout.write(f'Worker {worker.id} com {worker.threads} threads.')
+        processed = worker.run(once=options['once'])
+        self.stdout.write(f'{processed} trabalhos executados.')
+
+    def supervise(self, options):
+        """Mantém N processos de worker, reiniciando os que terminarem com erro"""
+        command = [
+            sys.executable, str(settings.BASE_DIR / 'manage.py'), 'runworker',
+            '--processes', '1', '--threads', str(options['threads']),
+        ]
+        if options['once']:
+            command.append('--once')
+        stopping = False
+
+        def stop(*_):
+            nonlocal stopping
+            stopping = True
+            for process in processes:
+                if process.poll() is None:
+                    process.terminate()
+
+        processes = [subprocess.Popen(command) for _ in range(options['processes'])]
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, stop)
+        self.stdout.write(f"{options['processes']} processos com {options['threads']} threads cada.")
+
+        while True:
+            for index, process in enumerate(processes):
+                code = process.poll()
+                if code not in (None, 0) and not stopping and not options['once']:
+                    self.stderr.write(f'Processo {process.pid} terminou com código {code}; reiniciando.')
+                    processes[index] = subprocess.Popen(command)
+            if all(process.poll() is not None for process in processes):
+                break
+            time.sleep(1)
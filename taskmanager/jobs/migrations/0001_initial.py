@@ -0,0 +1,46 @@
+# Generated by Django 5.2.5 on 2026-10-19 16:31
+
+import django.core.serializers.json
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Nome registrado em jobs/handlers.py', max_length=100, verbose_name='Tarefa')),
+                ('arguments', models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Argumentos')),
+                ('status', models.CharField(choices=[('queued', 'Na fila'), ('running', 'Em execução'), ('succeeded', 'Concluído'), ('failed', 'Falhou'), ('cancelled', 'Cancelado')], default='queued', max_length=10, verbose_name='Situação')),
+                ('priority', models.SmallIntegerField(default=0, help_text='Maior executa primeiro', verbose_name='Prioridade')),
+                ('run_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Executar a partir de')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Tentativas')),
+                ('max_attempts', models.PositiveSmallIntegerField(default=3, verbose_name='Máximo de Tentativas')),
+                ('result', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True, verbose_name='Resultado')),
+                ('error', models.TextField(blank=True, verbose_name='Último Erro')),
+                ('locked_by', models.CharField(blank=True, max_length=100, verbose_name='Worker')),
+                ('locked_until', models.DateTimeField(blank=True, help_text='Renovado pelo worker; vencido, o trabalho volta para a fila', null=True, verbose_name='Reservado até')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Iniciado em')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Concluído em')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='jobs', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Trabalho',
+                'verbose_name_plural': 'Trabalhos',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(condition=models.Q(('status', 'queued')), fields=['-priority', 'run_at', 'id'], name='job_ready_idx'), models.Index(condition=models.Q(('status', 'running')), fields=['locked_until'], name='job_lease_idx'), models.Index(fields=['user', '-created_at'], name='job_user_created_idx'), models.Index(fields=['finished_at'], name='job_finished_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,126 @@
+from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """
+    Trabalho em segundo plano executado pelo `runworker`. Fica sempre no
+    banco `default`; a tarefa roda no banco do usuário (`user`).
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+    STATUS_CHOICES = [
+        (QUEUED, 'Na fila'),
+        (RUNNING, 'Em execução'),
+        (SUCCEEDED, 'Concluído'),
+        (FAILED, 'Falhou'),
+        (CANCELLED, 'Cancelado'),
+    ]
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='jobs',
+        verbose_name="Usuário"
+    )
+    name = models.CharField(
+        max_length=100,
+        verbose_name="Tarefa",
+        help_text="Nome registrado em jobs/handlers.py"
+    )
+    arguments = models.JSONField(
+        default=dict,
+        blank=True,
+        encoder=DjangoJSONEncoder,
+        verbose_name="Argumentos"
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=QUEUED,
+        verbose_name="Situação"
+    )
+    priority = models.SmallIntegerField(
+        default=0,
+        verbose_name="Prioridade",
+        help_text="Maior executa primeiro"
+    )
+    run_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name="Executar a partir de"
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name="Tentativas"
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        default=3,
+        verbose_name="Máximo de Tentativas"
+    )
+    result = models.JSONField(
+        null=True,
+        blank=True,
+        encoder=DjangoJSONEncoder,
+        verbose_name="Resultado"
+    )
+    error = models.TextField(
+        blank=True,
+        verbose_name="Último Erro"
+    )
+    locked_by = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name="Worker"
+    )
+    locked_until = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Reservado até",
+        help_text="Renovado pelo worker; vencido, o trabalho volta para a fila"
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Criado em"
+    )
+    started_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Iniciado em"
+    )
+    finished_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Concluído em"
+    )
+
+    class Meta:
+        verbose_name = "Trabalho"
+        verbose_name_plural = "Trabalhos"
+        ordering = ['-created_at']
+        indexes = [
+            # Reserva: próximos trabalhos prontos, na ordem de execução
+            models.Index(
+                fields=['-priority', 'run_at', 'id'],
+                condition=Q(status='queued'),
+                name='job_ready_idx',
+            ),
+            # Recuperação de trabalhos de workers interrompidos
+            models.Index(
+                fields=['locked_until'],
+                condition=Q(status='running'),
+                name='job_lease_idx',
+            ),
+            models.Index(fields=['user', '-created_at'], name='job_user_created_idx'),
+            models.Index(fields=['finished_at'], name='job_finished_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
@@ -0,0 +1,210 @@
+"""
+Fila de trabalhos em segundo plano gravada no banco, sem serviços externos.
+
+As tarefas executáveis são registradas por nome (`@register`, em
+jobs/handlers.py); `enqueue()` grava um `Job` e o `runworker` o executa.
+Trabalhos de um usuário recebem `user_id` e rodam no banco do usuário.
+
+Reserva: no PostgreSQL, `SELECT ... FOR UPDATE SKIP LOCKED` faz cada worker
+pegar trabalhos diferentes sem esperar pelos outros. No SQLite (sem
+bloqueio de linhas) a reserva é um UPDATE condicionado à situação `queued`;
+um worker que perde a disputa simplesmente não recebe o trabalho.
+
+Cada reserva vale por `LEASE` segundos e é renovada enquanto o trabalho
+executa; reservas vencidas (worker interrompido) voltam para a fila.
+Falhas são repetidas com espera exponencial até `max_attempts`.
+"""
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+
+DEFAULTS = {
+    # Processos e threads por processo do `runworker`
+    'PROCESSES': 1,
+    'THREADS': 4,
+    # Espera quando a fila está vazia (segundos)
+    'POLL_INTERVAL': 1.0,
+    # Validade da reserva de um trabalho, renovada durante a execução (segundos)
+    'LEASE': 300,
+    'MAX_ATTEMPTS': 3,
+    # Espera entre tentativas: RETRY_BACKOFF_BASE * 2^(tentativas - 1), até RETRY_BACKOFF_MAX
+    'RETRY_BACKOFF_BASE': 10,
+    'RETRY_BACKOFF_MAX': 3600,
+    # Espera de trabalhos de usuários com dados em migração entre bancos (segundos)
+    'SHARD_MOVING_DELAY': 5,
+    # Trabalhos encerrados são removidos após esse prazo
+    'RETENTION_DAYS': 7,
+}
+
+FINISHED = [Job.SUCCEEDED, Job.FAILED, Job.CANCELLED]
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'JOBS', {})}
+
+
+class UnknownJob(Exception):
+    message = 'Tarefa não registrada'
+
+
+_handlers = {}
+
+
+def register(name, priority=0, max_attempts=None):
+    """Registra a função como tarefa executável pelo worker"""
+    def decorator(func):
+        _handlers[name] = (func, priority, max_attempts)
+        return func
+    return decorator
+
+
+def get_handler(name):
+    try:
+        return _handlers[name][0]
+    except KeyError:
+        raise UnknownJob(name)
+
+
+def enqueue(name, user_id=None, arguments=None, priority=None, run_at=None,
+            delay=None, unique=False):
+    """
+    Agenda uma tarefa registrada. `run_at` (ou `delay`, em segundos) adia a
+    execução; com `unique`, reaproveita um trabalho idêntico ainda na fila.
+    """
+    if name not in _handlers:
+        raise UnknownJob(name)
+    _, default_priority, max_attempts = _handlers[name]
+    arguments = arguments or {}
+    if run_at is None:
+        run_at = timezone.now() + timedelta(seconds=delay or 0)
+
+    if unique:
+        existing = Job.objects.filter(
+            name=name, user_id=user_id, arguments=arguments, status=Job.QUEUED
+        ).first()
+        if existing is not None:
+            return existing
+    return Job.objects.create(
+        name=name,
+        user_id=user_id,
+        arguments=arguments,
+        priority=default_priority if priority is None else priority,
+        run_at=run_at,
+        max_attempts=max_attempts or get_config()['MAX_ATTEMPTS'],
+    )
+
+
+def claim(worker_id, limit, config=None):
+    """Reserva até `limit` trabalhos prontos para o worker, na ordem de execução"""
+    config = config or get_config()
+    now = timezone.now()
+    ready = Job.objects.filter(status=Job.QUEUED, run_at__lte=now).order_by(
+        '-priority', 'run_at', 'pk'
+    ).values_list('pk', flat=True)
+
+    def reserve(ids):
+        Job.objects.filter(pk__in=ids, status=Job.QUEUED).update(
+            status=Job.RUNNING,
+            locked_by=worker_id,
+            locked_until=now + timedelta(seconds=config['LEASE']),
+            started_at=now,
+            attempts=F('attempts') + 1,
+        )
+
+    if connections[DEFAULT_DB_ALIAS].features.has_select_for_update_skip_locked:
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            ids = list(ready.select_for_update(skip_locked=True)[:limit])
+            reserve(ids)
+    else:
+        # Sem transação: no SQLite, a leitura seguida de escrita na mesma
+        # transação falha com "database is locked" sob concorrência
+        ids = list(ready[:limit])
+        reserve(ids)
+    if not ids:
+        return []
+    claimed = Job.objects.filter(pk__in=ids, status=Job.RUNNING, locked_by=worker_id, started_at=now)
+    return sorted(claimed, key=lambda job: ids.index(job.pk))
+
+
+def renew(worker_id, job_ids, config=None):
+    """Estende a reserva dos trabalhos em execução no worker"""
+    config = config or get_config()
+    if job_ids:
+        Job.objects.filter(pk__in=job_ids, status=Job.RUNNING, locked_by=worker_id).update(
+            locked_until=timezone.now() + timedelta(seconds=config['LEASE'])
+        )
+
+
+def complete(job, worker_id, result=None):
+    Job.objects.filter(pk=job.pk, status=Job.RUNNING, locked_by=worker_id).update(
+        status=Job.SUCCEEDED, result=result, error='', finished_at=timezone.now(),
+        locked_by='', locked_until=None,
+    )
+
+
+def postpone(job, worker_id, delay):
+    """Devolve o trabalho à fila para daqui a `delay` segundos, sem contar a tentativa"""
+    Job.objects.filter(pk=job.pk, status=Job.RUNNING, locked_by=worker_id).update(
+        status=Job.QUEUED, run_at=timezone.now() + timedelta(seconds=delay),
+        attempts=F('attempts') - 1, locked_by='', locked_until=None,
+    )
+
+
+def retry_delay(attempts, config):
+    delay = min(config['RETRY_BACKOFF_BASE'] * 2 ** (attempts - 1), config['RETRY_BACKOFF_MAX'])
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def fail(job, worker_id, error, config=None):
+    """Agenda nova tentativa ou, esgotadas as tentativas, encerra com falha"""
+    config = config or get_config()
+    now = timezone.now()
+    running = Job.objects.filter(pk=job.pk, status=Job.RUNNING, locked_by=worker_id)
+    if job.attempts < job.max_attempts:
+        running.update(
+            status=Job.QUEUED, run_at=now + retry_delay(job.attempts, config),
+            error=error[:4000], locked_by='', locked_until=None,
+        )
+    else:
+        running.update(
+            status=Job.FAILED, error=error[:4000], finished_at=now,
+            locked_by='', locked_until=None,
+        )
+
+
+def cancel(job_id, user_id=None):
+    """Cancela um trabalho ainda na fila; retorna se foi cancelado"""
+    queryset = Job.objects.filter(pk=job_id, status=Job.QUEUED)
+    if user_id is not None:
+        queryset = queryset.filter(user_id=user_id)
+    return bool(queryset.update(status=Job.CANCELLED, finished_at=timezone.now()))
+
+
+def recover_expired():
+    """Devolve à fila (ou encerra) os trabalhos de workers interrompidos"""
+    now = timezone.now()
+    expired = Job.objects.filter(status=Job.RUNNING, locked_until__lt=now)
+    requeued = expired.filter(attempts__lt=F('max_attempts')).update(
+        status=Job.QUEUED, run_at=now, error='Reserva expirada (worker interrompido)',
+        locked_by='', locked_until=None,
+    )
+    failed = expired.update(
+        status=Job.FAILED, error='Reserva expirada (worker interrompido)', finished_at=now,
+        locked_by='', locked_until=None,
+    )
+    return requeued + failed
+
+
+def prune_finished(config=None):
+    """Remove trabalhos encerrados há mais de `RETENTION_DAYS`"""
+    config = config or get_config()
+    cutoff = timezone.now() - timedelta(days=config['RETENTION_DAYS'])
+    deleted, _ = Job.objects.filter(status__in=FINISHED, finished_at__lt=cutoff).delete()
+    return deleted
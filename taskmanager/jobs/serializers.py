@@ -0,0 +1,13 @@
+from rest_framework import serializers
+
+from .models import Job
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """Serializer (somente leitura) para a situação de um trabalho"""
+
+    class Meta:
+        model = Job
+        fields = ['id', 'name', 'arguments', 'status', 'priority', 'run_at', 'attempts',
+                  'max_attempts', 'result', 'error', 'created_at', 'started_at', 'finished_at']
+        read_only_fields = fields
@@ -0,0 +1,218 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from . import queue, worker
+from .models import Job
+
+
+WORKER_ID = 'teste:1'
+
+
+class JobTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('ana', password='senha-segura-1')
+        self.calls = []
+        handlers = mock.patch.dict(queue._handlers, {
+            'tests.echo': (self.echo, 0, 2),
+            'tests.broken': (self.broken, 0, 2),
+        })
+        handlers.start()
+        self.addCleanup(handlers.stop)
+        self.config = {**queue.get_config(), 'RETRY_BACKOFF_BASE': 0}
+
+    def echo(self, **arguments):
+        self.calls.append(arguments)
+        return arguments
+
+    def broken(self, **arguments):
+        raise RuntimeError('falhou')
+
+    def claim_one(self):
+        claimed = queue.claim(WORKER_ID, 1, self.config)
+        self.assertEqual(len(claimed), 1)
+        return claimed[0]
+
+
+class QueueTests(JobTestCase):
+    def test_unique_enqueue_reuses_queued_job(self):
+        first = queue.enqueue('tests.echo', self.user.pk, {'value': 1}, unique=True)
+        second = queue.enqueue('tests.echo', self.user.pk, {'value': 1}, unique=True)
+
+        self.assertEqual(first.pk, second.pk)
+
+    def test_unknown_job_is_rejected(self):
+        with self.assertRaises(queue.UnknownJob):
+            queue.enqueue('tests.unknown')
+
+    def test_claimed_job_is_not_claimed_again(self):
+        queue.enqueue('tests.echo')
+
+        job = self.claim_one()
+
+        self.assertEqual((job.status, job.attempts, job.locked_by), (Job.RUNNING, 1, WORKER_ID))
+        self.assertEqual(queue.claim('teste:2', 1, self.config), [])
+
+    def test_failures_are_retried_until_max_attempts(self):
+        queue.enqueue('tests.broken')
+
+        for _ in range(2):
+            job = self.claim_one()
+            with self.assertLogs('jobs.worker', 'ERROR'):
+                worker.execute(job, WORKER_ID, self.config)
+            Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        self.assertIn('falhou', job.error)
+
+    def test_claim_follows_priority_and_run_at(self):
+        now = timezone.now()
+        late = queue.enqueue('tests.echo', run_at=now - timedelta(minutes=1))
+        early = queue.enqueue('tests.echo', run_at=now - timedelta(minutes=2))
+        urgent = queue.enqueue('tests.echo', priority=5, run_at=now)
+        queue.enqueue('tests.echo', priority=9, delay=60)
+
+        claimed = queue.claim(WORKER_ID, 2, self.config)
+
+        self.assertEqual([job.pk for job in claimed], [urgent.pk, early.pk])
+        self.assertEqual([job.pk for job in queue.claim(WORKER_ID, 5, self.config)], [late.pk])
+        self.assertEqual(Job.objects.filter(status=Job.QUEUED).count(), 1)
+
+    def test_retry_backoff_grows_exponentially_up_to_the_limit(self):
+        config = {**self.config, 'RETRY_BACKOFF_BASE': 10, 'RETRY_BACKOFF_MAX': 30}
+        job = queue.enqueue('tests.broken')
+        Job.objects.filter(pk=job.pk).update(max_attempts=5)
+
+        for attempts, expected in [(1, 10), (2, 20), (3, 30), (4, 30)]:
+            job = self.claim_one()
+            self.assertEqual(job.attempts, attempts)
+            before = timezone.now()
+            queue.fail(job, WORKER_ID, 'RuntimeError: falhou', config)
+
+            job.refresh_from_db()
+            with self.subTest(attempts=attempts):
+                self.assertEqual((job.status, job.locked_by, job.locked_until), (Job.QUEUED, '', None))
+                # Variação aleatória de 20% em torno da espera
+                self.assertGreaterEqual(job.run_at, before + timedelta(seconds=expected * 0.8))
+                self.assertLessEqual(job.run_at, timezone.now() + timedelta(seconds=expected * 1.2))
+            Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+
+    def test_last_attempt_fails_the_job(self):
+        queue.enqueue('tests.broken')
+        Job.objects.update(attempts=1)
+
+        job = self.claim_one()
+        queue.fail(job, WORKER_ID, 'x' * 5000, self.config)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.locked_by), (Job.FAILED, 2, ''))
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(len(job.error), 4000)
+        self.assertEqual(queue.claim(WORKER_ID, 1, self.config), [])
+
+    def test_results_of_a_lost_lease_are_ignored(self):
+        queue.enqueue('tests.echo')
+        job = self.claim_one()
+        Job.objects.filter(pk=job.pk).update(locked_by='teste:2')
+
+        queue.complete(job, WORKER_ID, {'ok': True})
+        queue.fail(job, WORKER_ID, 'RuntimeError: falhou', self.config)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by, job.result), (Job.RUNNING, 'teste:2', None))
+
+    def test_renew_extends_only_own_leases(self):
+        queue.enqueue('tests.echo')
+        queue.enqueue('tests.echo')
+        mine, other = queue.claim(WORKER_ID, 1, self.config) + queue.claim('teste:2', 1, self.config)
+        Job.objects.update(locked_until=timezone.now())
+
+        queue.renew(WORKER_ID, [mine.pk, other.pk], {**self.config, 'LEASE': 600})
+
+        mine.refresh_from_db()
+        other.refresh_from_db()
+        self.assertGreater(mine.locked_until, timezone.now() + timedelta(seconds=500))
+        self.assertLess(other.locked_until, timezone.now())
+
+    def test_expired_leases_are_requeued_or_failed(self):
+        queue.enqueue('tests.echo')
+        queue.enqueue('tests.echo')
+        retried, exhausted = queue.claim(WORKER_ID, 2, self.config)
+        Job.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+        Job.objects.filter(pk=exhausted.pk).update(attempts=2)
+
+        self.assertEqual(queue.recover_expired(), 2)
+
+        retried.refresh_from_db()
+        exhausted.refresh_from_db()
+        self.assertEqual((retried.status, retried.locked_by), (Job.QUEUED, ''))
+        self.assertEqual(exhausted.status, Job.FAILED)
+        self.assertIn('Reserva expirada', exhausted.error)
+
+    def test_cancel_only_queued_jobs_of_the_user(self):
+        queued = queue.enqueue('tests.echo', self.user.pk)
+        running = queue.enqueue('tests.echo', self.user.pk)
+        Job.objects.filter(pk=running.pk).update(status=Job.RUNNING)
+
+        self.assertFalse(queue.cancel(queued.pk, user_id=self.user.pk + 1))
+        self.assertFalse(queue.cancel(running.pk))
+        self.assertTrue(queue.cancel(queued.pk, user_id=self.user.pk))
+        self.assertEqual(Job.objects.get(pk=queued.pk).status, Job.CANCELLED)
+
+    def test_prune_removes_only_old_finished_jobs(self):
+        old = timezone.now() - timedelta(days=8)
+        for status in (Job.SUCCEEDED, Job.FAILED, Job.CANCELLED, Job.RUNNING):
+            Job.objects.filter(pk=queue.enqueue('tests.echo').pk).update(status=status, finished_at=old)
+        Job.objects.filter(pk=queue.enqueue('tests.echo').pk).update(
+            status=Job.SUCCEEDED, finished_at=timezone.now(),
+        )
+
+        self.assertEqual(queue.prune_finished(self.config), 3)
+        self.assertEqual(sorted(Job.objects.values_list('status', flat=True)), [Job.RUNNING, Job.SUCCEEDED])
+
+
+class WorkerTests(JobTestCase):
+    def test_execute_runs_handler_with_user(self):
+        queue.enqueue('tests.echo', self.user.pk, {'value': 1})
+
+        worker.execute(self.claim_one(), WORKER_ID, self.config)
+
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(job.result, {'value': 1, 'user_id': self.user.pk})
+
+    def test_execute_postpones_jobs_of_moving_users(self):
+        queue.enqueue('tests.echo', self.user.pk)
+        job = self.claim_one()
+
+        with mock.patch.object(worker, 'get_user_shard', return_value=('default', True)):
+            worker.execute(job, WORKER_ID, self.config)
+
+        job = Job.objects.get()
+        self.assertEqual(self.calls, [])
+        self.assertEqual((job.status, job.attempts, job.locked_by), (Job.QUEUED, 0, ''))
+        self.assertGreater(job.run_at, timezone.now())
+
+    def test_execute_records_handler_failure_for_retry(self):
+        queue.enqueue('tests.broken', arguments={'value': 1})
+
+        with self.assertLogs('jobs.worker', 'ERROR'):
+            worker.execute(self.claim_one(), WORKER_ID, self.config)
+
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts, job.error), (Job.QUEUED, 1, 'RuntimeError: falhou'))
+        self.assertIsNone(job.finished_at)
+
+    def test_execute_fails_unregistered_jobs(self):
+        job = queue.enqueue('tests.echo')
+        Job.objects.filter(pk=job.pk).update(name='tests.removida', max_attempts=1)
+
+        with self.assertLogs('jobs.worker', 'ERROR'):
+            worker.execute(self.claim_one(), WORKER_ID, self.config)
+
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.error), (Job.FAILED, 'UnknownJob: tests.removida'))
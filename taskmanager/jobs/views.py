@@ -0,0 +1,43 @@
+from django.urls import reverse
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import filters, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from . import queue
+from .models import Job
+from .serializers import JobSerializer
+
+
+def accepted_response(request, job, message):
+    """Resposta 202 de uma operação enviada para segundo plano"""
+    location = reverse('job-detail', args=[job.pk])
+    return Response({
+        'message': message,
+        'job': JobSerializer(job).data,
+        'status_url': request.build_absolute_uri(location),
+    }, status=status.HTTP_202_ACCEPTED, headers={'Location': location})
+
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    """ViewSet para acompanhar os trabalhos em segundo plano do usuário"""
+    serializer_class = JobSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['status', 'name']
+    ordering_fields = ['created_at', 'run_at', 'priority']
+    ordering = ['-created_at']
+
+    def get_queryset(self):
+        return Job.objects.filter(user=self.request.user)
+
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        """Cancelar um trabalho que ainda não começou"""
+        job = self.get_object()
+        if not queue.cancel(job.pk, user_id=request.user.pk):
+            return Response({'error': 'Apenas trabalhos na fila podem ser cancelados'},
+                            status=status.HTTP_409_CONFLICT)
+        job.refresh_from_db()
+        return Response(JobSerializer(job).data)
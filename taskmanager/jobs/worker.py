@@ -0,0 +1,132 @@
+"""
+Worker de um processo: reserva trabalhos prontos enquanto houver threads
+livres, executa cada um em uma thread do pool e renova as reservas em
+andamento. `stop()` para de reservar e aguarda os trabalhos em execução.
+"""
+import logging
+import os
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event, Lock
+
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, close_old_connections, connections
+
+from taskmanager.sharding import get_user_shard, use_shard
+from . import queue
+
+
+logger = logging.getLogger(__name__)
+
+# Intervalo entre as recuperações de reservas vencidas e limpezas (segundos)
+MAINTENANCE_INTERVAL = 60
+
+
+def execute(job, worker_id, config):
+    """
+    Executa um trabalho reservado e grava o resultado ou a falha. Trabalhos
+    de usuários com dados em migração entre bancos voltam para a fila.
+    """
+    close_old_connections()
+    try:
+        handler = queue.get_handler(job.name)
+        arguments = dict(job.arguments)
+        if job.user_id is not None:
+            arguments['user_id'] = job.user_id
+            alias, moving = get_user_shard(job.user_id)
+            if moving:
+                queue.postpone(job, worker_id, config['SHARD_MOVING_DELAY'])
+                return
+        else:
+            alias = DEFAULT_DB_ALIAS
+        with use_shard(alias):
+            result = handler(**arguments)
+    except Exception as exc:
+        logger.exception('Falha no trabalho %s #%s', job.name, job.pk)
+        queue.fail(job, worker_id, f'{type(exc).__name__}: {exc}', config)
+    else:
+        queue.complete(job, worker_id, result)
+    finally:
+        close_old_connections()
+
+
+class Worker:
+    """Laço de reserva e execução de trabalhos com `threads` threads"""
+
+    def __init__(self, threads=None, config=None, worker_id=None):
+        self.config = config or queue.get_config()
+        self.threads = threads or self.config['THREADS']
+        self.id = worker_id or f'{socket.gethostname()}:{os.getpid()}'
+        self.processed = 0
+        self._running = set()
+        self._lock = Lock()
+        self._stopping = Event()
+        self._wake = Event()
+
+    def stop(self):
+        self._stopping.set()
+        self._wake.set()
+
+    def _run(self, job):
+        try:
+            execute(job, self.id, self.config)
+        finally:
+            with self._lock:
+                self._running.discard(job.pk)
+                self.processed += 1
+            self._wake.set()
+
+    def run(self, once=False):
+        """Executa até `stop()`; com `once`, até a fila de trabalhos prontos esvaziar"""
+        lease_renewal = self.config['LEASE'] / 3
+        last_renewal = last_maintenance = float('-inf')
+        executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='job')
+        try:
+            while not self._stopping.is_set():
+                now = time.monotonic()
+                with self._lock:
+                    running = list(self._running)
+                # Conclusões durante a reserva acordam o laço na próxima espera
+                self._wake.clear()
+                try:
+                    if now - last_maintenance >= MAINTENANCE_INTERVAL:
+                        queue.recover_expired()
+                        queue.prune_finished(self.config)
+                        last_maintenance = now
+                    if now - last_renewal >= lease_renewal:
+                        queue.renew(self.id, running, self.config)
+                        last_renewal = now
+                    free = self.threads - len(running)
+                    claimed = queue.claim(self.id, free, self.config) if free > 0 else []
+                except DatabaseError:
+                    # Banco indisponível ou ocupado: tenta de novo após a espera
+                    logger.exception('Falha ao consultar a fila de trabalhos')
+                    close_old_connections()
+                    claimed = []
+                for job in claimed:
+                    with self._lock:
+                        self._running.add(job.pk)
+                    executor.submit(self._run, job)
+
+                if once and not claimed and not running:
+                    break
+                self._wake.wait(self.config['POLL_INTERVAL'])
+        finally:
+            self._drain(executor, lease_renewal)
+            connections.close_all()
+        return self.processed
+
+    def _drain(self, executor, lease_renewal):
+        """Aguarda os trabalhos em execução, mantendo as reservas renovadas"""
+        executor.shutdown(wait=False)
+        last_renewal = time.monotonic()
+        while True:
+            with self._lock:
+                running = list(self._running)
+            if not running:
+                break
+            if time.monotonic() - last_renewal >= lease_renewal:
+                queue.renew(self.id, running, self.config)
+                last_renewal = time.monotonic()
+            self._wake.wait(1)
+            self._wake.clear()
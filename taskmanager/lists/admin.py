@@ -1,18 +1,27 @@
 from django.contrib import admin
+from tasks.annotations import annotated_completion_percentage, task_count_annotations
 from .models import TaskList
 
 
 @admin.register(TaskList)
 class TaskListAdmin(admin.ModelAdmin):
     list_display = ['name', 'user', 'tasks_count', 'completion_percentage', 'custom_profile', 'auto_suggestion', 'created_at']
-    list_filter = ['user', 'custom_profile', 'auto_suggestion', 'created_at']
-    search_fields = ['name', 'description']
+    list_filter = ['custom_profile', 'auto_suggestion', 'created_at']
+    search_fields = ['name', 'description', '=user__username']
     readonly_fields = ['created_at', 'updated_at']
-    
+    autocomplete_fields = ['user']
+
+    def get_queryset(self, request):
+        annotations = task_count_annotations('task_list')
+        return super().get_queryset(request).select_related('user').annotate(
+            **annotations['completion_percentage']
+        )
+
     def tasks_count(self, obj):
-        return obj.get_tasks_count()
+        return obj._tasks_count
     tasks_count.short_description = 'Tarefas'
-    
+    tasks_count.admin_order_field = '_tasks_count'
+
     def completion_percentage(self, obj):
-        return f"{obj.get_completion_percentage()}%"
+        return f"{annotated_completion_percentage(obj)}%"
     completion_percentage.short_description = 'Conclusão'
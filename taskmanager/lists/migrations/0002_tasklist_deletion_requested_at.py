@@ -0,0 +1,32 @@
+# Generated by Django 5.2.5 on 2026-10-19 15:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lists', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='tasklist',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='tasklist',
+            name='deletion_requested_at',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Preenchido quando a lista aguarda exclusão em segundo plano', null=True, verbose_name='Exclusão solicitada em'),
+        ),
+        migrations.AddIndex(
+            model_name='tasklist',
+            index=models.Index(condition=models.Q(('deletion_requested_at__isnull', False)), fields=['deletion_requested_at'], name='tasklist_pending_deletion_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='tasklist',
+            constraint=models.UniqueConstraint(condition=models.Q(('deletion_requested_at__isnull', True)), fields=('user', 'name'), name='tasklist_unique_user_name'),
+        ),
+    ]
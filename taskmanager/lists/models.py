@@ -34,6 +34,13 @@ class TaskList(models.Model):
         verbose_name="Usuário",
         help_text="Usuário proprietário da lista"
     )
+    deletion_requested_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="Exclusão solicitada em",
+        help_text="Preenchido quando a lista aguarda exclusão em segundo plano"
+    )
     created_at = models.DateTimeField(
         auto_now_add=True,
         verbose_name="Criado em"
@@ -47,18 +54,32 @@ class TaskList(models.Model):
         verbose_name = "Lista de Tarefas"
         verbose_name_plural = "Listas de Tarefas"
         ordering = ['name']
-        unique_together = ['user', 'name']  # Nome único por usuário
+        constraints = [
+            # Nome único por usuário, desconsiderando registros aguardando exclusão
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                condition=models.Q(deletion_requested_at__isnull=True),
+                name='tasklist_unique_user_name',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['deletion_requested_at'],
+                condition=models.Q(deletion_requested_at__isnull=False),
+                name='tasklist_pending_deletion_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.user.username})"
 
     def get_tasks_count(self):
         """Retorna o número total de tarefas na lista"""
-        return self.tasks.count()
+        return self.tasks.count() + self.archived_tasks.count()
 
     def get_completed_tasks_count(self):
         """Retorna o número de tarefas concluídas na lista"""
-        return self.tasks.filter(completed=True).count()
+        return self.tasks.filter(completed=True).count() + self.archived_tasks.count()
 
     def get_pending_tasks_count(self):
         """Retorna o número de tarefas pendentes na lista"""
@@ -74,11 +95,8 @@ class TaskList(models.Model):
 
     def get_overdue_tasks_count(self):
         """Retorna o número de tarefas atrasadas na lista"""
-        from django.utils import timezone
-        return self.tasks.filter(
-            completed=False,
-            due_date__lt=timezone.now()
-        ).count()
+        from tasks import agenda
+        return agenda.overdue(self.tasks.all()).count()
 
     def get_high_priority_tasks_count(self):
         """Retorna o número de tarefas de alta prioridade na lista"""
@@ -1,8 +1,12 @@
 from rest_framework import serializers
+from taskmanager import autocomplete
+from taskmanager.sparse_fields import SparseFieldsetMixin
+from tasks import suggestions
+from tasks.annotations import annotated, annotated_completion_percentage
 from .models import TaskList
 
 
-class TaskListSerializer(serializers.ModelSerializer):
+class TaskListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer para listas de tarefas"""
     tasks_count = serializers.SerializerMethodField()
     completed_tasks_count = serializers.SerializerMethodField()
@@ -20,30 +24,41 @@ class TaskListSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
     def get_tasks_count(self, obj):
-        return obj.get_tasks_count()
+        return annotated(obj, 'tasks_count', obj.get_tasks_count)
 
     def get_completed_tasks_count(self, obj):
-        return obj.get_completed_tasks_count()
+        return annotated(obj, 'completed_tasks_count', obj.get_completed_tasks_count)
 
     def get_pending_tasks_count(self, obj):
-        return obj.get_pending_tasks_count()
+        return annotated(obj, 'pending_tasks_count', obj.get_pending_tasks_count)
 
     def get_completion_percentage(self, obj):
-        return obj.get_completion_percentage()
+        return annotated_completion_percentage(obj)
 
     def get_overdue_tasks_count(self, obj):
-        return obj.get_overdue_tasks_count()
+        return annotated(obj, 'overdue_tasks_count', obj.get_overdue_tasks_count)
 
     def get_high_priority_tasks_count(self, obj):
-        return obj.get_high_priority_tasks_count()
+        return annotated(obj, 'high_priority_tasks_count', obj.get_high_priority_tasks_count)
 
     def create(self, validated_data):
         validated_data['user'] = self.context['request'].user
-        return TaskList.objects.create(**validated_data)
+        instance = TaskList.objects.create(**validated_data)
+        autocomplete.invalidate(instance.user_id)
+        return instance
+
+    def update(self, instance, validated_data):
+        name, auto_suggestion = instance.name, instance.auto_suggestion
+        instance = super().update(instance, validated_data)
+        if instance.name != name:
+            autocomplete.invalidate(instance.user_id)
+        if instance.auto_suggestion != auto_suggestion:
+            suggestions.invalidate(instance.user_id)
+        return instance
 
     def validate_name(self, value):
         user = self.context['request'].user
-        if TaskList.objects.filter(user=user, name=value).exists():
+        if TaskList.objects.filter(user=user, name=value, deletion_requested_at__isnull=True).exists():
             if not self.instance or self.instance.name != value:
                 raise serializers.ValidationError("Já existe uma lista com este nome.")
         return value
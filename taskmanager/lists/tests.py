@@ -1,3 +1,43 @@
+from django.contrib.auth.models import User
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from jobs.models import Job
+from tasks import deletion
+from tasks.models import Task
+from .models import TaskList
+
+
+class TaskListTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('ana', password='senha-segura-1')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.task_list = TaskList.objects.create(user=self.user, name='Trabalho')
+        self.task = Task.objects.create(user=self.user, title='Relatório', task_list=self.task_list)
+
+    def test_tasks_of_list(self):
+        Task.objects.create(user=self.user, title='Reunião')
+
+        response = self.client.get(f'/api/lists/{self.task_list.pk}/tasks/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([task['id'] for task in response.data], [self.task.pk])
+
+    def test_destroy_hides_list_and_schedules_purge(self):
+        response = self.client.delete(f'/api/lists/{self.task_list.pk}/')
+
+        self.assertEqual(response.status_code, 202)
+        job = Job.objects.get()
+        self.assertEqual((job.name, job.arguments), ('lists.purge', {'task_list_id': self.task_list.pk}))
+        self.assertEqual(self.client.get(f'/api/lists/{self.task_list.pk}/').status_code, 404)
+        self.assertTrue(TaskList.objects.filter(pk=self.task_list.pk).exists())
+
+    def test_purge_unlinks_tasks_and_bumps_version(self):
+        deletion.request_deletion(self.task_list)
+        deletion.purge_task_list(self.task_list.pk)
+
+        self.task.refresh_from_db()
+        self.assertIsNone(self.task.task_list_id)
+        self.assertEqual(self.task.version, 2)
+        self.assertFalse(TaskList.objects.filter(pk=self.task_list.pk).exists())
@@ -1,40 +1,59 @@
 from rest_framework import viewsets, status
-from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
+from django.db import transaction
+from taskmanager.sharding import current_shard
+from taskmanager.sparse_fields import SparseQuerysetMixin
+from jobs import queue
+from jobs.views import accepted_response
+from webhooks import outbox
+from webhooks.outbox import OutboxMixin
+from tasks.annotations import task_count_annotations
 from .models import TaskList
 from .serializers import TaskListSerializer
 from tasks.serializers import TaskListSerializer as TaskSerializer
+from tasks.deletion import request_deletion
+from tasks.views import TaskViewSet
 
 
-class TaskListViewSet(viewsets.ModelViewSet):
+class TaskListViewSet(OutboxMixin, SparseQuerysetMixin, viewsets.ModelViewSet):
     """ViewSet para listas de tarefas"""
     serializer_class = TaskListSerializer
     permission_classes = [IsAuthenticated]
+    outbox_type = 'list'
+    outbox_fields = outbox.LIST_FIELDS
 
     def get_queryset(self):
-        return TaskList.objects.filter(user=self.request.user)
+        queryset = TaskList.objects.filter(user=self.request.user, deletion_requested_at__isnull=True)
+        return self.optimize_queryset(queryset)
 
-    @action(detail=True, methods=['get'])
-    def tasks(self, request, pk=None):
-        """Listar tarefas de uma lista específica"""
+    def get_field_annotations(self):
+        return task_count_annotations('task_list')
+
+    def destroy(self, request, *args, **kwargs):
+        """Agenda a exclusão; as tarefas são desvinculadas em segundo plano"""
         task_list = self.get_object()
-        tasks = task_list.tasks.all()
-        serializer = TaskSerializer(tasks, many=True, context={'request': request})
-        return Response(serializer.data)
+        with transaction.atomic(using=current_shard()):
+            request_deletion(task_list)
+            outbox.emit(request.user.pk, 'list.deleted', task_list.pk, {'id': task_list.pk})
+        job = queue.enqueue('lists.purge', user_id=request.user.pk,
+                            arguments={'task_list_id': task_list.pk})
+        return accepted_response(request, job, 'Exclusão da lista agendada')
 
 
-class TaskListTasksView(APIView):
+class TaskListTasksView(SparseQuerysetMixin, APIView):
     """View para tarefas de uma lista específica"""
     permission_classes = [IsAuthenticated]
+    field_select_related = TaskViewSet.field_select_related
+    field_prefetch_related = TaskViewSet.field_prefetch_related
 
     def get(self, request, pk):
         try:
-            task_list = TaskList.objects.get(pk=pk, user=request.user)
+            task_list = TaskList.objects.get(pk=pk, user=request.user, deletion_requested_at__isnull=True)
         except TaskList.DoesNotExist:
             return Response({'error': 'Lista não encontrada'}, status=status.HTTP_404_NOT_FOUND)
         
-        tasks = task_list.tasks.all()
+        tasks = self.optimize_queryset(task_list.tasks.all(), serializer_class=TaskSerializer)
         serializer = TaskSerializer(tasks, many=True, context={'request': request})
         return Response(serializer.data)
@@ -0,0 +1,11 @@
+from django.contrib import admin
+from .models import DailyProductivity
+
+
+@admin.register(DailyProductivity)
+class DailyProductivityAdmin(admin.ModelAdmin):
+    list_display = ['day', 'user', 'category', 'priority', 'completed_count', 'on_time_count', 'late_count']
+    list_filter = ['priority', 'day']
+    list_select_related = ['user', 'category__user']
+    search_fields = ['user__username']
+    autocomplete_fields = ['user', 'category']
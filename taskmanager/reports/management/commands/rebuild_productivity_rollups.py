@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from reports.rollups import rebuild_rollups
+from taskmanager.sharding import iter_shards
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói os agregados diários de produtividade a partir do histórico de tarefas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, default=None,
+            help='Reconstruir apenas os agregados deste usuário (ID)'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Quantidade de registros de histórico lidos por bloco'
+        )
+
+    def handle(self, *args, **options):
+        processed = 0
+        for _ in iter_shards(options['user']):
+            processed += rebuild_rollups(
+                user_id=options['user'],
+                chunk_size=options['chunk_size'],
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'{processed} registros de histórico processados.'
+        ))
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.5 on 2026-10-19 15:35
+
+import datetime
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('categories', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyProductivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(help_text='Dia (no fuso do projeto) em que as tarefas foram concluídas', verbose_name='Dia')),
+                ('priority', models.CharField(choices=[('low', 'Baixa'), ('medium', 'Média'), ('high', 'Alta')], default='medium', max_length=10, verbose_name='Prioridade')),
+                ('completed_count', models.IntegerField(default=0, help_text='Número de tarefas concluídas no dia', verbose_name='Concluídas')),
+                ('on_time_count', models.IntegerField(default=0, help_text='Concluídas até a data limite', verbose_name='No Prazo')),
+                ('late_count', models.IntegerField(default=0, help_text='Concluídas depois da data limite', verbose_name='Atrasadas')),
+                ('estimated_duration', models.DurationField(default=datetime.timedelta, help_text='Soma das durações estimadas', verbose_name='Duração Estimada')),
+                ('actual_duration', models.DurationField(default=datetime.timedelta, help_text='Soma das durações reais', verbose_name='Duração Real')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='daily_productivity', to='categories.category', verbose_name='Categoria')),
+                ('user', models.ForeignKey(help_text='Usuário ao qual o agregado pertence', on_delete=django.db.models.deletion.CASCADE, related_name='daily_productivity', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Produtividade Diária',
+                'verbose_name_plural': 'Produtividade Diária',
+                'ordering': ['-day'],
+                'indexes': [models.Index(fields=['user', 'day'], name='reports_dai_user_id_dcd7e1_idx')],
+            },
+        ),
+    ]
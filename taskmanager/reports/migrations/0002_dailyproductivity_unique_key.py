@@ -0,0 +1,42 @@
+# Generated by Django 5.2.5 on 2026-10-19 16:45
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def merge_duplicates(apps, schema_editor):
+    """Soma as linhas repetidas de uma mesma chave na primeira delas"""
+    DailyProductivity = apps.get_model('reports', 'DailyProductivity')
+    rows = DailyProductivity.objects.using(schema_editor.connection.alias)
+    key = ['user_id', 'day', 'category_id', 'priority']
+    totals = ['completed_count', 'on_time_count', 'late_count', 'estimated_duration', 'actual_duration']
+    duplicated = rows.values(*key).annotate(rows=Count('pk')).filter(rows__gt=1)
+    for group in duplicated:
+        group.pop('rows')
+        same_key = rows.filter(**group).order_by('pk')
+        sums = same_key.aggregate(**{field: Sum(field) for field in totals})
+        first = same_key.values_list('pk', flat=True)[0]
+        rows.filter(pk=first).update(**sums)
+        same_key.exclude(pk=first).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0003_category_name_trgm'),
+        ('reports', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='dailyproductivity',
+            constraint=models.UniqueConstraint(condition=models.Q(('category__isnull', False)), fields=('user', 'day', 'category', 'priority'), name='daily_productivity_key_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyproductivity',
+            constraint=models.UniqueConstraint(condition=models.Q(('category__isnull', True)), fields=('user', 'day', 'priority'), name='daily_productivity_no_category_key_uniq'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-19 17:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0003_category_name_trgm'),
+        ('reports', '0002_dailyproductivity_unique_key'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dailyproductivity',
+            name='category',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_productivity', to='categories.category', verbose_name='Categoria'),
+        ),
+    ]
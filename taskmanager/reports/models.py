@@ -0,0 +1,95 @@
+from datetime import timedelta
+
+from django.db import models
+from django.contrib.auth.models import User
+
+
+class DailyProductivity(models.Model):
+    """
+    Agregado diário de produtividade por usuário, categoria e prioridade.
+    Mantido incrementalmente a partir do TaskHistory e reconstruível via
+    `manage.py rebuild_productivity_rollups`.
+    """
+    PRIORITY_CHOICES = [
+        ('low', 'Baixa'),
+        ('medium', 'Média'),
+        ('high', 'Alta'),
+    ]
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='daily_productivity',
+        verbose_name="Usuário",
+        help_text="Usuário ao qual o agregado pertence"
+    )
+    day = models.DateField(
+        verbose_name="Dia",
+        help_text="Dia (no fuso do projeto) em que as tarefas foram concluídas"
+    )
+    # Ao excluir a categoria, os agregados são somados aos sem categoria
+    # (`rollups.fold_category`) antes; SET_NULL violaria a restrição única
+    category = models.ForeignKey(
+        'categories.Category',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='daily_productivity',
+        verbose_name="Categoria"
+    )
+    priority = models.CharField(
+        max_length=10,
+        choices=PRIORITY_CHOICES,
+        default='medium',
+        verbose_name="Prioridade"
+    )
+    completed_count = models.IntegerField(
+        default=0,
+        verbose_name="Concluídas",
+        help_text="Número de tarefas concluídas no dia"
+    )
+    on_time_count = models.IntegerField(
+        default=0,
+        verbose_name="No Prazo",
+        help_text="Concluídas até a data limite"
+    )
+    late_count = models.IntegerField(
+        default=0,
+        verbose_name="Atrasadas",
+        help_text="Concluídas depois da data limite"
+    )
+    estimated_duration = models.DurationField(
+        default=timedelta,
+        verbose_name="Duração Estimada",
+        help_text="Soma das durações estimadas"
+    )
+    actual_duration = models.DurationField(
+        default=timedelta,
+        verbose_name="Duração Real",
+        help_text="Soma das durações reais"
+    )
+
+    class Meta:
+        verbose_name = "Produtividade Diária"
+        verbose_name_plural = "Produtividade Diária"
+        ordering = ['-day']
+        indexes = [
+            models.Index(fields=['user', 'day']),
+        ]
+        # Uma linha por chave; NULL não se repete em restrições únicas, daí
+        # a restrição à parte para os agregados sem categoria
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'day', 'category', 'priority'],
+                condition=models.Q(category__isnull=False),
+                name='daily_productivity_key_uniq',
+            ),
+            models.UniqueConstraint(
+                fields=['user', 'day', 'priority'],
+                condition=models.Q(category__isnull=True),
+                name='daily_productivity_no_category_key_uniq',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.day} ({self.completed_count})"
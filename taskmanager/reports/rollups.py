@@ -0,0 +1,195 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Value, DurationField
+from django.utils import timezone
+
+from taskmanager.sharding import current_shard
+from categories.models import Category
+from tasks.models import TaskHistory, ArchivedTask
+from .models import DailyProductivity
+
+
+ROLLUP_COUNTERS = (
+    'completed_count', 'on_time_count', 'late_count', 'estimated_duration', 'actual_duration',
+)
+
+
+def completion_fields(task, completion_date):
+    """
+    Categoria, prioridade e cumprimento do prazo da tarefa no momento da
+    conclusão, gravados no TaskHistory e usados como chave do agregado
+    """
+    return {
+        'category_id': task.category_id,
+        'priority': task.priority,
+        'on_time': completion_date <= task.due_date if task.due_date else None,
+    }
+
+
+def _rollup_key(task, history):
+    """Chave (usuário, dia, categoria, prioridade) de uma conclusão, como gravada no histórico"""
+    return (
+        task.user_id,
+        timezone.localdate(history.completion_date),
+        history.category_id,
+        history.priority,
+    )
+
+
+def _rollup_values(history):
+    """Contadores com que uma conclusão contribui para o agregado"""
+    return {
+        'completed_count': 1,
+        'on_time_count': 1 if history.on_time is True else 0,
+        'late_count': 1 if history.on_time is False else 0,
+        'estimated_duration': history.estimated_duration or timedelta(),
+        'actual_duration': history.actual_duration or timedelta(),
+    }
+
+
+def _increments(values, sign=1):
+    """Expressões de UPDATE que somam (ou subtraem) os contadores ao agregado"""
+    updates = {}
+    for field, value in values.items():
+        if isinstance(value, timedelta):
+            updates[field] = F(field) + Value(value * sign, output_field=DurationField())
+        else:
+            updates[field] = F(field) + value * sign
+    return updates
+
+
+def _apply(task, history, sign):
+    user_id, day, category_id, priority = _rollup_key(task, history)
+    values = _rollup_values(history)
+    row = DailyProductivity.objects.filter(
+        user_id=user_id, day=day, category_id=category_id, priority=priority
+    )
+    updates = _increments(values, sign)
+
+    with transaction.atomic(using=current_shard()):
+        if row.update(**updates) or sign < 0:
+            return
+        # Sem linha para a chave: cria; se outra conclusão criou a mesma linha
+        # ao mesmo tempo, a restrição única rejeita esta e a soma é feita no UPDATE
+        try:
+            with transaction.atomic(using=current_shard()):
+                DailyProductivity.objects.create(
+                    user_id=user_id, day=day, category_id=category_id, priority=priority, **values
+                )
+        except IntegrityError:
+            row.update(**updates)
+
+
+def record_completion(task, history):
+    """Soma uma conclusão ao agregado diário"""
+    _apply(task, history, 1)
+
+
+def revert_completion(task, history):
+    """Remove uma conclusão do agregado diário (tarefa desmarcada)"""
+    _apply(task, history, -1)
+
+
+def fold_category(category_id, chunk_size=1000):
+    """
+    Soma os agregados da categoria aos agregados sem categoria do mesmo dia
+    e prioridade e remove os da categoria. Desvincular com UPDATE violaria a
+    restrição única quando já existe o agregado sem categoria.
+    """
+    alias = current_shard()
+    while True:
+        rows = list(DailyProductivity.objects.filter(category_id=category_id).order_by('pk')[:chunk_size])
+        if not rows:
+            return
+        with transaction.atomic(using=alias):
+            for row in rows:
+                target = DailyProductivity.objects.filter(
+                    user_id=row.user_id, day=row.day, category__isnull=True, priority=row.priority
+                )
+                updates = _increments({field: getattr(row, field) for field in ROLLUP_COUNTERS})
+                if target.update(**updates):
+                    DailyProductivity.objects.filter(pk=row.pk).delete()
+                    continue
+                # Sem agregado sem categoria: a própria linha passa a sê-lo
+                try:
+                    with transaction.atomic(using=alias):
+                        DailyProductivity.objects.filter(pk=row.pk).update(category=None)
+                except IntegrityError:
+                    target.update(**updates)
+                    DailyProductivity.objects.filter(pk=row.pk).delete()
+
+
+def _iterate_in_chunks(queryset, chunk_size):
+    """Percorre um queryset ordenado por pk em blocos de tamanho fixo"""
+    last_pk = None
+    while True:
+        chunk_qs = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        chunk = list(chunk_qs[:chunk_size])
+        if not chunk:
+            break
+        yield from chunk
+        last_pk = chunk[-1].pk
+
+
+def rebuild_rollups(user_id=None, chunk_size=1000):
+    """
+    Reconstrói os agregados a partir do TaskHistory, percorrendo o histórico
+    em blocos por chave primária para não carregar tudo em memória.
+    Retorna o número de históricos processados.
+    """
+    history_qs = TaskHistory.objects.select_related('task').order_by('pk')
+    archived_qs = ArchivedTask.objects.filter(history__isnull=False).order_by('pk')
+    rollup_qs = DailyProductivity.objects.all()
+    if user_id is not None:
+        history_qs = history_qs.filter(task__user_id=user_id)
+        archived_qs = archived_qs.filter(user_id=user_id)
+        rollup_qs = rollup_qs.filter(user_id=user_id)
+
+    def empty():
+        return {
+            'completed_count': 0,
+            'on_time_count': 0,
+            'late_count': 0,
+            'estimated_duration': timedelta(),
+            'actual_duration': timedelta(),
+        }
+
+    totals = defaultdict(empty)
+
+    def accumulate(task, history):
+        bucket = totals[_rollup_key(task, history)]
+        for field, value in _rollup_values(history).items():
+            bucket[field] += value
+
+    processed = 0
+    for history in _iterate_in_chunks(history_qs, chunk_size):
+        accumulate(history.task, history)
+        processed += 1
+    # Tarefas arquivadas guardam o histórico desnormalizado
+    for archived in _iterate_in_chunks(archived_qs, chunk_size):
+        accumulate(archived, archived.get_history())
+        processed += 1
+
+    # O histórico arquivado pode citar uma categoria já excluída
+    category_ids = {category_id for _, _, category_id, _ in totals if category_id is not None}
+    existing = set(Category.objects.filter(pk__in=category_ids).values_list('pk', flat=True))
+    merged = defaultdict(empty)
+    for (user_id_, day, category_id, priority), values in totals.items():
+        bucket = merged[(user_id_, day, category_id if category_id in existing else None, priority)]
+        for field, value in values.items():
+            bucket[field] += value
+
+    rows = [
+        DailyProductivity(
+            user_id=user_id_, day=day, category_id=category_id, priority=priority, **values
+        )
+        for (user_id_, day, category_id, priority), values in merged.items()
+    ]
+
+    with transaction.atomic(using=current_shard()):
+        rollup_qs.delete()
+        DailyProductivity.objects.bulk_create(rows, batch_size=chunk_size)
+
+    return processed
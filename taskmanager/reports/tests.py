@@ -0,0 +1,148 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import QuerySet
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from categories.models import Category
+from tasks import deletion
+from tasks.models import Task, TaskHistory
+from .models import DailyProductivity
+from .rollups import rebuild_rollups, record_completion
+
+
+class RollupTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('ana', password='senha-segura-1')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.work = Category.objects.create(user=self.user, name='Trabalho')
+        self.home = Category.objects.create(user=self.user, name='Casa')
+
+    def create_task(self, **fields):
+        return Task.objects.create(user=self.user, title='Relatório', **fields)
+
+    def totals(self):
+        return self.client.get('/api/reports/').data['totals']
+
+
+class CompletionRollupTests(RollupTestCase):
+    def test_uncomplete_reverts_key_recorded_at_completion(self):
+        task = self.create_task(category=self.work, priority='high')
+        self.client.post(f'/api/tasks/{task.pk}/complete/')
+
+        Task.objects.filter(pk=task.pk).update(category=self.home, priority='low')
+        self.client.post(f'/api/tasks/{task.pk}/uncomplete/')
+
+        self.assertEqual(self.totals()['completed_count'], 0)
+        self.assertFalse(DailyProductivity.objects.exclude(completed_count=0).exists())
+
+    def test_uncomplete_reverts_on_time_flag_recorded_at_completion(self):
+        task = self.create_task(due_date=timezone.now() + timedelta(days=1))
+        self.client.post(f'/api/tasks/{task.pk}/complete/')
+        self.assertEqual(TaskHistory.objects.get(task=task).on_time, True)
+
+        Task.objects.filter(pk=task.pk).update(due_date=timezone.now() - timedelta(days=1))
+        self.client.post(f'/api/tasks/{task.pk}/uncomplete/')
+
+        totals = self.totals()
+        self.assertEqual((totals['on_time_count'], totals['late_count']), (0, 0))
+
+    def test_rebuild_matches_incremental_rollups(self):
+        for category in (self.work, self.work, None):
+            task = self.create_task(category=category)
+            self.client.post(f'/api/tasks/{task.pk}/complete/')
+        incremental = self.totals()
+
+        rebuild_rollups(user_id=self.user.pk)
+
+        self.assertEqual(self.totals(), incremental)
+        self.assertEqual(DailyProductivity.objects.count(), 2)
+
+
+class RollupKeyTests(RollupTestCase):
+    def test_completions_with_same_key_share_one_row(self):
+        for _ in range(2):
+            task = self.create_task()
+            self.client.post(f'/api/tasks/{task.pk}/complete/')
+
+        row = DailyProductivity.objects.get()
+        self.assertEqual(row.completed_count, 2)
+
+    def test_duplicate_key_is_rejected(self):
+        for category in (self.work, None):
+            key = {'user': self.user, 'day': timezone.localdate(), 'category': category, 'priority': 'medium'}
+            DailyProductivity.objects.create(**key)
+            with self.assertRaises(IntegrityError), transaction.atomic():
+                DailyProductivity.objects.create(**key)
+
+    def test_record_completion_adds_to_row_created_concurrently(self):
+        task = self.create_task(category=self.work)
+        history = TaskHistory.objects.create(task=task, category=self.work, priority='medium')
+        # Outra conclusão cria a linha entre o UPDATE (que não achou nada) e o INSERT
+        original_update = QuerySet.update
+        competitor = []
+
+        def update_then_competitor_inserts(queryset, **values):
+            if queryset.model is DailyProductivity and not competitor:
+                competitor.append(DailyProductivity.objects.create(
+                    user=self.user, day=timezone.localdate(history.completion_date),
+                    category=self.work, priority='medium', completed_count=1,
+                ))
+                return 0
+            return original_update(queryset, **values)
+
+        with mock.patch.object(QuerySet, 'update', update_then_competitor_inserts):
+            record_completion(task, history)
+
+        self.assertEqual(DailyProductivity.objects.get().completed_count, 2)
+
+
+class CategoryDeletionRollupTests(RollupTestCase):
+    def row(self, category, **counters):
+        return DailyProductivity.objects.create(
+            user=self.user, day=timezone.localdate(), category=category, priority='medium', **counters
+        )
+
+    def test_purge_adds_category_rows_to_existing_uncategorized_row(self):
+        self.row(None, completed_count=1, late_count=1, actual_duration=timedelta(hours=1))
+        self.row(self.work, completed_count=2, on_time_count=2, actual_duration=timedelta(hours=2))
+
+        deletion.request_deletion(self.work)
+        deletion.purge_category(self.work.pk)
+
+        row = DailyProductivity.objects.get()
+        self.assertIsNone(row.category_id)
+        self.assertEqual(
+            (row.completed_count, row.on_time_count, row.late_count, row.actual_duration),
+            (3, 2, 1, timedelta(hours=3)),
+        )
+        self.assertFalse(Category.objects.filter(pk=self.work.pk).exists())
+
+    def test_purge_without_uncategorized_row_keeps_the_counters(self):
+        self.row(self.work, completed_count=2)
+        self.row(self.home, completed_count=1)
+
+        deletion.purge_category(self.work.pk)
+
+        self.assertEqual(
+            sorted(DailyProductivity.objects.values_list('category_id', 'completed_count'), key=str),
+            sorted([(None, 2), (self.home.pk, 1)], key=str),
+        )
+
+    def test_admin_delete_folds_rows_into_uncategorized_row(self):
+        User.objects.filter(pk=self.user.pk).update(is_staff=True, is_superuser=True)
+        self.client.force_login(self.user)
+        self.row(None, completed_count=1)
+        self.row(self.work, completed_count=2)
+
+        response = self.client.post(
+            f'/admin/categories/category/{self.work.pk}/delete/', {'post': 'yes'}
+        )
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(list(DailyProductivity.objects.values_list('category_id', 'completed_count')), [(None, 3)])
@@ -0,0 +1,7 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('', views.ReportsView.as_view(), name='reports'),
+    path('rebuild/', views.ReportsRebuildView.as_view(), name='reports-rebuild'),
+]
@@ -0,0 +1,87 @@
+from datetime import timedelta
+
+from django.db.models import Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.duration import duration_string
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from jobs import queue
+from jobs.views import accepted_response
+from .models import DailyProductivity
+
+
+class ReportsView(APIView):
+    """View para relatórios de produtividade servidos a partir dos agregados diários"""
+    permission_classes = [IsAuthenticated]
+
+    GROUPINGS = {
+        'day': ['day'],
+        'category': ['category', 'category__name'],
+        'priority': ['priority'],
+    }
+    DEFAULT_RANGE_DAYS = 30
+
+    def get(self, request):
+        today = timezone.localdate()
+        start = request.query_params.get('start')
+        end = request.query_params.get('end')
+        group_by = request.query_params.get('group_by', 'day')
+
+        try:
+            start = parse_date(start) if start else today - timedelta(days=self.DEFAULT_RANGE_DAYS - 1)
+            end = parse_date(end) if end else today
+        except ValueError:
+            start = end = None
+        if not start or not end:
+            return Response({'error': 'Datas devem estar no formato AAAA-MM-DD.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if start > end:
+            return Response({'error': 'A data inicial deve ser anterior à data final.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if group_by not in self.GROUPINGS:
+            return Response({'error': 'Agrupamento inválido. Use day, category ou priority.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        rollups = DailyProductivity.objects.filter(
+            user=request.user, day__gte=start, day__lte=end
+        )
+        sums = {
+            'completed_count': Sum('completed_count'),
+            'on_time_count': Sum('on_time_count'),
+            'late_count': Sum('late_count'),
+            'estimated_duration': Sum('estimated_duration'),
+            'actual_duration': Sum('actual_duration'),
+        }
+        group_fields = self.GROUPINGS[group_by]
+
+        totals = rollups.aggregate(**sums)
+        groups = rollups.values(*group_fields).annotate(**sums).order_by(*group_fields)
+
+        return Response({
+            'start': start,
+            'end': end,
+            'group_by': group_by,
+            'totals': self._format(totals),
+            'groups': [self._format(group) for group in groups],
+        })
+
+    def _format(self, row):
+        data = dict(row)
+        for field in ('completed_count', 'on_time_count', 'late_count'):
+            data[field] = data[field] or 0
+        for field in ('estimated_duration', 'actual_duration'):
+            data[field] = duration_string(data[field] or timedelta())
+        return data
+
+
+class ReportsRebuildView(APIView):
+    """Recalcula em segundo plano os agregados do usuário a partir do histórico"""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        job = queue.enqueue('reports.rebuild_rollups', user_id=request.user.pk, unique=True)
+        return accepted_response(request, job, 'Recálculo dos relatórios agendado')
@@ -1,14 +1,26 @@
 from django.contrib import admin
+from django.db.models import OuterRef
+from tasks.annotations import SubqueryCount
+from tasks.models import Task, ArchivedTask
 from .models import Tag
 
 
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
     list_display = ['name', 'user', 'color', 'tasks_count', 'created_at']
-    list_filter = ['user', 'created_at']
-    search_fields = ['name']
+    list_filter = ['created_at']
+    search_fields = ['name', '=user__username']
     readonly_fields = ['created_at', 'updated_at']
-    
+    autocomplete_fields = ['user']
+
+    def get_queryset(self, request):
+        links = Task.tags.through.objects.filter(tag=OuterRef('pk')).values('pk')
+        archived_links = ArchivedTask.tags.through.objects.filter(tag=OuterRef('pk')).values('pk')
+        return super().get_queryset(request).select_related('user').annotate(
+            _tasks_count=SubqueryCount(links) + SubqueryCount(archived_links),
+        )
+
     def tasks_count(self, obj):
-        return obj.get_tasks_count()
+        return obj._tasks_count
     tasks_count.short_description = 'Tarefas'
+    tasks_count.admin_order_field = '_tasks_count'
@@ -52,11 +52,11 @@ class Tag(models.Model):
 
     def get_tasks_count(self):
         """Retorna o número de tarefas com esta etiqueta"""
-        return self.tasks.count()
+        return self.tasks.count() + self.archived_tasks.count()
 
     def get_completed_tasks_count(self):
         """Retorna o número de tarefas concluídas com esta etiqueta"""
-        return self.tasks.filter(completed=True).count()
+        return self.tasks.filter(completed=True).count() + self.archived_tasks.count()
 
     def get_completion_percentage(self):
         """Retorna a porcentagem de conclusão das tarefas com esta etiqueta"""
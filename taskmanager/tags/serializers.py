@@ -1,8 +1,12 @@
 from rest_framework import serializers
+from taskmanager import autocomplete
+from taskmanager.sparse_fields import SparseFieldsetMixin
+from tasks.annotations import annotated, annotated_completion_percentage
+from tasks.fields import OwnedPrimaryKeyRelatedField
 from .models import Tag
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer para etiquetas"""
     tasks_count = serializers.SerializerMethodField()
     completed_tasks_count = serializers.SerializerMethodField()
@@ -15,17 +19,26 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
     def get_tasks_count(self, obj):
-        return obj.get_tasks_count()
+        return annotated(obj, 'tasks_count', obj.get_tasks_count)
 
     def get_completed_tasks_count(self, obj):
-        return obj.get_completed_tasks_count()
+        return annotated(obj, 'completed_tasks_count', obj.get_completed_tasks_count)
 
     def get_completion_percentage(self, obj):
-        return obj.get_completion_percentage()
+        return annotated_completion_percentage(obj)
 
     def create(self, validated_data):
         validated_data['user'] = self.context['request'].user
-        return Tag.objects.create(**validated_data)
+        instance = Tag.objects.create(**validated_data)
+        autocomplete.invalidate(instance.user_id)
+        return instance
+
+    def update(self, instance, validated_data):
+        name = instance.name
+        instance = super().update(instance, validated_data)
+        if instance.name != name:
+            autocomplete.invalidate(instance.user_id)
+        return instance
 
     def validate_name(self, value):
         user = self.context['request'].user
@@ -34,3 +47,13 @@ class TagSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError("Já existe uma etiqueta com este nome.")
         return value
 
+
+
+class TagMergeSerializer(serializers.Serializer):
+    """Entrada da união de etiquetas"""
+    source_tags = OwnedPrimaryKeyRelatedField(
+        queryset=Tag.objects.only('id'),
+        many=True,
+        allow_empty=False,
+        error_messages={'does_not_exist': 'Etiqueta "{pk_value}" não encontrada.'},
+    )
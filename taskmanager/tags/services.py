@@ -0,0 +1,62 @@
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from taskmanager import autocomplete
+from taskmanager.sharding import current_shard
+from tasks import suggestions
+from tasks.models import Task, ArchivedTask
+from webhooks import outbox
+from .models import Tag
+
+
+def _merge_links(through, owner_field, target_id, source_ids):
+    """
+    Move os vínculos das etiquetas de origem para a etiqueta de destino em
+    SQL baseado em conjuntos: um INSERT ... SELECT que ignora vínculos já
+    existentes e um DELETE dos vínculos de origem.
+    """
+    connection = connections[current_shard()]
+    quote = connection.ops.quote_name
+    table = quote(through._meta.db_table)
+    owner_column = quote(through._meta.get_field(owner_field).column)
+    tag_column = quote(through._meta.get_field('tag').column)
+    placeholders = ', '.join(['%s'] * len(source_ids))
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} ({owner_column}, {tag_column}) '
+            f'SELECT DISTINCT {owner_column}, %s FROM {table} '
+            f'WHERE {tag_column} IN ({placeholders}) '
+            f'ON CONFLICT DO NOTHING',
+            [target_id, *source_ids],
+        )
+    through.objects.filter(tag_id__in=source_ids).delete()
+
+
+def merge_tags(target, source_ids):
+    """
+    Une as etiquetas de origem na etiqueta de destino: todas as tarefas
+    (ativas e arquivadas) passam a usar o destino e as origens são excluídas.
+    As tarefas ativas afetadas geram `task.updated` com as novas etiquetas.
+    """
+    TagLink = Task.tags.through
+    with transaction.atomic(using=current_shard()):
+        task_ids = list(
+            TagLink.objects.filter(tag_id__in=source_ids).values_list('task_id', flat=True).distinct()
+        )
+        # Mantém updated_at e a versão (ETag) coerentes com a alteração
+        Task.objects.filter(pk__in=task_ids).update(updated_at=timezone.now(), version=F('version') + 1)
+        _merge_links(TagLink, 'task', target.pk, source_ids)
+        _merge_links(ArchivedTask.tags.through, 'archivedtask', target.pk, source_ids)
+        Tag.objects.filter(pk__in=source_ids).delete()
+        suggestions.forget(target.user_id, 'tag', source_ids)
+        suggestions.rebuild_tag(target.user_id, target.pk)
+        autocomplete.invalidate(target.user_id)
+
+        tags_of = {task_id: [] for task_id in task_ids}
+        for task_id, tag_id in TagLink.objects.filter(task_id__in=task_ids).values_list('task_id', 'tag_id'):
+            tags_of[task_id].append(tag_id)
+        outbox.emit_many(target.user_id, 'task.updated', [
+            {'id': task_id, 'tags': sorted(tag_ids)} for task_id, tag_ids in tags_of.items()
+        ])
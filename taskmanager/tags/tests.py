@@ -1,3 +1,47 @@
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from tasks.models import ArchivedTask, Task
+from .models import Tag
+
+
+class TagMergeTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('ana', password='senha-segura-1')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.target = Tag.objects.create(user=self.user, name='urgente')
+        self.source = Tag.objects.create(user=self.user, name='importante')
+
+    def merge(self, *source_tags):
+        return self.client.post(
+            f'/api/tags/{self.target.pk}/merge/', {'source_tags': list(source_tags)}, format='json'
+        )
+
+    def test_merge_moves_tasks_and_deletes_source(self):
+        both = Task.objects.create(user=self.user, title='Relatório')
+        both.tags.add(self.target, self.source)
+        only_source = Task.objects.create(user=self.user, title='Reunião')
+        only_source.tags.add(self.source)
+        now = timezone.now()
+        archived = ArchivedTask.objects.create(
+            id=1000, user=self.user, title='Antiga', created_at=now, updated_at=now,
+        )
+        archived.tags.add(self.source)
+
+        response = self.merge(self.source.pk)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Tag.objects.filter(pk=self.source.pk).exists())
+        for task in (both, only_source, archived):
+            self.assertEqual(list(task.tags.values_list('pk', flat=True)), [self.target.pk])
+        only_source.refresh_from_db()
+        self.assertEqual(only_source.version, 2)
+
+    def test_target_cannot_be_a_source(self):
+        response = self.merge(self.target.pk, self.source.pk)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(Tag.objects.filter(pk=self.source.pk).exists())
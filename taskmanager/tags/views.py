@@ -1,13 +1,51 @@
-from rest_framework import viewsets
+from rest_framework import viewsets, serializers
+from rest_framework.decorators import action
+from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from taskmanager import autocomplete
+from taskmanager.sparse_fields import SparseQuerysetMixin
+from tasks import suggestions
+from tasks.annotations import task_count_annotations
 from .models import Tag
-from .serializers import TagSerializer
+from .serializers import TagSerializer, TagMergeSerializer
+from .services import merge_tags
 
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(SparseQuerysetMixin, viewsets.ModelViewSet):
     """ViewSet para etiquetas"""
     serializer_class = TagSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return Tag.objects.filter(user=self.request.user)
+        queryset = Tag.objects.filter(user=self.request.user)
+        return self.optimize_queryset(queryset)
+
+    def get_field_annotations(self):
+        return task_count_annotations('tags')
+
+    def perform_destroy(self, instance):
+        suggestions.forget(instance.user_id, 'tag', [instance.pk])
+        instance.delete()
+        autocomplete.invalidate(instance.user_id)
+
+    @action(detail=True, methods=['post'])
+    def merge(self, request, pk=None):
+        """Une outras etiquetas nesta, movendo todas as suas tarefas"""
+        target = self.get_object()
+        serializer = TagMergeSerializer(data=request.data, context=self.get_serializer_context())
+        serializer.is_valid(raise_exception=True)
+
+        source_ids = [tag.pk for tag in serializer.validated_data['source_tags']]
+        if target.pk in source_ids:
+            raise serializers.ValidationError(
+                {'source_tags': 'A etiqueta de destino não pode estar entre as de origem.'}
+            )
+        merge_tags(target, source_ids)
+        # Recarrega para que as contagens anotadas incluam as tarefas movidas
+        target = self.get_queryset().get(pk=target.pk)
+
+        return Response({
+            'message': 'Etiquetas unidas com sucesso',
+            'merged_count': len(source_ids),
+            'tag': TagSerializer(target, context=self.get_serializer_context()).data,
+        })
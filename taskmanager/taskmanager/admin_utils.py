@@ -0,0 +1,43 @@
+"""
+Utilitários para manter o admin utilizável em tabelas grandes.
+"""
+import json
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator do admin que evita o COUNT(*) completo em tabelas grandes.
+
+    No PostgreSQL, usa a estimativa de linhas do planejador (EXPLAIN) para a
+    consulta da listagem; quando a estimativa é pequena, ou em outros bancos,
+    faz a contagem exata como o Paginator padrão.
+    """
+    estimate_threshold = 100000
+
+    @cached_property
+    def count(self):
+        estimate = self.estimated_count()
+        if estimate is not None and estimate >= self.estimate_threshold:
+            return estimate
+        return super().count
+
+    def estimated_count(self):
+        queryset = self.object_list
+        if not hasattr(queryset, 'query'):
+            return None
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+
+        sql, params = queryset.order_by().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
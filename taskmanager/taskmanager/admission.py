@@ -0,0 +1,237 @@
+"""
+Controle de admissão por custo da requisição.
+
+Cada processo (worker) limita quantas requisições caras executa ao mesmo
+tempo, com uma fila de espera curta e limitada, e quantas requisições caras
+cada usuário pode ter em andamento. Requisições baratas não entram nessa fila:
+usam a capacidade restante do worker (faixa prioritária). O que não cabe
+recebe 503 imediato com `Retry-After`, em vez de aumentar a fila até o timeout
+do servidor. As requisições internas de um lote (`POST /api/batch/`) passam
+pelos mesmos limites, uma a uma, como se fossem enviadas separadamente.
+
+Os limites valem por processo; fazem diferença com workers de múltiplas
+threads (gunicorn `--threads`) ou ASGI.
+"""
+import asyncio
+import re
+import threading
+import time
+
+from django.conf import settings
+
+
+DEFAULTS = {
+    'ENABLED': True,
+    # Requisições simultâneas por worker (todas as faixas)
+    'MAX_IN_FLIGHT': 64,
+    # Requisições caras simultâneas por worker, fila de espera e tempo máximo na fila
+    'MAX_EXPENSIVE': 4,
+    'EXPENSIVE_QUEUE': 8,
+    'QUEUE_TIMEOUT': 2.0,
+    # Requisições caras simultâneas por usuário (token ou sessão)
+    'MAX_EXPENSIVE_PER_USER': 2,
+    'RETRY_AFTER': 2,
+    'PATH_PREFIX': '/api/',
+    # (métodos, padrão do caminho) das requisições caras
+    'EXPENSIVE': [
+        ('GET', r'^/api/(tasks|lists|categories|tags)/$'),
+        ('GET', r'^/api/tasks/(overdue|upcoming)/$'),
+        ('GET', r'^/api/lists/\d+/tasks/$'),
+        ('GET', r'^/api/reports/'),
+        ('POST', r'^/api/tasks/bulk-tags/$'),
+        ('POST', r'^/api/tags/\d+/merge/$'),
+    ],
+}
+
+OVERLOADED_DETAIL = 'Servidor sobrecarregado. Tente novamente em instantes.'
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'ADMISSION_CONTROL', {})}
+
+
+def get_controller():
+    """Estado de admissão do processo, compartilhado pelo middleware e pelos lotes"""
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            _controller = AdmissionController(get_config())
+        return _controller
+
+
+def admit_subrequest(request):
+    """
+    Admite uma requisição interna de um lote. As caras ocupam as vagas do
+    worker e do usuário; retorna a função que as libera, ou None quando a
+    requisição deve ser recusada.
+    """
+    controller = get_controller()
+    if not controller.config['ENABLED'] or not controller.is_expensive(request):
+        return lambda: None
+    return controller.admit(request)
+
+
+class Lane:
+    """Limite de execuções simultâneas com fila de espera limitada"""
+    poll_interval = 0.01
+
+    def __init__(self, limit, queue_size=0):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.in_flight = 0
+        self.waiting = 0
+        self.condition = threading.Condition()
+
+    def try_acquire(self):
+        with self.condition:
+            if self.in_flight < self.limit:
+                self.in_flight += 1
+                return True
+            return False
+
+    def acquire(self, timeout):
+        with self.condition:
+            if self.in_flight < self.limit:
+                self.in_flight += 1
+                return True
+            if self.waiting >= self.queue_size:
+                return False
+            self.waiting += 1
+            try:
+                admitted = self.condition.wait_for(lambda: self.in_flight < self.limit, timeout)
+                if admitted:
+                    self.in_flight += 1
+                return admitted
+            finally:
+                self.waiting -= 1
+
+    async def aacquire(self, timeout):
+        """Como `acquire`, sem bloquear o event loop enquanto espera"""
+        if self.try_acquire():
+            return True
+        with self.condition:
+            if self.waiting >= self.queue_size:
+                return False
+            self.waiting += 1
+        try:
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline:
+                await asyncio.sleep(self.poll_interval)
+                if self.try_acquire():
+                    return True
+            return False
+        finally:
+            with self.condition:
+                self.waiting -= 1
+
+    def release(self):
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify()
+
+
+class PerKeyLimit:
+    """Limite de execuções simultâneas por chave (usuário), sem fila"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.counts = {}
+        self.lock = threading.Lock()
+
+    def try_acquire(self, key):
+        with self.lock:
+            count = self.counts.get(key, 0)
+            if count >= self.limit:
+                return False
+            self.counts[key] = count + 1
+            return True
+
+    def release(self, key):
+        with self.lock:
+            count = self.counts.get(key, 0) - 1
+            if count > 0:
+                self.counts[key] = count
+            else:
+                self.counts.pop(key, None)
+
+
+class AdmissionController:
+    """Estado de admissão de um worker"""
+
+    def __init__(self, config):
+        self.config = config
+        self.worker = Lane(config['MAX_IN_FLIGHT'])
+        self.expensive = Lane(config['MAX_EXPENSIVE'], config['EXPENSIVE_QUEUE'])
+        self.per_user = PerKeyLimit(config['MAX_EXPENSIVE_PER_USER'])
+        self.patterns = [
+            (method, re.compile(pattern)) for method, pattern in config['EXPENSIVE']
+        ]
+
+    def applies_to(self, request):
+        return request.path_info.startswith(self.config['PATH_PREFIX'])
+
+    def is_expensive(self, request):
+        return self.is_expensive_path(request.method, request.path_info)
+
+    def is_expensive_path(self, method, path):
+        return any(
+            method == expensive_method and pattern.match(path)
+            for expensive_method, pattern in self.patterns
+        )
+
+    def client_key(self, request):
+        """Identifica o usuário sem consultar o banco: token, sessão ou IP"""
+        header = request.headers.get('Authorization', '').split()
+        if len(header) == 2 and header[0].lower() == 'token':
+            return f'token:{header[1]}'
+        session_key = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        if session_key:
+            return f'session:{session_key}'
+        return f"ip:{request.META.get('REMOTE_ADDR', '')}"
+
+    def admit(self, request):
+        """
+        Tenta admitir a requisição. Retorna a função que libera as vagas
+        ocupadas, ou None quando a requisição deve ser recusada.
+        """
+        if not self.is_expensive(request):
+            if not self.worker.try_acquire():
+                return None
+            return self.worker.release
+
+        key = self.client_key(request)
+        if not self.per_user.try_acquire(key):
+            return None
+        if not self.expensive.acquire(self.config['QUEUE_TIMEOUT']):
+            self.per_user.release(key)
+            return None
+        return self._admit_to_worker(key)
+
+    async def aadmit(self, request):
+        if not self.is_expensive(request):
+            if not self.worker.try_acquire():
+                return None
+            return self.worker.release
+
+        key = self.client_key(request)
+        if not self.per_user.try_acquire(key):
+            return None
+        if not await self.expensive.aacquire(self.config['QUEUE_TIMEOUT']):
+            self.per_user.release(key)
+            return None
+        return self._admit_to_worker(key)
+
+    def _admit_to_worker(self, key):
+        if not self.worker.try_acquire():
+            self.expensive.release()
+            self.per_user.release(key)
+            return None
+
+        def release():
+            self.worker.release()
+            self.expensive.release()
+            self.per_user.release(key)
+        return release
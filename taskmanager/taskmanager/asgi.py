@@ -3,6 +3,12 @@ ASGI config for taskmanager project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Requests served through this entry point use ``settings.ASGI_ROOT_URLCONF``
+(see ``taskmanager.middleware.AsgiUrlconfMiddleware``), which routes the hot
+read endpoints to the async views in ``taskmanager.async_views``. Run it with::
+
+    uvicorn taskmanager.asgi:application
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -14,3 +20,9 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'taskmanager.settings')
 
 application = get_asgi_application()
+
+# Rotas, serializers e conexões prontos antes da primeira requisição
+from taskmanager import warmup  # noqa: E402
+
+if warmup.get_config()['ENABLED']:
+    warmup.warm_up()
@@ -0,0 +1,170 @@
+"""
+Caminho de leitura assíncrono (ASGI) para os endpoints mais acessados.
+
+As views daqui reaproveitam os ViewSets do DRF para montar querysets, filtros,
+paginação e serializers, mas fazem as idas ao banco com o ORM assíncrono
+(`aget`, `acount`, `aiterator`). Qualquer caso fora do caminho rápido
+(requisição não autenticada, token inválido, filtro inválido, API navegável,
+métodos de escrita, objeto não encontrado) é delegado à view síncrona
+original, para que autenticação, permissões e erros sejam idênticos.
+"""
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ObjectDoesNotExist
+from django.core.paginator import InvalidPage
+from django.http import HttpResponse
+from django.urls import resolve
+from django.utils import timezone
+from django.views import View
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from tasks import agenda
+from tasks.concurrency import make_etag
+
+
+SYNC_URLCONF = 'taskmanager.urls'
+
+
+class AsyncReadView(View):
+    """View base para leituras assíncronas sobre um ViewSet do DRF"""
+    viewset_class = None
+    action = 'list'
+    chunk_size = 100
+
+    async def get(self, request, *args, **kwargs):
+        if not self.can_handle(request):
+            return await self.fallback(request, *args, **kwargs)
+
+        drf_request = await self.authenticate(request)
+        if drf_request is None:
+            return await self.fallback(request, *args, **kwargs)
+
+        viewset = self.build_viewset(drf_request, kwargs)
+        try:
+            data = await self.get_data(viewset)
+        except (APIException, ObjectDoesNotExist, ValueError):
+            return await self.fallback(request, *args, **kwargs)
+        if data is None:
+            return await self.fallback(request, *args, **kwargs)
+
+        response = HttpResponse(JSONRenderer().render(data), content_type='application/json')
+        if isinstance(data, dict) and 'version' in data:
+            response['ETag'] = make_etag(data['version'])
+        return response
+
+    async def fallback(self, request, *args, **kwargs):
+        """Delega a requisição para a view síncrona equivalente"""
+        match = resolve(request.path_info, urlconf=SYNC_URLCONF)
+        return await sync_to_async(match.func)(request, *match.args, **match.kwargs)
+
+    post = put = patch = delete = options = fallback
+
+    def can_handle(self, request):
+        """Somente respostas JSON simples passam pelo caminho assíncrono"""
+        if 'format' in request.GET:
+            return False
+        return 'text/html' not in request.headers.get('Accept', '')
+
+    async def authenticate(self, request):
+        """
+        Autentica com os autenticadores configurados no ViewSet, que também
+        selecionam o banco do usuário. Retorna a requisição do DRF, ou None
+        quando ela deve seguir pelo caminho síncrono (e receber o erro do DRF).
+        """
+        drf_request = Request(request, authenticators=self.viewset_class().get_authenticators())
+        try:
+            user = await sync_to_async(lambda: drf_request.user)()
+        except APIException:
+            return None
+        return drf_request if user.is_authenticated else None
+
+    def build_viewset(self, drf_request, kwargs):
+        viewset = self.viewset_class(
+            request=drf_request, args=(), kwargs=kwargs,
+            action=self.action, format_kwarg=None,
+        )
+        viewset.headers = {}
+        return viewset
+
+    def get_queryset(self, viewset):
+        return viewset.filter_queryset(viewset.get_queryset())
+
+    async def get_data(self, viewset):
+        queryset = await sync_to_async(self.get_queryset)(viewset)
+        page = await self.paginate(viewset, queryset)
+        objects = page.object_list if page is not None else queryset
+        objects = [obj async for obj in objects.aiterator(chunk_size=self.chunk_size)]
+
+        serializer = viewset.get_serializer(objects, many=True)
+        data = await sync_to_async(lambda: serializer.data)()
+        if page is None:
+            return data
+        page.object_list = objects
+        return viewset.paginator.get_paginated_response(data).data
+
+    async def paginate(self, viewset, queryset):
+        """Paginação do DRF com a contagem feita por `acount()`"""
+        paginator = viewset.paginator
+        if paginator is None:
+            return None
+        page_size = paginator.get_page_size(viewset.request)
+        if not page_size:
+            return None
+
+        django_paginator = paginator.django_paginator_class(queryset, page_size)
+        django_paginator.__dict__['count'] = await queryset.acount()
+        page_number = paginator.get_page_number(viewset.request, django_paginator)
+        try:
+            page = django_paginator.page(page_number)
+        except InvalidPage:
+            # O DRF responde 404 para páginas inválidas
+            raise NotFound()
+        paginator.request = viewset.request
+        paginator.page = page
+        return page
+
+
+class AsyncDetailView(AsyncReadView):
+    """Leitura assíncrona de um único objeto"""
+    action = 'retrieve'
+
+    def get_queryset(self, viewset):
+        return viewset.get_queryset()
+
+    async def get_data(self, viewset):
+        queryset = await sync_to_async(self.get_queryset)(viewset)
+        instance = await queryset.aget(pk=viewset.kwargs['pk'])
+        serializer = viewset.get_serializer(instance)
+        return await sync_to_async(lambda: serializer.data)()
+
+
+class AsyncTaskListView(AsyncReadView):
+    """Listagem de tarefas; leituras do arquivo seguem pelo caminho síncrono"""
+
+    async def get_data(self, viewset):
+        if viewset.include_archived():
+            return None
+        return await super().get_data(viewset)
+
+
+class AsyncTaskAgendaView(AsyncReadView):
+    """Ações `overdue` e `today` do TaskViewSet (sem paginação)"""
+
+    def get_queryset(self, viewset):
+        if self.action == 'overdue':
+            return agenda.overdue(viewset.get_queryset())
+        return agenda.today(viewset.get_queryset(), viewset.get_agenda_timezone())
+
+    def get_window(self, viewset):
+        """Intervalo das ocorrências virtuais de tarefas recorrentes"""
+        if self.action == 'overdue':
+            return None, timezone.now()
+        return agenda.today_range(viewset.get_agenda_timezone())
+
+    async def get_data(self, viewset):
+        queryset = await sync_to_async(self.get_queryset)(viewset)
+        tasks = [task async for task in queryset.aiterator(chunk_size=self.chunk_size)]
+        tasks = await sync_to_async(viewset.agenda_tasks)(tasks, *self.get_window(viewset))
+        serializer = viewset.get_serializer(tasks, many=True)
+        return await sync_to_async(lambda: serializer.data)()
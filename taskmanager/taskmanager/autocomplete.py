@@ -0,0 +1,247 @@
+"""
+Autocompletar: `GET /api/autocomplete/?q=` busca o texto digitado nos títulos
+de tarefas e nos nomes de listas, categorias e etiquetas do usuário e devolve
+os melhores resultados, em ordem de relevância.
+
+No PostgreSQL a busca é uma única consulta com `pg_trgm` (expressões regulares
+para prefixo e prefixos de palavras, sem distinguir acentos, e
+`word_similarity`), apoiada pelos índices GIN de trigramas das migrações. Nos
+demais bancos, usa um índice em memória por usuário (prefixos das palavras e
+trigramas, no mesmo cálculo do `pg_trgm`), montado uma vez e refeito apenas
+quando algum nome muda.
+"""
+import bisect
+import heapq
+import re
+import unicodedata
+from collections import Counter
+
+from django.db import connections
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from categories.models import Category
+from lists.models import TaskList
+from tags.models import Tag
+from tasks.models import Task
+from .sharding import current_shard
+from .user_cache import UserCache
+
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 20
+# Semelhança mínima (0 a 1) para resultados aproximados
+SIMILARITY_THRESHOLD = 0.3
+# Pontuação por tipo de correspondência; aproximações ficam abaixo dos prefixos
+PREFIX_SCORE = 1.0
+WORD_PREFIX_SCORE = 0.9
+MAX_FUZZY_SCORE = 0.85
+
+# tipo, modelo, campo de texto, filtros extras
+SOURCES = [
+    ('task', Task, 'title', {}),
+    ('list', TaskList, 'name', {'deletion_requested_at__isnull': True}),
+    ('category', Category, 'name', {'deletion_requested_at__isnull': True}),
+    ('tag', Tag, 'name', {}),
+]
+TYPES = [source[0] for source in SOURCES]
+
+
+def fold(text):
+    """Texto em minúsculas e sem acentos"""
+    return unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode().lower()
+
+
+def split_words(text):
+    return re.findall(r'[a-z0-9]+', fold(text))
+
+
+def trigrams(text):
+    """Trigramas das palavras, com o preenchimento usado pelo pg_trgm"""
+    grams = set()
+    for word in split_words(text):
+        padded = f'  {word} '
+        grams.update(padded[index:index + 3] for index in range(len(padded) - 2))
+    return grams
+
+
+class PrefixIndex:
+    """Índice em memória dos nomes de um usuário"""
+
+    def __init__(self, entries):
+        # entries: (tipo, id, nome)
+        self.entries = entries
+        self.folded = [fold(name) for _, _, name in entries]
+        self.words = sorted(
+            (word, index)
+            for index, (_, _, name) in enumerate(entries)
+            for word in set(split_words(name))
+        )
+        self.gram_counts = []
+        self.grams = {}
+        for index, (_, _, name) in enumerate(entries):
+            entry_grams = trigrams(name)
+            self.gram_counts.append(len(entry_grams))
+            for gram in entry_grams:
+                self.grams.setdefault(gram, []).append(index)
+
+    def _word_prefix(self, prefix):
+        """Entradas com alguma palavra começando por `prefix`"""
+        matches = set()
+        position = bisect.bisect_left(self.words, (prefix,))
+        while position < len(self.words) and self.words[position][0].startswith(prefix):
+            matches.add(self.words[position][1])
+            position += 1
+        return matches
+
+    def search(self, query, types, limit):
+        folded = fold(query).strip()
+        query_words = split_words(query)
+        if not query_words:
+            return []
+
+        scores = {}
+        matches = None
+        for word in query_words:
+            found = self._word_prefix(word)
+            matches = found if matches is None else matches & found
+            if not matches:
+                break
+        for index in matches or ():
+            scores[index] = PREFIX_SCORE if self.folded[index].startswith(folded) else WORD_PREFIX_SCORE
+
+        query_grams = trigrams(query)
+        if len(scores) < limit and len(folded) >= 3 and query_grams:
+            shared = Counter(
+                index for gram in query_grams for index in self.grams.get(gram, ())
+            )
+            for index, count in shared.items():
+                if index in scores:
+                    continue
+                similarity = count / (len(query_grams) + self.gram_counts[index] - count)
+                if similarity >= SIMILARITY_THRESHOLD:
+                    scores[index] = min(similarity, MAX_FUZZY_SCORE)
+
+        best = heapq.nsmallest(
+            limit,
+            (index for index in scores if self.entries[index][0] in types),
+            key=lambda index: (-scores[index], len(self.entries[index][2]), self.entries[index][2]),
+        )
+        return [result(*self.entries[index], scores[index]) for index in best]
+
+
+def result(kind, pk, name, score):
+    return {'type': kind, 'id': pk, 'name': name, 'score': round(float(score), 4)}
+
+
+def build_index(user_id):
+    entries = []
+    for kind, model, field, extra in SOURCES:
+        rows = model.objects.filter(user_id=user_id, **extra).values_list('pk', field)
+        entries += [(kind, pk, name) for pk, name in rows]
+    return PrefixIndex(entries)
+
+
+_indexes = UserCache('autocomplete', build_index)
+invalidate = _indexes.invalidate
+
+
+# Letras acentuadas equivalentes à letra sem acento, como em `fold`
+ACCENTS = {
+    'a': 'áàâãä', 'e': 'éèêë', 'i': 'íìîï', 'o': 'óòôõö', 'u': 'úùûü', 'c': 'ç', 'n': 'ñ',
+}
+
+
+def _accent_pattern(folded):
+    """Expressão regular do PostgreSQL que aceita `folded` com ou sem acentos"""
+    pattern = ''
+    for char in folded:
+        if char in ACCENTS:
+            pattern += f'[{char}{ACCENTS[char]}]'
+        elif char.isalnum():
+            pattern += char
+        else:
+            pattern += '\\' + char
+    return pattern
+
+
+def _prefix_patterns(query):
+    """Padrões de prefixo do nome e de prefixo de cada palavra (`\\m`: início de palavra)"""
+    prefix = '^' + _accent_pattern(fold(query).strip())
+    words = ['\\m' + _accent_pattern(word) for word in split_words(query)]
+    return prefix, words
+
+
+def search_postgresql(connection, user_id, query, types, limit):
+    """Uma consulta com uma parte por tipo; cada parte usa o índice GIN da sua tabela"""
+    quote = connection.ops.quote_name
+    prefix, words = _prefix_patterns(query)
+    if not words:
+        return []
+    parts = []
+    params = []
+    for kind, model, field, extra in SOURCES:
+        if kind not in types:
+            continue
+        column = quote(model._meta.get_field(field).column)
+        # Todas as palavras digitadas precisam começar alguma palavra do nome
+        word_prefix = ' AND '.join([f'{column} ~* %s'] * len(words))
+        where = f'{quote("user_id")} = %s AND ({column} ~* %s OR ({word_prefix}) OR %s <%% {column})'
+        if 'deletion_requested_at__isnull' in extra:
+            where += f' AND {quote("deletion_requested_at")} IS NULL'
+        parts.append(
+            f'(SELECT %s::text AS type, {quote("id")} AS id, {column} AS name, '
+            f'CASE WHEN {column} ~* %s THEN {PREFIX_SCORE} '
+            f'WHEN {word_prefix} THEN {WORD_PREFIX_SCORE} '
+            f'ELSE LEAST(word_similarity(%s, {column}), {MAX_FUZZY_SCORE}) END AS score '
+            f'FROM {quote(model._meta.db_table)} WHERE {where} '
+            f'ORDER BY score DESC, length({column}) LIMIT %s)'
+        )
+        params += [kind, prefix, *words, query, user_id, prefix, *words, query, limit]
+
+    sql = f'SELECT type, id, name, score FROM ({" UNION ALL ".join(parts)}) matches ' \
+          f'ORDER BY score DESC, length(name), name LIMIT %s'
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params + [limit])
+        return [result(*row) for row in cursor.fetchall()]
+
+
+def search(user_id, query, types=None, limit=DEFAULT_LIMIT):
+    """Melhores resultados para o texto digitado, dos tipos pedidos"""
+    types = [kind for kind in TYPES if types is None or kind in types]
+    if not types or not query.strip():
+        return []
+    connection = connections[current_shard()]
+    if connection.vendor == 'postgresql':
+        return search_postgresql(connection, user_id, query.strip(), types, limit)
+    return _indexes.get(user_id).search(query, types, limit)
+
+
+class AutocompleteView(APIView):
+    """Busca por prefixo e aproximada em tarefas, listas, categorias e etiquetas"""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'error': 'Informe o parâmetro q.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        types = None
+        if 'types' in request.query_params:
+            types = {name.strip() for name in request.query_params['types'].split(',')}
+            unknown = types - set(TYPES)
+            if unknown:
+                return Response({
+                    'error': f'Tipos inválidos: {", ".join(sorted(unknown))}. Use: {", ".join(TYPES)}.'
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+        limit = request.query_params.get('limit', str(DEFAULT_LIMIT))
+        limit = int(limit) if limit.isdigit() else 0
+        if not 1 <= limit <= MAX_LIMIT:
+            return Response({
+                'error': f'O parâmetro limit deve estar entre 1 e {MAX_LIMIT}.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({'results': search(request.user.pk, query, types, limit)})
@@ -0,0 +1,235 @@
+"""
+Requisições em lote: `POST /api/batch/` executa várias requisições da API no
+mesmo processo, pelo resolvedor de URLs, e devolve as respostas na ordem.
+
+A autenticação, o fragmento do usuário, os middlewares e a conexão com o banco
+são feitos uma única vez para o lote. Com `"parallel": true`, leituras (GET)
+consecutivas rodam ao mesmo tempo em um pool de threads, cada uma com a sua
+conexão; escritas sempre rodam sozinhas, na ordem enviada.
+
+Requisições internas caras passam pelo controle de admissão uma a uma, como
+se fossem enviadas separadamente: o lote não executa mais leituras caras ao
+mesmo tempo do que o limite por usuário, e as recusadas recebem 503 no item.
+"""
+import io
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from contextvars import copy_context
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connections
+from django.urls import Resolver404, resolve
+from rest_framework import serializers, status
+from rest_framework.permissions import IsAuthenticated, SAFE_METHODS
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from accounts.authentication import ShardMoving
+from . import admission, sharding
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'MAX_REQUESTS': 20,
+    'MAX_WORKERS': 4,
+    'PATH_PREFIX': '/api/',
+}
+
+# Cabeçalhos das respostas repassados no resultado de cada requisição
+RESPONSE_HEADERS = ['ETag', 'Location', 'Retry-After']
+
+# Cabeçalhos condicionais do lote não valem para as requisições internas
+OUTER_ONLY_HEADERS = {'HTTP_IF_MATCH', 'HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE'}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'BATCH_API', {})}
+
+
+class BatchItemSerializer(serializers.Serializer):
+    METHOD_CHOICES = ['GET', 'POST', 'PUT', 'PATCH', 'DELETE']
+
+    method = serializers.ChoiceField(choices=METHOD_CHOICES, default='GET')
+    path = serializers.CharField()
+    body = serializers.JSONField(required=False, allow_null=True)
+    headers = serializers.DictField(child=serializers.CharField(), required=False)
+
+    def validate_method(self, value):
+        return value.upper()
+
+    def validate_path(self, value):
+        path = urlsplit(value).path
+        if not path.startswith(get_config()['PATH_PREFIX']):
+            raise serializers.ValidationError('Use um caminho relativo da API, como /api/tasks/.')
+        if path.rstrip('/') == '/api/batch':
+            raise serializers.ValidationError('Lotes não podem conter outros lotes.')
+        return value
+
+
+class BatchSerializer(serializers.Serializer):
+    requests = BatchItemSerializer(many=True, allow_empty=False)
+    parallel = serializers.BooleanField(default=False)
+
+    def validate_requests(self, value):
+        limit = get_config()['MAX_REQUESTS']
+        if len(value) > limit:
+            raise serializers.ValidationError(f'Envie no máximo {limit} requisições por lote.')
+        return value
+
+
+def build_subrequest(request, item):
+    """Monta a requisição interna reaproveitando o usuário já autenticado"""
+    url = urlsplit(item['path'])
+    body = b''
+    if item.get('body') is not None:
+        body = json.dumps(item['body']).encode()
+
+    environ = {
+        key: value for key, value in request.META.items()
+        if key.startswith('HTTP_') and key not in OUTER_ONLY_HEADERS
+    }
+    for name, value in item.get('headers', {}).items():
+        environ['HTTP_' + name.upper().replace('-', '_')] = value
+    environ.update({
+        'REQUEST_METHOD': item['method'],
+        'PATH_INFO': url.path,
+        'SCRIPT_NAME': '',
+        'QUERY_STRING': url.query,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+        'SERVER_NAME': request.META.get('SERVER_NAME', 'localhost'),
+        'SERVER_PORT': request.META.get('SERVER_PORT', '80'),
+        'REMOTE_ADDR': request.META.get('REMOTE_ADDR', ''),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.url_scheme': request.scheme,
+    })
+    subrequest = WSGIRequest(environ)
+    subrequest.user = request.user
+    # O DRF usa o usuário já autenticado em vez de autenticar de novo
+    subrequest._force_auth_user = request.user
+    subrequest._force_auth_token = request.auth
+    session = getattr(request._request, 'session', None)
+    if session is not None:
+        subrequest.session = session
+    return subrequest
+
+
+def error_result(status_code, detail):
+    return {'status': status_code, 'headers': {}, 'body': {'detail': detail}}
+
+
+def run_subrequest(request, item):
+    """Executa uma requisição interna e devolve status, cabeçalhos e corpo"""
+    subrequest = build_subrequest(request, item)
+    try:
+        match = resolve(subrequest.path_info, urlconf=settings.ROOT_URLCONF)
+    except Resolver404:
+        return error_result(status.HTTP_404_NOT_FOUND, 'Não encontrado.')
+
+    release = admission.admit_subrequest(subrequest)
+    if release is None:
+        result = error_result(status.HTTP_503_SERVICE_UNAVAILABLE, admission.OVERLOADED_DETAIL)
+        result['headers']['Retry-After'] = str(admission.get_config()['RETRY_AFTER'])
+        return result
+
+    try:
+        response = match.func(subrequest, *match.args, **match.kwargs)
+        if response.streaming:
+            # Respostas em fluxo (como o feed .ics) não cabem no corpo JSON do lote
+            response.close()
+            return error_result(
+                status.HTTP_400_BAD_REQUEST,
+                'Respostas em fluxo (como o feed .ics) não podem ser lidas em lote.',
+            )
+        if hasattr(response, 'render'):
+            response.render()
+        content = response.content
+        if content and response.get('Content-Type', '').startswith('application/json'):
+            body = json.loads(content)
+        else:
+            body = content.decode() or None
+    except Exception:
+        logger.exception('Erro na requisição em lote %s %s', item['method'], item['path'])
+        return error_result(status.HTTP_500_INTERNAL_SERVER_ERROR, 'Erro interno do servidor.')
+    finally:
+        release()
+
+    return {
+        'status': response.status_code,
+        'headers': {name: response[name] for name in RESPONSE_HEADERS if response.has_header(name)},
+        'body': body,
+    }
+
+
+def run_in_thread(request, item, slot):
+    try:
+        with slot:
+            return run_subrequest(request, item)
+    finally:
+        # Cada thread do pool abre as próprias conexões
+        connections.close_all()
+
+
+class BatchView(APIView):
+    """Executa várias requisições da API em uma única chamada"""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        items = serializer.validated_data['requests']
+        parallel = serializer.validated_data['parallel']
+
+        # A autenticação do lote já ativou o fragmento; a checagem de migração
+        # das escritas é feita aqui porque as requisições internas não autenticam
+        _, moving = sharding.get_user_shard(request.user.pk)
+
+        results = [None] * len(items)
+        reads = []
+        for index, item in enumerate(items):
+            if item['method'] in SAFE_METHODS:
+                reads.append(index)
+                continue
+            self.run_reads(request, items, reads, results, parallel)
+            reads = []
+            if moving:
+                results[index] = error_result(ShardMoving.status_code, str(ShardMoving.default_detail))
+                results[index]['headers']['Retry-After'] = str(ShardMoving.wait)
+            else:
+                results[index] = run_subrequest(request, item)
+        self.run_reads(request, items, reads, results, parallel)
+
+        return Response({'responses': results})
+
+    def run_reads(self, request, items, indexes, results, parallel):
+        """Executa um grupo de leituras consecutivas, em paralelo quando pedido"""
+        if not parallel or len(indexes) < 2:
+            for index in indexes:
+                results[index] = run_subrequest(request, items[index])
+            return
+
+        # Leituras caras esperam a vez dentro do lote em vez de serem recusadas
+        # pelo limite por usuário
+        controller = admission.get_controller()
+        expensive_slots = threading.Semaphore(controller.config['MAX_EXPENSIVE_PER_USER'])
+
+        def slot(item):
+            if controller.is_expensive_path(item['method'], urlsplit(item['path']).path):
+                return expensive_slots
+            return nullcontext()
+
+        workers = min(get_config()['MAX_WORKERS'], len(indexes))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # copy_context leva o fragmento ativo para as threads
+            futures = {
+                index: executor.submit(copy_context().run, run_in_thread, request, items[index], slot(items[index]))
+                for index in indexes
+            }
+        for index, future in futures.items():
+            results[index] = future.result()
@@ -0,0 +1,117 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse
+
+from . import admission, sharding
+
+
+class AsgiUrlconfMiddleware:
+    """
+    Usa `ASGI_ROOT_URLCONF` nas requisições servidas via ASGI, para que as
+    leituras mais acessadas sigam pelas views assíncronas.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.urlconf = getattr(settings, 'ASGI_ROOT_URLCONF', None)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        self.set_urlconf(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        self.set_urlconf(request)
+        return await self.get_response(request)
+
+    def set_urlconf(self, request):
+        if self.urlconf and isinstance(request, ASGIRequest):
+            request.urlconf = self.urlconf
+
+
+class ShardMiddleware:
+    """
+    Limpa o banco (fragmento) selecionado ao fim de cada requisição, para que
+    ele não vaze para a próxima requisição atendida pela mesma thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        sharding.reset_shard()
+        try:
+            return self.get_response(request)
+        finally:
+            sharding.reset_shard()
+
+    async def __acall__(self, request):
+        sharding.reset_shard()
+        try:
+            return await self.get_response(request)
+        finally:
+            sharding.reset_shard()
+
+
+class AdmissionControlMiddleware:
+    """
+    Recusa com 503 + Retry-After as requisições que excedem os limites de
+    concorrência do worker (ver taskmanager/admission.py).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        config = admission.get_config()
+        if not config['ENABLED']:
+            raise MiddlewareNotUsed()
+        self.controller = admission.get_controller()
+        self.retry_after = config['RETRY_AFTER']
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.controller.applies_to(request):
+            return self.get_response(request)
+        release = self.controller.admit(request)
+        if release is None:
+            return self.overloaded_response()
+        try:
+            return self.get_response(request)
+        finally:
+            release()
+
+    async def __acall__(self, request):
+        if not self.controller.applies_to(request):
+            return await self.get_response(request)
+        release = await self.controller.aadmit(request)
+        if release is None:
+            return self.overloaded_response()
+        try:
+            return await self.get_response(request)
+        finally:
+            release()
+
+    def overloaded_response(self):
+        response = JsonResponse(
+            {'detail': admission.OVERLOADED_DETAIL},
+            status=503,
+        )
+        response['Retry-After'] = str(self.retry_after)
+        return response
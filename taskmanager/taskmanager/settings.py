@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -50,10 +51,16 @@ INSTALLED_APPS = [
     'lists',
     'categories',
     'tags',
+    'reports',
+    'webhooks',
+    'jobs',
 ]
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'taskmanager.middleware.AdmissionControlMiddleware',
+    'taskmanager.middleware.AsgiUrlconfMiddleware',
+    'taskmanager.middleware.ShardMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -82,6 +89,9 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'taskmanager.wsgi.application'
 
+# Sob ASGI, as leituras mais acessadas usam views assíncronas (ver taskmanager/asgi.py)
+ASGI_ROOT_URLCONF = 'taskmanager.urls_asgi'
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -93,6 +103,21 @@ DATABASES = {
     }
 }
 
+# Fragmentação por usuário (ver taskmanager/sharding.py)
+# Os dados de cada usuário ficam em um dos bancos abaixo. Com TASK_SHARD_COUNT > 1,
+# bancos SQLite adicionais (db_shard_N.sqlite3) são criados para testes locais;
+# em produção, declare os bancos em DATABASES e liste-os aqui.
+TASK_SHARD_COUNT = int(os.environ.get('TASK_SHARD_COUNT', '1'))
+for index in range(1, TASK_SHARD_COUNT):
+    DATABASES[f'shard_{index}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / f'db_shard_{index}.sqlite3',
+    }
+TASK_SHARD_DATABASES = ['default'] + [f'shard_{index}' for index in range(1, TASK_SHARD_COUNT)]
+# Cada fragmento gera IDs a partir de índice * TASK_SHARD_ID_BLOCK
+TASK_SHARD_ID_BLOCK = 10 ** 12
+DATABASE_ROUTERS = ['taskmanager.sharding.UserShardRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -139,8 +164,8 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Django REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
-        'rest_framework.authentication.SessionAuthentication',
+        'accounts.authentication.TokenAuthentication',
+        'accounts.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -165,16 +190,82 @@ CORS_ALLOWED_HEADERS = [
     'authorization',
     'content-type',
     'dnt',
+    'if-match',
     'origin',
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
 ]
+CORS_EXPOSE_HEADERS = ['etag', 'retry-after']
 
 # Configurações de segurança para desenvolvimento
 CORS_ALLOW_CREDENTIALS = True
 CSRF_TRUSTED_ORIGINS = ['http://localhost:3000', 'http://127.0.0.1:3000']
 
+# Arquivamento de tarefas concluídas
+# Tarefas concluídas há mais dias que isso são movidas para o arquivo
+# por `python manage.py archive_completed_tasks`
+TASK_ARCHIVE_AFTER_DAYS = 90
+
+# Controle de admissão (ver taskmanager/admission.py)
+# Limites por worker para requisições caras (listagens, atrasadas, relatórios,
+# operações em lote); o excedente recebe 503 com Retry-After.
+ADMISSION_CONTROL = {
+    'MAX_IN_FLIGHT': 64,
+    'MAX_EXPENSIVE': 4,
+    'EXPENSIVE_QUEUE': 8,
+    'QUEUE_TIMEOUT': 2.0,
+    'MAX_EXPENSIVE_PER_USER': 2,
+    'RETRY_AFTER': 2,
+}
+
+# Requisições em lote (ver taskmanager/batch.py)
+# Máximo de requisições por lote e de threads para leituras em paralelo
+BATCH_API = {
+    'MAX_REQUESTS': 20,
+    'MAX_WORKERS': 4,
+}
+
+# Aquecimento na carga de wsgi.py / asgi.py (ver taskmanager/warmup.py)
+# Com `gunicorn --preload`, use CONNECT_DATABASES = False e o hook post_fork
+WARMUP = {
+    'ENABLED': os.environ.get('DJANGO_WARMUP', '0') == '1',
+    'CONNECT_DATABASES': os.environ.get('DJANGO_WARMUP_CONNECT', '1') == '1',
+}
+
+# Webhooks (ver webhooks/dispatcher.py)
+# Eventos do outbox entregues por `python manage.py dispatch_webhooks`;
+# ALLOW_LOCAL_URLS aceita http:// e endereços locais (desenvolvimento e testes)
+WEBHOOKS = {
+    'BATCH_SIZE': 500,
+    'MAX_EVENTS_PER_DELIVERY': 100,
+    'MAX_WORKERS': 4,
+    'TIMEOUT': 10,
+    'MAX_FAILURES': 10,
+    'ALLOW_LOCAL_URLS': DEBUG,
+}
+
+# Trabalhos em segundo plano (ver jobs/queue.py)
+# Executados por `python manage.py runworker`; PROCESSES e THREADS são os
+# padrões de --processes e --threads
+JOBS = {
+    'PROCESSES': int(os.environ.get('JOBS_PROCESSES', '1')),
+    'THREADS': int(os.environ.get('JOBS_THREADS', '4')),
+    'POLL_INTERVAL': 1.0,
+    'LEASE': 300,
+    'MAX_ATTEMPTS': 3,
+}
+
+# Registro de tempo (ver tasks/timetracking.py)
+# Sinais de atividade do cronômetro gravados em lote a cada N segundos ou N
+# registros; cronômetros sem sinal há STALE_AFTER segundos são encerrados no
+# último sinal (`python manage.py close_stale_timers`)
+TIME_TRACKING = {
+    'HEARTBEAT_FLUSH_INTERVAL': 30,
+    'HEARTBEAT_FLUSH_SIZE': 100,
+    'STALE_AFTER': 300,
+}
+
 # Configurações de logging
 LOGGING = {
     'version': 1,
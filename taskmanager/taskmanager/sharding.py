@@ -0,0 +1,201 @@
+"""
+Fragmentação (sharding) dos dados por usuário.
+
+Todos os dados de um usuário (tarefas, subtarefas, históricos, listas,
+categorias, etiquetas, consolidados e webhooks) ficam em um único banco, escolhido em
+`TASK_SHARD_DATABASES`. Usuários, tokens, sessões e o mapa de fragmentos
+(`accounts.UserShard`) ficam sempre em `default`; cada fragmento guarda uma
+cópia da linha do usuário para satisfazer as chaves estrangeiras.
+
+O banco de cada requisição é definido na autenticação (`use_shard` /
+`activate_user_shard`) e lido pelo `UserShardRouter`. Com um único banco
+configurado, tudo continua em `default` sem consultas adicionais.
+"""
+import zlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models.constants import OnConflict
+
+
+SHARDED_APPS = {'tasks', 'lists', 'categories', 'tags', 'reports', 'webhooks'}
+
+_current_shard = ContextVar('current_shard', default=None)
+
+
+def shard_aliases():
+    return list(getattr(settings, 'TASK_SHARD_DATABASES', [DEFAULT_DB_ALIAS]))
+
+
+def is_sharded():
+    return len(shard_aliases()) > 1
+
+
+def hashed_shard(user_id):
+    """Fragmento escolhido por hash estável do ID, usado na criação do usuário"""
+    aliases = shard_aliases()
+    return aliases[zlib.crc32(str(user_id).encode()) % len(aliases)]
+
+
+def get_user_shard(user_id):
+    """
+    Retorna `(banco, em_migração)` do usuário. Usuários sem registro no mapa
+    (anteriores à fragmentação) ficam em `default`.
+    """
+    if not is_sharded():
+        return DEFAULT_DB_ALIAS, False
+    from accounts.models import UserShard
+    entry = UserShard.objects.filter(user_id=user_id).values_list('database', 'moving').first()
+    return entry or (DEFAULT_DB_ALIAS, False)
+
+
+def get_user_shards(user_ids):
+    """`{user_id: (banco, em_migração)}` de vários usuários, em uma consulta"""
+    shards = {user_id: (DEFAULT_DB_ALIAS, False) for user_id in user_ids}
+    if not is_sharded() or not shards:
+        return shards
+    from accounts.models import UserShard
+    for user_id, database, moving in UserShard.objects.filter(user_id__in=list(shards)).values_list(
+        'user_id', 'database', 'moving'
+    ):
+        shards[user_id] = (database, moving)
+    return shards
+
+
+def shard_for_user(user_id):
+    return get_user_shard(user_id)[0]
+
+
+def current_shard():
+    """Banco da requisição (ou do bloco `use_shard`) em andamento"""
+    return _current_shard.get() or DEFAULT_DB_ALIAS
+
+
+def set_current_shard(alias):
+    _current_shard.set(alias)
+
+
+def activate_user_shard(user_id):
+    """Define o banco do usuário para o restante da requisição"""
+    alias, moving = get_user_shard(user_id)
+    set_current_shard(alias)
+    return alias, moving
+
+
+@contextmanager
+def use_shard(alias):
+    token = _current_shard.set(alias)
+    try:
+        yield alias
+    finally:
+        _current_shard.reset(token)
+
+
+def reset_shard():
+    _current_shard.set(None)
+
+
+def iter_shards(user_id=None):
+    """
+    Percorre os bancos ativando cada um (para comandos de manutenção).
+    Com `user_id`, percorre apenas o banco do usuário.
+    """
+    aliases = [shard_for_user(user_id)] if user_id is not None else shard_aliases()
+    for alias in aliases:
+        with use_shard(alias):
+            yield alias
+
+
+def upsert(model, objs, using, batch_size=500):
+    """
+    INSERT ... ON CONFLICT (pk) DO UPDATE preservando todos os valores,
+    inclusive campos `auto_now`. Usado para copiar linhas entre bancos.
+    """
+    opts = model._meta
+    fields = opts.concrete_fields
+    update_fields = [field for field in fields if not field.primary_key]
+    manager = model._base_manager
+    for start in range(0, len(objs), batch_size):
+        manager._insert(
+            objs[start:start + batch_size],
+            fields=fields,
+            raw=True,
+            using=using,
+            on_conflict=OnConflict.UPDATE,
+            update_fields=update_fields or [opts.pk],
+            unique_fields=[opts.pk],
+        )
+
+
+def mirror_user(user, alias):
+    """Copia (ou atualiza) a linha do usuário no fragmento indicado"""
+    if alias != DEFAULT_DB_ALIAS:
+        upsert(User, [user], using=alias)
+
+
+def reserve_id_range(alias, models):
+    """
+    Faz as sequências de chave primária do fragmento começarem no seu bloco
+    (`índice * TASK_SHARD_ID_BLOCK`), para que IDs nunca colidam entre
+    fragmentos e os dados possam ser movidos mantendo os IDs.
+    """
+    aliases = shard_aliases()
+    if alias not in aliases or aliases.index(alias) == 0:
+        return
+    start = aliases.index(alias) * settings.TASK_SHARD_ID_BLOCK
+    connection = connections[alias]
+
+    with connection.cursor() as cursor:
+        for model in models:
+            pk = model._meta.pk
+            if pk.get_internal_type() not in ('AutoField', 'BigAutoField', 'SmallAutoField'):
+                continue
+            table = model._meta.db_table
+            if connection.vendor == 'sqlite':
+                cursor.execute(
+                    'INSERT INTO sqlite_sequence (name, seq) SELECT %s, %s '
+                    'WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = %s)',
+                    [table, start, table],
+                )
+                cursor.execute(
+                    'UPDATE sqlite_sequence SET seq = %s WHERE name = %s AND seq < %s',
+                    [start, table, start],
+                )
+            elif connection.vendor == 'postgresql':
+                cursor.execute('SELECT pg_get_serial_sequence(%s, %s)', [table, pk.column])
+                sequence = cursor.fetchone()[0]
+                cursor.execute(
+                    f'SELECT setval(%s, GREATEST(%s, (SELECT last_value FROM {sequence})))',
+                    [sequence, start],
+                )
+
+
+class UserShardRouter:
+    """
+    Envia os modelos dos apps fragmentados para o banco do usuário:
+    o banco da instância relacionada, quando houver, ou o da requisição.
+    """
+
+    def _db_for_model(self, model, **hints):
+        if model._meta.app_label not in SHARDED_APPS:
+            return None
+        instance = hints.get('instance')
+        if instance is not None:
+            if instance._meta.app_label in SHARDED_APPS and instance._state.db:
+                return instance._state.db
+            if isinstance(instance, User) and instance.pk and _current_shard.get() is None:
+                return shard_for_user(instance.pk)
+        return _current_shard.get()
+
+    db_for_read = _db_for_model
+    db_for_write = _db_for_model
+
+    def allow_relation(self, obj1, obj2, **hints):
+        sharded = [obj._meta.app_label in SHARDED_APPS for obj in (obj1, obj2)]
+        if all(sharded):
+            return obj1._state.db == obj2._state.db
+        # Usuários (em default) se relacionam com dados de qualquer fragmento
+        return True
@@ -0,0 +1,151 @@
+"""
+Conjuntos esparsos de campos: `?fields=id,title` devolve apenas os campos
+pedidos, `?omit=history,subtasks` remove campos da resposta e
+`?include=subtasks` acrescenta relações opcionais embutidas em cada objeto.
+
+O serializer deixa de calcular os campos omitidos e a view deixa de fazer os
+JOINs, prefetches e anotações que só esses campos usariam. Na listagem e no
+detalhe, a consulta também lê só as colunas desses campos (`.only()`). Vale
+apenas para leituras (GET/HEAD/OPTIONS) e para o serializer de nível superior.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+
+def parse_field_list(value):
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+def requested_fields(request, available):
+    """Nomes de `available` que a resposta deve conter, na ordem original"""
+    names = list(available)
+    if request is None or request.method not in SAFE_METHODS:
+        return names
+    params = request.query_params
+    if 'fields' in params:
+        wanted = parse_field_list(params['fields'])
+        names = [name for name in names if name in wanted]
+    if 'omit' in params:
+        omitted = parse_field_list(params['omit'])
+        names = [name for name in names if name not in omitted]
+    return names
+
+
+def requested_includes(request, available):
+    """Nomes de `available` pedidos em `?include=`"""
+    if request is None or request.method not in SAFE_METHODS:
+        return []
+    wanted = parse_field_list(request.query_params.get('include', ''))
+    return [name for name in available if name in wanted]
+
+
+class SparseFieldsetMixin:
+    """Serializer que respeita `?fields=`, `?omit=` e `?include=` da requisição"""
+
+    def get_include_fields(self):
+        """Campos opcionais, serializados apenas quando pedidos em `?include=`"""
+        return {}
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self.is_top_level():
+            return fields
+        request = self.context.get('request')
+        keep = set(requested_fields(request, fields))
+        fields = {name: field for name, field in fields.items() if name in keep}
+
+        include_fields = self.get_include_fields()
+        for name in requested_includes(request, include_fields):
+            fields[name] = include_fields[name]
+        return fields
+
+    def is_top_level(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+
+class SparseQuerysetMixin:
+    """
+    Mixin para views: aplica ao queryset apenas os select_related,
+    prefetch_related e anotações exigidos pelos campos que serão serializados.
+    """
+    # campo do serializer -> lookups necessários
+    field_select_related = {}
+    field_prefetch_related = {}
+    # campo do serializer que não é coluna do modelo -> colunas que ele lê
+    field_only = {}
+    # Ações cujo queryset carrega só as colunas dos campos da resposta
+    only_actions = ('list', 'retrieve')
+
+    def get_field_annotations(self):
+        """campo do serializer -> {nome da anotação: expressão}"""
+        return {}
+
+    def get_rendered_fields(self, serializer_class=None):
+        serializer_class = serializer_class or self.get_serializer_class()
+        fields = requested_fields(self.request, serializer_class.Meta.fields)
+        if issubclass(serializer_class, SparseFieldsetMixin):
+            fields += requested_includes(self.request, serializer_class().get_include_fields())
+        return fields
+
+    def optimize_queryset(self, queryset, serializer_class=None,
+                          field_select_related=None, field_prefetch_related=None):
+        """
+        Aplica os requisitos dos campos de `serializer_class` (por padrão o da
+        view). Os mapas podem ser trocados para outro modelo, como o arquivo.
+        """
+        if self.request.method == 'DELETE':
+            return queryset
+        if field_select_related is None:
+            field_select_related = self.field_select_related
+        if field_prefetch_related is None:
+            field_prefetch_related = self.field_prefetch_related
+
+        fields = self.get_rendered_fields(serializer_class)
+        select_related = []
+        prefetch_related = []
+        annotations = {}
+        field_annotations = self.get_field_annotations()
+        for name in fields:
+            select_related += field_select_related.get(name, [])
+            prefetch_related += field_prefetch_related.get(name, [])
+            annotations.update(field_annotations.get(name, {}))
+
+        if select_related:
+            queryset = queryset.select_related(*dict.fromkeys(select_related))
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*dict.fromkeys(prefetch_related))
+        if annotations:
+            queryset = queryset.annotate(**annotations)
+
+        if getattr(self, 'action', None) in self.only_actions:
+            columns = self.get_only_columns(queryset.model, fields, field_annotations)
+            if columns is not None:
+                # As relações do JOIN precisam estar entre as colunas carregadas
+                columns += [lookup.split('__')[0] for lookup in select_related]
+                queryset = queryset.only(*dict.fromkeys(columns))
+        return queryset
+
+    def get_only_columns(self, model, fields, field_annotations):
+        """
+        Colunas de `model` lidas pelos campos, ou None se algum campo não é
+        coluna nem está em `field_only` (a consulta carrega todas as colunas).
+        """
+        columns = [model._meta.pk.name]
+        for name in fields:
+            if name in field_annotations:
+                continue
+            try:
+                field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                field = None
+            if field is not None and field.concrete:
+                columns.append(name)
+            elif name in self.field_only:
+                columns += self.field_only[name]
+            else:
+                return None
+        return columns
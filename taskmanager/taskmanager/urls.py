@@ -17,6 +17,8 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from django.http import JsonResponse
+from .autocomplete import AutocompleteView
+from .batch import BatchView
 
 def api_root(request):
     """Root endpoint da API"""
@@ -31,6 +33,11 @@ def api_root(request):
             'lists': '/api/lists/',
             'categories': '/api/categories/',
             'tags': '/api/tags/',
+            'reports': '/api/reports/',
+            'batch': '/api/batch/',
+            'autocomplete': '/api/autocomplete/',
+            'webhooks': '/api/webhooks/',
+            'jobs': '/api/jobs/',
         }
     })
 
@@ -48,6 +55,11 @@ urlpatterns = [
         path('lists/', include('lists.urls')),
         path('categories/', include('categories.urls')),
         path('tags/', include('tags.urls')),
+        path('reports/', include('reports.urls')),
+        path('batch/', BatchView.as_view(), name='batch'),
+        path('autocomplete/', AutocompleteView.as_view(), name='autocomplete'),
+        path('webhooks/', include('webhooks.urls')),
+        path('jobs/', include('jobs.urls')),
     ])),
     
     # DRF browsable API
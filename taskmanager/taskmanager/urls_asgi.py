@@ -0,0 +1,36 @@
+"""
+URL configuration usada pelas requisições servidas via ASGI.
+
+Sobrepõe as rotas de leitura mais acessadas com as views assíncronas de
+`taskmanager.async_views` e mantém todas as demais rotas de `taskmanager.urls`.
+"""
+from django.urls import path
+from django.views.decorators.csrf import csrf_exempt
+
+from categories.views import CategoryViewSet
+from lists.views import TaskListViewSet
+from tags.views import TagViewSet
+from tasks.views import TaskViewSet
+from . import urls
+from .async_views import AsyncReadView, AsyncDetailView, AsyncTaskListView, AsyncTaskAgendaView
+
+
+def async_view(view_class, viewset_class, **initkwargs):
+    return csrf_exempt(view_class.as_view(viewset_class=viewset_class, **initkwargs))
+
+
+urlpatterns = [
+    path('api/tasks/', async_view(AsyncTaskListView, TaskViewSet), name='async-task-list'),
+    path('api/tasks/overdue/', async_view(AsyncTaskAgendaView, TaskViewSet, action='overdue'),
+         name='async-task-overdue'),
+    path('api/tasks/today/', async_view(AsyncTaskAgendaView, TaskViewSet, action='today'),
+         name='async-task-today'),
+    path('api/tasks/<int:pk>/', async_view(AsyncDetailView, TaskViewSet), name='async-task-detail'),
+    path('api/lists/', async_view(AsyncReadView, TaskListViewSet), name='async-tasklist-list'),
+    path('api/lists/<int:pk>/', async_view(AsyncDetailView, TaskListViewSet), name='async-tasklist-detail'),
+    path('api/categories/', async_view(AsyncReadView, CategoryViewSet), name='async-category-list'),
+    path('api/categories/<int:pk>/', async_view(AsyncDetailView, CategoryViewSet),
+         name='async-category-detail'),
+    path('api/tags/', async_view(AsyncReadView, TagViewSet), name='async-tag-list'),
+    path('api/tags/<int:pk>/', async_view(AsyncDetailView, TagViewSet), name='async-tag-detail'),
+] + urls.urlpatterns
@@ -0,0 +1,62 @@
+"""
+Estruturas por usuário mantidas em memória no processo (modelo de sugestões,
+índice de autocompletar).
+
+Cada estrutura é reconstruída quando a versão do usuário no cache do Django
+muda; `invalidate()` troca a versão após a confirmação da transação. Com um
+cache compartilhado (Redis, Memcached), a troca vale para todos os processos;
+com o cache local padrão, o `ttl` limita por quanto tempo outro processo pode
+usar uma estrutura antiga.
+"""
+import time
+import uuid
+from collections import OrderedDict
+from threading import Lock
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .sharding import current_shard
+
+
+class UserCache:
+    """Cache LRU de uma estrutura por usuário, montada por `build(user_id)`"""
+
+    def __init__(self, name, build, max_size=256, ttl=300):
+        self.name = name
+        self.build = build
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def version_key(self, user_id):
+        return f'{self.name}:{user_id}'
+
+    def get(self, user_id):
+        version = cache.get(self.version_key(user_id))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] == version and now - entry[1] < self.ttl:
+                self._entries.move_to_end(user_id)
+                return entry[2]
+
+        value = self.build(user_id)
+        with self._lock:
+            self._entries[user_id] = (version, now, value)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, user_id):
+        """Troca a versão do usuário quando a transação atual for confirmada"""
+        transaction.on_commit(
+            lambda: cache.set(self.version_key(user_id), uuid.uuid4().hex, None),
+            using=current_shard(),
+        )
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,153 @@
+"""
+Aquecimento do processo antes do primeiro acesso.
+
+Sem aquecimento, a primeira requisição de cada worker paga a montagem das
+rotas, os imports tardios do DRF (renderers, parsers, autenticação), a
+introspecção dos modelos pelos serializers, a criação dos FilterSets do
+django-filter e a abertura das conexões com os bancos. `warm_up()` faz esse
+trabalho na carga de `wsgi.py` / `asgi.py` quando `WARMUP['ENABLED']`.
+
+Com `gunicorn --preload` o aquecimento roda no processo mestre, antes do
+fork, e os workers herdam rotas e módulos já carregados. Conexões com o banco
+não podem ser herdadas: nesse modo use `CONNECT_DATABASES = False` e, no
+arquivo de configuração do gunicorn, `from taskmanager.warmup import post_fork`.
+As conexões do Django são por thread: abri-las adianta apenas a thread que
+carrega a aplicação (workers síncronos) e valida DNS e credenciais.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.urls import URLPattern, URLResolver, get_resolver
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import serializers
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': False,
+    'CONNECT_DATABASES': True,
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'WARMUP', {})}
+
+
+def urlconfs():
+    """URLconfs servidos pelo projeto (WSGI e ASGI)"""
+    names = [settings.ROOT_URLCONF, getattr(settings, 'ASGI_ROOT_URLCONF', None)]
+    return [name for index, name in enumerate(names) if name and name not in names[:index]]
+
+
+def iter_callbacks(patterns):
+    """Views de todas as rotas, percorrendo os includes"""
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from iter_callbacks(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern):
+            yield pattern.callback
+
+
+def warm_urls():
+    """Monta as rotas e os índices de reverse() de cada URLconf"""
+    callbacks = []
+    for urlconf in urlconfs():
+        resolver = get_resolver(urlconf)
+        # O acesso popula reverse_dict, namespace_dict e app_dict
+        resolver.reverse_dict
+        callbacks += iter_callbacks(resolver.url_patterns)
+    return callbacks
+
+
+def _touch(serializer):
+    """Constrói os campos do serializer e dos serializers aninhados"""
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    for field in serializer.fields.values():
+        if isinstance(field, serializers.BaseSerializer):
+            _touch(field)
+
+
+def warm_view(callback):
+    """
+    Instancia a view do DRF e o seu serializer e FilterSet. Os campos dos
+    serializers são montados por instância; o ganho está nos imports e nos
+    caches de `_meta` dos modelos, compartilhados por todo o processo.
+    """
+    cls = getattr(callback, 'cls', None)
+    if cls is None:
+        return False
+    view = cls(**getattr(callback, 'initkwargs', {}))
+    view.format_kwarg = None
+    view.get_renderers()
+    view.get_parsers()
+    view.get_authenticators()
+    view.get_permissions()
+
+    serializer_class = getattr(cls, 'serializer_class', None)
+    if serializer_class is None:
+        return True
+    _touch(serializer_class(context={}))
+
+    model = getattr(getattr(serializer_class, 'Meta', None), 'model', None)
+    for backend in getattr(cls, 'filter_backends', ()):
+        if model is not None and issubclass(backend, DjangoFilterBackend):
+            queryset = model._default_manager.none()
+            filterset_class = backend().get_filterset_class(view, queryset)
+            if filterset_class is not None:
+                # O acesso monta os campos do formulário
+                filterset_class(queryset=queryset).form
+    return True
+
+
+def connect_databases():
+    """Abre (nesta thread) a conexão com cada banco configurado"""
+    for alias in connections:
+        connections[alias].ensure_connection()
+    return len(connections.all())
+
+
+def post_fork(server, worker):
+    """Hook `post_fork` do gunicorn: conexões próprias de cada worker"""
+    connect_databases()
+
+
+def warm_up(connect=None):
+    """
+    Aquece rotas, views, serializers e FilterSets e, com `connect`, abre as
+    conexões com os bancos. Falhas são registradas e não impedem a subida.
+    Retorna a duração de cada etapa, em milissegundos.
+    """
+    if connect is None:
+        connect = get_config()['CONNECT_DATABASES']
+    timings = {}
+
+    started = time.perf_counter()
+    callbacks = warm_urls()
+    timings['urls'] = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    views = 0
+    for callback in {id(callback): callback for callback in callbacks}.values():
+        try:
+            views += warm_view(callback)
+        except Exception:
+            logger.warning('Falha ao aquecer a view %r', callback, exc_info=True)
+    timings['views'] = (time.perf_counter() - started) * 1000
+
+    if connect:
+        started = time.perf_counter()
+        try:
+            connect_databases()
+        except Exception:
+            logger.warning('Falha ao abrir as conexões com os bancos', exc_info=True)
+        timings['databases'] = (time.perf_counter() - started) * 1000
+
+    logger.info(
+        'Aquecimento: %d rotas, %d views em %.0f ms',
+        len(callbacks), views, sum(timings.values()),
+    )
+    return timings
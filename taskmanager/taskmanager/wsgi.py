@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'taskmanager.settings')
 
 application = get_wsgi_application()
+
+# Rotas, serializers e conexões prontos antes da primeira requisição
+from taskmanager import warmup  # noqa: E402
+
+if warmup.get_config()['ENABLED']:
+    warmup.warm_up()
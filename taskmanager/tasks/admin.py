@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Task, Subtask, TaskHistory
+from taskmanager.admin_utils import EstimatedCountPaginator
+from .models import Task, Subtask, TaskHistory, ArchivedTask, TimeEntry
 
 
 class SubtaskInline(admin.TabularInline):
@@ -7,50 +8,99 @@ class SubtaskInline(admin.TabularInline):
     extra = 0
     fields = ['title', 'completed', 'order']
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('task')
+
 
 class TaskHistoryInline(admin.StackedInline):
     model = TaskHistory
     extra = 0
     readonly_fields = ['completion_date']
+    autocomplete_fields = ['category']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('task')
 
 
 @admin.register(Task)
 class TaskAdmin(admin.ModelAdmin):
     list_display = ['title', 'user', 'priority', 'completed', 'due_date', 'category', 'task_list', 'created_at']
-    list_filter = ['completed', 'priority', 'category', 'task_list', 'user', 'created_at']
-    search_fields = ['title', 'description']
-    readonly_fields = ['created_at', 'updated_at', 'completed_at']
-    filter_horizontal = ['tags']
+    list_filter = ['completed', 'priority', 'created_at']
+    search_fields = ['title', 'description', '=user__username']
+    readonly_fields = ['created_at', 'updated_at', 'completed_at', 'recurrence_series', 'tracked_duration']
+    autocomplete_fields = ['user', 'task_list', 'category', 'tags']
     inlines = [SubtaskInline, TaskHistoryInline]
-    
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
     fieldsets = (
         ('Informações Básicas', {
             'fields': ('title', 'description', 'user')
         }),
         ('Configurações', {
-            'fields': ('priority', 'completed', 'due_date', 'reminder', 'estimated_duration')
+            'fields': ('priority', 'completed', 'due_date', 'reminder', 'estimated_duration',
+                       'tracked_duration')
         }),
         ('Organização', {
             'fields': ('task_list', 'category', 'tags')
         }),
+        ('Recorrência', {
+            'fields': ('recurrence_rule', 'recurrence_exceptions', 'recurrence_series'),
+            'classes': ('collapse',)
+        }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at', 'completed_at'),
             'classes': ('collapse',)
         }),
     )
 
+    def get_queryset(self, request):
+        # Vale também para o autocomplete de outras telas, onde __str__ usa o usuário
+        return super().get_queryset(request).select_related('user', 'category__user', 'task_list__user')
+
 
 @admin.register(Subtask)
 class SubtaskAdmin(admin.ModelAdmin):
     list_display = ['title', 'task', 'completed', 'order', 'created_at']
-    list_filter = ['completed', 'task__user', 'created_at']
+    list_filter = ['completed', 'created_at']
+    list_select_related = ['task__user']
     search_fields = ['title', 'task__title']
     readonly_fields = ['created_at', 'updated_at', 'completed_at']
+    autocomplete_fields = ['task']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(TaskHistory)
 class TaskHistoryAdmin(admin.ModelAdmin):
     list_display = ['task', 'completion_date', 'estimated_duration', 'actual_duration']
-    list_filter = ['completion_date', 'task__user']
+    list_filter = ['completion_date']
+    list_select_related = ['task__user']
     search_fields = ['task__title', 'notes']
     readonly_fields = ['completion_date']
+    autocomplete_fields = ['task', 'category']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(TimeEntry)
+class TimeEntryAdmin(admin.ModelAdmin):
+    list_display = ['task', 'user', 'started_at', 'ended_at', 'duration']
+    list_filter = ['started_at']
+    list_select_related = ['task__user', 'user']
+    search_fields = ['task__title', '=user__username']
+    autocomplete_fields = ['user', 'task']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(ArchivedTask)
+class ArchivedTaskAdmin(admin.ModelAdmin):
+    list_display = ['title', 'user', 'priority', 'completed_at', 'archived_at']
+    list_filter = ['priority', 'archived_at']
+    list_select_related = ['user']
+    search_fields = ['title', 'description', '=user__username']
+    readonly_fields = ['archived_at']
+    autocomplete_fields = ['user', 'task_list', 'category', 'tags']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
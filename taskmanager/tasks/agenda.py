@@ -0,0 +1,103 @@
+"""
+Agenda de tarefas.
+
+Converte "hoje", "atrasadas", "esta semana" e "próximos N dias" em intervalos
+semiabertos [início, fim) no fuso do usuário, para que os filtros sejam feitos
+diretamente sobre `due_date` e possam usar os índices (user, due_date) — em vez
+de `due_date__date`, que aplica uma conversão à coluna.
+"""
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.utils import timezone
+
+
+MAX_UPCOMING_DAYS = 60
+
+
+def get_timezone(name=None):
+    """Retorna o fuso pelo nome IANA, ou o fuso atual do projeto"""
+    if not name:
+        return timezone.get_current_timezone()
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Fuso horário inválido: {name}")
+
+
+def local_today(tz=None, now=None):
+    """Data de hoje no fuso informado"""
+    now = now or timezone.now()
+    return timezone.localtime(now, tz or timezone.get_current_timezone()).date()
+
+
+def start_of_day(day, tz=None):
+    """Início (meia-noite) do dia no fuso informado, como datetime aware"""
+    return datetime.combine(day, time.min, tzinfo=tz or timezone.get_current_timezone())
+
+
+def day_range(day, tz=None):
+    """Intervalo [início, fim) de um dia"""
+    return start_of_day(day, tz), start_of_day(day + timedelta(days=1), tz)
+
+
+def today_range(tz=None, now=None):
+    """Intervalo [início, fim) de hoje"""
+    return day_range(local_today(tz, now), tz)
+
+
+def week_range(tz=None, now=None):
+    """Intervalo [segunda-feira, próxima segunda-feira) da semana atual"""
+    today = local_today(tz, now)
+    monday = today - timedelta(days=today.weekday())
+    return start_of_day(monday, tz), start_of_day(monday + timedelta(days=7), tz)
+
+
+def next_days_range(days, tz=None, now=None):
+    """Intervalo [hoje, hoje + N dias)"""
+    today = local_today(tz, now)
+    return start_of_day(today, tz), start_of_day(today + timedelta(days=days), tz)
+
+
+def in_range(queryset, start, end):
+    """Filtra tarefas com data limite no intervalo [start, end)"""
+    return queryset.filter(due_date__gte=start, due_date__lt=end)
+
+
+def pending(queryset):
+    """Filtra apenas tarefas não concluídas (índice parcial WHERE NOT completed)"""
+    return queryset.filter(completed=False)
+
+
+def recurring(queryset):
+    """Tarefas pendentes que carregam uma regra de recorrência"""
+    return pending(queryset).exclude(recurrence_rule='').filter(due_date__isnull=False)
+
+
+def today(queryset, tz=None, now=None):
+    """Tarefas com data limite hoje"""
+    return in_range(queryset, *today_range(tz, now))
+
+
+def overdue(queryset, now=None):
+    """Tarefas pendentes com data limite já passada"""
+    return pending(queryset).filter(due_date__lt=now or timezone.now())
+
+
+def this_week(queryset, tz=None, now=None):
+    """Tarefas pendentes com data limite nesta semana"""
+    return in_range(pending(queryset), *week_range(tz, now))
+
+
+def upcoming(queryset, days=7, tz=None, now=None):
+    """Tarefas pendentes com data limite nos próximos N dias"""
+    return in_range(pending(queryset), *next_days_range(days, tz, now))
+
+
+def group_by_day(tasks, tz=None):
+    """Agrupa tarefas (já ordenadas por due_date) em baldes por dia local"""
+    buckets = {}
+    for task in tasks:
+        day = timezone.localtime(task.due_date, tz or timezone.get_current_timezone()).date()
+        buckets.setdefault(day, []).append(task)
+    return buckets
@@ -0,0 +1,64 @@
+"""
+Contagens de tarefas anotadas no queryset de listas, categorias e etiquetas.
+
+As anotações usam o prefixo `_` (`_tasks_count`, ...). Serializers e admin
+usam o valor anotado quando presente e caem para os métodos do modelo
+(uma consulta por objeto) quando não.
+"""
+from django.db.models import IntegerField, OuterRef, Subquery
+
+from . import agenda
+from .models import Task, ArchivedTask
+
+
+class SubqueryCount(Subquery):
+    """
+    Contagem das linhas de um queryset correlacionado (com OuterRef), para
+    anotar contagens de relações diferentes sem multiplicar os JOINs.
+    """
+    template = '(SELECT COUNT(*) FROM (%(subquery)s) _count)'
+    output_field = IntegerField()
+
+
+def task_count_annotations(relation):
+    """
+    Anotações por campo do serializer. `relation` é o campo de Task e de
+    ArchivedTask que aponta para o objeto (`task_list`, `category` ou `tags`).
+    Tarefas arquivadas contam como concluídas, como nos métodos dos modelos.
+    """
+    tasks = Task.objects.filter(**{relation: OuterRef('pk')})
+    archived = SubqueryCount(ArchivedTask.objects.filter(**{relation: OuterRef('pk')}).values('pk'))
+
+    total = {'_tasks_count': SubqueryCount(tasks.values('pk')) + archived}
+    completed = {'_completed_tasks_count': SubqueryCount(tasks.filter(completed=True).values('pk')) + archived}
+    return {
+        'tasks_count': total,
+        'completed_tasks_count': completed,
+        'completion_percentage': {**total, **completed},
+        'pending_tasks_count': {
+            '_pending_tasks_count': SubqueryCount(agenda.pending(tasks).values('pk')),
+        },
+        'overdue_tasks_count': {
+            '_overdue_tasks_count': SubqueryCount(agenda.overdue(tasks).values('pk')),
+        },
+        'high_priority_tasks_count': {
+            '_high_priority_tasks_count': SubqueryCount(tasks.filter(priority='high').values('pk')),
+        },
+    }
+
+
+def annotated(obj, name, fallback):
+    """Valor anotado `_<name>`, ou o resultado de `fallback()` sem anotação"""
+    attr = f'_{name}'
+    if hasattr(obj, attr):
+        return getattr(obj, attr)
+    return fallback()
+
+
+def annotated_completion_percentage(obj):
+    """Porcentagem de conclusão a partir das contagens anotadas, quando houver"""
+    if not (hasattr(obj, '_tasks_count') and hasattr(obj, '_completed_tasks_count')):
+        return obj.get_completion_percentage()
+    if obj._tasks_count == 0:
+        return 0
+    return round((obj._completed_tasks_count / obj._tasks_count) * 100, 2)
@@ -0,0 +1,167 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import BooleanField, Value
+from django.utils import timezone
+
+from taskmanager import autocomplete
+from taskmanager.sharding import current_shard
+from .models import Task, Subtask, TaskHistory, ArchivedTask, TimeEntry
+
+
+SUBTASK_ARCHIVE_FIELDS = [
+    'id', 'title', 'description', 'completed', 'order', 'priority', 'due_date',
+    'reminder', 'estimated_duration', 'notes', 'created_at', 'updated_at', 'completed_at',
+]
+
+
+def _reroot_series(task_ids):
+    """
+    Séries cuja primeira tarefa vai para o arquivo passam a ter como primeira
+    a ocorrência ativa mais antiga; sem isso a exclusão (SET_NULL) desligaria
+    as demais ocorrências da série.
+    """
+    remaining = Task.objects.filter(recurrence_series_id__in=task_ids).exclude(pk__in=task_ids)
+    roots = {}
+    for series_id, task_id in remaining.order_by('pk').values_list('recurrence_series_id', 'pk'):
+        roots.setdefault(series_id, task_id)
+    for series_id, root_id in roots.items():
+        remaining.filter(recurrence_series_id=series_id).exclude(pk=root_id).update(
+            recurrence_series_id=root_id
+        )
+        Task.objects.filter(pk=root_id).update(recurrence_series=None)
+
+
+def _archive_batch(task_ids):
+    """Move um lote de tarefas (com subtarefas, etiquetas e histórico) para o arquivo"""
+    tasks = Task.objects.filter(pk__in=task_ids)
+
+    subtasks = {}
+    for subtask in Subtask.objects.filter(task_id__in=task_ids).order_by('order', 'created_at').values(
+        'task_id', *SUBTASK_ARCHIVE_FIELDS
+    ):
+        subtasks.setdefault(subtask.pop('task_id'), []).append(subtask)
+
+    histories = {
+        history['task_id']: history
+        for history in TaskHistory.objects.filter(task_id__in=task_ids).values(
+            'task_id', 'completion_date', 'estimated_duration', 'actual_duration', 'notes',
+            'category_id', 'priority', 'on_time',
+        )
+    }
+
+    TagLink = Task.tags.through
+    tag_links = list(TagLink.objects.filter(task_id__in=task_ids).values_list('task_id', 'tag_id'))
+
+    archived = []
+    for task in tasks:
+        history = histories.get(task.pk)
+        if history:
+            history = {key: value for key, value in history.items() if key != 'task_id'}
+        archived.append(ArchivedTask(
+            id=task.pk,
+            title=task.title,
+            description=task.description,
+            due_date=task.due_date,
+            completed=True,
+            priority=task.priority,
+            reminder=task.reminder,
+            estimated_duration=task.estimated_duration,
+            user_id=task.user_id,
+            task_list_id=task.task_list_id,
+            category_id=task.category_id,
+            subtasks=subtasks.get(task.pk, []),
+            history=history,
+            created_at=task.created_at,
+            updated_at=task.updated_at,
+            completed_at=task.completed_at,
+        ))
+
+    ArchivedTask.objects.bulk_create(archived)
+    ArchivedTask.tags.through.objects.bulk_create([
+        ArchivedTask.tags.through(archivedtask_id=task_id, tag_id=tag_id)
+        for task_id, tag_id in tag_links
+    ])
+
+    _reroot_series(task_ids)
+
+    # Remoção explícita, na ordem das dependências, para evitar que o
+    # collector do Django carregue os objetos relacionados em memória
+    TagLink.objects.filter(task_id__in=task_ids).delete()
+    Subtask.objects.filter(task_id__in=task_ids).delete()
+    TaskHistory.objects.filter(task_id__in=task_ids).delete()
+    TimeEntry.objects.filter(task_id__in=task_ids).delete()
+    tasks.delete()
+
+    for user_id in {task.user_id for task in archived}:
+        autocomplete.invalidate(user_id)
+    return len(archived)
+
+
+def archive_completed_tasks(days=None, batch_size=500, user_id=None):
+    """
+    Arquiva tarefas concluídas há mais de `days` dias, em lotes.
+    Retorna o número de tarefas arquivadas.
+    """
+    if days is None:
+        days = settings.TASK_ARCHIVE_AFTER_DAYS
+    cutoff = timezone.now() - timedelta(days=days)
+
+    candidates = Task.objects.filter(completed=True, completed_at__lt=cutoff)
+    if user_id is not None:
+        candidates = candidates.filter(user_id=user_id)
+
+    archived = 0
+    while True:
+        task_ids = list(candidates.order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not task_ids:
+            break
+        with transaction.atomic(using=current_shard()):
+            archived += _archive_batch(task_ids)
+    return archived
+
+
+class ArchiveChain:
+    """
+    Sequência paginável das tarefas ativas e arquivadas em uma única
+    ordenação (a do queryset das ativas, desempatada pelo ID). A página é
+    escolhida no banco por um UNION das chaves de ordenação das duas tabelas;
+    só os registros da página são carregados, pelos querysets originais.
+    """
+
+    def __init__(self, hot, archived):
+        self.hot = hot
+        self.archived = archived
+        self._count = None
+
+        ordering = [name for name in hot.query.order_by if isinstance(name, str)] or ['-created_at']
+        self.ordering = ordering + ['-id' if ordering[0].startswith('-') else 'id']
+        fields = ['id'] + [name.lstrip('-') for name in ordering]
+        self.keys = self._keys(hot, fields, False).union(
+            self._keys(archived, fields, True), all=True
+        ).order_by(*self.ordering)
+
+    @staticmethod
+    def _keys(queryset, fields, archived):
+        return queryset.prefetch_related(None).order_by().values(
+            *fields, archived=Value(archived, output_field=BooleanField())
+        )
+
+    def count(self):
+        if self._count is None:
+            self._count = self.hot.count() + self.archived.count()
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        keys = list(self.keys[index])
+        hot_ids = [key['id'] for key in keys if not key['archived']]
+        archived_ids = [key['id'] for key in keys if key['archived']]
+        loaded = {(False, task.pk): task for task in self.hot.filter(pk__in=hot_ids)}
+        loaded.update({(True, task.pk): task for task in self.archived.filter(pk__in=archived_ids)})
+        return [loaded[key['archived'], key['id']] for key in keys]
@@ -0,0 +1,87 @@
+"""
+Operações em lote sobre tarefas.
+
+Alteram a tabela intermediária de `Task.tags` diretamente: inserções em lote
+com `ignore_conflicts` e um único DELETE para remoções, em vez de um
+`tags.set()` (leitura + diff) por tarefa.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from taskmanager.sharding import current_shard
+from webhooks import outbox
+from . import suggestions
+from .models import Task
+
+
+BULK_TAGS_BATCH_SIZE = 1000
+
+
+def _tags_of(task_ids, links):
+    """Conjunto de etiquetas de cada tarefa (`links`: pares tarefa/etiqueta)"""
+    tags_of = {task_id: set() for task_id in task_ids}
+    for task_id, tag_id in links:
+        tags_of[task_id].add(tag_id)
+    return tags_of
+
+
+def _tag_features(titles, links):
+    """Contagens de sugestão das etiquetas (`links`: pares tarefa/etiqueta)"""
+    tag_ids = {}
+    for task_id, tag_id in links:
+        tag_ids.setdefault(task_id, []).append(tag_id)
+    features = Counter()
+    for task_id, title in titles.items():
+        features.update(suggestions.features_of(title, tag_ids=tag_ids.get(task_id, [])))
+    return features
+
+
+def bulk_update_tags(user_id, task_ids, tag_ids, mode):
+    """
+    Adiciona (`add`), remove (`remove`) ou substitui (`replace`) as etiquetas
+    de um conjunto de tarefas do usuário. Os IDs já devem ter sido validados
+    quanto ao dono. Só as tarefas cujos vínculos mudaram têm a versão
+    incrementada e geram `task.updated`. Retorna o número de vínculos removidos.
+    """
+    TagLink = Task.tags.through
+    removed = 0
+
+    with transaction.atomic(using=current_shard()):
+        titles = dict(Task.objects.filter(pk__in=task_ids).values_list('pk', 'title'))
+        links = TagLink.objects.filter(task_id__in=task_ids).values_list('task_id', 'tag_id')
+        links_before = list(links)
+        before = _tag_features(titles, links_before)
+
+        if mode == 'remove':
+            removed, _ = TagLink.objects.filter(task_id__in=task_ids, tag_id__in=tag_ids).delete()
+        else:
+            if mode == 'replace':
+                removed, _ = TagLink.objects.filter(task_id__in=task_ids).exclude(
+                    tag_id__in=tag_ids
+                ).delete()
+            TagLink.objects.bulk_create(
+                [TagLink(task_id=task_id, tag_id=tag_id) for task_id in task_ids for tag_id in tag_ids],
+                batch_size=BULK_TAGS_BATCH_SIZE,
+                ignore_conflicts=True,
+            )
+
+        after = list(links.all())
+        tags_before = _tags_of(titles, links_before)
+        tags_after = _tags_of(titles, after)
+        changed = [task_id for task_id in titles if tags_before[task_id] != tags_after[task_id]]
+        if not changed:
+            return removed
+
+        # Mantém updated_at e a versão (ETag) coerentes com a alteração
+        Task.objects.filter(pk__in=changed).update(
+            updated_at=timezone.now(), version=F('version') + 1
+        )
+        suggestions.record(user_id, before, _tag_features(titles, after))
+        outbox.emit_many(user_id, 'task.updated', [
+            {'id': task_id, 'tags': sorted(tags_after[task_id])} for task_id in changed
+        ])
+
+    return removed
@@ -0,0 +1,82 @@
+"""
+Controle de concorrência otimista com ETag / If-Match.
+
+A ETag de tarefas e subtarefas é a coluna `version`. Clientes que enviam
+`If-Match` com a ETag que possuem só gravam se ninguém alterou o objeto
+nesse meio tempo; caso contrário recebem 412, sem precisar de uma leitura
+prévia. Sem `If-Match` o comportamento é o de antes (última gravação vence).
+"""
+from django.db import transaction
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from taskmanager.sharding import current_shard
+from .models import VersionConflict
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = 'O recurso foi alterado por outra requisição. Recarregue e tente novamente.'
+    default_code = 'precondition_failed'
+
+
+def make_etag(version):
+    return f'"{version}"'
+
+
+def parse_if_match(request):
+    """
+    Retorna a versão enviada em If-Match, ou None quando o cabeçalho está
+    ausente ou é `*`.
+    """
+    header = request.headers.get('If-Match', '').strip()
+    if not header or header == '*':
+        return None
+    if header.startswith('W/'):
+        header = header[2:]
+    try:
+        return int(header.strip('"'))
+    except ValueError:
+        raise PreconditionFailed('Cabeçalho If-Match inválido.')
+
+
+class OptimisticConcurrencyMixin:
+    """
+    Mixin para views de detalhe de modelos versionados: envia ETag nas
+    respostas e valida If-Match em PUT/PATCH/DELETE.
+    """
+
+    def get_expected_version(self, instance):
+        expected = parse_if_match(self.request)
+        if expected is not None and expected != instance.version:
+            raise PreconditionFailed()
+        return expected
+
+    def perform_update(self, serializer):
+        expected = self.get_expected_version(serializer.instance)
+        try:
+            serializer.save(expected_version=expected)
+        except VersionConflict:
+            raise PreconditionFailed()
+
+    def perform_destroy(self, instance):
+        expected = self.get_expected_version(instance)
+        if expected is None:
+            instance.delete()
+            return
+        # A linha fica bloqueada até o DELETE: uma alteração entre a checagem
+        # do If-Match e a exclusão resulta em 412, não em exclusão às cegas
+        with transaction.atomic(using=current_shard()):
+            current = type(instance)._default_manager.select_for_update().filter(
+                pk=instance.pk, version=expected
+            )
+            if not current.exists():
+                raise PreconditionFailed()
+            instance.delete()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        data = getattr(response, 'data', None)
+        if response.status_code < 300 and isinstance(data, dict) and 'version' in data:
+            response['ETag'] = make_etag(data['version'])
+        return response
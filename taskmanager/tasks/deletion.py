@@ -0,0 +1,155 @@
+"""
+Exclusão em segundo plano de listas, categorias e contas.
+
+Excluir uma lista ou categoria (SET_NULL nas tarefas) ou um usuário (CASCADE
+em tudo) pelo `delete()` do Django faz o collector carregar todas as tarefas,
+subtarefas e históricos relacionados antes de emitir os comandos. Aqui a
+solicitação apenas marca o registro como aguardando exclusão; o processamento
+(`process_pending_deletions`) faz a cascata em lotes de tamanho fixo, com
+UPDATE/DELETE em massa na ordem das dependências do banco.
+"""
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from taskmanager import autocomplete
+from taskmanager.sharding import iter_shards, shard_for_user, use_shard
+from accounts.models import AccountDeletion, CalendarFeed
+from categories.models import Category
+from lists.models import TaskList
+from tags.models import Tag
+from reports import rollups
+from reports.models import DailyProductivity
+from webhooks.models import OutboxEvent, WebhookSubscription
+from . import suggestions
+from .models import Task, Subtask, TaskHistory, ArchivedTask, SuggestionTerm, TimeEntry
+
+
+DELETION_CHUNK_SIZE = 1000
+
+
+def request_deletion(instance):
+    """Marca uma lista ou categoria como aguardando exclusão"""
+    instance.deletion_requested_at = timezone.now()
+    type(instance).objects.filter(pk=instance.pk).update(
+        deletion_requested_at=instance.deletion_requested_at
+    )
+    # Deixa de ser sugerida e de aparecer no autocompletar imediatamente
+    suggestions.invalidate(instance.user_id)
+    autocomplete.invalidate(instance.user_id)
+
+
+def request_account_deletion(user):
+    """Desativa o usuário, revoga seus tokens e agenda a exclusão da conta"""
+    with transaction.atomic():
+        User.objects.filter(pk=user.pk).update(is_active=False)
+        AccountDeletion.objects.get_or_create(user=user)
+        Token.objects.filter(user=user).delete()
+        CalendarFeed.objects.filter(user=user).delete()
+
+
+def _chunks(queryset, chunk_size):
+    """Gera listas de IDs do queryset, relendo do início a cada lote"""
+    while True:
+        ids = list(queryset.order_by('pk').values_list('pk', flat=True)[:chunk_size])
+        if not ids:
+            return
+        yield ids
+
+
+def _nullify(model, field, value, chunk_size, **extra):
+    """UPDATE em lotes que desvincula as linhas de `model` do registro excluído"""
+    queryset = model.objects.filter(**{field: value})
+    for ids in _chunks(queryset, chunk_size):
+        model.objects.filter(pk__in=ids).update(**{field: None}, **extra)
+
+
+def _delete_tasks(task_ids):
+    """Remove tarefas e seus dependentes, na ordem das dependências"""
+    Task.tags.through.objects.filter(task_id__in=task_ids).delete()
+    Subtask.objects.filter(task_id__in=task_ids).delete()
+    TaskHistory.objects.filter(task_id__in=task_ids).delete()
+    TimeEntry.objects.filter(task_id__in=task_ids).delete()
+    Task.objects.filter(pk__in=task_ids).delete()
+
+
+def _delete_archived_tasks(task_ids):
+    """Remove tarefas arquivadas e seus vínculos com etiquetas"""
+    ArchivedTask.tags.through.objects.filter(archivedtask_id__in=task_ids).delete()
+    ArchivedTask.objects.filter(pk__in=task_ids).delete()
+
+
+def purge_task_list(task_list_id, chunk_size=DELETION_CHUNK_SIZE):
+    """Desvincula as tarefas da lista em lotes e exclui a lista"""
+    task_version = {'version': F('version') + 1, 'updated_at': timezone.now()}
+    _nullify(Task, 'task_list_id', task_list_id, chunk_size, **task_version)
+    _nullify(ArchivedTask, 'task_list_id', task_list_id, chunk_size)
+    for user_id in TaskList.objects.filter(pk=task_list_id).values_list('user_id', flat=True):
+        suggestions.forget(user_id, 'list', [task_list_id])
+    TaskList.objects.filter(pk=task_list_id).delete()
+
+
+def purge_category(category_id, chunk_size=DELETION_CHUNK_SIZE):
+    """Desvincula tarefas e consolidados da categoria em lotes e exclui a categoria"""
+    task_version = {'version': F('version') + 1, 'updated_at': timezone.now()}
+    _nullify(Task, 'category_id', category_id, chunk_size, **task_version)
+    _nullify(ArchivedTask, 'category_id', category_id, chunk_size)
+    _nullify(TaskHistory, 'category_id', category_id, chunk_size)
+    rollups.fold_category(category_id, chunk_size)
+    for user_id in Category.objects.filter(pk=category_id).values_list('user_id', flat=True):
+        suggestions.forget(user_id, 'category', [category_id])
+    Category.objects.filter(pk=category_id).delete()
+
+
+def purge_user(user_id, chunk_size=DELETION_CHUNK_SIZE):
+    """Exclui em lotes todos os dados do usuário e, por fim, o próprio usuário"""
+    with use_shard(shard_for_user(user_id)) as alias:
+        for ids in _chunks(Task.objects.filter(user_id=user_id), chunk_size):
+            with transaction.atomic(using=alias):
+                _delete_tasks(ids)
+        for ids in _chunks(ArchivedTask.objects.filter(user_id=user_id), chunk_size):
+            with transaction.atomic(using=alias):
+                _delete_archived_tasks(ids)
+        for ids in _chunks(DailyProductivity.objects.filter(user_id=user_id), chunk_size):
+            DailyProductivity.objects.filter(pk__in=ids).delete()
+        SuggestionTerm.objects.filter(user_id=user_id).delete()
+        OutboxEvent.objects.filter(user_id=user_id).delete()
+        WebhookSubscription.objects.filter(user_id=user_id).delete()
+
+        # Sem tarefas, o collector não tem mais o que carregar em cascata
+        Tag.objects.filter(user_id=user_id).delete()
+        TaskList.objects.filter(user_id=user_id).delete()
+        Category.objects.filter(user_id=user_id).delete()
+        if alias != DEFAULT_DB_ALIAS:
+            User.objects.using(alias).filter(pk=user_id).delete()
+
+    User.objects.filter(pk=user_id).delete()
+
+
+def process_pending_deletions(chunk_size=DELETION_CHUNK_SIZE):
+    """
+    Processa todas as exclusões pendentes. Retorna um dicionário com o
+    número de listas, categorias e contas excluídas.
+    """
+    processed = {'lists': 0, 'categories': 0, 'accounts': 0}
+
+    for _ in iter_shards():
+        for task_list_id in TaskList.objects.filter(
+            deletion_requested_at__isnull=False
+        ).values_list('pk', flat=True):
+            purge_task_list(task_list_id, chunk_size)
+            processed['lists'] += 1
+
+        for category_id in Category.objects.filter(
+            deletion_requested_at__isnull=False
+        ).values_list('pk', flat=True):
+            purge_category(category_id, chunk_size)
+            processed['categories'] += 1
+
+    for user_id in AccountDeletion.objects.values_list('user_id', flat=True):
+        purge_user(user_id, chunk_size)
+        processed['accounts'] += 1
+
+    return processed
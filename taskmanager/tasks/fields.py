@@ -0,0 +1,52 @@
+from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+
+
+class OwnedManyRelatedField(serializers.ManyRelatedField):
+    """
+    Versão de ManyRelatedField que resolve todos os IDs enviados em uma
+    única consulta (`in_bulk`), em vez de uma consulta por item.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        child = self.child_relation
+        pks = []
+        for value in data:
+            if isinstance(value, bool):
+                child.fail('incorrect_type', data_type=type(value).__name__)
+            try:
+                pk = int(value)
+            except (TypeError, ValueError):
+                child.fail('incorrect_type', data_type=type(value).__name__)
+            if pk not in pks:
+                pks.append(pk)
+
+        objects = child.get_queryset().in_bulk(pks)
+        for pk in pks:
+            if pk not in objects:
+                child.fail('does_not_exist', pk_value=pk)
+        return [objects[pk] for pk in pks]
+
+
+class OwnedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField restrito aos objetos do usuário da requisição.
+    IDs de outros usuários são rejeitados como inexistentes, sem carregar
+    o objeto para comparar o dono.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(user=self.context['request'].user)
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return OwnedManyRelatedField(**list_kwargs)
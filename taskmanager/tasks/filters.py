@@ -0,0 +1,83 @@
+"""
+Filtros da listagem de tarefas (`/api/tasks/`), ativas e arquivadas.
+
+Os filtros por etiqueta usam subconsultas na tabela de vínculos, sem JOIN
+na consulta principal (e portanto sem linhas repetidas nem DISTINCT):
+
+- `tags_any=1,2`: `EXISTS` de um vínculo com alguma das etiquetas
+- `tags_none=1,2`: `NOT EXISTS` de um vínculo com alguma das etiquetas
+- `tags_all=1,2`: `id IN (... GROUP BY tarefa HAVING COUNT(*) = 2)`
+
+As três leem o índice (tag_id, task_id) da tabela de vínculos.
+"""
+from django.db.models import Count, Exists, OuterRef
+from django_filters import rest_framework as filters
+
+from .models import Task, ArchivedTask
+
+
+class NumberInFilter(filters.BaseInFilter, filters.NumberFilter):
+    """Lista de IDs separados por vírgula"""
+
+
+def tag_links(queryset, tag_ids):
+    """Vínculos das etiquetas com as tarefas do modelo do queryset, e o campo da tarefa"""
+    through = queryset.model.tags.through
+    owner_field = queryset.model.tags.field.m2m_field_name()
+    return through.objects.filter(tag_id__in=tag_ids), owner_field
+
+
+class TaskFilter(filters.FilterSet):
+    tags_all = NumberInFilter(method='filter_tags_all', help_text='Tarefas com todas as etiquetas')
+    tags_any = NumberInFilter(method='filter_tags_any', help_text='Tarefas com alguma das etiquetas')
+    tags_none = NumberInFilter(method='filter_tags_none', help_text='Tarefas sem nenhuma das etiquetas')
+    due_after = filters.IsoDateTimeFilter(field_name='due_date', lookup_expr='gte')
+    due_before = filters.IsoDateTimeFilter(field_name='due_date', lookup_expr='lte')
+    created_after = filters.IsoDateTimeFilter(field_name='created_at', lookup_expr='gte')
+
+    class Meta:
+        model = Task
+        fields = ['completed', 'priority', 'category', 'task_list']
+
+    @staticmethod
+    def tag_ids(value):
+        return sorted({int(tag_id) for tag_id in value})
+
+    def filter_tags_all(self, queryset, name, value):
+        tag_ids = self.tag_ids(value)
+        if not tag_ids:
+            return queryset
+        links, owner_field = tag_links(queryset, tag_ids)
+        matching = links.values(owner_field).annotate(
+            matched=Count('tag')
+        ).filter(matched=len(tag_ids)).values(owner_field)
+        return queryset.filter(pk__in=matching)
+
+    def filter_tags_any(self, queryset, name, value):
+        tag_ids = self.tag_ids(value)
+        if not tag_ids:
+            return queryset
+        links, owner_field = tag_links(queryset, tag_ids)
+        return queryset.filter(Exists(links.filter(**{owner_field: OuterRef('pk')})))
+
+    def filter_tags_none(self, queryset, name, value):
+        tag_ids = self.tag_ids(value)
+        if not tag_ids:
+            return queryset
+        links, owner_field = tag_links(queryset, tag_ids)
+        return queryset.filter(~Exists(links.filter(**{owner_field: OuterRef('pk')})))
+
+
+class ArchivedTaskFilter(TaskFilter):
+    class Meta(TaskFilter.Meta):
+        model = ArchivedTask
+
+
+class TaskFilterBackend(filters.DjangoFilterBackend):
+    """Escolhe o FilterSet pelo modelo do queryset (tarefas ativas ou arquivadas)"""
+    filterset_classes = {Task: TaskFilter, ArchivedTask: ArchivedTaskFilter}
+
+    def get_filterset_class(self, view, queryset=None):
+        if queryset is not None and queryset.model in self.filterset_classes:
+            return self.filterset_classes[queryset.model]
+        return super().get_filterset_class(view, queryset)
@@ -0,0 +1,178 @@
+"""
+Feed iCalendar (RFC 5545) das tarefas e subtarefas pendentes com data limite
+ou lembrete, para assinatura em aplicativos de calendário.
+
+Os aplicativos consultam o feed com frequência; a validação (ETag) usa uma
+única consulta agregada (MAX(updated_at) e contagem das tarefas e subtarefas
+pendentes), e o corpo só é gerado quando algo mudou, em streaming a partir de
+`.values()`, sem instanciar modelos. Não há Last-Modified: concluir ou
+excluir uma tarefa a tira do feed sem aumentar o MAX(updated_at) das que
+restam, e um If-Modified-Since responderia 304 indevidamente.
+"""
+import hashlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from .models import Task, Subtask
+
+
+PRODID = '-//TaskManager//Tarefas//PT'
+UID_DOMAIN = 'taskmanager'
+# Duração dos eventos de tarefas sem duração estimada
+DEFAULT_DURATION = timedelta(minutes=30)
+# Intervalo de atualização sugerido aos aplicativos
+REFRESH_INTERVAL = 'PT15M'
+CHUNK_SIZE = 1000
+
+# Prioridade do iCalendar: 1 (maior) a 9 (menor)
+PRIORITIES = {'high': 1, 'medium': 5, 'low': 9}
+
+TASK_FIELDS = [
+    'id', 'title', 'description', 'due_date', 'reminder', 'estimated_duration',
+    'priority', 'recurrence_rule', 'recurrence_exceptions', 'updated_at',
+]
+SUBTASK_FIELDS = [
+    'id', 'title', 'description', 'due_date', 'reminder', 'estimated_duration',
+    'priority', 'updated_at', 'task__title',
+]
+
+
+def feed_tasks(user_id, task_lists=None, categories=None):
+    """Tarefas pendentes do feed, com os filtros de lista e categoria"""
+    tasks = Task.objects.filter(user_id=user_id, completed=False)
+    if task_lists:
+        tasks = tasks.filter(task_list_id__in=task_lists)
+    if categories:
+        tasks = tasks.filter(category_id__in=categories)
+    return tasks
+
+
+def feed_etag(tasks):
+    """
+    ETag do feed em uma consulta. A contagem entra no ETag para que
+    conclusões e exclusões (que não alteram o MAX) também invalidem o feed.
+    """
+    state = tasks.aggregate(
+        tasks_updated=Max('updated_at'),
+        tasks=Count('id', distinct=True),
+        subtasks_updated=Max('subtasks__updated_at'),
+        subtasks=Count('subtasks__id'),
+    )
+    return hashlib.md5(repr(sorted(state.items())).encode()).hexdigest()
+
+
+def escape(text):
+    return (text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def fold(line):
+    """Quebra linhas com mais de 75 octetos, como exige o RFC 5545"""
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts = []
+    start = 0
+    limit = 75
+    while start < len(encoded):
+        end = min(start + limit, len(encoded))
+        # Não corta caracteres UTF-8 de vários bytes ao meio
+        while end < len(encoded) and (encoded[end] & 0xC0) == 0x80:
+            end -= 1
+        parts.append(encoded[start:end].decode())
+        start = end
+        limit = 74
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def format_utc(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def format_local(value, tz):
+    return timezone.localtime(value, tz).strftime('%Y%m%dT%H%M%S')
+
+
+def format_duration(value):
+    seconds = int(value.total_seconds())
+    sign = '-' if seconds < 0 else ''
+    days, rest = divmod(abs(seconds), 86400)
+    hours, rest = divmod(rest, 3600)
+    minutes, seconds = divmod(rest, 60)
+    text = f'{sign}P'
+    if days:
+        text += f'{days}D'
+    if hours or minutes or seconds or not days:
+        text += 'T'
+        text += f'{hours}H' if hours else ''
+        text += f'{minutes}M' if minutes else ''
+        text += f'{seconds}S' if seconds or not (hours or minutes) else ''
+    return text
+
+
+def event_lines(uid, item, summary, tz):
+    """Linhas de um VEVENT (com VALARM para o lembrete)"""
+    start = item['due_date'] or item['reminder']
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:{uid}@{UID_DOMAIN}',
+        f'DTSTAMP:{format_utc(item["updated_at"])}',
+    ]
+    rule = item.get('recurrence_rule')
+    if rule:
+        # Regras com BYDAY valem no fuso local, como na agenda
+        lines.append(f'DTSTART;TZID={tz.key}:{format_local(start, tz)}')
+        lines.append(f'RRULE:{rule}')
+        for key in item['recurrence_exceptions'] or []:
+            exception = datetime.fromisoformat(key)
+            lines.append(f'EXDATE;TZID={tz.key}:{format_local(exception, tz)}')
+    else:
+        lines.append(f'DTSTART:{format_utc(start)}')
+    lines.append(f'DURATION:{format_duration(item["estimated_duration"] or DEFAULT_DURATION)}')
+    lines.append(f'SUMMARY:{escape(summary)}')
+    if item['description']:
+        lines.append(f'DESCRIPTION:{escape(item["description"])}')
+    if item['priority'] in PRIORITIES:
+        lines.append(f'PRIORITY:{PRIORITIES[item["priority"]]}')
+    if item['reminder']:
+        lines += [
+            'BEGIN:VALARM',
+            'ACTION:DISPLAY',
+            f'DESCRIPTION:{escape(summary)}',
+            f'TRIGGER:{format_duration(item["reminder"] - start)}',
+            'END:VALARM',
+        ]
+    lines.append('END:VEVENT')
+    return ''.join(fold(line) for line in lines)
+
+
+def generate(tasks, using, name='TaskManager'):
+    """Gera o calendário em partes, lendo tarefas e subtarefas em blocos"""
+    tz = timezone.get_current_timezone()
+    yield ''.join(fold(line) for line in [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODID}',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{escape(name)}',
+        f'X-WR-TIMEZONE:{tz.key}',
+        f'REFRESH-INTERVAL;VALUE=DURATION:{REFRESH_INTERVAL}',
+        f'X-PUBLISHED-TTL:{REFRESH_INTERVAL}',
+    ])
+
+    scheduled = Q(due_date__isnull=False) | Q(reminder__isnull=False)
+    task_rows = tasks.using(using).filter(scheduled).order_by().values(*TASK_FIELDS)
+    for task in task_rows.iterator(chunk_size=CHUNK_SIZE):
+        yield event_lines(f'task-{task["id"]}', task, task['title'], tz)
+
+    subtask_rows = Subtask.objects.using(using).filter(
+        scheduled, task__in=tasks.values('pk'), completed=False,
+    ).order_by().values(*SUBTASK_FIELDS)
+    for subtask in subtask_rows.iterator(chunk_size=CHUNK_SIZE):
+        summary = f'{subtask["title"]} ({subtask["task__title"]})'
+        yield event_lines(f'subtask-{subtask["id"]}', subtask, summary, tz)
+
+    yield fold('END:VCALENDAR')
@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from taskmanager.sharding import iter_shards
+from tasks.archive import archive_completed_tasks
+
+
+class Command(BaseCommand):
+    help = 'Move tarefas concluídas há mais de N dias para o arquivo'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.TASK_ARCHIVE_AFTER_DAYS,
+            help='Arquivar tarefas concluídas há mais deste número de dias'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Quantidade de tarefas movidas por transação'
+        )
+        parser.add_argument(
+            '--user', type=int, default=None,
+            help='Arquivar apenas as tarefas deste usuário (ID)'
+        )
+
+    def handle(self, *args, **options):
+        archived = 0
+        for _ in iter_shards(options['user']):
+            archived += archive_completed_tasks(
+                days=options['days'],
+                batch_size=options['batch_size'],
+                user_id=options['user'],
+            )
+        self.stdout.write(self.style.SUCCESS(f'{archived} tarefas arquivadas.'))
@@ -0,0 +1,83 @@
+import http.client
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara a vazão de leituras concorrentes entre servidores já em execução, '
+        'ex.: gunicorn (WSGI) e uvicorn (ASGI)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'targets', nargs='+',
+            help='Alvos no formato nome=url_base, ex.: wsgi=http://127.0.0.1:8000'
+        )
+        parser.add_argument('--token', required=True, help='Token de autenticação da API')
+        parser.add_argument(
+            '--path', action='append', dest='paths',
+            help='Caminho a ser requisitado (pode repetir). Padrão: endpoints de leitura principais'
+        )
+        parser.add_argument('--concurrency', type=int, default=32, help='Requisições simultâneas')
+        parser.add_argument('--requests', type=int, default=1000, help='Total de requisições por alvo')
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or [
+            '/api/tasks/', '/api/tasks/overdue/', '/api/tasks/today/',
+            '/api/lists/', '/api/categories/', '/api/tags/',
+        ]
+        for target in options['targets']:
+            name, sep, base_url = target.partition('=')
+            if not sep:
+                raise CommandError(f'Alvo inválido: {target} (use nome=url_base)')
+            result = self.run_target(
+                base_url, paths, options['token'], options['concurrency'], options['requests']
+            )
+            self.stdout.write(
+                f"{name}: {result['rps']:.1f} req/s | p50 {result['p50']:.1f} ms | "
+                f"p95 {result['p95']:.1f} ms | p99 {result['p99']:.1f} ms | "
+                f"erros {result['errors']}"
+            )
+
+    def run_target(self, base_url, paths, token, concurrency, total):
+        url = urlsplit(base_url)
+        headers = {'Authorization': f'Token {token}', 'Accept': 'application/json'}
+        local = threading.local()
+
+        def request(index):
+            # Uma conexão keep-alive por thread
+            if not hasattr(local, 'conn'):
+                local.conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+            path = url.path.rstrip('/') + paths[index % len(paths)]
+            started = time.perf_counter()
+            try:
+                local.conn.request('GET', path, headers=headers)
+                response = local.conn.getresponse()
+                response.read()
+                ok = response.status == 200
+            except (OSError, http.client.HTTPException):
+                local.conn.close()
+                del local.conn
+                ok = False
+            return time.perf_counter() - started, ok
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(request, range(total)))
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(latency * 1000 for latency, _ in results)
+        quantiles = statistics.quantiles(latencies, n=100)
+        return {
+            'rps': total / elapsed,
+            'p50': quantiles[49],
+            'p95': quantiles[94],
+            'p99': quantiles[98],
+            'errors': sum(1 for _, ok in results if not ok),
+        }
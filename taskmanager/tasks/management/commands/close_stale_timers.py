@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from taskmanager.sharding import iter_shards
+from tasks.timetracking import close_stale_entries
+
+
+class Command(BaseCommand):
+    help = 'Encerra, no último sinal de atividade, os cronômetros abandonados'
+
+    def handle(self, *args, **options):
+        closed = 0
+        for _ in iter_shards():
+            closed += close_stale_entries()
+        self.stdout.write(self.style.SUCCESS(f'{closed} cronômetros encerrados.'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from tasks.deletion import DELETION_CHUNK_SIZE, process_pending_deletions
+
+
+class Command(BaseCommand):
+    help = 'Processa as exclusões agendadas de listas, categorias e contas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=DELETION_CHUNK_SIZE,
+            help='Quantidade de linhas atualizadas ou removidas por comando'
+        )
+
+    def handle(self, *args, **options):
+        processed = process_pending_deletions(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{processed['lists']} listas, {processed['categories']} categorias e "
+            f"{processed['accounts']} contas excluídas."
+        ))
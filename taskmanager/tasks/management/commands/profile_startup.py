@@ -0,0 +1,100 @@
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Executado em um processo novo, com `-X importtime`: imports frios, como na subida
+STARTUP_SCRIPT = '''
+import json, time
+started = time.perf_counter()
+import django
+django.setup()
+setup = time.perf_counter()
+from taskmanager import warmup
+callbacks = warmup.warm_urls()
+urls = time.perf_counter()
+for callback in {id(callback): callback for callback in callbacks}.values():
+    warmup.warm_view(callback)
+views = time.perf_counter()
+print(json.dumps({
+    'setup': (setup - started) * 1000,
+    'urls': (urls - setup) * 1000,
+    'views': (views - urls) * 1000,
+}))
+'''
+
+
+def parse_importtime(output):
+    """Linhas `import time: self | cumulative | módulo` -> [(módulo, self em µs)]"""
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        modules.append((fields[2].strip(), int(fields[0])))
+    return modules
+
+
+def group_of(module, local_apps):
+    """App local, pacote de terceiros (django, rest_framework...) ou `python`"""
+    top = module.split('.')[0]
+    if top in local_apps or top == 'taskmanager':
+        return top
+    if top == 'django' and module.startswith('django.contrib.'):
+        return '.'.join(module.split('.')[:3])
+    if top in sys.stdlib_module_names or top.startswith('_'):
+        return 'python'
+    return top
+
+
+class Command(BaseCommand):
+    help = 'Mede o custo de subida (imports, rotas e views) por app, em um processo novo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=20, help='Quantidade de grupos exibidos')
+        parser.add_argument(
+            '--json', action='store_true',
+            help='Saída em JSON, para comparar entre versões'
+        )
+
+    def handle(self, *args, **options):
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get(
+            'DJANGO_SETTINGS_MODULE', 'taskmanager.settings'
+        )}
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', STARTUP_SCRIPT],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            raise CommandError(f'Falha ao iniciar o processo de medição:\n{result.stderr[-2000:]}')
+
+        phases = json.loads(result.stdout.strip().splitlines()[-1])
+        local_apps = {app.split('.')[0] for app in settings.INSTALLED_APPS if '.' not in app}
+        groups = defaultdict(lambda: {'ms': 0.0, 'modules': 0})
+        for module, self_us in parse_importtime(result.stderr):
+            group = groups[group_of(module, local_apps)]
+            group['ms'] += self_us / 1000
+            group['modules'] += 1
+        ranking = sorted(groups.items(), key=lambda item: -item[1]['ms'])
+
+        if options['json']:
+            self.stdout.write(json.dumps({
+                'phases': {name: round(value, 1) for name, value in phases.items()},
+                'imports': {name: {'ms': round(data['ms'], 1), 'modules': data['modules']}
+                            for name, data in ranking},
+            }, indent=2))
+            return
+
+        self.stdout.write(
+            'Fases: ' + ' | '.join(f'{name} {value:.0f} ms' for name, value in phases.items())
+        )
+        self.stdout.write(f'Imports ({sum(data["ms"] for _, data in ranking):.0f} ms no total):')
+        for name, data in ranking[:options['top']]:
+            self.stdout.write(f'  {name:<36} {data["ms"]:8.1f} ms  {data["modules"]:5d} módulos')
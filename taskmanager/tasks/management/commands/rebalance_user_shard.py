@@ -0,0 +1,47 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.rebalance import LateWrites, WritesDidNotSettle, move_user
+
+
+class Command(BaseCommand):
+    help = 'Move os dados de um usuário para outro banco (fragmento) sem tirá-lo do ar'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, required=True, help='ID do usuário')
+        parser.add_argument('--to', required=True, help='Alias do banco de destino')
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Quantidade de linhas copiadas ou removidas por comando'
+        )
+        parser.add_argument(
+            '--grace', type=float, default=2,
+            help='Segundos de espera após bloquear as escritas e após a troca, para requisições em andamento'
+        )
+        parser.add_argument(
+            '--max-rounds', type=int, default=5,
+            help='Rodadas de cópia até a origem parar de mudar'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            result = move_user(
+                options['user'], options['to'],
+                chunk_size=options['chunk_size'],
+                grace_seconds=options['grace'],
+                max_rounds=options['max_rounds'],
+            )
+        except User.DoesNotExist:
+            raise CommandError(f"Usuário {options['user']} não encontrado.")
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        except (WritesDidNotSettle, LateWrites) as exc:
+            raise CommandError(exc.message)
+
+        if result['source'] == result['target']:
+            self.stdout.write(f"O usuário já está em {result['target']}.")
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Usuário movido de {result['source']} para {result['target']} "
+            f"({result['copied']} linhas copiadas)."
+        ))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from taskmanager.sharding import iter_shards
+from tasks.models import Task, ArchivedTask, SuggestionTerm
+from tasks.suggestions import rebuild_user
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói as contagens de termos usadas nas sugestões de lista, categoria e etiquetas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, default=None,
+            help='Reconstruir apenas as contagens deste usuário (ID)'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Quantidade de tarefas lidas por bloco'
+        )
+
+    def handle(self, *args, **options):
+        processed = 0
+        for _ in iter_shards(options['user']):
+            if options['user'] is not None:
+                user_ids = [options['user']]
+            else:
+                # Inclui quem só tem contagens, para remover as que sobraram
+                user_ids = sorted(
+                    set(Task.objects.values_list('user_id', flat=True).distinct())
+                    | set(ArchivedTask.objects.values_list('user_id', flat=True).distinct())
+                    | set(SuggestionTerm.objects.values_list('user_id', flat=True).distinct())
+                )
+            for user_id in user_ids:
+                processed += rebuild_user(user_id, chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{processed} tarefas processadas.'
+        ))
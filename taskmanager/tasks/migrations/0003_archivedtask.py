@@ -0,0 +1,49 @@
+# Generated by Django 5.2.5 on 2026-10-19 15:36
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0001_initial'),
+        ('lists', '0001_initial'),
+        ('tags', '0001_initial'),
+        ('tasks', '0002_subtask_description_subtask_due_date_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTask',
+            fields=[
+                ('id', models.BigIntegerField(help_text='ID da tarefa original', primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=200, verbose_name='Título')),
+                ('description', models.TextField(blank=True, verbose_name='Descrição')),
+                ('due_date', models.DateTimeField(blank=True, null=True, verbose_name='Data Limite')),
+                ('completed', models.BooleanField(default=True, verbose_name='Concluída')),
+                ('priority', models.CharField(choices=[('low', 'Baixa'), ('medium', 'Média'), ('high', 'Alta')], default='medium', max_length=10, verbose_name='Prioridade')),
+                ('reminder', models.DateTimeField(blank=True, null=True, verbose_name='Lembrete')),
+                ('estimated_duration', models.DurationField(blank=True, null=True, verbose_name='Duração Estimada')),
+                ('subtasks', models.JSONField(blank=True, default=list, encoder=django.core.serializers.json.DjangoJSONEncoder, help_text='Subtarefas da tarefa no momento do arquivamento', verbose_name='Subtarefas')),
+                ('history', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, help_text='Histórico de conclusão da tarefa no momento do arquivamento', null=True, verbose_name='Histórico')),
+                ('created_at', models.DateTimeField(verbose_name='Criado em')),
+                ('updated_at', models.DateTimeField(verbose_name='Atualizado em')),
+                ('completed_at', models.DateTimeField(blank=True, null=True, verbose_name='Concluído em')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Arquivado em')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_tasks', to='categories.category', verbose_name='Categoria')),
+                ('tags', models.ManyToManyField(blank=True, related_name='archived_tasks', to='tags.tag', verbose_name='Etiquetas')),
+                ('task_list', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_tasks', to='lists.tasklist', verbose_name='Lista')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_tasks', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Tarefa Arquivada',
+                'verbose_name_plural': 'Tarefas Arquivadas',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user', 'completed_at'], name='tasks_archi_user_id_a1418e_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.5 on 2026-10-19 15:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0001_initial'),
+        ('lists', '0001_initial'),
+        ('tags', '0001_initial'),
+        ('tasks', '0003_archivedtask'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('completed', False)), fields=['user', 'due_date'], name='task_user_due_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-19 15:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0004_task_task_user_due_pending_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subtask',
+            name='version',
+            field=models.PositiveIntegerField(default=1, help_text='Incrementada a cada alteração (usada em ETag/If-Match)', verbose_name='Versão'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='version',
+            field=models.PositiveIntegerField(default=1, help_text='Incrementada a cada alteração (usada em ETag/If-Match)', verbose_name='Versão'),
+        ),
+    ]
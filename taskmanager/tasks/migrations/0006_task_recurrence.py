@@ -0,0 +1,38 @@
+# Generated by Django 5.2.5 on 2026-10-19 16:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0002_category_deletion_requested_at'),
+        ('lists', '0002_tasklist_deletion_requested_at'),
+        ('tags', '0001_initial'),
+        ('tasks', '0005_task_subtask_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='recurrence_exceptions',
+            field=models.JSONField(blank=True, default=list, help_text='Datas de ocorrências já materializadas, que não são mais geradas virtualmente', verbose_name='Exceções da Recorrência'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='recurrence_rule',
+            field=models.CharField(blank=True, help_text='Regra no formato RRULE (ex.: FREQ=WEEKLY;BYDAY=MO). Fica na ocorrência pendente atual da série', max_length=255, verbose_name='Regra de Recorrência'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='recurrence_series',
+            field=models.ForeignKey(blank=True, help_text='Primeira tarefa da série recorrente', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='occurrences', to='tasks.task', verbose_name='Série'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('completed', False), models.Q(('recurrence_rule', ''), _negated=True)), fields=['user', 'due_date'], name='task_user_recurring_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.5 on 2026-10-19 16:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0006_task_recurrence'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SuggestionTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('list', 'Lista'), ('category', 'Categoria'), ('tag', 'Etiqueta')], max_length=10, verbose_name='Tipo')),
+                ('target_id', models.PositiveBigIntegerField(help_text='ID da lista, categoria ou etiqueta', verbose_name='Destino')),
+                ('token', models.CharField(blank=True, max_length=64, verbose_name='Termo')),
+                ('count', models.IntegerField(default=0, verbose_name='Contagem')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='suggestion_terms', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Termo de Sugestão',
+                'verbose_name_plural': 'Termos de Sugestão',
+                'constraints': [models.UniqueConstraint(fields=('user', 'kind', 'target_id', 'token'), name='suggestionterm_unique_target_token')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+"""
+Índice GIN de trigramas em `tasks_task.title` para o autocompletar
+(`/api/autocomplete/`). Só existe no PostgreSQL; nos demais bancos o
+autocompletar usa o índice em memória.
+"""
+from django.db import migrations
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS task_title_trgm_idx ON tasks_task USING gin (title gin_trgm_ops)'
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS task_title_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0007_suggestionterm'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.5 on 2026-10-19 16:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0003_category_name_trgm'),
+        ('lists', '0003_tasklist_name_trgm'),
+        ('tags', '0002_tag_name_trgm'),
+        ('tasks', '0008_task_title_trgm'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('completed', False)), fields=['user', 'updated_at'], name='task_user_updated_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.5 on 2026-10-19 16:16
+
+import datetime
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0009_task_user_updated_pending_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='tracked_duration',
+            field=models.DurationField(default=datetime.timedelta, help_text='Soma dos registros de tempo encerrados (ver tasks/timetracking.py)', verbose_name='Tempo Registrado'),
+        ),
+        migrations.CreateModel(
+            name='TimeEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField(verbose_name='Início')),
+                ('ended_at', models.DateTimeField(blank=True, null=True, verbose_name='Fim')),
+                ('last_heartbeat_at', models.DateTimeField(blank=True, help_text='Último sinal de atividade gravado; os sinais são gravados em lotes', null=True, verbose_name='Último Sinal')),
+                ('duration', models.DurationField(blank=True, help_text='Preenchida ao encerrar o registro', null=True, verbose_name='Duração')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='time_entries', to='tasks.task', verbose_name='Tarefa')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='time_entries', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Registro de Tempo',
+                'verbose_name_plural': 'Registros de Tempo',
+                'ordering': ['-started_at'],
+                'indexes': [models.Index(fields=['task', 'started_at'], name='tasks_timee_task_id_e077ef_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('ended_at__isnull', True)), fields=('user',), name='timeentry_one_running_per_user')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+"""
+Índices (tag_id, task_id) nas tabelas de vínculo entre tarefas e etiquetas,
+usados pelos filtros `tags_all`, `tags_any` e `tags_none`
+(tasks/filters.py). A restrição única criada pelo Django começa por
+task_id e não atende às buscas por etiqueta.
+
+As tabelas de vínculo são criadas automaticamente pelo Django e não aceitam
+`AddIndex`; o SQL vale para SQLite e PostgreSQL.
+"""
+from django.db import migrations
+
+
+LINK_INDEXES = [
+    # (índice, tabela de vínculo, coluna da tarefa)
+    ('task_tags_tag_task_idx', 'tasks_task_tags', 'task_id'),
+    ('archivedtask_tags_tag_task_idx', 'tasks_archivedtask_tags', 'archivedtask_id'),
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0010_timeentry'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=f'CREATE INDEX IF NOT EXISTS "{index}" ON "{table}" ("tag_id", "{column}")',
+            reverse_sql=f'DROP INDEX IF EXISTS "{index}"',
+        )
+        for index, table, column in LINK_INDEXES
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.5 on 2026-10-19 16:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill(apps, schema_editor):
+    """Históricos existentes recebem a categoria, a prioridade e o prazo atuais da tarefa"""
+    TaskHistory = apps.get_model('tasks', 'TaskHistory')
+    histories = TaskHistory.objects.using(schema_editor.connection.alias).select_related('task')
+    last_pk = 0
+    while True:
+        chunk = list(histories.filter(pk__gt=last_pk).order_by('pk')[:1000])
+        if not chunk:
+            break
+        for history in chunk:
+            task = history.task
+            history.category_id = task.category_id
+            history.priority = task.priority
+            history.on_time = history.completion_date <= task.due_date if task.due_date else None
+        TaskHistory.objects.using(schema_editor.connection.alias).bulk_update(
+            chunk, ['category', 'priority', 'on_time']
+        )
+        last_pk = chunk[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0003_category_name_trgm'),
+        ('tasks', '0011_tag_links_tag_task_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taskhistory',
+            name='category',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='task_histories', to='categories.category', verbose_name='Categoria na Conclusão'),
+        ),
+        migrations.AddField(
+            model_name='taskhistory',
+            name='on_time',
+            field=models.BooleanField(blank=True, help_text='Concluída até a data limite; vazio quando a tarefa não tinha prazo', null=True, verbose_name='No Prazo'),
+        ),
+        migrations.AddField(
+            model_name='taskhistory',
+            name='priority',
+            field=models.CharField(blank=True, choices=[('low', 'Baixa'), ('medium', 'Média'), ('high', 'Alta')], max_length=10, verbose_name='Prioridade na Conclusão'),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
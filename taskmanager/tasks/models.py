@@ -1,10 +1,69 @@
+from datetime import timedelta
+
 from django.db import models
+from django.db.models import F
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.dateparse import parse_datetime, parse_duration
+
 
+class VersionConflict(Exception):
+    """A versão esperada não corresponde à versão gravada no banco"""
 
-class Task(models.Model):
+
+class VersionedModel(models.Model):
+    """
+    Modelo abstrato com coluna de versão para controle de concorrência otimista.
+    A versão é incrementada a cada gravação.
+    """
+    version = models.PositiveIntegerField(
+        default=1,
+        verbose_name="Versão",
+        help_text="Incrementada a cada alteração (usada em ETag/If-Match)"
+    )
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            self.version += 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'version'}
+        super().save(*args, **kwargs)
+
+    def save_changes(self, fields, expected_version=None):
+        """
+        Grava apenas os campos informados em um único UPDATE, incrementando a
+        versão. Com `expected_version`, o UPDATE só acontece se a versão gravada
+        for a esperada; caso contrário levanta VersionConflict.
+        """
+        now = timezone.now()
+        values = {field: getattr(self, field) for field in fields}
+        queryset = type(self)._default_manager.filter(pk=self.pk)
+        if expected_version is not None:
+            queryset = queryset.filter(version=expected_version)
+        if not queryset.update(**values, updated_at=now, version=F('version') + 1):
+            raise VersionConflict()
+
+        self.updated_at = now
+        if expected_version is not None:
+            self.version = expected_version + 1
+        else:
+            self.refresh_from_db(fields=['version'])
+
+    def sync_completed_at(self):
+        """Mantém completed_at coerente com completed"""
+        if self.completed and not self.completed_at:
+            self.completed_at = timezone.now()
+        elif not self.completed:
+            self.completed_at = None
+
+
+class Task(VersionedModel):
     """
     Modelo principal para tarefas.
     Pode existir independentemente ou estar associada a uma lista.
@@ -55,6 +114,11 @@ class Task(models.Model):
         verbose_name="Duração Estimada",
         help_text="Tempo estimado para conclusão da tarefa"
     )
+    tracked_duration = models.DurationField(
+        default=timedelta,
+        verbose_name="Tempo Registrado",
+        help_text="Soma dos registros de tempo encerrados (ver tasks/timetracking.py)"
+    )
     
     # Relacionamentos
     user = models.ForeignKey(
@@ -89,6 +153,29 @@ class Task(models.Model):
         verbose_name="Etiquetas",
         help_text="Etiquetas associadas à tarefa"
     )
+
+    # Recorrência (ver tasks/recurrence.py)
+    recurrence_rule = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name="Regra de Recorrência",
+        help_text="Regra no formato RRULE (ex.: FREQ=WEEKLY;BYDAY=MO). Fica na ocorrência pendente atual da série"
+    )
+    recurrence_exceptions = models.JSONField(
+        default=list,
+        blank=True,
+        verbose_name="Exceções da Recorrência",
+        help_text="Datas de ocorrências já materializadas, que não são mais geradas virtualmente"
+    )
+    recurrence_series = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='occurrences',
+        verbose_name="Série",
+        help_text="Primeira tarefa da série recorrente"
+    )
     
     # Timestamps
     created_at = models.DateTimeField(
@@ -114,6 +201,24 @@ class Task(models.Model):
             models.Index(fields=['user', 'completed']),
             models.Index(fields=['user', 'due_date']),
             models.Index(fields=['user', 'priority']),
+            # Índice parcial para a agenda (atrasadas, próximos dias)
+            models.Index(
+                fields=['user', 'due_date'],
+                condition=models.Q(completed=False),
+                name='task_user_due_pending_idx',
+            ),
+            # Séries recorrentes pendentes, expandidas pela agenda
+            models.Index(
+                fields=['user', 'due_date'],
+                condition=models.Q(completed=False) & ~models.Q(recurrence_rule=''),
+                name='task_user_recurring_idx',
+            ),
+            # Validação (ETag) do feed de calendário: MAX(updated_at) das pendentes
+            models.Index(
+                fields=['user', 'updated_at'],
+                condition=models.Q(completed=False),
+                name='task_user_updated_pending_idx',
+            ),
         ]
 
     def __str__(self):
@@ -121,10 +226,7 @@ class Task(models.Model):
 
     def save(self, *args, **kwargs):
         """Override do save para gerenciar completed_at automaticamente"""
-        if self.completed and not self.completed_at:
-            self.completed_at = timezone.now()
-        elif not self.completed:
-            self.completed_at = None
+        self.sync_completed_at()
         super().save(*args, **kwargs)
 
     def is_overdue(self):
@@ -155,6 +257,8 @@ class Task(models.Model):
 
     def get_completed_subtasks_count(self):
         """Retorna o número de subtarefas concluídas"""
+        if 'subtasks' in getattr(self, '_prefetched_objects_cache', {}):
+            return sum(1 for subtask in self.subtasks.all() if subtask.completed)
         return self.subtasks.filter(completed=True).count()
 
     def get_subtasks_completion_percentage(self):
@@ -171,7 +275,7 @@ class Task(models.Model):
         return self.get_subtasks_count() == 0 or self.get_completed_subtasks_count() == self.get_subtasks_count()
 
 
-class Subtask(models.Model):
+class Subtask(VersionedModel):
     """
     Modelo para subtarefas.
     Cada subtarefa pertence a uma tarefa principal.
@@ -263,14 +367,14 @@ class Subtask(models.Model):
         ordering = ['order', 'created_at']
 
     def __str__(self):
-        return f"{self.title} ({self.task.title})"
+        # A tarefa só entra no texto se já estiver carregada (sem consulta extra)
+        if Subtask.task.is_cached(self):
+            return f"{self.title} ({self.task.title})"
+        return self.title
 
     def save(self, *args, **kwargs):
         """Override do save para gerenciar completed_at automaticamente"""
-        if self.completed and not self.completed_at:
-            self.completed_at = timezone.now()
-        elif not self.completed:
-            self.completed_at = None
+        self.sync_completed_at()
         super().save(*args, **kwargs)
 
     def is_overdue(self):
@@ -322,6 +426,29 @@ class TaskHistory(models.Model):
         verbose_name="Observações",
         help_text="Observações sobre a conclusão da tarefa"
     )
+
+    # Chave e prazo usados no agregado diário (reports/rollups.py) na conclusão;
+    # desmarcar a tarefa reverte exatamente o que foi somado
+    category = models.ForeignKey(
+        'categories.Category',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='task_histories',
+        verbose_name="Categoria na Conclusão"
+    )
+    priority = models.CharField(
+        max_length=10,
+        choices=Task.PRIORITY_CHOICES,
+        blank=True,
+        verbose_name="Prioridade na Conclusão"
+    )
+    on_time = models.BooleanField(
+        null=True,
+        blank=True,
+        verbose_name="No Prazo",
+        help_text="Concluída até a data limite; vazio quando a tarefa não tinha prazo"
+    )
     
     # Relacionamentos
     task = models.OneToOneField(
@@ -352,3 +479,264 @@ class TaskHistory(models.Model):
             return None
         return self.actual_duration <= self.estimated_duration
 
+
+
+class ArchivedTask(models.Model):
+    """
+    Modelo para tarefas concluídas movidas para o arquivo.
+    Mantém o mesmo ID da tarefa original; subtarefas e histórico são
+    guardados como JSON, já que o arquivo é somente leitura.
+    """
+    PRIORITY_CHOICES = Task.PRIORITY_CHOICES
+
+    id = models.BigIntegerField(
+        primary_key=True,
+        verbose_name="ID",
+        help_text="ID da tarefa original"
+    )
+    title = models.CharField(
+        max_length=200,
+        verbose_name="Título"
+    )
+    description = models.TextField(
+        blank=True,
+        verbose_name="Descrição"
+    )
+    due_date = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Data Limite"
+    )
+    completed = models.BooleanField(
+        default=True,
+        verbose_name="Concluída"
+    )
+    priority = models.CharField(
+        max_length=10,
+        choices=PRIORITY_CHOICES,
+        default='medium',
+        verbose_name="Prioridade"
+    )
+    reminder = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Lembrete"
+    )
+    estimated_duration = models.DurationField(
+        null=True,
+        blank=True,
+        verbose_name="Duração Estimada"
+    )
+
+    # Relacionamentos
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_tasks',
+        verbose_name="Usuário"
+    )
+    task_list = models.ForeignKey(
+        'lists.TaskList',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='archived_tasks',
+        verbose_name="Lista"
+    )
+    category = models.ForeignKey(
+        'categories.Category',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='archived_tasks',
+        verbose_name="Categoria"
+    )
+    tags = models.ManyToManyField(
+        'tags.Tag',
+        blank=True,
+        related_name='archived_tasks',
+        verbose_name="Etiquetas"
+    )
+
+    # Dados desnormalizados
+    subtasks = models.JSONField(
+        default=list,
+        blank=True,
+        encoder=DjangoJSONEncoder,
+        verbose_name="Subtarefas",
+        help_text="Subtarefas da tarefa no momento do arquivamento"
+    )
+    history = models.JSONField(
+        null=True,
+        blank=True,
+        encoder=DjangoJSONEncoder,
+        verbose_name="Histórico",
+        help_text="Histórico de conclusão da tarefa no momento do arquivamento"
+    )
+
+    # Timestamps
+    created_at = models.DateTimeField(
+        verbose_name="Criado em"
+    )
+    updated_at = models.DateTimeField(
+        verbose_name="Atualizado em"
+    )
+    completed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Concluído em"
+    )
+    archived_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Arquivado em"
+    )
+
+    class Meta:
+        verbose_name = "Tarefa Arquivada"
+        verbose_name_plural = "Tarefas Arquivadas"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'completed_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.title} (arquivada)"
+
+    def is_overdue(self):
+        """Tarefas arquivadas estão sempre concluídas"""
+        return False
+
+    def get_priority_display_color(self):
+        """Retorna a cor associada à prioridade"""
+        colors = {
+            'low': '#28a745',    # Verde
+            'medium': '#ffc107', # Amarelo
+            'high': '#dc3545',   # Vermelho
+        }
+        return colors.get(self.priority, '#6c757d')
+
+    def get_history(self):
+        """Retorna o histórico arquivado como um TaskHistory não salvo"""
+        if not self.history:
+            return None
+        history = TaskHistory(
+            completion_date=parse_datetime(self.history['completion_date']),
+            estimated_duration=parse_duration(self.history['estimated_duration'] or ''),
+            actual_duration=parse_duration(self.history['actual_duration'] or ''),
+            notes=self.history.get('notes', ''),
+            category_id=self.history.get('category_id', self.category_id),
+            priority=self.history.get('priority') or self.priority,
+        )
+        if 'on_time' in self.history:
+            history.on_time = self.history['on_time']
+        elif self.due_date:
+            history.on_time = history.completion_date <= self.due_date
+        return history
+
+
+class SuggestionTerm(models.Model):
+    """
+    Contagem de um termo dos títulos das tarefas do usuário por destino
+    (lista, categoria ou etiqueta), usada pelas sugestões (tasks/suggestions.py).
+    O termo vazio guarda o número de tarefas do destino.
+    """
+    KIND_CHOICES = [
+        ('list', 'Lista'),
+        ('category', 'Categoria'),
+        ('tag', 'Etiqueta'),
+    ]
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='suggestion_terms',
+        verbose_name="Usuário"
+    )
+    kind = models.CharField(
+        max_length=10,
+        choices=KIND_CHOICES,
+        verbose_name="Tipo"
+    )
+    target_id = models.PositiveBigIntegerField(
+        verbose_name="Destino",
+        help_text="ID da lista, categoria ou etiqueta"
+    )
+    token = models.CharField(
+        max_length=64,
+        blank=True,
+        verbose_name="Termo"
+    )
+    count = models.IntegerField(
+        default=0,
+        verbose_name="Contagem"
+    )
+
+    class Meta:
+        verbose_name = "Termo de Sugestão"
+        verbose_name_plural = "Termos de Sugestão"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'kind', 'target_id', 'token'],
+                name='suggestionterm_unique_target_token',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.target_id} {self.token or '*'} = {self.count}"
+
+
+class TimeEntry(models.Model):
+    """
+    Registro de tempo (cronômetro) de uma tarefa. Fica em andamento enquanto
+    `ended_at` é nulo; cada usuário tem no máximo um registro em andamento.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='time_entries',
+        verbose_name="Usuário"
+    )
+    task = models.ForeignKey(
+        Task,
+        on_delete=models.CASCADE,
+        related_name='time_entries',
+        verbose_name="Tarefa"
+    )
+    started_at = models.DateTimeField(
+        verbose_name="Início"
+    )
+    ended_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Fim"
+    )
+    last_heartbeat_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Último Sinal",
+        help_text="Último sinal de atividade gravado; os sinais são gravados em lotes"
+    )
+    duration = models.DurationField(
+        null=True,
+        blank=True,
+        verbose_name="Duração",
+        help_text="Preenchida ao encerrar o registro"
+    )
+
+    class Meta:
+        verbose_name = "Registro de Tempo"
+        verbose_name_plural = "Registros de Tempo"
+        ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['task', 'started_at']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user'],
+                condition=models.Q(ended_at__isnull=True),
+                name='timeentry_one_running_per_user',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.task_id}: {self.started_at} - {self.ended_at or '...'}"
@@ -0,0 +1,182 @@
+"""
+Migração online dos dados de um usuário entre fragmentos (bancos).
+
+1. cópia inicial em lotes, mantendo os IDs, com o usuário ativo;
+2. bloqueio das escritas do usuário (`UserShard.moving`): requisições
+   recebem 503 e o worker de trabalhos, o lote de sinais do cronômetro e o
+   despacho de webhooks deixam o usuário para depois;
+3. após a espera, nova cópia (que aplica as alterações feitas durante a
+   etapa 1) e remoção no destino das linhas excluídas na origem, repetidas
+   até a soma de verificação da origem e do destino coincidirem: uma escrita
+   que ainda chegue à origem gera nova rodada;
+4. troca do banco no mapa e liberação das escritas;
+5. após nova espera, remoção dos dados na origem, apenas se a origem não
+   mudou desde a etapa 3. Caso contrário (escrita atrasada de quem resolveu
+   o banco antes da troca), a origem é mantida para conferência.
+
+Leituras funcionam durante todo o processo; escritas recebem 503 apenas
+entre as etapas 2 e 4.
+"""
+import hashlib
+import json
+import time
+
+from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS
+
+from accounts.models import UserShard
+from categories.models import Category
+from lists.models import TaskList
+from reports.models import DailyProductivity
+from tags.models import Tag
+from taskmanager import sharding
+from webhooks.models import OutboxEvent, WebhookSubscription
+from .models import Task, Subtask, TaskHistory, ArchivedTask, SuggestionTerm, TimeEntry
+
+
+# Dados de cada usuário, na ordem das dependências (pais antes dos filhos)
+USER_DATA = [
+    (TaskList, 'user_id'),
+    (Category, 'user_id'),
+    (Tag, 'user_id'),
+    (Task, 'user_id'),
+    (Subtask, 'task__user_id'),
+    (TaskHistory, 'task__user_id'),
+    (Task.tags.through, 'task__user_id'),
+    (TimeEntry, 'user_id'),
+    (ArchivedTask, 'user_id'),
+    (ArchivedTask.tags.through, 'archivedtask__user_id'),
+    (DailyProductivity, 'user_id'),
+    (SuggestionTerm, 'user_id'),
+    (WebhookSubscription, 'user_id'),
+    (OutboxEvent, 'user_id'),
+]
+
+
+class WritesDidNotSettle(Exception):
+    message = 'A origem continuou recebendo escritas durante a migração; o usuário permanece na origem.'
+
+
+class LateWrites(Exception):
+    message = (
+        'A origem recebeu escritas após a troca de banco; os dados da origem '
+        'foram mantidos para conferência.'
+    )
+
+
+def _user_rows(model, lookup, user_id, using):
+    return model._base_manager.using(using).filter(**{lookup: user_id}).order_by('pk')
+
+
+def _iterate_in_chunks(queryset, chunk_size):
+    """Percorre o queryset em blocos por chave primária"""
+    last_pk = None
+    while True:
+        chunk_qs = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        chunk = list(chunk_qs[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_pk = chunk[-1].pk
+
+
+def copy_user_data(user_id, source, target, chunk_size=1000):
+    """Copia (upsert) todas as linhas do usuário da origem para o destino"""
+    copied = 0
+    for model, lookup in USER_DATA:
+        for chunk in _iterate_in_chunks(_user_rows(model, lookup, user_id, source), chunk_size):
+            sharding.upsert(model, chunk, using=target, batch_size=chunk_size)
+            copied += len(chunk)
+    return copied
+
+
+def user_data_checksum(user_id, using, chunk_size=1000):
+    """Número de linhas e hash do conteúdo de cada modelo do usuário no banco"""
+    checksums = {}
+    for model, lookup in USER_DATA:
+        columns = [field.attname for field in model._meta.concrete_fields]
+        pk_index = columns.index(model._meta.pk.attname)
+        queryset = _user_rows(model, lookup, user_id, using).values_list(*columns)
+        digest = hashlib.sha256()
+        count = 0
+        last_pk = None
+        while True:
+            chunk = list((queryset if last_pk is None else queryset.filter(pk__gt=last_pk))[:chunk_size])
+            if not chunk:
+                break
+            for row in chunk:
+                digest.update(json.dumps(row, cls=DjangoJSONEncoder, sort_keys=True).encode())
+            count += len(chunk)
+            last_pk = chunk[-1][pk_index]
+        checksums[model._meta.label] = (count, digest.hexdigest())
+    return checksums
+
+
+def prune_user_data(user_id, source, target, chunk_size=1000):
+    """Remove do destino as linhas do usuário que não existem mais na origem"""
+    pruned = 0
+    for model, lookup in reversed(USER_DATA):
+        source_ids = set(_user_rows(model, lookup, user_id, source).values_list('pk', flat=True))
+        target_ids = _user_rows(model, lookup, user_id, target).values_list('pk', flat=True)
+        stale = [pk for pk in target_ids if pk not in source_ids]
+        for start in range(0, len(stale), chunk_size):
+            model._base_manager.using(target).filter(pk__in=stale[start:start + chunk_size]).delete()
+        pruned += len(stale)
+    return pruned
+
+
+def delete_user_data(user_id, using, chunk_size=1000):
+    """Remove em lotes as linhas do usuário, dos filhos para os pais"""
+    for model, lookup in reversed(USER_DATA):
+        queryset = _user_rows(model, lookup, user_id, using)
+        while True:
+            ids = list(queryset.values_list('pk', flat=True)[:chunk_size])
+            if not ids:
+                break
+            model._base_manager.using(using).filter(pk__in=ids).delete()
+
+
+def move_user(user_id, target, chunk_size=1000, grace_seconds=2, max_rounds=5):
+    """
+    Move os dados do usuário para o banco `target`.
+    Retorna um dicionário com origem, destino e número de linhas copiadas.
+    WritesDidNotSettle se a origem não parou de mudar em `max_rounds`
+    rodadas (nada é trocado); LateWrites se mudou após a troca (a origem é
+    mantida).
+    """
+    if target not in sharding.shard_aliases():
+        raise ValueError(f'Banco "{target}" não está em TASK_SHARD_DATABASES.')
+    user = User.objects.get(pk=user_id)
+    source = sharding.shard_for_user(user_id)
+    if source == target:
+        return {'source': source, 'target': target, 'copied': 0}
+
+    sharding.mirror_user(user, target)
+    copied = copy_user_data(user_id, source, target, chunk_size)
+
+    UserShard.objects.update_or_create(user=user, defaults={'database': source, 'moving': True})
+    try:
+        for _ in range(max_rounds):
+            time.sleep(grace_seconds)
+            copied += copy_user_data(user_id, source, target, chunk_size)
+            prune_user_data(user_id, source, target, chunk_size)
+            settled = user_data_checksum(user_id, source, chunk_size)
+            if settled == user_data_checksum(user_id, target, chunk_size):
+                break
+        else:
+            raise WritesDidNotSettle()
+        UserShard.objects.filter(user=user).update(database=target, moving=False)
+    except Exception:
+        UserShard.objects.filter(user=user).update(moving=False)
+        raise
+
+    # Quem resolveu o banco antes do bloqueio ainda pode gravar na origem
+    time.sleep(grace_seconds)
+    if user_data_checksum(user_id, source, chunk_size) != settled:
+        raise LateWrites()
+    delete_user_data(user_id, source, chunk_size)
+    if source != DEFAULT_DB_ALIAS:
+        User.objects.using(source).filter(pk=user_id).delete()
+
+    return {'source': source, 'target': target, 'copied': copied}
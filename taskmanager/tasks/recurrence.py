@@ -0,0 +1,313 @@
+"""
+Tarefas recorrentes.
+
+A regra (subconjunto do RRULE do iCalendar: FREQ, INTERVAL, BYDAY, COUNT e
+UNTIL) fica na ocorrência pendente atual da série. As ocorrências seguintes
+são virtuais: calculadas sob demanda para a janela pedida (hoje, atrasadas,
+próximos dias) e nunca gravadas. Uma ocorrência só vira linha no banco quando
+a atual é concluída (a próxima é criada, O(1)) ou quando o usuário a
+materializa para editá-la; nesse caso a data entra em `recurrence_exceptions`
+(como o EXDATE do iCalendar) e deixa de ser gerada virtualmente.
+"""
+import copy
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from taskmanager import autocomplete
+from taskmanager.sharding import current_shard
+from webhooks import outbox
+from . import agenda, suggestions
+from .models import Task, Subtask
+
+
+# Máximo de ocorrências virtuais de uma série em uma resposta
+MAX_VIRTUAL_OCCURRENCES = 100
+# Passos sem nenhuma ocorrência antes de considerar a regra vazia
+MAX_EMPTY_STEPS = 1000
+
+WEEKDAYS = ['MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU']
+FREQUENCIES = ['DAILY', 'WEEKLY', 'MONTHLY', 'YEARLY']
+
+
+class InvalidRecurrenceRule(ValueError):
+    """Regra de recorrência mal formada ou não suportada"""
+
+
+class RecurrenceRule:
+    """Regra de recorrência no formato `FREQ=WEEKLY;INTERVAL=1;BYDAY=MO,WE;COUNT=10`"""
+
+    def __init__(self, freq, interval=1, by_day=None, count=None, until=None):
+        self.freq = freq
+        self.interval = interval
+        self.by_day = sorted(set(by_day or []))
+        self.count = count
+        self.until = until
+
+    @classmethod
+    def parse(cls, text):
+        text = text.strip()
+        if text.upper().startswith('RRULE:'):
+            text = text[len('RRULE:'):]
+        parts = {}
+        for part in filter(None, text.split(';')):
+            name, sep, value = part.partition('=')
+            if not sep or not value:
+                raise InvalidRecurrenceRule(f'Parte inválida na regra de recorrência: "{part}".')
+            parts[name.strip().upper()] = value.strip().upper()
+
+        unknown = set(parts) - {'FREQ', 'INTERVAL', 'BYDAY', 'COUNT', 'UNTIL'}
+        if unknown:
+            raise InvalidRecurrenceRule(f'Parâmetros não suportados: {", ".join(sorted(unknown))}.')
+        freq = parts.get('FREQ')
+        if freq not in FREQUENCIES:
+            raise InvalidRecurrenceRule(f'FREQ deve ser um de: {", ".join(FREQUENCIES)}.')
+
+        interval = cls._positive_int(parts.get('INTERVAL', '1'), 'INTERVAL')
+        count = cls._positive_int(parts['COUNT'], 'COUNT') if 'COUNT' in parts else None
+        if count is not None and 'UNTIL' in parts:
+            raise InvalidRecurrenceRule('Use COUNT ou UNTIL, não ambos.')
+
+        by_day = []
+        if 'BYDAY' in parts:
+            if freq not in ('DAILY', 'WEEKLY'):
+                raise InvalidRecurrenceRule('BYDAY só é suportado com FREQ=DAILY ou WEEKLY.')
+            for day in parts['BYDAY'].split(','):
+                if day not in WEEKDAYS:
+                    raise InvalidRecurrenceRule(f'Dia da semana inválido em BYDAY: "{day}".')
+                by_day.append(WEEKDAYS.index(day))
+
+        until = cls._parse_until(parts['UNTIL']) if 'UNTIL' in parts else None
+        return cls(freq, interval, by_day, count, until)
+
+    @staticmethod
+    def _positive_int(value, name):
+        if not value.isdigit() or int(value) < 1:
+            raise InvalidRecurrenceRule(f'{name} deve ser um inteiro positivo.')
+        return int(value)
+
+    @staticmethod
+    def _parse_until(value):
+        """UNTIL como data (AAAAMMDD, inclusiva no fuso do projeto) ou instante UTC"""
+        try:
+            if 'T' in value:
+                return datetime.strptime(value, '%Y%m%dT%H%M%SZ').replace(tzinfo=dt_timezone.utc)
+            day = datetime.strptime(value, '%Y%m%d').date()
+        except ValueError:
+            raise InvalidRecurrenceRule('UNTIL deve estar no formato AAAAMMDD ou AAAAMMDDTHHMMSSZ.')
+        return datetime.combine(day, time.max, tzinfo=timezone.get_current_timezone())
+
+    def __str__(self):
+        parts = [f'FREQ={self.freq}']
+        if self.interval != 1:
+            parts.append(f'INTERVAL={self.interval}')
+        if self.by_day:
+            parts.append('BYDAY=' + ','.join(WEEKDAYS[day] for day in self.by_day))
+        if self.count is not None:
+            parts.append(f'COUNT={self.count}')
+        if self.until is not None:
+            until = self.until.astimezone(dt_timezone.utc)
+            parts.append(f"UNTIL={until.strftime('%Y%m%dT%H%M%SZ')}")
+        return ';'.join(parts)
+
+    def with_count(self, count):
+        return RecurrenceRule(self.freq, self.interval, self.by_day, count, self.until)
+
+    def _local_dates(self, start):
+        """Datas locais (naive) geradas a partir de `start`, em ordem"""
+        empty_steps = 0
+        step = 0
+        while empty_steps < MAX_EMPTY_STEPS:
+            found = False
+            for candidate in self._step_dates(start, step):
+                if candidate >= start:
+                    found = True
+                    yield candidate
+            empty_steps = 0 if found else empty_steps + 1
+            step += 1
+
+    def _step_dates(self, start, step):
+        offset = step * self.interval
+        if self.freq == 'DAILY':
+            day = start + timedelta(days=offset)
+            if not self.by_day or day.weekday() in self.by_day:
+                yield day
+        elif self.freq == 'WEEKLY':
+            if not self.by_day:
+                yield start + timedelta(weeks=offset)
+                return
+            monday = start - timedelta(days=start.weekday()) + timedelta(weeks=offset)
+            for weekday in self.by_day:
+                yield monday + timedelta(days=weekday)
+        elif self.freq == 'MONTHLY':
+            year, month = divmod(start.month - 1 + offset, 12)
+            try:
+                yield start.replace(year=start.year + year, month=month + 1)
+            except ValueError:
+                # Mês sem o dia (ex.: 31), pulado como no RFC 5545
+                pass
+        else:
+            try:
+                yield start.replace(year=start.year + offset)
+            except ValueError:
+                pass
+
+    def occurrences(self, dtstart):
+        """
+        Gera `(índice, data)` das ocorrências da série iniciada em `dtstart`
+        (índice 1), respeitando COUNT e UNTIL.
+        """
+        tz = timezone.get_current_timezone()
+        local_start = timezone.localtime(dtstart, tz).replace(tzinfo=None)
+        # `dtstart` é sempre a primeira ocorrência, mesmo fora de BYDAY
+        dates = (local for local in self._local_dates(local_start) if local > local_start)
+        yield 1, dtstart
+        for index, local in enumerate(dates, start=2):
+            if self.count is not None and index > self.count:
+                return
+            value = timezone.make_aware(local, tz)
+            if self.until is not None and value > self.until:
+                return
+            yield index, value
+
+
+def validate_rule(text):
+    """Valida e normaliza o texto da regra; vazio desliga a recorrência"""
+    if not text or not text.strip():
+        return ''
+    return str(RecurrenceRule.parse(text))
+
+
+def exception_key(value):
+    return value.astimezone(dt_timezone.utc).isoformat()
+
+
+def virtual_dates(task, start=None, end=None, limit=MAX_VIRTUAL_OCCURRENCES):
+    """Datas das ocorrências virtuais (após a atual) no intervalo [start, end)"""
+    if not task.recurrence_rule or task.due_date is None:
+        return []
+    excluded = set(task.recurrence_exceptions or [])
+    dates = []
+    for index, value in RecurrenceRule.parse(task.recurrence_rule).occurrences(task.due_date):
+        if end is not None and value >= end:
+            break
+        if index == 1 or (start is not None and value < start) or exception_key(value) in excluded:
+            continue
+        dates.append(value)
+        if len(dates) >= limit:
+            break
+    return dates
+
+
+def virtual_occurrence(task, due_date):
+    """
+    Cópia em memória da tarefa para a data informada. Compartilha os caches
+    de relacionamentos (etiquetas, subtarefas) da tarefa atual da série.
+    """
+    occurrence = copy.copy(task)
+    if task.reminder and task.due_date:
+        occurrence.reminder = due_date - (task.due_date - task.reminder)
+    occurrence.due_date = due_date
+    occurrence.occurrence_of = task.pk
+    return occurrence
+
+
+def with_occurrences(tasks, queryset, start=None, end=None):
+    """
+    Acrescenta às tarefas as ocorrências virtuais do intervalo [start, end)
+    das séries pendentes de `queryset`, em ordem de data limite.
+    """
+    recurring = agenda.recurring(queryset)
+    if end is not None:
+        recurring = recurring.filter(due_date__lt=end)
+    occurrences = [
+        virtual_occurrence(task, due_date)
+        for task in recurring
+        for due_date in virtual_dates(task, start, end)
+    ]
+    occurrences.sort(key=lambda task: task.due_date)
+    return list(tasks) + occurrences
+
+
+def _copy_task(task, due_date, rule='', exceptions=None):
+    """Nova ocorrência real da série, com etiquetas e subtarefas (pendentes)"""
+    reminder = None
+    if task.reminder and task.due_date:
+        reminder = due_date - (task.due_date - task.reminder)
+    occurrence = Task.objects.create(
+        title=task.title,
+        description=task.description,
+        due_date=due_date,
+        priority=task.priority,
+        reminder=reminder,
+        estimated_duration=task.estimated_duration,
+        user_id=task.user_id,
+        task_list_id=task.task_list_id,
+        category_id=task.category_id,
+        recurrence_rule=rule,
+        recurrence_exceptions=exceptions or [],
+        recurrence_series_id=task.recurrence_series_id or task.pk,
+    )
+    TagLink = Task.tags.through
+    tag_ids = list(TagLink.objects.filter(task_id=task.pk).values_list('tag_id', flat=True))
+    TagLink.objects.bulk_create([TagLink(task_id=occurrence.pk, tag_id=tag_id) for tag_id in tag_ids])
+    Subtask.objects.bulk_create([
+        Subtask(task=occurrence, title=subtask.title, description=subtask.description,
+                order=subtask.order, priority=subtask.priority,
+                estimated_duration=subtask.estimated_duration)
+        for subtask in Subtask.objects.filter(task_id=task.pk).order_by('order', 'created_at')
+    ])
+    suggestions.record(task.user_id, after=suggestions.task_features(occurrence, tag_ids))
+    autocomplete.invalidate(task.user_id)
+    outbox.emit(task.user_id, 'task.created', occurrence.pk, outbox.snapshot(occurrence, outbox.TASK_FIELDS))
+    return occurrence
+
+
+def spawn_next(task_id):
+    """
+    Passa a regra da ocorrência concluída para a próxima, criando-a.
+    O UPDATE condicional garante uma única próxima ocorrência mesmo com
+    conclusões concorrentes. Retorna a nova tarefa, ou None.
+    """
+    with transaction.atomic(using=current_shard()):
+        task = Task.objects.select_for_update().get(pk=task_id)
+        if not task.recurrence_rule or task.due_date is None:
+            return None
+        cleared = Task.objects.filter(pk=task_id).exclude(recurrence_rule='').update(
+            recurrence_rule='', updated_at=timezone.now(), version=F('version') + 1,
+        )
+        if not cleared:
+            return None
+
+        rule = RecurrenceRule.parse(task.recurrence_rule)
+        excluded = set(task.recurrence_exceptions or [])
+        for index, due_date in rule.occurrences(task.due_date):
+            if index == 1 or exception_key(due_date) in excluded:
+                continue
+            if rule.count is not None:
+                rule = rule.with_count(rule.count - index + 1)
+            remaining = [key for key in excluded if datetime.fromisoformat(key) > due_date]
+            return _copy_task(task, due_date, str(rule), sorted(remaining))
+        return None
+
+
+class NotAnOccurrence(Exception):
+    """Data que não corresponde a uma ocorrência virtual da série"""
+    message = 'A data informada não é uma ocorrência futura desta tarefa.'
+
+
+def materialize(task, due_date):
+    """
+    Cria a linha de uma ocorrência virtual (para editá-la ou concluí-la) e a
+    exclui da geração virtual da série.
+    """
+    with transaction.atomic(using=current_shard()):
+        task = Task.objects.select_for_update().get(pk=task.pk)
+        if due_date not in virtual_dates(task, start=due_date, end=due_date + timedelta(microseconds=1)):
+            raise NotAnOccurrence()
+        occurrence = _copy_task(task, due_date)
+        task.recurrence_exceptions = sorted(set(task.recurrence_exceptions) | {exception_key(due_date)})
+        task.save_changes(['recurrence_exceptions'])
+    return occurrence
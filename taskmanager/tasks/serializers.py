@@ -1,17 +1,82 @@
+from django.db import transaction
+from django.db.models import prefetch_related_objects
 from rest_framework import serializers
-from .models import Task, Subtask, TaskHistory
+from .models import Task, Subtask, TaskHistory, ArchivedTask, TimeEntry, VersionConflict
 from categories.models import Category
 from tags.models import Tag
 from lists.models import TaskList
+from taskmanager import autocomplete
+from taskmanager.sharding import current_shard
+from taskmanager.sparse_fields import SparseFieldsetMixin
+from . import recurrence, services, suggestions
+from .fields import OwnedPrimaryKeyRelatedField
 
 
-class SubtaskSerializer(serializers.ModelSerializer):
+class ChangedFieldsUpdateMixin:
+    """
+    Atualização que grava apenas os campos alterados (em um único UPDATE com
+    checagem de versão) e não grava nada quando nada mudou.
+    """
+
+    def update(self, instance, validated_data):
+        expected_version = validated_data.pop('expected_version', None)
+        opts = instance._meta
+
+        changed = []
+        many_to_many = {}
+        for name, value in validated_data.items():
+            field = opts.get_field(name)
+            if field.many_to_many:
+                many_to_many[name] = value
+            elif field.is_relation:
+                if getattr(instance, field.attname) != (value.pk if value is not None else None):
+                    setattr(instance, name, value)
+                    changed.append(field.attname)
+            elif getattr(instance, name) != value:
+                setattr(instance, name, value)
+                changed.append(name)
+
+        many_to_many_changed = {
+            name: values for name, values in many_to_many.items()
+            if {obj.pk for obj in getattr(instance, name).all()} != {obj.pk for obj in values}
+        }
+
+        if not changed and not many_to_many_changed:
+            return instance
+
+        if 'completed' in changed:
+            instance.sync_completed_at()
+            changed.append('completed_at')
+        instance.save_changes(changed, expected_version)
+
+        for name, values in many_to_many_changed.items():
+            getattr(instance, name).set(values)
+        return instance
+
+
+class OccurrenceMixin:
+    """
+    Ocorrências virtuais de tarefas recorrentes saem com `id` nulo e
+    `occurrence_of` apontando para a tarefa atual da série.
+    """
+
+    def get_occurrence_of(self, obj):
+        return getattr(obj, 'occurrence_of', None)
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if getattr(instance, 'occurrence_of', None) is not None and 'id' in data:
+            data['id'] = None
+        return data
+
+
+class SubtaskSerializer(ChangedFieldsUpdateMixin, serializers.ModelSerializer):
     """Serializer para subtarefas"""
     
     class Meta:
         model = Subtask
-        fields = ['id', 'title', 'completed', 'order', 'created_at', 'updated_at', 'completed_at']
-        read_only_fields = ['id', 'created_at', 'updated_at', 'completed_at']
+        fields = ['id', 'title', 'completed', 'order', 'version', 'created_at', 'updated_at', 'completed_at']
+        read_only_fields = ['id', 'version', 'created_at', 'updated_at', 'completed_at']
 
 
 class TaskHistorySerializer(serializers.ModelSerializer):
@@ -33,13 +98,43 @@ class TaskHistorySerializer(serializers.ModelSerializer):
         return obj.was_completed_on_time()
 
 
-class TaskSerializer(serializers.ModelSerializer):
+class TimeEntrySerializer(serializers.ModelSerializer):
+    """Serializer somente leitura para registros de tempo"""
+    running = serializers.SerializerMethodField()
+
+    class Meta:
+        model = TimeEntry
+        fields = ['id', 'task', 'started_at', 'ended_at', 'duration', 'running']
+        read_only_fields = fields
+
+    def get_running(self, obj):
+        return obj.ended_at is None
+
+
+SUGGESTION_FIELDS = {'title', 'task_list', 'category', 'tags'}
+
+
+class TaskSerializer(SparseFieldsetMixin, OccurrenceMixin, ChangedFieldsUpdateMixin, serializers.ModelSerializer):
     """Serializer para tarefas"""
     subtasks = SubtaskSerializer(many=True, read_only=True)
     history = TaskHistorySerializer(read_only=True)
     category_name = serializers.CharField(source='category.name', read_only=True)
     task_list_name = serializers.CharField(source='task_list.name', read_only=True)
     tags_names = serializers.StringRelatedField(source='tags', many=True, read_only=True)
+
+    # Relacionamentos resolvidos com uma consulta por modelo, já filtrados pelo usuário
+    task_list = OwnedPrimaryKeyRelatedField(
+        queryset=TaskList.objects.filter(deletion_requested_at__isnull=True), required=False, allow_null=True,
+        error_messages={'does_not_exist': 'Lista "{pk_value}" não encontrada.'}
+    )
+    category = OwnedPrimaryKeyRelatedField(
+        queryset=Category.objects.filter(deletion_requested_at__isnull=True), required=False, allow_null=True,
+        error_messages={'does_not_exist': 'Categoria "{pk_value}" não encontrada.'}
+    )
+    tags = OwnedPrimaryKeyRelatedField(
+        queryset=Tag.objects.all(), many=True, required=False,
+        error_messages={'does_not_exist': 'Etiqueta "{pk_value}" não encontrada.'}
+    )
     
     # Campos calculados
     is_overdue = serializers.SerializerMethodField()
@@ -49,17 +144,35 @@ class TaskSerializer(serializers.ModelSerializer):
     completed_subtasks_count = serializers.SerializerMethodField()
     subtasks_completion_percentage = serializers.SerializerMethodField()
     can_be_completed = serializers.SerializerMethodField()
+    occurrence_of = serializers.SerializerMethodField()
 
     class Meta:
         model = Task
         fields = ['id', 'title', 'description', 'due_date', 'completed', 'priority', 
-                 'reminder', 'estimated_duration', 'task_list', 'category', 'tags',
+                 'reminder', 'estimated_duration', 'tracked_duration', 'task_list', 'category', 'tags',
                  'created_at', 'updated_at', 'completed_at', 'subtasks', 'history',
                  'category_name', 'task_list_name', 'tags_names', 'is_overdue',
                  'days_until_due', 'priority_color', 'subtasks_count', 
                  'completed_subtasks_count', 'subtasks_completion_percentage',
-                 'can_be_completed']
-        read_only_fields = ['id', 'created_at', 'updated_at', 'completed_at']
+                 'can_be_completed', 'recurrence_rule', 'recurrence_series',
+                 'occurrence_of', 'version']
+        read_only_fields = ['id', 'version', 'created_at', 'updated_at', 'completed_at',
+                            'recurrence_series', 'tracked_duration']
+
+    def validate_recurrence_rule(self, value):
+        try:
+            return recurrence.validate_rule(value)
+        except recurrence.InvalidRecurrenceRule as exc:
+            raise serializers.ValidationError(str(exc))
+
+    def validate(self, attrs):
+        rule = attrs.get('recurrence_rule', getattr(self.instance, 'recurrence_rule', ''))
+        due_date = attrs.get('due_date', getattr(self.instance, 'due_date', None))
+        if rule and due_date is None:
+            raise serializers.ValidationError(
+                {'due_date': 'Tarefas recorrentes precisam de data limite.'}
+            )
+        return attrs
 
     def get_is_overdue(self, obj):
         return obj.is_overdue()
@@ -82,41 +195,164 @@ class TaskSerializer(serializers.ModelSerializer):
     def get_can_be_completed(self, obj):
         return obj.can_be_completed()
 
-    def validate(self, attrs):
-        # Validar que task_list e category pertencem ao usuário
+    def set_completed(self, task, completed):
+        """
+        Conclui ou reabre a tarefa pelo serviço de conclusão, que grava
+        histórico, agregados, próxima ocorrência e eventos
+        """
         user = self.context['request'].user
-        
-        if 'task_list' in attrs and attrs['task_list']:
-            if attrs['task_list'].user != user:
-                raise serializers.ValidationError("Lista não pertence ao usuário.")
-        
-        if 'category' in attrs and attrs['category']:
-            if attrs['category'].user != user:
-                raise serializers.ValidationError("Categoria não pertence ao usuário.")
-        
-        return attrs
+        try:
+            if completed:
+                services.complete_task(user, task.pk)
+            else:
+                services.uncomplete_task(user, task.pk)
+        except services.TaskHasPendingSubtasks as exc:
+            raise serializers.ValidationError({'completed': exc.message})
+        task.refresh_from_db(fields=['completed', 'completed_at', 'version', 'updated_at'])
 
     def create(self, validated_data):
         tags_data = validated_data.pop('tags', [])
+        completed = validated_data.pop('completed', False)
         validated_data['user'] = self.context['request'].user
         task = Task.objects.create(**validated_data)
-        task.tags.set(tags_data)
+        if tags_data:
+            task.tags.set(tags_data)
+        suggestions.record(task.user_id, after=suggestions.task_features(task, [tag.pk for tag in tags_data]))
+        autocomplete.invalidate(task.user_id)
+        if completed:
+            self.set_completed(task, True)
+        # Evita uma consulta por etiqueta ao montar tags_names na resposta
+        prefetch_related_objects([task], 'tags__user')
         return task
 
+    def update(self, instance, validated_data):
+        completed = validated_data.pop('completed', instance.completed)
+        if completed == instance.completed:
+            return self.update_fields(instance, validated_data)
+
+        # Demais campos e conclusão na mesma transação: uma conclusão recusada
+        # (subtarefas pendentes, versão alterada) desfaz também os campos
+        with transaction.atomic(using=current_shard()):
+            expected_version = validated_data.get('expected_version')
+            instance = self.update_fields(instance, validated_data)
+            if expected_version is not None and not Task.objects.select_for_update().filter(
+                pk=instance.pk, version=instance.version
+            ).exists():
+                raise VersionConflict()
+            self.set_completed(instance, completed)
+        return instance
+
+    def update_fields(self, instance, validated_data):
+        tags_changed = 'tags' in validated_data
+        # Só mudanças de título, lista, categoria ou etiquetas alteram as sugestões
+        before = None
+        if SUGGESTION_FIELDS & set(validated_data):
+            before = suggestions.task_features(instance)
+        title = instance.title
+        instance = super().update(instance, validated_data)
+        if instance.title != title:
+            autocomplete.invalidate(instance.user_id)
+        if before is not None:
+            tag_ids = [tag.pk for tag in validated_data['tags']] if tags_changed else None
+            suggestions.record(instance.user_id, before, suggestions.task_features(instance, tag_ids))
+        if tags_changed:
+            prefetch_related_objects([instance], 'tags__user')
+        return instance
+
+
+class TaskCompletionSerializer(serializers.Serializer):
+    """Resposta mínima das rotas de conclusão de tarefas"""
+    id = serializers.IntegerField()
+    completed = serializers.BooleanField()
+    completed_at = serializers.DateTimeField(allow_null=True)
+    next_occurrence = serializers.IntegerField(allow_null=True)
+
+
+class SubtaskToggleSerializer(serializers.Serializer):
+    """Entrada da marcação de subtarefa; sem `completed`, inverte o estado"""
+    completed = serializers.BooleanField(required=False, allow_null=True, default=None)
+
+
+class SubtaskReorderSerializer(serializers.Serializer):
+    """Entrada da reordenação: IDs de todas as subtarefas, na nova ordem"""
+    MAX_SUBTASKS = 1000
 
-class TaskListSerializer(serializers.ModelSerializer):
+    subtasks = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_SUBTASKS,
+    )
+
+
+class OccurrenceSerializer(serializers.Serializer):
+    """Entrada da materialização de uma ocorrência virtual"""
+    due_date = serializers.DateTimeField()
+
+
+class BulkTagSerializer(serializers.Serializer):
+    """Entrada da atribuição de etiquetas em lote"""
+    MODE_CHOICES = [
+        ('add', 'Adicionar'),
+        ('remove', 'Remover'),
+        ('replace', 'Substituir'),
+    ]
+    MAX_TASKS = 1000
+
+    tasks = OwnedPrimaryKeyRelatedField(
+        queryset=Task.objects.only('id'),
+        many=True,
+        allow_empty=False,
+        error_messages={'does_not_exist': 'Tarefa "{pk_value}" não encontrada.'},
+    )
+    tags = OwnedPrimaryKeyRelatedField(
+        queryset=Tag.objects.only('id'),
+        many=True,
+        error_messages={'does_not_exist': 'Etiqueta "{pk_value}" não encontrada.'},
+    )
+    mode = serializers.ChoiceField(choices=MODE_CHOICES, default='add')
+
+    def validate_tasks(self, value):
+        if len(value) > self.MAX_TASKS:
+            raise serializers.ValidationError(
+                f'Envie no máximo {self.MAX_TASKS} tarefas por requisição.'
+            )
+        return value
+
+    def validate(self, attrs):
+        if not attrs['tags'] and attrs['mode'] != 'replace':
+            raise serializers.ValidationError({'tags': 'Informe ao menos uma etiqueta.'})
+        return attrs
+
+
+class EmbeddedTagSerializer(serializers.ModelSerializer):
+    """Etiqueta resumida, embutida nas tarefas com `?include=tags`"""
+
+    class Meta:
+        model = Tag
+        fields = ['id', 'name', 'color']
+
+
+class TaskListSerializer(SparseFieldsetMixin, OccurrenceMixin, serializers.ModelSerializer):
     """Serializer básico para tarefas (para listagem)"""
     category_name = serializers.CharField(source='category.name', read_only=True)
     task_list_name = serializers.CharField(source='task_list.name', read_only=True)
     tags_count = serializers.SerializerMethodField()
     is_overdue = serializers.SerializerMethodField()
     priority_color = serializers.SerializerMethodField()
+    occurrence_of = serializers.SerializerMethodField()
 
     class Meta:
         model = Task
         fields = ['id', 'title', 'due_date', 'completed', 'priority', 'category_name',
                  'task_list_name', 'tags_count', 'is_overdue', 'priority_color',
-                 'created_at', 'updated_at']
+                 'recurrence_rule', 'occurrence_of', 'version', 'created_at', 'updated_at']
+
+    def get_include_fields(self):
+        return {
+            'subtasks': SubtaskSerializer(many=True, read_only=True),
+            'history': TaskHistorySerializer(read_only=True),
+            'tags': EmbeddedTagSerializer(many=True, read_only=True),
+        }
 
     def get_tags_count(self, obj):
         return obj.tags.count()
@@ -127,3 +363,34 @@ class TaskListSerializer(serializers.ModelSerializer):
     def get_priority_color(self, obj):
         return obj.get_priority_display_color()
 
+
+
+class ArchivedTaskSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """Serializer somente leitura para tarefas arquivadas"""
+    category_name = serializers.CharField(source='category.name', read_only=True)
+    task_list_name = serializers.CharField(source='task_list.name', read_only=True)
+    tags_count = serializers.SerializerMethodField()
+    is_overdue = serializers.SerializerMethodField()
+    priority_color = serializers.SerializerMethodField()
+    archived = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ArchivedTask
+        fields = ['id', 'title', 'description', 'due_date', 'completed', 'priority',
+                 'reminder', 'estimated_duration', 'task_list', 'category', 'tags',
+                 'created_at', 'updated_at', 'completed_at', 'archived_at', 'subtasks',
+                 'history', 'category_name', 'task_list_name', 'tags_count', 'is_overdue',
+                 'priority_color', 'archived']
+        read_only_fields = fields
+
+    def get_tags_count(self, obj):
+        return len(obj.tags.all())
+
+    def get_is_overdue(self, obj):
+        return obj.is_overdue()
+
+    def get_priority_color(self, obj):
+        return obj.get_priority_display_color()
+
+    def get_archived(self, obj):
+        return True
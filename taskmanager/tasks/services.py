@@ -0,0 +1,228 @@
+"""
+Serviços de conclusão de tarefas e subtarefas.
+
+Todas as rotas de conclusão (ações do TaskViewSet e TaskCompleteView /
+TaskUncompleteView) passam por aqui. A conclusão é um UPDATE condicional
+único (WHERE NOT EXISTS subtarefa pendente), seguido de um upsert idempotente
+do histórico, na mesma transação. Marcar uma subtarefa e reordenar as
+subtarefas de uma tarefa também são um UPDATE cada.
+"""
+from django.db import transaction
+from django.db.models import (
+    BooleanField, Case, Count, DateTimeField, Exists, F, OuterRef,
+    PositiveIntegerField, Subquery, Value, When,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from taskmanager.sharding import current_shard
+from reports.rollups import completion_fields, record_completion, revert_completion
+from webhooks import outbox
+from . import recurrence, timetracking
+from .models import Task, Subtask, TaskHistory, VersionConflict
+
+
+class TaskNotFound(Exception):
+    """Tarefa inexistente ou de outro usuário"""
+    message = 'Tarefa não encontrada'
+
+
+class TaskHasPendingSubtasks(Exception):
+    """Tarefa com subtarefas não concluídas"""
+    message = 'Não é possível concluir a tarefa. Todas as subtarefas devem estar concluídas.'
+
+
+class SubtaskNotFound(Exception):
+    """Subtarefa inexistente ou de tarefa de outro usuário"""
+    message = 'Subtarefa não encontrada'
+
+
+class InvalidSubtaskOrder(Exception):
+    """Nova ordem que não contém exatamente as subtarefas da tarefa"""
+    message = 'Envie os IDs de todas as subtarefas da tarefa, cada um uma única vez.'
+
+
+def complete_task(user, task_id, notes=''):
+    """
+    Marca a tarefa como concluída e cria seu histórico. Retorna um dicionário
+    com id, completed e completed_at; se a tarefa já estava concluída, retorna
+    o estado atual sem gravar nada.
+    """
+    now = timezone.now()
+    pending_subtasks = Subtask.objects.filter(task=OuterRef('pk'), completed=False)
+
+    with transaction.atomic(using=current_shard()):
+        updated = Task.objects.filter(pk=task_id, user=user, completed=False).exclude(
+            Exists(pending_subtasks)
+        ).update(
+            completed=True,
+            completed_at=Coalesce('completed_at', Value(now)),
+            updated_at=now,
+            version=F('version') + 1,
+        )
+        if not updated:
+            current = Task.objects.filter(pk=task_id, user=user).values('completed', 'completed_at').first()
+            if current is None:
+                raise TaskNotFound()
+            if not current['completed']:
+                raise TaskHasPendingSubtasks()
+            return {'id': int(task_id), **current, 'next_occurrence': None}
+
+        # O cronômetro em andamento é encerrado e entra no tempo registrado
+        timetracking.stop_task_timer(task_id)
+
+        task = Task.objects.only(
+            'id', 'user_id', 'category_id', 'priority', 'due_date',
+            'estimated_duration', 'tracked_duration', 'completed', 'completed_at',
+            'recurrence_rule',
+        ).get(pk=task_id)
+
+        # Upsert idempotente: requisições concorrentes criam um único histórico
+        history, created = TaskHistory.objects.get_or_create(
+            task_id=task_id,
+            defaults={
+                'estimated_duration': task.estimated_duration,
+                'actual_duration': task.tracked_duration or None,
+                'notes': notes,
+                **completion_fields(task, now),
+            },
+        )
+        if created:
+            record_completion(task, history)
+
+        # Tarefa recorrente: a regra passa para a próxima ocorrência, criada agora
+        next_occurrence = None
+        if task.recurrence_rule:
+            next_occurrence = recurrence.spawn_next(task.pk)
+
+        result = {
+            'id': task.pk,
+            'completed': task.completed,
+            'completed_at': task.completed_at,
+            'next_occurrence': next_occurrence.pk if next_occurrence else None,
+        }
+        outbox.emit(task.user_id, 'task.completed', task.pk, result)
+    return result
+
+
+def uncomplete_task(user, task_id):
+    """
+    Desmarca a tarefa como concluída e remove seu histórico, se existir.
+    Retorna um dicionário com id, completed e completed_at; se a tarefa não
+    estava concluída, não grava nada.
+    """
+    result = {'id': int(task_id), 'completed': False, 'completed_at': None, 'next_occurrence': None}
+    with transaction.atomic(using=current_shard()):
+        updated = Task.objects.filter(pk=task_id, user=user, completed=True).update(
+            completed=False,
+            completed_at=None,
+            updated_at=timezone.now(),
+            version=F('version') + 1,
+        )
+        if not updated:
+            if not Task.objects.filter(pk=task_id, user=user).exists():
+                raise TaskNotFound()
+            return result
+
+        history = TaskHistory.objects.select_related('task').filter(task_id=task_id).first()
+        if history is not None:
+            revert_completion(history.task, history)
+            history.delete()
+
+        outbox.emit(user.pk, 'task.uncompleted', result['id'], result)
+    return result
+
+
+def toggle_subtask(user, subtask_id, completed=None, expected_version=None):
+    """
+    Marca ou desmarca a subtarefa (sem `completed`, inverte o estado atual) em
+    um UPDATE condicional. Retorna o novo estado da subtarefa e as contagens
+    de subtarefas da tarefa; se ela já estava no estado pedido, não grava nada.
+    """
+    now = timezone.now()
+    if completed is None:
+        # No UPDATE, os dois CASE leem o valor anterior de `completed`
+        values = {
+            'completed': Case(When(completed=True, then=Value(False)), default=Value(True),
+                              output_field=BooleanField()),
+            'completed_at': Case(When(completed=True, then=Value(None)), default=Value(now),
+                                 output_field=DateTimeField()),
+        }
+    elif completed:
+        values = {'completed': True, 'completed_at': Coalesce('completed_at', Value(now))}
+    else:
+        values = {'completed': False, 'completed_at': None}
+
+    subtasks = Subtask.objects.filter(pk=subtask_id, task__user=user)
+    queryset = subtasks if expected_version is None else subtasks.filter(version=expected_version)
+    with transaction.atomic(using=current_shard()):
+        changing = queryset if completed is None else queryset.exclude(completed=completed)
+        if not changing.update(**values, updated_at=now, version=F('version') + 1):
+            if not subtasks.exists():
+                raise SubtaskNotFound()
+            if not queryset.exists():
+                raise VersionConflict()
+            return subtask_rollup(subtask_id)
+        rollup = subtask_rollup(subtask_id)
+        outbox.emit(user.pk, 'subtask.updated', rollup['id'], {
+            'id': rollup['id'],
+            'task': rollup['task']['id'],
+            'completed': rollup['completed'],
+            'completed_at': rollup['completed_at'],
+            'version': rollup['version'],
+        })
+    return rollup
+
+
+def subtask_rollup(subtask_id):
+    """Estado da subtarefa e contagens da tarefa, em uma consulta"""
+    siblings = Subtask.objects.filter(task_id=OuterRef('task_id')).order_by().values('task_id')
+    row = Subtask.objects.filter(pk=subtask_id).values(
+        'id', 'completed', 'completed_at', 'version', 'task_id',
+    ).annotate(
+        subtasks_count=Subquery(siblings.annotate(count=Count('pk')).values('count')),
+        completed_subtasks_count=Coalesce(Subquery(
+            siblings.filter(completed=True).annotate(count=Count('pk')).values('count')
+        ), 0),
+    ).get()
+
+    total, done = row.pop('subtasks_count'), row.pop('completed_subtasks_count')
+    row['task'] = {
+        'id': row.pop('task_id'),
+        'subtasks_count': total,
+        'completed_subtasks_count': done,
+        'subtasks_completion_percentage': round(done / total * 100, 2),
+        'can_be_completed': done == total,
+    }
+    return row
+
+
+def reorder_subtasks(user, task_id, subtask_ids):
+    """
+    Grava a nova ordem das subtarefas da tarefa (`subtask_ids`, na ordem de
+    exibição) em um único UPDATE com CASE, apenas nas que mudaram de posição.
+    Retorna o número de subtarefas alteradas.
+    """
+    with transaction.atomic(using=current_shard()):
+        # Bloqueia a tarefa para serializar com criações e outras reordenações
+        if Task.objects.select_for_update().filter(pk=task_id, user=user).values_list('pk').first() is None:
+            raise TaskNotFound()
+
+        current = dict(Subtask.objects.filter(task_id=task_id).values_list('pk', 'order'))
+        if len(subtask_ids) != len(current) or set(subtask_ids) != set(current):
+            raise InvalidSubtaskOrder()
+
+        changed = {pk: position for position, pk in enumerate(subtask_ids) if current[pk] != position}
+        if changed:
+            Subtask.objects.filter(pk__in=list(changed)).update(
+                order=Case(
+                    *[When(pk=pk, then=Value(position)) for pk, position in changed.items()],
+                    output_field=PositiveIntegerField(),
+                ),
+                updated_at=timezone.now(),
+                version=F('version') + 1,
+            )
+            outbox.emit_many(user.pk, 'subtask.updated', [
+                {'id': pk, 'task': int(task_id), 'order': position} for pk, position in changed.items()
+            ])
+    return len(changed)
@@ -0,0 +1,10 @@
+from django.core.signals import request_finished
+from django.dispatch import receiver
+
+from . import timetracking
+
+
+@receiver(request_finished, dispatch_uid='tasks.flush_heartbeats')
+def flush_heartbeats(sender, **kwargs):
+    """Grava os sinais de cronômetro do lote vencido, mesmo sem sinais novos no processo"""
+    timetracking.heartbeats.flush_if_due()
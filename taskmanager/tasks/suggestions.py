@@ -0,0 +1,238 @@
+"""
+Sugestão de lista, categoria e etiquetas a partir do título da tarefa.
+
+Classificador Naive Bayes incremental por usuário: `SuggestionTerm` guarda,
+para cada lista, categoria e etiqueta, quantas tarefas usaram cada termo do
+título (e, no termo vazio, quantas tarefas o destino tem). Criar, mover ou
+excluir uma tarefa aplica apenas a diferença dos seus termos, sem reler as
+demais tarefas.
+
+A consulta usa o modelo do usuário carregado em memória no processo
+(`taskmanager.user_cache`), relido apenas depois de alguma alteração.
+Apenas listas com `auto_suggestion` são sugeridas.
+"""
+import math
+import re
+import unicodedata
+from collections import Counter
+
+from django.db import connections, transaction
+from django.db.models import Prefetch
+
+from categories.models import Category
+from lists.models import TaskList
+from tags.models import Tag
+from taskmanager.sharding import current_shard
+from taskmanager.user_cache import UserCache
+from .models import Task, ArchivedTask, SuggestionTerm
+
+
+# Suavização de Laplace das contagens de termos
+ALPHA = 1.0
+# Probabilidade mínima para sugerir uma etiqueta e máximo de etiquetas
+TAG_THRESHOLD = 0.25
+MAX_TAGS = 3
+MAX_TOKEN_LENGTH = 64
+# Linhas por INSERT ao gravar as contagens
+RECORD_BATCH_SIZE = 500
+
+KINDS = ('list', 'category', 'tag')
+
+STOPWORDS = {
+    'a', 'as', 'o', 'os', 'um', 'uma', 'de', 'da', 'das', 'do', 'dos', 'e', 'em',
+    'na', 'nas', 'no', 'nos', 'para', 'pra', 'por', 'com', 'sem', 'que', 'se',
+    'ao', 'aos', 'the', 'an', 'and', 'or', 'of', 'to', 'in', 'on', 'for', 'with',
+    'at', 'by', 'is',
+}
+
+def tokenize(title):
+    """Termos do título: minúsculos, sem acentos, sem stopwords e sem repetição"""
+    text = unicodedata.normalize('NFKD', title or '').encode('ascii', 'ignore').decode().lower()
+    tokens = []
+    for token in re.split(r'[^a-z0-9]+', text):
+        if len(token) < 2 or token in STOPWORDS:
+            continue
+        token = token[:MAX_TOKEN_LENGTH]
+        if token not in tokens:
+            tokens.append(token)
+    return tokens
+
+
+def features_of(title, task_list_id=None, category_id=None, tag_ids=()):
+    """Contagens `(tipo, destino, termo)` de uma tarefa; o termo vazio conta a tarefa"""
+    tokens = [''] + tokenize(title)
+    targets = [('list', task_list_id), ('category', category_id)]
+    targets += [('tag', tag_id) for tag_id in tag_ids]
+    return Counter(
+        (kind, target_id, token)
+        for kind, target_id in targets if target_id is not None
+        for token in tokens
+    )
+
+
+def task_features(task, tag_ids=None):
+    """Contagens de uma tarefa; sem `tag_ids`, os vínculos são lidos do banco"""
+    if tag_ids is None:
+        tag_ids = Task.tags.through.objects.filter(task_id=task.pk).values_list('tag_id', flat=True)
+    return features_of(task.title, task.task_list_id, task.category_id, list(tag_ids))
+
+
+def _apply(user_id, delta):
+    """Soma as contagens com INSERT ... ON CONFLICT DO UPDATE, em lotes"""
+    rows = [(user_id, kind, target_id, token, count)
+            for (kind, target_id, token), count in delta.items() if count]
+    connection = connections[current_shard()]
+    quote = connection.ops.quote_name
+    table = quote(SuggestionTerm._meta.db_table)
+    count = quote('count')
+    columns = [quote(name) for name in ('user_id', 'kind', 'target_id', 'token', 'count')]
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), RECORD_BATCH_SIZE):
+            batch = rows[start:start + RECORD_BATCH_SIZE]
+            cursor.execute(
+                f'INSERT INTO {table} ({", ".join(columns)}) '
+                f'VALUES {", ".join(["(%s, %s, %s, %s, %s)"] * len(batch))} '
+                f'ON CONFLICT ({", ".join(columns[:4])}) '
+                f'DO UPDATE SET {count} = {table}.{count} + EXCLUDED.{count}',
+                [value for row in batch for value in row],
+            )
+
+
+def record(user_id, before=None, after=None):
+    """Aplica a diferença entre as contagens antigas e novas de uma ou mais tarefas"""
+    delta = Counter(after or {})
+    delta.subtract(before or {})
+    if not any(delta.values()):
+        return
+    with transaction.atomic(using=current_shard()):
+        _apply(user_id, delta)
+        if any(count < 0 for count in delta.values()):
+            SuggestionTerm.objects.filter(user_id=user_id, count__lte=0).delete()
+        invalidate(user_id)
+
+
+def forget(user_id, kind, target_ids):
+    """Remove os termos de destinos excluídos"""
+    with transaction.atomic(using=current_shard()):
+        SuggestionTerm.objects.filter(user_id=user_id, kind=kind, target_id__in=target_ids).delete()
+        invalidate(user_id)
+
+
+def rebuild_tag(user_id, tag_id, chunk_size=1000):
+    """Recalcula os termos de uma etiqueta (após a união de etiquetas)"""
+    features = Counter()
+    for model in (Task, ArchivedTask):
+        titles = model.objects.filter(user_id=user_id, tags=tag_id).values_list('title', flat=True)
+        for title in titles.iterator(chunk_size=chunk_size):
+            features.update(('tag', tag_id, token) for token in [''] + tokenize(title))
+    with transaction.atomic(using=current_shard()):
+        SuggestionTerm.objects.filter(user_id=user_id, kind='tag', target_id=tag_id).delete()
+        _apply(user_id, features)
+        invalidate(user_id)
+
+
+def rebuild_user(user_id, chunk_size=1000):
+    """Recalcula todos os termos do usuário, lendo as tarefas em blocos"""
+    processed = 0
+    with transaction.atomic(using=current_shard()):
+        SuggestionTerm.objects.filter(user_id=user_id).delete()
+        for model in (Task, ArchivedTask):
+            queryset = model.objects.filter(user_id=user_id).only(
+                'id', 'title', 'task_list_id', 'category_id'
+            ).prefetch_related(Prefetch('tags', queryset=Tag.objects.only('id')))
+            last_pk = 0
+            while True:
+                chunk = list(queryset.filter(pk__gt=last_pk).order_by('pk')[:chunk_size])
+                if not chunk:
+                    break
+                features = Counter()
+                for task in chunk:
+                    features.update(features_of(
+                        task.title, task.task_list_id, task.category_id,
+                        [tag.pk for tag in task.tags.all()],
+                    ))
+                _apply(user_id, features)
+                processed += len(chunk)
+                last_pk = chunk[-1].pk
+        invalidate(user_id)
+    return processed
+
+
+def _build_model(user_id):
+    """Modelo do usuário: contagens por destino e logaritmos já calculados"""
+    terms = {kind: {} for kind in KINDS}
+    for kind, target_id, token, count in SuggestionTerm.objects.filter(
+        user_id=user_id
+    ).values_list('kind', 'target_id', 'token', 'count'):
+        target = terms[kind].setdefault(target_id, {'docs': 0, 'tokens': {}})
+        if token:
+            target['tokens'][token] = count
+        else:
+            target['docs'] = count
+
+    # Destinos ainda válidos; listas só com a sugestão automática ligada
+    allowed = {
+        'list': set(TaskList.objects.filter(
+            user_id=user_id, auto_suggestion=True, deletion_requested_at__isnull=True,
+        ).values_list('pk', flat=True)),
+        'category': set(Category.objects.filter(
+            user_id=user_id, deletion_requested_at__isnull=True,
+        ).values_list('pk', flat=True)),
+        'tag': set(Tag.objects.filter(user_id=user_id).values_list('pk', flat=True)),
+    }
+
+    model = {}
+    for kind in KINDS:
+        targets = {
+            target_id: target for target_id, target in terms[kind].items()
+            if target_id in allowed[kind] and target['docs'] > 0
+        }
+        vocabulary = len({token for target in targets.values() for token in target['tokens']})
+        docs = sum(target['docs'] for target in targets.values())
+        for target in targets.values():
+            total = sum(target['tokens'].values())
+            target['prior'] = math.log(target['docs'] / docs)
+            target['denominator'] = math.log(total + ALPHA * (vocabulary + 1))
+        model[kind] = targets
+    return model
+
+
+_models = UserCache('task-suggestions', _build_model)
+invalidate = _models.invalidate
+load_model = _models.get
+
+
+def _rank(targets, tokens):
+    """Probabilidade de cada destino com evidência nos termos, da maior para a menor"""
+    scores = {}
+    for target_id, target in targets.items():
+        counts = target['tokens']
+        if not any(token in counts for token in tokens):
+            continue
+        scores[target_id] = target['prior'] + sum(
+            math.log(counts.get(token, 0) + ALPHA) - target['denominator']
+            for token in tokens
+        )
+    if not scores:
+        return []
+    best = max(scores.values())
+    weights = {target_id: math.exp(score - best) for target_id, score in scores.items()}
+    total = sum(weights.values())
+    return sorted(
+        ({'id': target_id, 'score': round(weight / total, 4)} for target_id, weight in weights.items()),
+        key=lambda item: -item['score'],
+    )
+
+
+def suggest(user_id, title):
+    """Lista, categoria e etiquetas mais prováveis para o título"""
+    tokens = tokenize(title)
+    model = load_model(user_id)
+    lists = _rank(model['list'], tokens)
+    categories = _rank(model['category'], tokens)
+    tags = [item for item in _rank(model['tag'], tokens) if item['score'] >= TAG_THRESHOLD]
+    return {
+        'task_list': lists[0] if lists else None,
+        'category': categories[0] if categories else None,
+        'tags': tags[:MAX_TAGS],
+    }
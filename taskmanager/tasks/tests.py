@@ -1,3 +1,1565 @@
-from django.test import TestCase
+import importlib
+import json
+import re
+import threading
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from itertools import islice
+from unittest import mock, skipUnless
+from zoneinfo import ZoneInfo
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import OperationalError, connection, connections
+from django.db.models import F
+from django.test import AsyncClient, Client, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.authtoken.models import Token
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.test import APIClient
+
+from accounts.models import CalendarFeed, UserShard
+from categories.models import Category
+from lists.models import TaskList
+from tags.models import Tag
+from taskmanager import admission, async_views, autocomplete, batch, sharding, warmup
+from taskmanager.admin_utils import EstimatedCountPaginator
+from webhooks.models import OutboxEvent
+from . import agenda, archive, rebalance, recurrence, suggestions, timetracking
+from .concurrency import OptimisticConcurrencyMixin
+from .models import ArchivedTask, Subtask, SuggestionTerm, Task, TaskHistory, TimeEntry
+from .serializers import TaskSerializer
+from .views import TaskViewSet
+
+
+class TaskTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('ana', password='senha-segura-1')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_task(self, **fields):
+        return Task.objects.create(user=self.user, title=fields.pop('title', 'Relatório'), **fields)
+
+    def subscribe(self):
+        """Webhook para todos os eventos, para que o outbox grave os eventos do usuário"""
+        response = self.client.post('/api/webhooks/', {'url': 'https://example.com/hook'}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+    def events(self, event_type=None):
+        events = OutboxEvent.objects.filter(user=self.user)
+        if event_type is not None:
+            events = events.filter(event_type=event_type)
+        return list(events.values_list('event_type', 'object_id'))
+
+
+class TaskCompletionTests(TaskTestCase):
+    def test_update_completes_through_completion_service(self):
+        self.subscribe()
+        task = self.create_task()
+
+        response = self.client.patch(f'/api/tasks/{task.pk}/', {'completed': True}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['completed'], True)
+        self.assertEqual(response.data['version'], task.version + 1)
+        task.refresh_from_db()
+        self.assertIsNotNone(task.completed_at)
+        self.assertTrue(TaskHistory.objects.filter(task=task).exists())
+        self.assertIn(('task.completed', task.pk), self.events())
+
+    def test_update_uncompletes_through_completion_service(self):
+        task = self.create_task()
+        self.client.post(f'/api/tasks/{task.pk}/complete/')
+
+        response = self.client.put(f'/api/tasks/{task.pk}/', {'title': 'Revisado', 'completed': False}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        task.refresh_from_db()
+        self.assertEqual((task.title, task.completed, task.completed_at), ('Revisado', False, None))
+        self.assertFalse(TaskHistory.objects.filter(task=task).exists())
+
+    def test_update_with_pending_subtasks_changes_nothing(self):
+        task = self.create_task()
+        task.subtasks.create(title='Passo')
+
+        response = self.client.patch(
+            f'/api/tasks/{task.pk}/', {'title': 'Revisado', 'completed': True}, format='json'
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('completed', response.data)
+        task.refresh_from_db()
+        self.assertEqual((task.title, task.completed), ('Relatório', False))
+
+    def test_update_completion_with_stale_if_match_fails(self):
+        task = self.create_task()
+        Task.objects.filter(pk=task.pk).update(version=F('version') + 1)
+
+        response = self.client.patch(
+            f'/api/tasks/{task.pk}/', {'completed': True}, format='json', HTTP_IF_MATCH=f'"{task.version}"'
+        )
+
+        self.assertEqual(response.status_code, 412)
+        self.assertFalse(Task.objects.get(pk=task.pk).completed)
+
+    def test_create_completed_task_records_history(self):
+        response = self.client.post('/api/tasks/', {'title': 'Nova', 'completed': True}, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(response.data['completed'])
+        self.assertTrue(TaskHistory.objects.filter(task_id=response.data['id'], task__completed=True).exists())
+
+    def test_completing_completed_task_writes_nothing(self):
+        self.subscribe()
+        task = self.create_task()
+        self.client.post(f'/api/tasks/{task.pk}/complete/')
+        task.refresh_from_db()
+
+        response = self.client.post(f'/api/tasks/{task.pk}/complete/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['task']['completed_at'], timezone.localtime(task.completed_at).isoformat())
+        again = Task.objects.get(pk=task.pk)
+        self.assertEqual((again.version, again.updated_at), (task.version, task.updated_at))
+        self.assertEqual(self.events('task.completed'), [('task.completed', task.pk)])
+
+    def test_uncompleting_pending_task_writes_nothing(self):
+        self.subscribe()
+        task = self.create_task()
+
+        response = self.client.post(f'/api/tasks/{task.pk}/uncomplete/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Task.objects.get(pk=task.pk).version, task.version)
+        self.assertEqual(self.events('task.uncompleted'), [])
+
+    def test_complete_unknown_task(self):
+        other = User.objects.create_user('bia', password='senha-segura-1')
+        task = Task.objects.create(user=other, title='Alheia')
+
+        for action in ('complete', 'uncomplete'):
+            for pk in (task.pk, 'abc'):
+                with self.subTest(action=action, pk=pk):
+                    response = self.client.post(f'/api/tasks/{pk}/{action}/')
+                    self.assertEqual(response.status_code, 404)
+                    self.assertEqual(response.data, {'error': 'Tarefa não encontrada'})
+        self.assertEqual(Task.objects.get(pk=task.pk).version, task.version)
+
+
+class TaskConcurrencyTests(TaskTestCase):
+    def test_delete_with_stale_if_match_fails(self):
+        task = self.create_task()
+
+        response = self.client.delete(f'/api/tasks/{task.pk}/', HTTP_IF_MATCH=f'"{task.version - 1}"')
+
+        self.assertEqual(response.status_code, 412)
+        self.assertTrue(Task.objects.filter(pk=task.pk).exists())
+
+    def test_delete_fails_when_task_changes_after_if_match_check(self):
+        task = self.create_task()
+        check = OptimisticConcurrencyMixin.get_expected_version
+
+        def check_then_concurrent_update(view, instance):
+            expected = check(view, instance)
+            Task.objects.filter(pk=task.pk).update(title='Alterada', version=F('version') + 1)
+            return expected
+
+        with mock.patch.object(OptimisticConcurrencyMixin, 'get_expected_version', check_then_concurrent_update):
+            response = self.client.delete(f'/api/tasks/{task.pk}/', HTTP_IF_MATCH=f'"{task.version}"')
+
+        self.assertEqual(response.status_code, 412)
+        self.assertTrue(Task.objects.filter(pk=task.pk).exists())
+
+    def test_delete_with_current_if_match(self):
+        task = self.create_task()
+
+        response = self.client.delete(f'/api/tasks/{task.pk}/', HTTP_IF_MATCH=f'"{task.version}"')
+
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Task.objects.filter(pk=task.pk).exists())
+
+
+class BulkTagTests(TaskTestCase):
+    def setUp(self):
+        super().setUp()
+        self.urgent = Tag.objects.create(user=self.user, name='urgente')
+
+    def bulk_tags(self, tasks, mode):
+        return self.client.post('/api/tasks/bulk-tags/', {
+            'tasks': [task.pk for task in tasks], 'tags': [self.urgent.pk], 'mode': mode,
+        }, format='json')
+
+    def test_only_tasks_whose_tags_changed_are_updated(self):
+        self.subscribe()
+        tagged, untagged = self.create_task(), self.create_task()
+        tagged.tags.add(self.urgent)
+
+        response = self.bulk_tags([tagged, untagged], 'add')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Task.objects.get(pk=tagged.pk).version, tagged.version)
+        self.assertEqual(Task.objects.get(pk=untagged.pk).version, untagged.version + 1)
+        self.assertEqual(self.events('task.updated'), [('task.updated', untagged.pk)])
+
+    def test_removing_absent_tag_writes_nothing(self):
+        self.subscribe()
+        task = self.create_task()
+
+        self.bulk_tags([task], 'remove')
+
+        self.assertEqual(Task.objects.get(pk=task.pk).version, task.version)
+        self.assertEqual(self.events(), [])
+
+
+@skipUnless(sharding.is_sharded(), 'requer TASK_SHARD_COUNT > 1')
+class RebalanceTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.user = User.objects.create_user('ana', password='senha-segura-1')
+        self.source = sharding.shard_for_user(self.user.pk)
+        self.target = next(alias for alias in sharding.shard_aliases() if alias != self.source)
+        with sharding.use_shard(self.source):
+            self.task = Task.objects.create(user=self.user, title='Relatório')
+
+    def source_tasks(self):
+        return Task.objects.using(self.source).filter(user=self.user)
+
+    def test_move_user(self):
+        result = rebalance.move_user(self.user.pk, self.target, grace_seconds=0)
+
+        self.assertEqual(result['source'], self.source)
+        self.assertEqual(sharding.shard_for_user(self.user.pk), self.target)
+        self.assertEqual(Task.objects.using(self.target).get(pk=self.task.pk).title, 'Relatório')
+        self.assertFalse(self.source_tasks().exists())
+
+    def test_write_during_final_copy_starts_another_round(self):
+        prune = rebalance.prune_user_data
+        writes = []
+
+        def prune_then_write(*args, **kwargs):
+            pruned = prune(*args, **kwargs)
+            if not writes:
+                writes.append(self.source_tasks().update(title='Atrasada'))
+            return pruned
+
+        with mock.patch.object(rebalance, 'prune_user_data', prune_then_write):
+            rebalance.move_user(self.user.pk, self.target, grace_seconds=0)
+
+        self.assertEqual(Task.objects.using(self.target).get(pk=self.task.pk).title, 'Atrasada')
+
+    def test_source_that_never_settles_is_not_switched(self):
+        def prune_then_write(*args, **kwargs):
+            self.source_tasks().update(version=F('version') + 1)
+
+        with mock.patch.object(rebalance, 'prune_user_data', prune_then_write):
+            with self.assertRaises(rebalance.WritesDidNotSettle):
+                rebalance.move_user(self.user.pk, self.target, grace_seconds=0, max_rounds=2)
+
+        self.assertEqual(sharding.get_user_shard(self.user.pk), (self.source, False))
+
+    def test_write_after_switch_keeps_source(self):
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            if len(sleeps) == 2:
+                self.source_tasks().update(title='Atrasada')
+
+        with mock.patch.object(rebalance.time, 'sleep', sleep):
+            with self.assertRaises(rebalance.LateWrites):
+                rebalance.move_user(self.user.pk, self.target, grace_seconds=0)
+
+        self.assertEqual(sharding.shard_for_user(self.user.pk), self.target)
+        self.assertEqual(self.source_tasks().get().title, 'Atrasada')
+
+
+@skipUnless(sharding.is_sharded(), 'requer TASK_SHARD_COUNT > 1')
+class AsyncShardTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.user = User.objects.create_user('ana', password='senha-segura-1')
+        self.token = Token.objects.create(user=self.user)
+        # Fora do banco padrão, para que uma leitura no banco errado não ache a tarefa
+        alias = sharding.shard_aliases()[-1]
+        UserShard.objects.filter(user=self.user).update(database=alias)
+        sharding.mirror_user(self.user, alias)
+        with sharding.use_shard(alias):
+            self.task = Task.objects.create(user=self.user, title='Relatório')
+
+    async def test_async_read_uses_the_user_shard(self):
+        response = await AsyncClient().get(
+            f'/api/tasks/{self.task.pk}/', headers={'Authorization': f'Token {self.token.key}'}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['title'], 'Relatório')
+
+
+class HeartbeatBufferTests(TaskTestCase):
+    def test_flush_keeps_heartbeats_of_moving_users(self):
+        task = self.create_task()
+        entry = TimeEntry.objects.create(user=self.user, task=task, started_at=timezone.now())
+        buffer = timetracking.HeartbeatBuffer()
+        moment = timezone.now()
+        buffer.add(self.user.pk, entry.pk, moment)
+
+        with mock.patch.object(timetracking, 'get_user_shards', return_value={self.user.pk: ('default', True)}):
+            self.assertEqual(buffer.flush(), 0)
+        self.assertIsNone(TimeEntry.objects.get(pk=entry.pk).last_heartbeat_at)
+
+        self.assertEqual(buffer.flush(), 1)
+        self.assertEqual(TimeEntry.objects.get(pk=entry.pk).last_heartbeat_at, moment)
+
+
+class TimeTrackingTests(TaskTestCase):
+    def setUp(self):
+        super().setUp()
+        # O registro em andamento fica no cache, que sobrevive entre os testes
+        cache.clear()
+        self.task = self.create_task()
+
+    def start_entry(self, minutes_ago):
+        started_at = timezone.now() - timedelta(minutes=minutes_ago)
+        return TimeEntry.objects.create(user=self.user, task=self.task, started_at=started_at)
+
+    def test_start_is_idempotent_and_closes_the_running_timer(self):
+        response = self.client.post(f'/api/tasks/{self.task.pk}/timer/start/')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.client.post(f'/api/tasks/{self.task.pk}/timer/start/').status_code, 200)
+
+        other = self.create_task(title='Outra')
+        response = self.client.post(f'/api/tasks/{other.pk}/timer/start/')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(TimeEntry.objects.filter(ended_at__isnull=True).get().task_id, other.pk)
+        self.assertIsNotNone(TimeEntry.objects.get(task=self.task).ended_at)
+
+    def test_start_rejects_completed_and_foreign_tasks(self):
+        completed = self.create_task(completed=True)
+        foreign = Task.objects.create(user=User.objects.create_user('bia'), title='Alheia')
+
+        self.assertEqual(self.client.post(f'/api/tasks/{completed.pk}/timer/start/').status_code, 400)
+        self.assertEqual(self.client.post(f'/api/tasks/{foreign.pk}/timer/start/').status_code, 404)
+        self.assertFalse(TimeEntry.objects.exists())
+
+    def test_stop_adds_duration_to_task(self):
+        entry = self.start_entry(minutes_ago=3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/api/tasks/{self.task.pk}/timer/stop/')
+
+        self.assertEqual(response.status_code, 200)
+        entry.refresh_from_db()
+        self.task.refresh_from_db()
+        self.assertGreaterEqual(entry.duration, timedelta(minutes=3))
+        self.assertLess(entry.duration, timedelta(minutes=4))
+        self.assertEqual(self.task.tracked_duration, entry.duration)
+        self.assertEqual(self.task.version, 2)
+        self.assertEqual(self.client.post(f'/api/tasks/{self.task.pk}/timer/stop/').status_code, 400)
+
+    def test_stale_timer_ends_at_last_heartbeat(self):
+        entry = self.start_entry(minutes_ago=60)
+        last_heartbeat = entry.started_at + timedelta(minutes=20)
+        TimeEntry.objects.filter(pk=entry.pk).update(last_heartbeat_at=last_heartbeat)
+
+        self.client.post(f'/api/tasks/{self.task.pk}/timer/stop/')
+
+        entry.refresh_from_db()
+        self.assertEqual((entry.ended_at, entry.duration), (last_heartbeat, timedelta(minutes=20)))
+
+    def test_heartbeat_is_buffered_without_writes(self):
+        entry = self.start_entry(minutes_ago=1)
+        self.assertEqual(self.client.post(f'/api/tasks/{self.task.pk}/timer/heartbeat/').status_code, 204)
+        other = self.create_task(title='Outra')
+        self.assertEqual(self.client.post(f'/api/tasks/{other.pk}/timer/heartbeat/').status_code, 400)
+
+        with self.assertNumQueries(0):
+            self.assertTrue(timetracking.heartbeat(self.user, self.task.pk))
+        self.assertIsNone(TimeEntry.objects.get(pk=entry.pk).last_heartbeat_at)
+        self.assertIsNotNone(timetracking.heartbeats.get(entry.pk))
+        timetracking.heartbeats.flush()
+        self.assertIsNotNone(TimeEntry.objects.get(pk=entry.pk).last_heartbeat_at)
+
+    def test_buffer_flushes_by_size_and_at_request_end(self):
+        now = timezone.now()
+        entries = [
+            TimeEntry.objects.create(user=self.user, task=self.task, started_at=now, ended_at=now,
+                                     duration=timedelta()),
+            self.start_entry(minutes_ago=1),
+        ]
+        moment = timezone.now()
+        buffer = timetracking.HeartbeatBuffer()
+
+        with self.settings(TIME_TRACKING={'HEARTBEAT_FLUSH_SIZE': 2}):
+            buffer.add(self.user.pk, entries[0].pk, moment)
+            self.assertFalse(buffer.flush_if_due())
+            buffer.add(self.user.pk, entries[1].pk, moment)
+        # Registros já encerrados não recebem o sinal
+        self.assertIsNone(TimeEntry.objects.get(pk=entries[0].pk).last_heartbeat_at)
+        self.assertEqual(TimeEntry.objects.get(pk=entries[1].pk).last_heartbeat_at, moment)
+
+        TimeEntry.objects.filter(pk=entries[1].pk).update(last_heartbeat_at=None)
+        with mock.patch.object(timetracking, 'heartbeats', buffer):
+            buffer.add(self.user.pk, entries[1].pk, moment)
+            self.client.get('/api/tasks/')
+            self.assertIsNone(TimeEntry.objects.get(pk=entries[1].pk).last_heartbeat_at)
+            with self.settings(TIME_TRACKING={'HEARTBEAT_FLUSH_INTERVAL': 0}):
+                self.client.get('/api/tasks/')
+        self.assertEqual(TimeEntry.objects.get(pk=entries[1].pk).last_heartbeat_at, moment)
+
+    def test_completion_stops_timer_and_records_tracked_duration(self):
+        TimeEntry.objects.create(user=self.user, task=self.task, started_at=timezone.now(),
+                                 ended_at=timezone.now(), duration=timedelta(minutes=15))
+        Task.objects.filter(pk=self.task.pk).update(tracked_duration=timedelta(minutes=15))
+        running = self.start_entry(minutes_ago=2)
+
+        response = self.client.post(f'/api/tasks/{self.task.pk}/complete/')
+
+        self.assertEqual(response.status_code, 200)
+        running.refresh_from_db()
+        self.assertIsNotNone(running.ended_at)
+        history = TaskHistory.objects.get(task=self.task)
+        self.assertEqual(history.actual_duration, timedelta(minutes=15) + running.duration)
+        self.assertEqual(self.client.post(f'/api/tasks/{self.task.pk}/timer/start/').status_code, 400)
+
+
+class BatchTests(TaskTestCase):
+    def batch(self, *paths):
+        return self.client.post('/api/batch/', {
+            'requests': [{'path': path} for path in paths],
+        }, format='json')
+
+    def run_batch(self, *items, **data):
+        response = self.client.post('/api/batch/', {'requests': list(items), **data}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data['responses']
+
+    def test_reads_and_writes_run_in_the_order_sent(self):
+        task = self.create_task()
+        path = f'/api/tasks/{task.pk}/'
+
+        before, write, after = self.run_batch(
+            {'path': path},
+            {'method': 'PATCH', 'path': path, 'body': {'title': 'Revisado'}},
+            {'path': path},
+        )
+
+        self.assertEqual((before['body']['title'], after['body']['title']), ('Relatório', 'Revisado'))
+        self.assertEqual(write['status'], 200)
+        self.assertEqual(after['headers']['ETag'], f'"{task.version + 1}"')
+
+    def test_failing_items_do_not_affect_the_others(self):
+        task = self.create_task()
+        other = self.create_task(title='Outra')
+
+        with mock.patch.object(TaskViewSet, 'retrieve', side_effect=RuntimeError('falha')), \
+                self.assertLogs('taskmanager.batch', 'ERROR'):
+            results = self.run_batch(
+                {'method': 'DELETE', 'path': '/api/tasks/999999/'},
+                {'path': '/api/inexistente/'},
+                {'method': 'POST', 'path': '/api/tasks/', 'body': {'title': ''}},
+                {'path': f'/api/tasks/{task.pk}/'},
+                {'method': 'PATCH', 'path': f'/api/tasks/{other.pk}/', 'body': {'title': 'Revisada'}},
+                {'method': 'POST', 'path': f'/api/tasks/{task.pk}/complete/'},
+            )
+
+        self.assertEqual([result['status'] for result in results], [404, 404, 400, 500, 200, 200])
+        self.assertIn('title', results[2]['body'])
+        self.assertEqual(results[3]['body'], {'detail': 'Erro interno do servidor.'})
+        self.assertEqual(Task.objects.get(pk=other.pk).title, 'Revisada')
+        self.assertTrue(Task.objects.get(pk=task.pk).completed)
+
+    def test_request_limit_and_invalid_items_reject_the_batch(self):
+        task = self.create_task()
+        item = {'path': f'/api/tasks/{task.pk}/'}
+
+        self.assertEqual(len(self.run_batch(*[item] * 20)), 20)
+        for items in ([item] * 21, [], [{'path': '/admin/'}], [{'path': '/api/batch/'}],
+                      [{'method': 'TRACE', 'path': '/api/tasks/'}]):
+            with self.subTest(count=len(items)):
+                response = self.client.post('/api/batch/', {'requests': items}, format='json')
+                self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/batch/', {'requests': [item] * 21}, format='json')
+        self.assertIn('no máximo 20', str(response.data['requests']))
+
+    def test_writes_wait_while_the_user_is_moving(self):
+        task = self.create_task()
+        path = f'/api/tasks/{task.pk}/'
+
+        with mock.patch.object(sharding, 'get_user_shard', return_value=('default', True)):
+            read, write = self.run_batch({'path': path}, {'method': 'PATCH', 'path': path, 'body': {'title': 'X'}})
+
+        self.assertEqual(read['status'], 200)
+        self.assertEqual((write['status'], write['headers']['Retry-After']), (503, '5'))
+        self.assertEqual(Task.objects.get(pk=task.pk).title, 'Relatório')
+
+    def test_item_headers_are_forwarded_but_outer_conditionals_are_not(self):
+        task = self.create_task()
+        path = f'/api/tasks/{task.pk}/'
+
+        response = self.client.post('/api/batch/', {'requests': [
+            {'method': 'PATCH', 'path': path, 'body': {'title': 'A'}},
+            {'method': 'PATCH', 'path': path, 'body': {'title': 'B'}, 'headers': {'If-Match': '"1"'}},
+        ]}, format='json', HTTP_IF_MATCH='"99"')
+
+        self.assertEqual([item['status'] for item in response.data['responses']], [200, 412])
+        self.assertEqual(Task.objects.get(pk=task.pk).title, 'A')
+
+    def test_parallel_reads_run_in_the_callers_shard(self):
+        seen = []
+
+        def record(request, item):
+            seen.append((item['path'], sharding.current_shard(), threading.current_thread().name))
+            return batch.error_result(200, 'ok')
+
+        items = [{'method': 'GET', 'path': f'/api/tasks/{pk}/'} for pk in range(1, 5)]
+        results = [None] * len(items)
+        request = mock.Mock(user=self.user)
+        with mock.patch.object(batch, 'run_subrequest', side_effect=record), sharding.use_shard('shard_9'):
+            batch.BatchView().run_reads(request, items, list(range(len(items))), results, parallel=True)
+
+        self.assertEqual(sorted(path for path, _, _ in seen), [item['path'] for item in items])
+        self.assertEqual({shard for _, shard, _ in seen}, {'shard_9'})
+        self.assertNotIn(threading.current_thread().name, {name for _, _, name in seen})
+        self.assertEqual([result['status'] for result in results], [200] * len(items))
+
+    def test_streaming_response_fails_only_its_item(self):
+        task = self.create_task()
+        feed = CalendarFeed.objects.create(user=self.user, token='token-do-feed')
+
+        response = self.batch(f'/api/tasks/calendar/{feed.token}.ics', f'/api/tasks/{task.pk}/')
+
+        self.assertEqual(response.status_code, 200)
+        feed_result, task_result = response.data['responses']
+        self.assertEqual(feed_result['status'], 400)
+        self.assertEqual(task_result['status'], 200)
+        self.assertEqual(task_result['body']['id'], task.pk)
+
+
+@skipUnless(sharding.is_sharded(), 'requer TASK_SHARD_COUNT > 1')
+class ParallelBatchShardTests(TransactionTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.user = User.objects.create_user('ana', password='senha-segura-1')
+        self.token = Token.objects.create(user=self.user)
+        # Fora do banco padrão: uma thread no banco errado não acha as tarefas
+        alias = sharding.shard_aliases()[-1]
+        UserShard.objects.filter(user=self.user).update(database=alias)
+        sharding.mirror_user(self.user, alias)
+        with sharding.use_shard(alias):
+            self.tasks = [Task.objects.create(user=self.user, title=f'Tarefa {index}') for index in range(4)]
+
+    def test_parallel_reads_use_the_user_shard(self):
+        response = self.client.post('/api/batch/', {
+            'requests': [{'path': f'/api/tasks/{task.pk}/'} for task in self.tasks],
+            'parallel': True,
+        }, content_type='application/json', HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['responses']
+        self.assertEqual([result['status'] for result in results], [200] * 4)
+        self.assertEqual([result['body']['title'] for result in results], [task.title for task in self.tasks])
+
+
+class AdmissionTestMixin:
+    def setUp(self):
+        super().setUp()
+        self.controller = admission.AdmissionController(admission.get_config())
+        patcher = mock.patch.object(admission, 'get_controller', return_value=self.controller)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # Cliente novo: o middleware pega o controlador ao montar a cadeia
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.key = 'ip:127.0.0.1'
+
+    def exhaust_user(self):
+        while self.controller.per_user.try_acquire(self.key):
+            pass
+
+
+class AdmissionTests(AdmissionTestMixin, TaskTestCase):
+    def test_lane_queues_until_release_or_timeout(self):
+        lane = admission.Lane(1, queue_size=1)
+        self.assertTrue(lane.try_acquire())
+        self.assertFalse(lane.acquire(timeout=0.01))
+
+        threading.Timer(0.05, lane.release).start()
+        self.assertTrue(lane.acquire(timeout=2))
+        self.assertEqual(lane.in_flight, 1)
+
+    def test_full_lane_queue_refuses_without_waiting(self):
+        lane = admission.Lane(1, queue_size=0)
+        lane.try_acquire()
+
+        self.assertFalse(lane.acquire(timeout=10))
+
+    def test_per_key_limit(self):
+        limit = admission.PerKeyLimit(1)
+        self.assertTrue(limit.try_acquire('ana'))
+        self.assertFalse(limit.try_acquire('ana'))
+        self.assertTrue(limit.try_acquire('bia'))
+
+        limit.release('ana')
+        self.assertTrue(limit.try_acquire('ana'))
+
+    def test_expensive_patterns(self):
+        cases = [
+            ('GET', '/api/tasks/', True), ('GET', '/api/tasks/upcoming/', True),
+            ('GET', '/api/lists/3/tasks/', True), ('GET', '/api/reports/', True),
+            ('POST', '/api/tags/3/merge/', True), ('GET', '/api/tasks/3/', False),
+            ('POST', '/api/tasks/', False), ('POST', '/api/batch/', False),
+        ]
+        for method, path, expensive in cases:
+            with self.subTest(method=method, path=path):
+                self.assertEqual(self.controller.is_expensive_path(method, path), expensive)
+
+    def test_user_over_limit_gets_503_only_for_expensive_requests(self):
+        task = self.create_task()
+        self.exhaust_user()
+
+        response = self.client.get('/api/tasks/')
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], str(admission.get_config()['RETRY_AFTER']))
+        self.assertEqual(self.client.get(f'/api/tasks/{task.pk}/').status_code, 200)
+
+    def test_saturated_worker_refuses_cheap_requests(self):
+        while self.controller.worker.try_acquire():
+            pass
+
+        self.assertEqual(self.client.get('/api/tasks/1/').status_code, 503)
+
+    def test_batch_items_are_admitted_one_by_one(self):
+        task = self.create_task()
+        self.exhaust_user()
+
+        response = self.client.post('/api/batch/', {
+            'requests': [{'path': '/api/tasks/'}, {'path': f'/api/tasks/{task.pk}/'}],
+        }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        refused, cheap = response.data['responses']
+        self.assertEqual((refused['status'], refused['headers']), (503, {'Retry-After': '2'}))
+        self.assertEqual(cheap['status'], 200)
+
+
+# Leituras em paralelo usam outras conexões: os dados precisam estar gravados
+class ParallelBatchAdmissionTests(AdmissionTestMixin, TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('ana', password='senha-segura-1')
+        super().setUp()
+
+    def test_parallel_batch_waits_for_its_own_expensive_reads(self):
+        paths = ['/api/tasks/', '/api/lists/', '/api/categories/', '/api/tags/', '/api/reports/']
+
+        response = self.client.post('/api/batch/', {
+            'requests': [{'path': path} for path in paths], 'parallel': True,
+        }, format='json')
+
+        self.assertEqual([item['status'] for item in response.data['responses']], [200] * len(paths))
+        self.assertEqual(self.controller.per_user.counts, {})
+        self.assertEqual((self.controller.expensive.in_flight, self.controller.worker.in_flight), (0, 0))
+
+
+class WarmupTests(TestCase):
+    def failing_connection(self):
+        return mock.patch.object(
+            connections['default'], 'ensure_connection', side_effect=OperationalError('banco indisponível'),
+        )
+
+    def test_failing_database_does_not_stop_warm_up(self):
+        with self.failing_connection(), self.assertLogs('taskmanager.warmup', 'WARNING') as logs:
+            timings = warmup.warm_up(connect=True)
+
+        self.assertEqual(set(timings), {'urls', 'views', 'databases'})
+        self.assertIn('Falha ao abrir as conexões', logs.output[0])
+
+    def test_failing_view_is_skipped(self):
+        warm_view = warmup.warm_view
+        failed = []
+
+        def flaky(callback):
+            if not failed:
+                failed.append(callback)
+                raise RuntimeError('falha')
+            return warm_view(callback)
+
+        with mock.patch.object(warmup, 'warm_view', side_effect=flaky), \
+                self.assertLogs('taskmanager.warmup', 'WARNING') as logs:
+            warmup.warm_up(connect=False)
+
+        self.assertEqual(len(failed), 1)
+        self.assertEqual(len(logs.output), 1)
+
+    def test_wsgi_loads_with_database_down(self):
+        from taskmanager import wsgi
+
+        with self.settings(WARMUP={'ENABLED': True}), self.failing_connection(), \
+                mock.patch.object(warmup, 'warm_up', wraps=warmup.warm_up) as warm_up, \
+                self.assertLogs('taskmanager.warmup', 'WARNING'):
+            module = importlib.reload(wsgi)
+
+        warm_up.assert_called_once_with()
+        self.assertTrue(callable(module.application))
+        self.assertEqual(self.client.get('/api/tasks/').status_code, 401)
+
+
+class CalendarFeedTests(TaskTestCase):
+    def setUp(self):
+        super().setUp()
+        self.feed = CalendarFeed.objects.create(user=self.user, token='token-do-feed')
+        self.url = f'/api/tasks/calendar/{self.feed.token}.ics'
+
+    def test_completing_task_changes_feed_etag(self):
+        due = timezone.now() + timedelta(days=1)
+        done, _ = self.create_task(due_date=due), self.create_task(title='Reunião', due_date=due)
+        etag = self.client.get(self.url)['ETag']
+        self.client.post(f'/api/tasks/{done.pk}/complete/')
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Relatório', b''.join(response.streaming_content).decode())
+
+    def test_if_modified_since_does_not_hide_completion(self):
+        due = timezone.now() + timedelta(days=1)
+        done, _ = self.create_task(due_date=due), self.create_task(title='Reunião', due_date=due)
+        self.client.get(self.url)
+        polled_at = http_date()
+        self.client.post(f'/api/tasks/{done.pk}/complete/')
+
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=polled_at)
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_unchanged_feed_is_not_modified(self):
+        self.create_task(due_date=timezone.now() + timedelta(days=1))
+        response = self.client.get(self.url)
+        self.assertNotIn('Last-Modified', response)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+        self.assertEqual(response.status_code, 304)
+
+
+class SubtaskToggleTests(TaskTestCase):
+    def setUp(self):
+        super().setUp()
+        self.subtask = Subtask.objects.create(task=self.create_task(), title='Revisar')
+
+    def toggle(self, **data):
+        return self.client.post(f'/api/tasks/subtasks/{self.subtask.pk}/toggle/', data, format='json')
+
+    def test_explicit_current_state_writes_nothing(self):
+        self.subscribe()
+
+        response = self.toggle(completed=False)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['version'], self.subtask.version)
+        self.assertEqual(Subtask.objects.get(pk=self.subtask.pk).version, self.subtask.version)
+        self.assertEqual(self.events(), [])
+
+    def test_toggle_without_value_inverts_state(self):
+        self.subscribe()
+
+        response = self.toggle()
+
+        self.assertTrue(response.data['completed'])
+        self.assertEqual(response.data['task']['completed_subtasks_count'], 1)
+        self.assertEqual(self.events(), [('subtask.updated', self.subtask.pk)])
+
+    def test_stale_if_match_fails_even_without_change(self):
+        response = self.client.post(
+            f'/api/tasks/subtasks/{self.subtask.pk}/toggle/', {'completed': False},
+            format='json', HTTP_IF_MATCH=f'"{self.subtask.version + 1}"',
+        )
+
+        self.assertEqual(response.status_code, 412)
+
+
+class RecurrenceTests(TaskTestCase):
+    tz = ZoneInfo('America/Sao_Paulo')
+
+    def local(self, *args):
+        return datetime(*args, tzinfo=self.tz)
+
+    def dates(self, rule, start, limit=10):
+        occurrences = recurrence.RecurrenceRule.parse(rule).occurrences(start)
+        return [value for _, value in islice(occurrences, limit)]
+
+    def test_invalid_rules_are_rejected(self):
+        for rule in ('FREQ=HOURLY', 'INTERVAL=2', 'FREQ=DAILY;INTERVAL=0', 'FREQ=DAILY;COUNT=abc',
+                     'FREQ=DAILY;COUNT=2;UNTIL=20240110', 'FREQ=MONTHLY;BYDAY=MO',
+                     'FREQ=WEEKLY;BYDAY=XX', 'FREQ=DAILY;UNTIL=2024-01-10', 'FREQ=DAILY;BYMONTH=1',
+                     'FREQ'):
+            with self.subTest(rule=rule), self.assertRaises(recurrence.InvalidRecurrenceRule):
+                recurrence.RecurrenceRule.parse(rule)
+
+    def test_rules_are_normalized(self):
+        self.assertEqual(recurrence.validate_rule('rrule:freq=weekly;byday=we,mo;interval=1'),
+                         'FREQ=WEEKLY;BYDAY=MO,WE')
+        self.assertEqual(recurrence.validate_rule('  '), '')
+
+    def test_api_rejects_invalid_rule_and_rule_without_due_date(self):
+        response = self.client.post('/api/tasks/', {
+            'title': 'Nova', 'due_date': '2024-01-10T09:00:00-03:00', 'recurrence_rule': 'FREQ=HOURLY',
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('recurrence_rule', response.data)
+
+        response = self.client.post('/api/tasks/', {'title': 'Nova', 'recurrence_rule': 'FREQ=DAILY'},
+                                    format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('due_date', response.data)
+
+    def test_count_and_until_end_the_series(self):
+        start = self.local(2024, 1, 10, 9)
+
+        self.assertEqual(self.dates('FREQ=DAILY;COUNT=3', start),
+                         [start, self.local(2024, 1, 11, 9), self.local(2024, 1, 12, 9)])
+        # UNTIL como data inclui o dia inteiro no fuso do projeto
+        self.assertEqual(self.dates('FREQ=WEEKLY;UNTIL=20240124', start),
+                         [start, self.local(2024, 1, 17, 9), self.local(2024, 1, 24, 9)])
+        # Instante UTC: 08:59:59 em São Paulo, antes da terceira ocorrência
+        self.assertEqual(self.dates('FREQ=WEEKLY;UNTIL=20240124T115959Z', start),
+                         [start, self.local(2024, 1, 17, 9)])
+
+    def test_weekly_by_day_starts_at_dtstart(self):
+        # Quarta-feira: a primeira ocorrência é o próprio início, mesmo fora de BYDAY
+        start = self.local(2024, 1, 10, 9)
+
+        self.assertEqual(self.dates('FREQ=WEEKLY;BYDAY=MO,FR', start, limit=4), [
+            start, self.local(2024, 1, 12, 9), self.local(2024, 1, 15, 9), self.local(2024, 1, 19, 9),
+        ])
+
+    def test_months_without_the_day_are_skipped(self):
+        start = self.local(2024, 1, 31, 9)
+
+        self.assertEqual(self.dates('FREQ=MONTHLY;COUNT=4', start), [
+            start, self.local(2024, 3, 31, 9), self.local(2024, 5, 31, 9), self.local(2024, 7, 31, 9),
+        ])
+        leap_day = self.local(2024, 2, 29, 9)
+        self.assertEqual(self.dates('FREQ=YEARLY;COUNT=2', leap_day), [leap_day, self.local(2028, 2, 29, 9)])
+
+    def test_completing_spawns_next_occurrence_with_remaining_count(self):
+        task = self.create_task(due_date=self.local(2024, 1, 10, 9), recurrence_rule='FREQ=DAILY;COUNT=2')
+        task.subtasks.create(title='Passo', completed=True)
+        task.tags.set([Tag.objects.create(user=self.user, name='casa')])
+
+        response = self.client.post(f'/api/tasks/{task.pk}/complete/')
+
+        self.assertEqual(response.status_code, 200)
+        task.refresh_from_db()
+        following = Task.objects.get(pk=response.data['task']['next_occurrence'])
+        self.assertEqual(task.recurrence_rule, '')
+        self.assertEqual((following.due_date, following.recurrence_rule, following.recurrence_series_id),
+                         (self.local(2024, 1, 11, 9), 'FREQ=DAILY;COUNT=1', task.pk))
+        self.assertEqual(list(following.tags.values_list('name', flat=True)), ['casa'])
+        self.assertEqual(list(following.subtasks.values_list('title', 'completed')), [('Passo', False)])
+
+        # Última ocorrência da contagem: nada é criado
+        following.subtasks.update(completed=True)
+        response = self.client.post(f'/api/tasks/{following.pk}/complete/')
+        self.assertIsNone(response.data['task']['next_occurrence'])
+        self.assertEqual(Task.objects.count(), 2)
+
+    def test_materialize_creates_occurrence_and_excludes_its_date(self):
+        start = self.local(2024, 1, 10, 9)
+        task = self.create_task(due_date=start, recurrence_rule='FREQ=DAILY;COUNT=4')
+        second, third = self.local(2024, 1, 11, 9), self.local(2024, 1, 12, 9)
+
+        response = self.client.post(f'/api/tasks/{task.pk}/materialize/', {'due_date': third.isoformat()},
+                                    format='json')
+
+        self.assertEqual(response.status_code, 201)
+        occurrence = Task.objects.get(pk=response.data['id'])
+        self.assertEqual((occurrence.due_date, occurrence.recurrence_rule, occurrence.recurrence_series_id),
+                         (third, '', task.pk))
+        task.refresh_from_db()
+        self.assertEqual(recurrence.virtual_dates(task), [second, self.local(2024, 1, 13, 9)])
+        # A data materializada não volta como próxima ocorrência
+        self.client.post(f'/api/tasks/{task.pk}/complete/')
+        following = Task.objects.get(recurrence_series=task, recurrence_rule__gt='')
+        self.assertEqual(following.due_date, second)
+        self.assertEqual(recurrence.virtual_dates(following), [self.local(2024, 1, 13, 9)])
+
+    def test_materialize_rejects_dates_outside_the_series(self):
+        task = self.create_task(due_date=self.local(2024, 1, 10, 9), recurrence_rule='FREQ=WEEKLY')
+
+        for due_date in (self.local(2024, 1, 10, 9), self.local(2024, 1, 11, 9)):
+            with self.subTest(due_date=due_date):
+                response = self.client.post(f'/api/tasks/{task.pk}/materialize/',
+                                            {'due_date': due_date.isoformat()}, format='json')
+                self.assertEqual(response.status_code, 400)
+        self.assertEqual(Task.objects.count(), 1)
+
+
+class SuggestionTests(TaskTestCase):
+    def setUp(self):
+        super().setUp()
+        suggestions._models.clear()
+        self.work = TaskList.objects.create(user=self.user, name='Trabalho', auto_suggestion=True)
+        self.home = TaskList.objects.create(user=self.user, name='Casa', auto_suggestion=True)
+        self.reports = Category.objects.create(user=self.user, name='Relatórios')
+        self.chores = Category.objects.create(user=self.user, name='Tarefas domésticas')
+        self.urgent = Tag.objects.create(user=self.user, name='urgente')
+
+    def add(self, title, task_list, category, tags=()):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/tasks/', {
+                'title': title, 'task_list': task_list.pk, 'category': category.pk,
+                'tags': [tag.pk for tag in tags],
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.data['id']
+
+    def train(self):
+        for title in ('Relatório de vendas', 'Relatório mensal do time', 'Enviar relatório anual'):
+            task_id = self.add(title, self.work, self.reports, [self.urgent])
+            self.client.post(f'/api/tasks/{task_id}/complete/')
+        self.add('Lavar a louça', self.home, self.chores)
+        self.add('Limpar a casa', self.home, self.chores)
+
+    def suggest(self, title):
+        response = self.client.get('/api/tasks/suggest/', {'title': title})
+        self.assertEqual(response.status_code, 200)
+        data = response.data
+        return (
+            data['task_list'] and data['task_list']['id'],
+            data['category'] and data['category']['id'],
+            [tag['id'] for tag in data['tags']],
+        )
+
+    def test_suggests_targets_learned_from_titles(self):
+        self.train()
+
+        self.assertEqual(self.suggest('Relatório trimestral'), (self.work.pk, self.reports.pk, [self.urgent.pk]))
+        self.assertEqual(self.suggest('Lavar o carro'), (self.home.pk, self.chores.pk, []))
+        self.assertEqual(self.suggest('Comprar ingressos'), (None, None, []))
+        self.assertEqual(self.client.get('/api/tasks/suggest/').status_code, 400)
+
+    def test_task_changes_invalidate_the_cached_model(self):
+        self.train()
+        self.assertEqual(self.suggest('Lavar o carro')[1], self.chores.pk)
+
+        for task in Task.objects.filter(category=self.chores):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.patch(f'/api/tasks/{task.pk}/', {'category': self.reports.pk}, format='json')
+        self.assertEqual(self.suggest('Lavar o carro')[1], self.reports.pk)
+
+        for task in Task.objects.filter(title__startswith='L'):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.delete(f'/api/tasks/{task.pk}/')
+        self.assertEqual(self.suggest('Lavar o carro'), (None, None, []))
+
+    def test_lists_without_auto_suggestion_are_not_suggested(self):
+        self.train()
+        self.assertEqual(self.suggest('Limpar o quintal')[0], self.home.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/api/lists/{self.home.pk}/', {'auto_suggestion': False}, format='json')
+
+        self.assertIsNone(self.suggest('Limpar o quintal')[0])
+
+    def test_rebuild_matches_incremental_counts(self):
+        self.train()
+        counts = set(SuggestionTerm.objects.values_list('kind', 'target_id', 'token', 'count'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(suggestions.rebuild_user(self.user.pk), 5)
+
+        self.assertEqual(set(SuggestionTerm.objects.values_list('kind', 'target_id', 'token', 'count')), counts)
+        self.assertEqual(self.suggest('Relatório trimestral')[0], self.work.pk)
+
+
+class TaskFilterTests(TaskTestCase):
+    def setUp(self):
+        super().setUp()
+        self.urgent, self.home, self.work = [
+            Tag.objects.create(user=self.user, name=name) for name in ('urgente', 'casa', 'trabalho')
+        ]
+        self.foreign = Tag.objects.create(user=User.objects.create_user('bia'), name='urgente')
+        self.both = self.create_task(title='Ambas')
+        self.both.tags.set([self.urgent, self.home])
+        self.only_urgent = self.create_task(title='Urgente')
+        self.only_urgent.tags.set([self.urgent])
+        self.untagged = self.create_task(title='Sem etiquetas')
+
+    def ids(self, query):
+        response = self.client.get(f'/api/tasks/?{query}')
+        self.assertEqual(response.status_code, 200, response.data)
+        return {task['id'] for task in response.data['results']}
+
+    def test_tag_filters(self):
+        cases = {
+            f'tags_all={self.urgent.pk},{self.home.pk}': {self.both.pk},
+            f'tags_all={self.urgent.pk},{self.urgent.pk}': {self.both.pk, self.only_urgent.pk},
+            f'tags_any={self.home.pk},{self.work.pk}': {self.both.pk},
+            f'tags_any={self.urgent.pk}': {self.both.pk, self.only_urgent.pk},
+            f'tags_none={self.home.pk}': {self.only_urgent.pk, self.untagged.pk},
+            f'tags_any={self.urgent.pk}&tags_none={self.home.pk}': {self.only_urgent.pk},
+            f'tags_all={self.work.pk}': set(),
+        }
+        for query, expected in cases.items():
+            with self.subTest(query=query):
+                self.assertEqual(self.ids(query), expected)
+
+    def test_tag_filters_do_not_repeat_tasks(self):
+        response = self.client.get(f'/api/tasks/?tags_any={self.urgent.pk},{self.home.pk}')
+
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_foreign_tags_match_nothing(self):
+        everything = {self.both.pk, self.only_urgent.pk, self.untagged.pk}
+
+        self.assertEqual(self.ids(f'tags_all={self.foreign.pk}'), set())
+        self.assertEqual(self.ids(f'tags_all={self.urgent.pk},{self.foreign.pk}'), set())
+        self.assertEqual(self.ids(f'tags_any={self.foreign.pk}'), set())
+        self.assertEqual(self.ids(f'tags_none={self.foreign.pk}'), everything)
+
+    def test_empty_values_are_ignored_and_invalid_ones_rejected(self):
+        everything = {self.both.pk, self.only_urgent.pk, self.untagged.pk}
+        for query in ('tags_all=', 'tags_any=', 'tags_none=', 'due_after=', 'due_before=', 'created_after='):
+            with self.subTest(query=query):
+                self.assertEqual(self.ids(query), everything)
+        for query in ('tags_any=abc', 'tags_all=1,x', 'due_after=amanhã', 'due_before=2024-13-01'):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(f'/api/tasks/?{query}').status_code, 400)
+
+    def test_date_ranges_are_inclusive(self):
+        tz = ZoneInfo('America/Sao_Paulo')
+        Task.objects.filter(pk=self.both.pk).update(due_date=datetime(2024, 12, 1, tzinfo=tz))
+        Task.objects.filter(pk=self.only_urgent.pk).update(due_date=datetime(2024, 12, 31, 23, 59, tzinfo=tz))
+        Task.objects.filter(pk=self.untagged.pk).update(created_at=timezone.now() - timedelta(days=10))
+
+        self.assertEqual(self.ids('due_after=2024-12-01&due_before=2024-12-31T23:59:00-03:00'),
+                         {self.both.pk, self.only_urgent.pk})
+        # Só a data vale 00:00 no fuso do projeto
+        self.assertEqual(self.ids('due_before=2024-12-31'), {self.both.pk})
+        self.assertEqual(self.ids('due_after=2024-12-02T00:00:00Z'), {self.only_urgent.pk})
+        created_after = (timezone.now() - timedelta(days=1)).isoformat().replace('+', '%2B')
+        self.assertEqual(self.ids(f'created_after={created_after}'), {self.both.pk, self.only_urgent.pk})
+
+    def test_tag_filters_apply_to_archived_tasks(self):
+        completed_at = timezone.now() - timedelta(days=100)
+        Task.objects.filter(pk=self.both.pk).update(completed=True, completed_at=completed_at)
+        archive.archive_completed_tasks(days=90)
+
+        self.assertEqual(self.ids(f'completed=true&tags_all={self.urgent.pk},{self.home.pk}'), {self.both.pk})
+        self.assertEqual(self.ids(f'include_archived=true&tags_none={self.home.pk}'),
+                         {self.only_urgent.pk, self.untagged.pk})
+
+
+class ArchiveTests(TaskTestCase):
+    def create_completed(self, days_ago=100, **fields):
+        completed_at = timezone.now() - timedelta(days=days_ago)
+        return self.create_task(completed=True, completed_at=completed_at, **fields)
+
+    def list_ids(self, query):
+        response = self.client.get(f'/api/tasks/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return response.data['count'], [task['id'] for task in response.data['results']]
+
+    def test_archive_moves_old_completed_tasks(self):
+        old = self.create_completed(title='Antiga')
+        old.subtasks.create(title='Passo')
+        old.tags.add(Tag.objects.create(user=self.user, name='urgente'))
+        recent = self.create_completed(days_ago=1)
+        pending = self.create_task()
+
+        self.assertEqual(archive.archive_completed_tasks(days=90), 1)
+
+        self.assertEqual(set(Task.objects.values_list('pk', flat=True)), {recent.pk, pending.pk})
+        archived = ArchivedTask.objects.get(pk=old.pk)
+        self.assertEqual([subtask['title'] for subtask in archived.subtasks], ['Passo'])
+        self.assertEqual(list(archived.tags.values_list('name', flat=True)), ['urgente'])
+        self.assertEqual(self.client.get(f'/api/tasks/{old.pk}/').data['archived'], True)
+
+    def test_listing_orders_across_hot_and_archived_tasks(self):
+        now = timezone.now()
+        expected = []
+        for day in range(6):
+            # Ativas e arquivadas intercaladas pela data limite
+            task = self.create_completed(
+                days_ago=100 if day % 2 else 1, title=f'Tarefa {day}', due_date=now + timedelta(days=day)
+            )
+            expected.append(task.pk)
+        archive.archive_completed_tasks(days=90)
+
+        with mock.patch.object(PageNumberPagination, 'page_size', 4):
+            first = self.list_ids('completed=true&ordering=due_date')
+            second = self.list_ids('completed=true&ordering=due_date&page=2')
+
+        self.assertEqual(first, (6, expected[:4]))
+        self.assertEqual(second, (6, expected[4:]))
+        self.assertEqual(self.list_ids('include_archived=true&ordering=-due_date')[1], expected[::-1])
+
+    def test_listing_filters_both_sources(self):
+        self.create_completed(title='Relatório anual')
+        self.create_completed(title='Reunião')
+        archive.archive_completed_tasks(days=90)
+        hot = self.create_completed(days_ago=1, title='Relatório mensal')
+
+        count, ids = self.list_ids('completed=true&search=Relat')
+
+        self.assertEqual(count, 2)
+        self.assertEqual(ids[0], hot.pk)
+
+    def test_archiving_series_root_keeps_later_occurrences_in_the_series(self):
+        root = self.create_completed()
+        second = self.create_completed(days_ago=1, recurrence_series=root)
+        current = self.create_task(recurrence_series=root, recurrence_rule='FREQ=DAILY',
+                                   due_date=timezone.now())
+
+        archive.archive_completed_tasks(days=90)
+
+        second.refresh_from_db()
+        current.refresh_from_db()
+        self.assertIsNone(second.recurrence_series_id)
+        self.assertEqual(current.recurrence_series_id, second.pk)
+        self.assertEqual(recurrence.spawn_next(current.pk).recurrence_series_id, second.pk)
+
+
+class AgendaTests(TaskTestCase):
+    def local_midnight(self, tz, days=0):
+        today = timezone.localtime(timezone.now(), tz).date()
+        return datetime.combine(today + timedelta(days=days), time.min, tzinfo=tz)
+
+    def test_today_range_follows_requested_timezone(self):
+        # 02:30 UTC ainda é o dia anterior em São Paulo e já é o dia seguinte em Tóquio
+        now = datetime(2026, 3, 10, 2, 30, tzinfo=dt_timezone.utc)
+
+        start, end = agenda.today_range(ZoneInfo('America/Sao_Paulo'), now)
+        self.assertEqual((start, end - start), (datetime(2026, 3, 9, 3, tzinfo=dt_timezone.utc), timedelta(days=1)))
+        start, _ = agenda.today_range(ZoneInfo('Asia/Tokyo'), now)
+        self.assertEqual(start, datetime(2026, 3, 9, 15, tzinfo=dt_timezone.utc))
+
+    def test_today_includes_local_midnight_and_excludes_next_midnight(self):
+        tz = ZoneInfo('Asia/Tokyo')
+        midnight = self.create_task(title='Meia-noite', due_date=self.local_midnight(tz))
+        self.create_task(title='Amanhã', due_date=self.local_midnight(tz, days=1))
+        self.create_task(title='Ontem', due_date=self.local_midnight(tz) - timedelta(microseconds=1))
+
+        response = self.client.get('/api/tasks/today/?tz=Asia/Tokyo')
+
+        self.assertEqual([task['id'] for task in response.data], [midnight.pk])
+
+    def test_invalid_timezone_is_rejected(self):
+        for path in ('/api/tasks/today/', '/api/tasks/upcoming/'):
+            response = self.client.get(f'{path}?tz=Marte/Olimpo')
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('Marte/Olimpo', response.data['error'])
+
+    def test_upcoming_days_is_limited(self):
+        tz = timezone.get_current_timezone()
+        last = self.create_task(due_date=self.local_midnight(tz, days=agenda.MAX_UPCOMING_DAYS) - timedelta(minutes=1))
+        self.create_task(due_date=self.local_midnight(tz, days=agenda.MAX_UPCOMING_DAYS))
+
+        response = self.client.get(f'/api/tasks/upcoming/?days={agenda.MAX_UPCOMING_DAYS}')
+
+        self.assertEqual([task['id'] for day in response.data for task in day['tasks']], [last.pk])
+        for days in (agenda.MAX_UPCOMING_DAYS + 1, 0, 'abc'):
+            self.assertEqual(self.client.get(f'/api/tasks/upcoming/?days={days}').status_code, 400)
+
+    def test_upcoming_groups_by_local_day(self):
+        tz = ZoneInfo('Asia/Tokyo')
+        first = self.create_task(due_date=self.local_midnight(tz, days=1) + timedelta(hours=23))
+        second = self.create_task(due_date=self.local_midnight(tz, days=2))
+
+        response = self.client.get('/api/tasks/upcoming/?days=3&tz=Asia/Tokyo')
+
+        today = self.local_midnight(tz).date()
+        self.assertEqual(
+            [(day['date'], [task['id'] for task in day['tasks']]) for day in response.data],
+            [(today + timedelta(days=1), [first.pk]), (today + timedelta(days=2), [second.pk])],
+        )
+
+    def test_list_overdue_count_includes_tasks_due_earlier_today(self):
+        task_list = TaskList.objects.create(user=self.user, name='Trabalho')
+        self.create_task(task_list=task_list, due_date=timezone.now() - timedelta(minutes=1))
+        self.create_task(task_list=task_list, due_date=timezone.now() - timedelta(days=2))
+        self.create_task(task_list=task_list, due_date=timezone.now() - timedelta(days=2), completed=True)
+        self.create_task(task_list=task_list, due_date=timezone.now() + timedelta(minutes=1))
+
+        self.assertEqual(task_list.get_overdue_tasks_count(), 2)
+
+
+class AsyncReadTests(TaskTestCase):
+    def setUp(self):
+        super().setUp()
+        self.token = Token.objects.create(user=self.user)
+        self.headers = {'Authorization': f'Token {self.token.key}'}
+        self.task = self.create_task(due_date=timezone.now() - timedelta(hours=1))
+        self.async_client = AsyncClient()
+
+    async def get(self, path, headers=None):
+        response = await self.async_client.get(path, headers=self.headers if headers is None else headers)
+        return response.status_code, json.loads(response.content)
+
+    async def sync_get(self, path, headers=None):
+        client = Client(headers=self.headers if headers is None else headers)
+        response = await sync_to_async(client.get)(path)
+        return response.status_code, json.loads(response.content)
+
+    async def test_results_match_sync_views(self):
+        for path in ('/api/tasks/', f'/api/tasks/{self.task.pk}/', '/api/tasks/overdue/',
+                     '/api/tasks/?fields=id,title', '/api/tasks/9999/'):
+            with self.subTest(path=path):
+                self.assertEqual(await self.get(path), await self.sync_get(path))
+
+    async def test_authentication_failures_get_drf_errors(self):
+        for headers in ({}, {'Authorization': 'Token invalido'}, {'Authorization': 'Token'}):
+            with self.subTest(headers=headers):
+                status_code, data = await self.get('/api/tasks/', headers)
+                self.assertEqual((status_code, data), await self.sync_get('/api/tasks/', headers))
+                self.assertEqual(status_code, 401)
+
+    async def test_inactive_user_is_rejected(self):
+        await User.objects.filter(pk=self.user.pk).aupdate(is_active=False)
+
+        status_code, _ = await self.get('/api/tasks/')
+
+        self.assertEqual(status_code, 401)
+
+    async def test_configured_authenticators_select_the_shard(self):
+        selected = []
+        get_data = async_views.AsyncReadView.get_data
+
+        async def record_shard(view, viewset):
+            selected.append(sharding.current_shard())
+            return await get_data(view, viewset)
+
+        with mock.patch.object(sharding, 'get_user_shard', return_value=('default', False)) as get_user_shard, \
+                mock.patch.object(async_views.AsyncReadView, 'get_data', record_shard):
+            status_code, _ = await self.get('/api/tasks/')
+
+        self.assertEqual(status_code, 200)
+        get_user_shard.assert_called_once_with(self.user.pk)
+        self.assertEqual(selected, ['default'])
+
+
+class SparseFieldsTests(TaskTestCase):
+    def setUp(self):
+        super().setUp()
+        self.category = Category.objects.create(user=self.user, name='Casa')
+        self.task_list = TaskList.objects.create(user=self.user, name='Trabalho')
+        self.task = self.create_task(category=self.category, task_list=self.task_list,
+                                     due_date=timezone.now() - timedelta(days=1))
+        self.task.subtasks.create(title='Passo')
+        self.task.tags.set([Tag.objects.create(user=self.user, name='urgente')])
+
+    def get(self, path):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return response, [query['sql'] for query in queries]
+
+    def task_select(self, queries):
+        return next(sql for sql in queries if sql.startswith('SELECT "tasks_task"."id"'))
+
+    def test_list_returns_and_loads_only_requested_fields(self):
+        response, queries = self.get('/api/tasks/?fields=id,title,desconhecido')
+
+        self.assertEqual(response.data['results'], [{'id': self.task.pk, 'title': 'Relatório'}])
+        select = self.task_select(queries)
+        self.assertNotIn('"tasks_task"."description"', select)
+        self.assertNotIn('JOIN', select)
+        self.assertFalse([sql for sql in queries if 'tasks_subtask' in sql or 'tags_tag' in sql])
+
+    def test_computed_fields_load_the_columns_they_read(self):
+        response, queries = self.get(f'/api/tasks/{self.task.pk}/?fields=id,is_overdue,category_name')
+
+        self.assertEqual(response.data, {'id': self.task.pk, 'is_overdue': True, 'category_name': 'Casa'})
+        self.assertNotIn('ETag', response)
+        select = self.task_select(queries)
+        for column in ('due_date', 'completed', 'category_id'):
+            self.assertIn(f'"tasks_task"."{column}"', select)
+        self.assertNotIn('"tasks_task"."description"', select)
+        self.assertEqual(len([sql for sql in queries if 'FROM "tasks_task"' in sql]), 1)
+
+    def test_omit_drops_fields_and_their_queries(self):
+        full, full_queries = self.get(f'/api/tasks/{self.task.pk}/')
+        response, queries = self.get(f'/api/tasks/{self.task.pk}/?omit=subtasks,history,tags,tags_names')
+
+        self.assertEqual(set(full.data) - set(response.data), {'subtasks', 'history', 'tags', 'tags_names'})
+        self.assertEqual(response['ETag'], f'"{self.task.version}"')
+        self.assertLess(len(queries), len(full_queries))
+        self.assertFalse([sql for sql in queries if 'tags_tag' in sql])
+
+    def test_unknown_fields_are_ignored(self):
+        response, _ = self.get('/api/tasks/?fields=desconhecido')
+        self.assertEqual(response.data['results'], [{}])
+
+        response, _ = self.get(f'/api/tasks/{self.task.pk}/?omit=desconhecido')
+        self.assertIn('subtasks', response.data)
+
+    def test_writes_ignore_sparse_parameters(self):
+        response = self.client.patch(f'/api/tasks/{self.task.pk}/?fields=id', {'title': 'Novo'}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['title'], 'Novo')
+        self.assertIn('subtasks', response.data)
+
+    def test_list_counts_are_computed_only_when_requested(self):
+        response, queries = self.get('/api/lists/?fields=id,name')
+        self.assertEqual(response.data['results'], [{'id': self.task_list.pk, 'name': 'Trabalho'}])
+        self.assertFalse([sql for sql in queries if 'COUNT' in sql and 'tasks_task' in sql])
+
+        response, queries = self.get(f'/api/lists/{self.task_list.pk}/?fields=id,tasks_count')
+        self.assertEqual(response.data, {'id': self.task_list.pk, 'tasks_count': 1})
+        self.assertEqual(len([sql for sql in queries if 'lists_tasklist' in sql]), 1)
+
+
+class IncludeTests(TaskTestCase):
+    def setUp(self):
+        super().setUp()
+        self.category = Category.objects.create(user=self.user, name='Casa')
+        self.task_list = TaskList.objects.create(user=self.user, name='Trabalho')
+        self.tags = [Tag.objects.create(user=self.user, name=name) for name in ('urgente', 'semanal')]
+
+    def add_tasks(self, count):
+        for _ in range(count):
+            task = self.create_task(category=self.category, task_list=self.task_list)
+            task.tags.set(self.tags)
+            task.subtasks.create(title='Passo')
+
+    def count_queries(self, path):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_include_embeds_tags_and_ignores_unknown_names(self):
+        self.add_tasks(1)
+
+        response = self.client.get('/api/tasks/?include=tags,category')
+
+        task = response.data['results'][0]
+        self.assertEqual([tag['name'] for tag in task['tags']], ['semanal', 'urgente'])
+        self.assertEqual(task['category_name'], 'Casa')
+        self.assertNotIn('category', task)
+        self.assertNotIn('subtasks', task)
+
+    def test_include_queries_do_not_grow_with_rows(self):
+        paths = [
+            '/api/tasks/?include=tags,category',
+            '/api/tasks/?include=subtasks,history,tags',
+            f'/api/lists/{self.task_list.pk}/tasks/?include=tags,category',
+            f'/api/lists/{self.task_list.pk}/tasks/?include=subtasks,tags',
+        ]
+        self.add_tasks(2)
+        expected = {path: self.count_queries(path) for path in paths}
+        self.add_tasks(8)
+
+        for path, count in expected.items():
+            with self.subTest(path=path), self.assertNumQueries(count):
+                response = self.client.get(path)
+            data = response.data['results'] if 'results' in response.data else response.data
+            self.assertEqual(len(data), 10)
+
+
+class AutocompleteTests(TaskTestCase):
+    def setUp(self):
+        super().setUp()
+        autocomplete._indexes.clear()
+
+    def search(self, query, **params):
+        response = self.client.get('/api/autocomplete/', {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [(item['type'], item['name'], item['score']) for item in response.data['results']]
+
+    def test_prefix_ranks_above_word_prefix_and_fuzzy_matches(self):
+        self.create_task(title='Relatório anual')
+        self.create_task(title='Revisar relatório')
+        self.create_task(title='Relatorios')
+        TaskList.objects.create(user=self.user, name='Relatório')
+        Tag.objects.create(user=self.user, name='relatoria')
+
+        results = self.search('relato')
+
+        self.assertEqual(results, [
+            ('list', 'Relatório', 1.0),
+            ('tag', 'relatoria', 1.0),
+            ('task', 'Relatorios', 1.0),
+            ('task', 'Relatório anual', 1.0),
+            ('task', 'Revisar relatório', 0.9),
+        ])
+        # Com erro de digitação, só aproximações, abaixo de qualquer prefixo
+        fuzzy = self.search('relatorip')
+        self.assertIn(('task', 'Relatorios'), [item[:2] for item in fuzzy])
+        self.assertTrue(all(score <= autocomplete.MAX_FUZZY_SCORE for _, _, score in fuzzy))
+
+    def test_every_word_must_start_a_word_of_the_name(self):
+        self.create_task(title='Relatório anual de vendas')
+        self.create_task(title='Relatório mensal')
+        self.create_task(title='Manual do relatório')
+
+        self.assertEqual(self.search('vend rel'), [('task', 'Relatório anual de vendas', 0.9)])
+        # "nual" está no meio de "anual" e "manual", não no início de uma palavra
+        self.assertEqual(self.search('rel nual', types='task'), [])
+
+    def test_filters_types_and_limit(self):
+        for index in range(3):
+            self.create_task(title=f'Casa {index}')
+        Category.objects.create(user=self.user, name='Casa')
+
+        self.assertEqual(self.search('casa', types='category'), [('category', 'Casa', 1.0)])
+        self.assertEqual(len(self.search('casa', limit='2')), 2)
+        response = self.client.get('/api/autocomplete/', {'q': 'casa', 'types': 'task,pessoa'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_renaming_rebuilds_the_index(self):
+        task = self.create_task(title='Comprar pão')
+        self.assertEqual(self.search('compr'), [('task', 'Comprar pão', 1.0)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(f'/api/tasks/{task.pk}/', {'title': 'Pagar contas'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.search('compr'), [])
+        self.assertEqual(self.search('contas'), [('task', 'Pagar contas', 0.9)])
+
+    def test_postgresql_patterns_match_word_prefixes_without_accents(self):
+        prefix, words = autocomplete._prefix_patterns('Relato anu')
+
+        self.assertEqual(words, ['\\mr[eéèêë]l[aáàâãä]t[oóòôõö]', '\\m[aáàâãä][nñ][uúùûü]'])
+        # `\m` (início de palavra no PostgreSQL) equivale a `\b` aqui
+        python_words = [word.replace('\\m', '\\b') for word in words]
+        for name, expected in [('Relatório anual', True), ('Relatório manual', False),
+                               ('Anuário de relatos', True), ('Correlato anual', False)]:
+            with self.subTest(name=name):
+                found = all(re.search(word, name, re.IGNORECASE) for word in python_words)
+                self.assertEqual(found, expected)
+        self.assertTrue(re.search(prefix, 'Relató anual', re.IGNORECASE))
+        self.assertFalse(re.search(prefix, 'Um relato anual', re.IGNORECASE))
+
+    def test_postgresql_query_scores_word_prefixes(self):
+        cursor = mock.MagicMock()
+        cursor.__enter__.return_value.fetchall.return_value = [('task', 1, 'Relatório anual', 0.9)]
+        fake = mock.Mock()
+        fake.cursor.return_value = cursor
+        fake.ops.quote_name = lambda name: f'"{name}"'
+
+        results = autocomplete.search_postgresql(fake, self.user.pk, 'rel anu', ['task'], 5)
+
+        sql, params = cursor.__enter__.return_value.execute.call_args.args
+        self.assertIn(f'WHEN "title" ~* %s AND "title" ~* %s THEN {autocomplete.WORD_PREFIX_SCORE}', sql)
+        self.assertEqual(sql.count('%s'), len(params))
+        self.assertEqual(results, [{'type': 'task', 'id': 1, 'name': 'Relatório anual', 'score': 0.9}])
+        self.assertEqual(autocomplete.search_postgresql(fake, self.user.pk, '!!', ['task'], 5), [])
+
+
+class OwnedRelatedFieldTests(TaskTestCase):
+    def setUp(self):
+        super().setUp()
+        self.other = User.objects.create_user('bia', password='senha-segura-1')
+        self.task_list = TaskList.objects.create(user=self.user, name='Trabalho')
+        self.category = Category.objects.create(user=self.user, name='Casa')
+        self.tags = [Tag.objects.create(user=self.user, name=name) for name in ('urgente', 'rápida', 'semanal')]
+
+    def test_foreign_ids_are_rejected(self):
+        foreign = {
+            'task_list': TaskList.objects.create(user=self.other, name='Alheia').pk,
+            'category': Category.objects.create(user=self.other, name='Alheia').pk,
+            'tags': [self.tags[0].pk, Tag.objects.create(user=self.other, name='alheia').pk],
+        }
+        for field, value in foreign.items():
+            with self.subTest(field=field):
+                response = self.client.post('/api/tasks/', {'title': 'Nova', field: value}, format='json')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('não encontrada', str(response.data[field]))
+        self.assertFalse(Task.objects.exists())
+
+    def test_one_query_per_related_model(self):
+        data = {
+            'title': 'Nova', 'task_list': self.task_list.pk, 'category': self.category.pk,
+            'tags': [tag.pk for tag in self.tags] + [str(self.tags[0].pk)],
+        }
+        request = mock.Mock(user=self.user)
+        serializer = TaskSerializer(data=data, context={'request': request})
+
+        with self.assertNumQueries(3):
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertEqual(serializer.validated_data['tags'], self.tags)
+
+    def test_invalid_tag_values_are_rejected(self):
+        for tags in (['abc'], [True], 'urgente'):
+            with self.subTest(tags=tags):
+                response = self.client.post('/api/tasks/', {'title': 'Nova', 'tags': tags}, format='json')
+                self.assertEqual(response.status_code, 400)
+
+
+class AdminTests(TaskTestCase):
+    def setUp(self):
+        super().setUp()
+        User.objects.filter(pk=self.user.pk).update(is_staff=True, is_superuser=True)
+        self.client.force_login(self.user)
+        self.category = Category.objects.create(user=self.user, name='Trabalho')
+        self.task_list = TaskList.objects.create(user=self.user, name='Casa')
+
+    def add_tasks(self, count):
+        for _ in range(count):
+            task = self.create_task(category=self.category, task_list=self.task_list)
+            task.subtasks.create(title='Passo')
+            TaskHistory.objects.create(task=task)
+            now = timezone.now()
+            TimeEntry.objects.create(task=task, user=self.user, started_at=now, ended_at=now,
+                                     duration=timedelta())
+
+    def changelist_queries(self, model_name):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/admin/tasks/{model_name}/')
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        self.add_tasks(2)
+        expected = {model: self.changelist_queries(model)
+                    for model in ('task', 'subtask', 'taskhistory', 'timeentry')}
+        self.add_tasks(8)
+
+        for model, count in expected.items():
+            with self.subTest(model=model), self.assertNumQueries(count):
+                self.client.get(f'/admin/tasks/{model}/')
+
+    def test_change_forms_use_autocomplete_for_relations(self):
+        for index in range(5):
+            Category.objects.create(user=self.user, name=f'Categoria {index}')
+        task = self.create_task(category=self.category)
+        history = TaskHistory.objects.create(task=task, category=self.category)
+
+        for path in (f'/admin/tasks/task/{task.pk}/change/', f'/admin/tasks/taskhistory/{history.pk}/change/'):
+            with self.subTest(path=path):
+                response = self.client.get(path)
+
+                # Só a categoria atual é renderizada; as demais vêm do autocomplete
+                self.assertContains(response, 'admin-autocomplete')
+                self.assertNotContains(response, 'Categoria 0')
+
+    def test_autocomplete_searches_tasks(self):
+        self.create_task(title='Relatório anual')
+        self.create_task(title='Reunião')
+
+        response = self.client.get('/admin/autocomplete/', {
+            'term': 'Relat', 'app_label': 'tasks', 'model_name': 'subtask', 'field_name': 'task',
+        })
+
+        self.assertEqual([item['text'] for item in response.json()['results']], ['Relatório anual (ana)'])
+
+    def test_large_tables_use_estimated_count(self):
+        self.add_tasks(1)
+
+        with mock.patch.object(EstimatedCountPaginator, 'estimated_count', return_value=250000):
+            response = self.client.get('/admin/tasks/task/')
+
+        self.assertEqual(response.context['cl'].result_count, 250000)
+        self.assertEqual(EstimatedCountPaginator(Task.objects.all(), 20).count, 1)
@@ -0,0 +1,267 @@
+"""
+Registro de tempo das tarefas (cronômetro no servidor).
+
+`start` abre um registro (encerrando o que estiver em andamento: um por
+usuário), `stop` o encerra e soma a duração em `Task.tracked_duration`, que
+vira `TaskHistory.actual_duration` na conclusão da tarefa.
+
+Os sinais de atividade (`heartbeat`), enviados a cada poucos segundos pelo
+cliente, não gravam uma linha por sinal: o registro em andamento do usuário e
+o último sinal ficam no cache, e os sinais acumulados no processo são
+gravados em lote (um UPDATE por banco) a cada `HEARTBEAT_FLUSH_INTERVAL`
+segundos ou `HEARTBEAT_FLUSH_SIZE` registros, no banco atual de cada usuário;
+os de usuários com dados em migração ficam para o lote seguinte. O prazo é
+conferido a cada sinal e ao fim de cada requisição (`request_finished`, ver
+tasks/signals.py); sinais de um processo encerrado antes do lote continuam no
+cache. Registros sem sinal há mais de `STALE_AFTER` segundos (aba fechada) são
+encerrados no último sinal.
+"""
+import time
+from datetime import timedelta
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, DateTimeField, F, Value, When
+from django.utils import timezone
+
+from taskmanager.sharding import current_shard, get_user_shards
+from .models import Task, TimeEntry
+
+
+DEFAULTS = {
+    'HEARTBEAT_FLUSH_INTERVAL': 30,
+    'HEARTBEAT_FLUSH_SIZE': 100,
+    'STALE_AFTER': 300,
+    # Por quanto tempo o registro em andamento de um usuário fica no cache
+    'RUNNING_CACHE_TIMEOUT': 60,
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'TIME_TRACKING', {})}
+
+
+class TaskNotTrackable(Exception):
+    """Tarefa concluída: não recebe mais registros de tempo"""
+    message = 'Não é possível registrar tempo em uma tarefa concluída.'
+
+
+class TimerNotRunning(Exception):
+    """Nenhum cronômetro em andamento na tarefa"""
+    message = 'Nenhum cronômetro em andamento para esta tarefa.'
+
+
+def _running_key(user_id):
+    return f'timer-running:{user_id}'
+
+
+def _heartbeat_key(entry_id):
+    return f'timer-heartbeat:{entry_id}'
+
+
+class HeartbeatBuffer:
+    """Últimos sinais por registro (IDs únicos entre bancos), ainda não gravados"""
+
+    def __init__(self):
+        self._pending = {}
+        self._oldest = None
+        self._lock = Lock()
+
+    def add(self, user_id, entry_id, moment):
+        with self._lock:
+            self._pending[entry_id] = (user_id, moment)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+        self.flush_if_due()
+
+    def is_due(self):
+        config = get_config()
+        with self._lock:
+            return self._oldest is not None and (
+                len(self._pending) >= config['HEARTBEAT_FLUSH_SIZE']
+                or time.monotonic() - self._oldest >= config['HEARTBEAT_FLUSH_INTERVAL']
+            )
+
+    def flush_if_due(self):
+        """Grava o lote se atingiu o tamanho ou o intervalo; retorna se gravou"""
+        if not self.is_due():
+            return False
+        self.flush()
+        return True
+
+    def get(self, entry_id):
+        with self._lock:
+            pending = self._pending.get(entry_id)
+        return pending[1] if pending is not None else None
+
+    def flush(self):
+        """Grava os sinais acumulados: um UPDATE com CASE por banco"""
+        with self._lock:
+            pending, self._pending, self._oldest = self._pending, {}, None
+        shards = get_user_shards({user_id for user_id, _ in pending.values()})
+        by_alias = {}
+        postponed = {}
+        for entry_id, (user_id, moment) in pending.items():
+            alias, moving = shards[user_id]
+            if moving:
+                postponed[entry_id] = (user_id, moment)
+            else:
+                by_alias.setdefault(alias, {})[entry_id] = moment
+        if postponed:
+            with self._lock:
+                for entry_id, item in postponed.items():
+                    self._pending.setdefault(entry_id, item)
+                if self._oldest is None:
+                    self._oldest = time.monotonic()
+        for alias, moments in by_alias.items():
+            TimeEntry.objects.using(alias).filter(
+                pk__in=list(moments), ended_at__isnull=True,
+            ).update(last_heartbeat_at=Case(
+                *[When(pk=entry_id, then=Value(moment)) for entry_id, moment in moments.items()],
+                output_field=DateTimeField(),
+            ))
+        return len(pending) - len(postponed)
+
+
+heartbeats = HeartbeatBuffer()
+
+
+def running_entry(user_id):
+    """`{'id', 'task_id', 'started_at'}` do registro em andamento, ou None"""
+    running = cache.get(_running_key(user_id))
+    if running is None:
+        entry = TimeEntry.objects.filter(user_id=user_id, ended_at__isnull=True).values(
+            'id', 'task_id', 'started_at', 'last_heartbeat_at',
+        ).first()
+        running = entry or {}
+        cache.set(_running_key(user_id), running, get_config()['RUNNING_CACHE_TIMEOUT'])
+    return running or None
+
+
+def _forget_running(user_id):
+    transaction.on_commit(lambda: cache.delete(_running_key(user_id)), using=current_shard())
+
+
+def last_seen(entry):
+    """Último sinal conhecido do registro: banco, cache ou lote ainda não gravado"""
+    moments = [
+        entry['started_at'],
+        entry.get('last_heartbeat_at'),
+        cache.get(_heartbeat_key(entry['id'])),
+        heartbeats.get(entry['id']),
+    ]
+    return max(moment for moment in moments if moment is not None)
+
+
+def _end_for(entry, now):
+    """Fim do registro: agora, ou o último sinal se o cliente sumiu"""
+    seen = last_seen(entry)
+    if now - seen > timedelta(seconds=get_config()['STALE_AFTER']):
+        return seen
+    return now
+
+
+def close_entry(entry, end):
+    """
+    Encerra o registro (UPDATE condicional, idempotente) e soma a duração ao
+    total da tarefa. Retorna a duração, ou None se já estava encerrado.
+    """
+    duration = max(end - entry['started_at'], timedelta())
+    with transaction.atomic(using=current_shard()):
+        closed = TimeEntry.objects.filter(pk=entry['id'], ended_at__isnull=True).update(
+            ended_at=end, duration=duration,
+        )
+        if not closed:
+            return None
+        # O total faz parte da representação da tarefa: atualiza a versão (ETag)
+        Task.objects.filter(pk=entry['task_id']).update(
+            tracked_duration=F('tracked_duration') + duration,
+            updated_at=timezone.now(),
+            version=F('version') + 1,
+        )
+    return duration
+
+
+def start(user, task_id):
+    """
+    Inicia o cronômetro da tarefa, encerrando o que estiver em andamento.
+    Retorna `(registro, criado)`; Task.DoesNotExist se a tarefa não é do usuário.
+    """
+    now = timezone.now()
+    with transaction.atomic(using=current_shard()):
+        task = Task.objects.select_for_update().only('id', 'completed').get(pk=task_id, user=user)
+        if task.completed:
+            raise TaskNotTrackable()
+
+        current = TimeEntry.objects.select_for_update().filter(
+            user=user, ended_at__isnull=True,
+        ).values('id', 'task_id', 'started_at', 'last_heartbeat_at').first()
+        if current is not None:
+            if current['task_id'] == task.pk:
+                return TimeEntry.objects.get(pk=current['id']), False
+            close_entry(current, _end_for(current, now))
+
+        entry = TimeEntry.objects.create(user=user, task=task, started_at=now)
+        _forget_running(user.pk)
+    return entry, True
+
+
+def stop(user, task_id):
+    """Encerra o cronômetro da tarefa. Retorna o registro encerrado"""
+    running = running_entry(user.pk)
+    if running is None or running['task_id'] != int(task_id):
+        # O cache pode estar desatualizado em relação a outro processo
+        cache.delete(_running_key(user.pk))
+        running = running_entry(user.pk)
+        if running is None or running['task_id'] != int(task_id):
+            raise TimerNotRunning()
+    close_entry(running, _end_for(running, timezone.now()))
+    _forget_running(user.pk)
+    return TimeEntry.objects.get(pk=running['id'])
+
+
+def heartbeat(user, task_id):
+    """
+    Sinal de atividade do cronômetro da tarefa. Normalmente não consulta nem
+    grava no banco; retorna False se não há cronômetro em andamento nela.
+    """
+    running = running_entry(user.pk)
+    if running is None or running['task_id'] != int(task_id):
+        return False
+    now = timezone.now()
+    cache.set(_heartbeat_key(running['id']), now, get_config()['STALE_AFTER'] * 2)
+    heartbeats.add(user.pk, running['id'], now)
+    return True
+
+
+def stop_task_timer(task_id):
+    """Encerra o cronômetro em andamento da tarefa (usado na conclusão)"""
+    entry = TimeEntry.objects.filter(task_id=task_id, ended_at__isnull=True).values(
+        'id', 'task_id', 'user_id', 'started_at', 'last_heartbeat_at',
+    ).first()
+    if entry is None:
+        return None
+    duration = close_entry(entry, _end_for(entry, timezone.now()))
+    _forget_running(entry['user_id'])
+    return duration
+
+
+def close_stale_entries(now=None):
+    """Encerra, no último sinal, os registros do banco atual sem sinal recente"""
+    heartbeats.flush()
+    now = now or timezone.now()
+    cutoff = now - timedelta(seconds=get_config()['STALE_AFTER'])
+    closed = 0
+    for entry in TimeEntry.objects.filter(ended_at__isnull=True).values(
+        'id', 'task_id', 'user_id', 'started_at', 'last_heartbeat_at',
+    ).iterator():
+        if last_seen(entry) >= cutoff:
+            continue
+        if close_entry(entry, last_seen(entry)) is not None:
+            _forget_running(entry['user_id'])
+            closed += 1
+    return closed
+
+
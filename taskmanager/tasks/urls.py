@@ -11,7 +11,10 @@ urlpatterns = [
     path('<int:pk>/complete/', views.TaskCompleteView.as_view(), name='task-complete'),
     path('<int:pk>/uncomplete/', views.TaskUncompleteView.as_view(), name='task-uncomplete'),
     path('<int:task_id>/subtasks/', views.SubtaskListCreateView.as_view(), name='subtask-list'),
+    path('<int:task_id>/subtasks/reorder/', views.SubtaskReorderView.as_view(), name='subtask-reorder'),
     path('subtasks/<int:pk>/', views.SubtaskDetailView.as_view(), name='subtask-detail'),
+    path('subtasks/<int:pk>/toggle/', views.SubtaskToggleView.as_view(), name='subtask-toggle'),
+    path('calendar/<str:token>.ics', views.calendar_feed, name='calendar-feed'),
     
     # Include router URLs
     path('', include(router.urls)),
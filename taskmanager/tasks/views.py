@@ -3,115 +3,361 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
-from rest_framework.generics import ListCreateAPIView, RetrieveUpdateDestroyAPIView
-from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework.generics import ListCreateAPIView, RetrieveUpdateDestroyAPIView, get_object_or_404
+from rest_framework.exceptions import NotFound
+from django.db import transaction
+from django.http import Http404, HttpResponseBadRequest, StreamingHttpResponse
 from django.utils import timezone
-from .models import Task, Subtask, TaskHistory
-from .serializers import TaskSerializer, TaskListSerializer, SubtaskSerializer, TaskHistorySerializer
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from django.views.decorators.http import require_safe
+from accounts.models import CalendarFeed
+from jobs import queue
+from jobs.views import accepted_response
+from taskmanager import autocomplete
+from taskmanager.sharding import activate_user_shard, current_shard
+from taskmanager.sparse_fields import SparseQuerysetMixin
+from webhooks import outbox
+from webhooks.outbox import OutboxMixin
+from . import agenda, ical, recurrence, services, suggestions, timetracking
+from .bulk import bulk_update_tags
+from .archive import ArchiveChain
+from .filters import TaskFilter, TaskFilterBackend
+from .concurrency import OptimisticConcurrencyMixin, PreconditionFailed, make_etag, parse_if_match
+from .models import Task, Subtask, ArchivedTask, TimeEntry, VersionConflict
+from .serializers import (
+    TaskSerializer, TaskListSerializer, SubtaskSerializer, TaskHistorySerializer,
+    ArchivedTaskSerializer, TaskCompletionSerializer, BulkTagSerializer, OccurrenceSerializer,
+    TimeEntrySerializer, SubtaskToggleSerializer, SubtaskReorderSerializer,
+)
 
 
-class TaskViewSet(viewsets.ModelViewSet):
+class TaskViewSet(OutboxMixin, OptimisticConcurrencyMixin, SparseQuerysetMixin, viewsets.ModelViewSet):
     """ViewSet para tarefas"""
     serializer_class = TaskSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['completed', 'priority', 'category', 'task_list']
+    outbox_type = 'task'
+    outbox_fields = outbox.TASK_FIELDS
+    filter_backends = [TaskFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filterset_class = TaskFilter
     search_fields = ['title', 'description']
     ordering_fields = ['created_at', 'due_date', 'priority', 'title']
     ordering = ['-created_at']
 
+    # JOINs e prefetches feitos só quando o campo está na resposta (?fields= / ?omit=)
+    field_select_related = {
+        'category_name': ['category'],
+        'task_list_name': ['task_list'],
+        'history': ['history'],
+    }
+    field_prefetch_related = {
+        'tags': ['tags'],
+        'tags_count': ['tags'],
+        'tags_names': ['tags__user'],
+        'subtasks': ['subtasks'],
+        'subtasks_count': ['subtasks'],
+        'completed_subtasks_count': ['subtasks'],
+        'subtasks_completion_percentage': ['subtasks'],
+        'can_be_completed': ['subtasks'],
+    }
+    # Colunas lidas pelos campos calculados e relações da resposta
+    field_only = {
+        'subtasks': [],
+        'history': [],
+        'tags': [],
+        'tags_names': [],
+        'tags_count': [],
+        'category_name': ['category'],
+        'task_list_name': ['task_list'],
+        'is_overdue': ['due_date', 'completed'],
+        'days_until_due': ['due_date'],
+        'priority_color': ['priority'],
+        'subtasks_count': [],
+        'completed_subtasks_count': [],
+        'subtasks_completion_percentage': [],
+        'can_be_completed': [],
+        'occurrence_of': [],
+    }
+    # No arquivo, subtarefas e histórico são colunas JSON
+    archived_field_select_related = {
+        'category_name': ['category'],
+        'task_list_name': ['task_list'],
+    }
+    archived_field_prefetch_related = {
+        'tags': ['tags'],
+        'tags_count': ['tags'],
+    }
+
     def get_queryset(self):
-        return Task.objects.filter(user=self.request.user).select_related(
-            'category', 'task_list'
-        ).prefetch_related('tags', 'subtasks')
+        return self.optimize_queryset(Task.objects.filter(user=self.request.user))
+
+    def get_archived_queryset(self):
+        return self.optimize_queryset(
+            ArchivedTask.objects.filter(user=self.request.user),
+            serializer_class=ArchivedTaskSerializer,
+            field_select_related=self.archived_field_select_related,
+            field_prefetch_related=self.archived_field_prefetch_related,
+        )
 
     def get_serializer_class(self):
-        if self.action == 'list':
+        if self.action in ('list', 'upcoming'):
             return TaskListSerializer
         return TaskSerializer
 
+    def include_archived(self):
+        """O arquivo só é lido com completed=true ou include_archived=true"""
+        params = self.request.query_params
+        return (
+            params.get('include_archived', '').lower() in ('1', 'true')
+            or params.get('completed', '').lower() in ('1', 'true')
+        )
+
+    def list(self, request, *args, **kwargs):
+        if not self.include_archived():
+            return super().list(request, *args, **kwargs)
+
+        tasks = ArchiveChain(
+            self.filter_queryset(self.get_queryset()),
+            self.filter_queryset(self.get_archived_queryset()),
+        )
+        page = self.paginate_queryset(tasks)
+        data = self.serialize_mixed(page if page is not None else tasks[:])
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    def serialize_mixed(self, tasks):
+        """Serializa uma sequência com tarefas ativas e arquivadas"""
+        context = self.get_serializer_context()
+        serializer_class = self.get_serializer_class()
+        return [
+            ArchivedTaskSerializer(task, context=context).data
+            if isinstance(task, ArchivedTask)
+            else serializer_class(task, context=context).data
+            for task in tasks
+        ]
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            archived = get_object_or_404(self.get_archived_queryset(), pk=kwargs['pk'])
+            serializer = ArchivedTaskSerializer(archived, context=self.get_serializer_context())
+            return Response(serializer.data)
+
+    def perform_destroy(self, instance):
+        features = suggestions.task_features(instance)
+        super().perform_destroy(instance)
+        suggestions.record(instance.user_id, before=features)
+        autocomplete.invalidate(instance.user_id)
+
     @action(detail=True, methods=['post'])
     def complete(self, request, pk=None):
         """Marcar tarefa como concluída"""
-        task = self.get_object()
-        
-        if not task.can_be_completed():
-            return Response({
-                'error': 'Não é possível concluir a tarefa. Todas as subtarefas devem estar concluídas.'
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
-        task.completed = True
-        task.save()
-        
-        # Criar histórico se não existir
-        if not hasattr(task, 'history'):
-            TaskHistory.objects.create(
-                task=task,
-                estimated_duration=task.estimated_duration,
-                notes=request.data.get('notes', '')
-            )
-        
-        return Response({
-            'message': 'Tarefa marcada como concluída',
-            'task': TaskSerializer(task, context={'request': request}).data
-        })
+        return completion_response(request, pk, complete=True)
 
     @action(detail=True, methods=['post'])
     def uncomplete(self, request, pk=None):
         """Desmarcar tarefa como concluída"""
-        task = self.get_object()
-        task.completed = False
-        task.save()
-        
-        # Remover histórico se existir
-        if hasattr(task, 'history'):
-            task.history.delete()
-        
-        return Response({
-            'message': 'Tarefa desmarcada como concluída',
-            'task': TaskSerializer(task, context={'request': request}).data
-        })
+        return completion_response(request, pk, complete=False)
+
+    def get_agenda_timezone(self):
+        """Fuso usado pela agenda (parâmetro `tz`, ou o fuso do projeto)"""
+        return agenda.get_timezone(self.request.query_params.get('tz'))
+
+    def agenda_tasks(self, tasks, start=None, end=None):
+        """Tarefas da agenda mais as ocorrências virtuais de tarefas recorrentes"""
+        return recurrence.with_occurrences(tasks, self.get_queryset(), start, end)
 
     @action(detail=False, methods=['get'])
     def overdue(self, request):
         """Listar tarefas atrasadas"""
-        overdue_tasks = self.get_queryset().filter(
-            completed=False,
-            due_date__lt=timezone.now()
-        )
+        now = timezone.now()
+        overdue_tasks = self.agenda_tasks(agenda.overdue(self.get_queryset(), now), end=now)
         serializer = self.get_serializer(overdue_tasks, many=True)
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'])
     def today(self, request):
         """Listar tarefas para hoje"""
-        today = timezone.now().date()
-        today_tasks = self.get_queryset().filter(
-            due_date__date=today
+        try:
+            tz = self.get_agenda_timezone()
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        today_tasks = self.agenda_tasks(
+            agenda.today(self.get_queryset(), tz), *agenda.today_range(tz)
         )
         serializer = self.get_serializer(today_tasks, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'])
+    def upcoming(self, request):
+        """Listar tarefas pendentes dos próximos dias, agrupadas por dia"""
+        try:
+            tz = self.get_agenda_timezone()
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        days = request.query_params.get('days', '7')
+        days = int(days) if days.isdigit() else 0
+        if not 1 <= days <= agenda.MAX_UPCOMING_DAYS:
+            return Response({
+                'error': f'O parâmetro days deve estar entre 1 e {agenda.MAX_UPCOMING_DAYS}.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        tasks = self.agenda_tasks(
+            agenda.upcoming(self.get_queryset(), days, tz), *agenda.next_days_range(days, tz)
+        )
+        tasks.sort(key=lambda task: task.due_date)
+        buckets = agenda.group_by_day(tasks, tz)
+        context = self.get_serializer_context()
+        return Response([
+            {
+                'date': day,
+                'tasks': TaskListSerializer(day_tasks, many=True, context=context).data,
+            }
+            for day, day_tasks in buckets.items()
+        ])
+
+    @action(detail=True, methods=['post'])
+    def materialize(self, request, pk=None):
+        """Cria a tarefa real de uma ocorrência virtual, para editá-la ou concluí-la"""
+        task = self.get_object()
+        serializer = OccurrenceSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            occurrence = recurrence.materialize(task, serializer.validated_data['due_date'])
+        except recurrence.NotAnOccurrence as exc:
+            return Response({'error': exc.message}, status=status.HTTP_400_BAD_REQUEST)
+        occurrence = self.get_queryset().get(pk=occurrence.pk)
+        serializer = self.get_serializer(occurrence)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['get'])
+    def suggest(self, request):
+        """Sugerir lista, categoria e etiquetas para o título de uma nova tarefa"""
+        title = request.query_params.get('title', '').strip()
+        if not title:
+            return Response({'error': 'Informe o parâmetro title.'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(suggestions.suggest(request.user.pk, title))
+
+    @action(detail=False, methods=['post'], url_path='suggest/rebuild')
+    def suggest_rebuild(self, request):
+        """Recalcular em segundo plano o modelo de sugestões do usuário"""
+        job = queue.enqueue('tasks.rebuild_suggestions', user_id=request.user.pk, unique=True)
+        return accepted_response(request, job, 'Recálculo das sugestões agendado')
+
+    def timer_task_id(self):
+        try:
+            return int(self.kwargs['pk'])
+        except ValueError:
+            raise NotFound('Tarefa não encontrada')
+
+    @action(detail=False, methods=['get'])
+    def timer(self, request):
+        """Cronômetro em andamento do usuário (ou null)"""
+        running = timetracking.running_entry(request.user.pk)
+        entry = TimeEntry.objects.filter(pk=running['id']).first() if running else None
+        return Response({'timer': TimeEntrySerializer(entry).data if entry else None})
+
+    @action(detail=True, methods=['post'], url_path='timer/start')
+    def timer_start(self, request, pk=None):
+        """Inicia o cronômetro da tarefa; o que estiver em andamento é encerrado"""
+        try:
+            entry, created = timetracking.start(request.user, self.timer_task_id())
+        except Task.DoesNotExist:
+            raise NotFound('Tarefa não encontrada')
+        except timetracking.TaskNotTrackable as exc:
+            return Response({'error': exc.message}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            TimeEntrySerializer(entry).data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )
+
+    @action(detail=True, methods=['post'], url_path='timer/stop')
+    def timer_stop(self, request, pk=None):
+        """Encerra o cronômetro da tarefa e soma o tempo registrado"""
+        try:
+            entry = timetracking.stop(request.user, self.timer_task_id())
+        except timetracking.TimerNotRunning as exc:
+            return Response({'error': exc.message}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(TimeEntrySerializer(entry).data)
+
+    @action(detail=True, methods=['post'], url_path='timer/heartbeat')
+    def timer_heartbeat(self, request, pk=None):
+        """Sinal de atividade do cronômetro, gravado em lote (sem consultar a tarefa)"""
+        if not timetracking.heartbeat(request.user, self.timer_task_id()):
+            error = timetracking.TimerNotRunning.message
+            return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=True, methods=['get'], url_path='time-entries')
+    def time_entries(self, request, pk=None):
+        """Registros de tempo da tarefa, do mais recente ao mais antigo"""
+        entries = TimeEntry.objects.filter(task_id=self.timer_task_id(), user=request.user)
+        page = self.paginate_queryset(entries)
+        if page is not None:
+            return self.get_paginated_response(TimeEntrySerializer(page, many=True).data)
+        return Response(TimeEntrySerializer(entries, many=True).data)
+
+    @action(detail=False, methods=['post'], url_path='bulk-tags')
+    def bulk_tags(self, request):
+        """Adiciona, remove ou substitui etiquetas de várias tarefas de uma vez"""
+        serializer = BulkTagSerializer(data=request.data, context=self.get_serializer_context())
+        serializer.is_valid(raise_exception=True)
+
+        task_ids = [task.pk for task in serializer.validated_data['tasks']]
+        tag_ids = [tag.pk for tag in serializer.validated_data['tags']]
+        removed = bulk_update_tags(request.user.pk, task_ids, tag_ids, serializer.validated_data['mode'])
+
+        return Response({
+            'message': 'Etiquetas atualizadas com sucesso',
+            'tasks_count': len(task_ids),
+            'tags_count': len(tag_ids),
+            'removed_count': removed,
+        })
+
+
+def completion_response(request, pk, complete):
+    """
+    Executa a conclusão (ou reabertura) pelo serviço de conclusão e monta a
+    resposta. Por padrão retorna apenas id/completed/completed_at; com
+    `?full=true` retorna a tarefa serializada por completo.
+    """
+    # A rota do ViewSet aceita qualquer texto como pk
+    try:
+        pk = int(pk)
+    except (TypeError, ValueError):
+        return Response({'error': services.TaskNotFound.message}, status=status.HTTP_404_NOT_FOUND)
+
+    try:
+        if complete:
+            result = services.complete_task(request.user, pk, notes=request.data.get('notes', ''))
+            message = 'Tarefa marcada como concluída'
+        else:
+            result = services.uncomplete_task(request.user, pk)
+            message = 'Tarefa desmarcada como concluída'
+    except services.TaskNotFound as exc:
+        return Response({'error': exc.message}, status=status.HTTP_404_NOT_FOUND)
+    except services.TaskHasPendingSubtasks as exc:
+        return Response({'error': exc.message}, status=status.HTTP_400_BAD_REQUEST)
+
+    if request.query_params.get('full', '').lower() in ('1', 'true'):
+        task = Task.objects.select_related('category', 'task_list').prefetch_related(
+            'tags', 'subtasks'
+        ).get(pk=result['id'])
+        data = TaskSerializer(task, context={'request': request}).data
+    else:
+        data = TaskCompletionSerializer(result).data
+
+    return Response({'message': message, 'task': data})
+
 
 class TaskCompleteView(APIView):
-    """View para marcar/desmarcar tarefa como concluída"""
+    """View para marcar tarefa como concluída"""
     permission_classes = [IsAuthenticated]
 
     def post(self, request, pk):
-        try:
-            task = Task.objects.get(pk=pk, user=request.user)
-        except Task.DoesNotExist:
-            return Response({'error': 'Tarefa não encontrada'}, status=status.HTTP_404_NOT_FOUND)
-        
-        if not task.can_be_completed():
-            return Response({
-                'error': 'Não é possível concluir a tarefa. Todas as subtarefas devem estar concluídas.'
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
-        task.completed = True
-        task.save()
-        
-        return Response({'message': 'Tarefa marcada como concluída'})
+        return completion_response(request, pk, complete=True)
 
 
 class TaskUncompleteView(APIView):
@@ -119,15 +365,7 @@ class TaskUncompleteView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, pk):
-        try:
-            task = Task.objects.get(pk=pk, user=request.user)
-        except Task.DoesNotExist:
-            return Response({'error': 'Tarefa não encontrada'}, status=status.HTTP_404_NOT_FOUND)
-        
-        task.completed = False
-        task.save()
-        
-        return Response({'message': 'Tarefa desmarcada como concluída'})
+        return completion_response(request, pk, complete=False)
 
 
 class SubtaskListCreateView(ListCreateAPIView):
@@ -141,18 +379,109 @@ class SubtaskListCreateView(ListCreateAPIView):
 
     def perform_create(self, serializer):
         task_id = self.kwargs['task_id']
-        try:
-            task = Task.objects.get(pk=task_id, user=self.request.user)
-        except Task.DoesNotExist:
-            return Response({'error': 'Tarefa não encontrada'}, status=status.HTTP_404_NOT_FOUND)
-        
-        serializer.save(task=task)
+        with transaction.atomic(using=current_shard()):
+            # Bloqueia a tarefa para serializar com uma conclusão concorrente;
+            # só a chave é lida, a subtarefa é gravada com `task_id`
+            locked = Task.objects.select_for_update().filter(
+                pk=task_id, user=self.request.user
+            ).values_list('pk', flat=True).first()
+            if locked is None:
+                raise NotFound('Tarefa não encontrada')
 
+            subtask = serializer.save(task_id=locked)
+            outbox.emit(self.request.user.pk, 'subtask.created', subtask.pk,
+                        outbox.snapshot(subtask, outbox.SUBTASK_FIELDS))
 
-class SubtaskDetailView(RetrieveUpdateDestroyAPIView):
+
+class SubtaskDetailView(OutboxMixin, OptimisticConcurrencyMixin, RetrieveUpdateDestroyAPIView):
     """View para detalhes, atualização e exclusão de subtarefas"""
     serializer_class = SubtaskSerializer
     permission_classes = [IsAuthenticated]
+    outbox_type = 'subtask'
+    outbox_fields = outbox.SUBTASK_FIELDS
 
     def get_queryset(self):
-        return Subtask.objects.filter(task__user=self.request.user)
+        # Busca por chave: o JOIN com a tarefa só verifica o dono, sem ORDER BY
+        return Subtask.objects.filter(task__user=self.request.user).order_by()
+
+
+class SubtaskToggleView(APIView):
+    """
+    Marca ou desmarca uma subtarefa com um único UPDATE e retorna as contagens
+    de subtarefas da tarefa. Aceita If-Match como a rota de detalhe.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        serializer = SubtaskToggleSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            data = services.toggle_subtask(
+                request.user, pk,
+                completed=serializer.validated_data['completed'],
+                expected_version=parse_if_match(request),
+            )
+        except services.SubtaskNotFound as exc:
+            return Response({'error': exc.message}, status=status.HTTP_404_NOT_FOUND)
+        except VersionConflict:
+            raise PreconditionFailed()
+        return Response(data, headers={'ETag': make_etag(data['version'])})
+
+
+class SubtaskReorderView(APIView):
+    """Reordena todas as subtarefas de uma tarefa em uma única gravação"""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, task_id):
+        serializer = SubtaskReorderSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        subtask_ids = serializer.validated_data['subtasks']
+        try:
+            updated = services.reorder_subtasks(request.user, task_id, subtask_ids)
+        except services.TaskNotFound as exc:
+            return Response({'error': exc.message}, status=status.HTTP_404_NOT_FOUND)
+        except services.InvalidSubtaskOrder as exc:
+            return Response({'error': exc.message}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'message': 'Subtarefas reordenadas com sucesso',
+            'subtasks': subtask_ids,
+            'updated_count': updated,
+        })
+
+
+def parse_id_list(value):
+    """IDs separados por vírgula (`?list=1,2`); ValueError se algum não for inteiro"""
+    return [int(part) for part in value.split(',') if part.strip()] if value else []
+
+
+@require_safe
+def calendar_feed(request, token):
+    """
+    Feed iCalendar das tarefas pendentes com data limite ou lembrete. Sem
+    autenticação da API: o token da URL identifica o usuário. Responde 304
+    (If-None-Match) quando nada mudou desde a última consulta do aplicativo.
+    """
+    user_id = CalendarFeed.objects.filter(
+        token=token, user__is_active=True
+    ).values_list('user_id', flat=True).first()
+    if user_id is None:
+        raise Http404('Feed não encontrado')
+    try:
+        task_lists = parse_id_list(request.GET.get('list'))
+        categories = parse_id_list(request.GET.get('category'))
+    except ValueError:
+        return HttpResponseBadRequest('Os parâmetros list e category devem ser IDs separados por vírgula.')
+
+    alias, _ = activate_user_shard(user_id)
+    tasks = ical.feed_tasks(user_id, task_lists, categories)
+    etag = quote_etag(ical.feed_etag(tasks))
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        # O banco é passado explicitamente: o corpo é gerado depois que a view retorna
+        response = StreamingHttpResponse(
+            ical.generate(tasks, alias), content_type='text/calendar; charset=utf-8'
+        )
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
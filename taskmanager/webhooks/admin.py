@@ -0,0 +1,25 @@
+from django.contrib import admin
+from taskmanager.admin_utils import EstimatedCountPaginator
+from .models import WebhookSubscription, OutboxEvent
+
+
+@admin.register(WebhookSubscription)
+class WebhookSubscriptionAdmin(admin.ModelAdmin):
+    list_display = ['url', 'user', 'is_active', 'failure_count', 'created_at']
+    list_filter = ['is_active', 'created_at']
+    list_select_related = ['user']
+    search_fields = ['url', '=user__username']
+    readonly_fields = ['created_at', 'updated_at']
+    autocomplete_fields = ['user']
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ['event_type', 'object_id', 'user', 'subscription', 'created_at']
+    list_filter = ['event_type', 'created_at']
+    list_select_related = ['user', 'subscription']
+    search_fields = ['=user__username']
+    readonly_fields = ['created_at']
+    autocomplete_fields = ['user', 'subscription']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
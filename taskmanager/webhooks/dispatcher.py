@@ -0,0 +1,257 @@
+"""
+Entrega dos eventos do outbox aos webhooks.
+
+Cada rodada lê, em uma consulta, um lote de eventos pendentes dos webhooks
+prontos (ativos e fora da espera), agrupa os eventos por webhook e envia
+cada grupo em um único POST, em paralelo, reaproveitando conexões HTTP
+keep-alive por origem. Uma entrega bem-sucedida remove os eventos
+entregues; uma falha agenda nova tentativa com espera exponencial e, após
+`MAX_FAILURES` falhas seguidas, desativa o webhook.
+
+Cada evento fica pendente até a sua entrega, sem cursor por ID: um evento
+cuja transação é confirmada depois da de um evento de ID maior (ou que
+chega com o usuário movido de banco) é entregue na rodada seguinte, nunca
+pulado. Os eventos saem na ordem de criação, exceto nesse caso.
+
+Corpo de cada entrega::
+
+    {"subscription": 3, "events": [{"id": 10, "type": "task.updated",
+     "created_at": "...", "data": {...}}]}
+
+Cabeçalhos: `X-Webhook-Timestamp` e `X-Webhook-Signature`
+(`sha256=` + HMAC-SHA256 de `"<timestamp>.<corpo>"` com o segredo).
+"""
+import hashlib
+import hmac
+import http.client
+import json
+import random
+import ssl
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from threading import Lock
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils import timezone
+
+from taskmanager.sharding import current_shard, get_user_shards, iter_shards
+from .models import OutboxEvent, WebhookSubscription
+
+
+DEFAULTS = {
+    # Eventos lidos do outbox por rodada e máximo por entrega
+    'BATCH_SIZE': 500,
+    'MAX_EVENTS_PER_DELIVERY': 100,
+    # Entregas simultâneas e tempo limite de cada uma (segundos)
+    'MAX_WORKERS': 4,
+    'TIMEOUT': 10,
+    # Espera após falhas: BACKOFF_BASE * 2^(falhas - 1), até BACKOFF_MAX (segundos)
+    'BACKOFF_BASE': 10,
+    'BACKOFF_MAX': 3600,
+    'MAX_FAILURES': 10,
+    # Eventos mais antigos que isso são removidos mesmo sem entrega
+    'RETENTION_DAYS': 7,
+    # Permite URLs http:// e endereços locais (receptor de testes)
+    'ALLOW_LOCAL_URLS': False,
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'WEBHOOKS', {})}
+
+
+def sign(secret, timestamp, body):
+    message = f'{timestamp}.'.encode() + body
+    return 'sha256=' + hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+class ConnectionPool:
+    """Conexões HTTP keep-alive ociosas, por origem (esquema, host, porta)"""
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+        self._idle = defaultdict(list)
+        self._lock = Lock()
+        self._ssl_context = ssl.create_default_context()
+
+    def acquire(self, origin):
+        with self._lock:
+            if self._idle[origin]:
+                return self._idle[origin].pop(), True
+        scheme, host, port = origin
+        if scheme == 'https':
+            connection = http.client.HTTPSConnection(
+                host, port, timeout=self.timeout, context=self._ssl_context
+            )
+        else:
+            connection = http.client.HTTPConnection(host, port, timeout=self.timeout)
+        return connection, False
+
+    def release(self, origin, connection):
+        with self._lock:
+            self._idle[origin].append(connection)
+
+    def close(self):
+        with self._lock:
+            for connections in self._idle.values():
+                for connection in connections:
+                    connection.close()
+            self._idle.clear()
+
+
+def post(pool, url, body, headers):
+    """
+    POST reaproveitando uma conexão ociosa; se ela foi fechada pelo servidor
+    enquanto esperava, repete em outra conexão. Retorna o status.
+    """
+    parts = urlsplit(url)
+    origin = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == 'https' else 80))
+    path = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+    while True:
+        connection, reused = pool.acquire(origin)
+        try:
+            connection.request('POST', path, body=body, headers=headers)
+            response = connection.getresponse()
+            response.read()
+        except (http.client.HTTPException, OSError):
+            connection.close()
+            if reused:
+                continue
+            raise
+        if response.will_close:
+            connection.close()
+        else:
+            pool.release(origin, connection)
+        return response.status
+
+
+def deliver(pool, subscription, events):
+    """Envia os eventos ao webhook; retorna None em caso de sucesso ou o erro"""
+    body = json.dumps({
+        'subscription': subscription.pk,
+        'events': [{
+            'id': event.pk,
+            'type': event.event_type,
+            'created_at': event.created_at,
+            'data': event.payload,
+        } for event in events],
+    }, cls=DjangoJSONEncoder).encode()
+    timestamp = str(int(time.time()))
+    headers = {
+        'Content-Type': 'application/json',
+        'User-Agent': 'TaskManager-Webhooks/1.0',
+        'X-Webhook-Timestamp': timestamp,
+        'X-Webhook-Signature': sign(subscription.secret, timestamp, body),
+    }
+    try:
+        status = post(pool, subscription.url, body, headers)
+    except (http.client.HTTPException, OSError) as exc:
+        return f'{type(exc).__name__}: {exc}'
+    if 200 <= status < 300:
+        return None
+    return f'HTTP {status}'
+
+
+def backoff(failures, config):
+    delay = min(config['BACKOFF_BASE'] * 2 ** (failures - 1), config['BACKOFF_MAX'])
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def settled_users(user_ids):
+    """Usuários cujos dados estão no banco atual e não estão em migração"""
+    alias = current_shard()
+    return {user_id for user_id, shard in get_user_shards(user_ids).items() if shard == (alias, False)}
+
+
+def ready_subscriptions(now):
+    """
+    Webhooks prontos no banco atual, exceto os de usuários com dados em
+    migração ou já movidos para outro banco (cópia que será removida)
+    """
+    subscriptions = list(WebhookSubscription.objects.filter(
+        Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now), is_active=True,
+    ))
+    settled = settled_users({subscription.user_id for subscription in subscriptions})
+    return [subscription for subscription in subscriptions if subscription.user_id in settled]
+
+
+def dispatch_batch(pool, config=None):
+    """
+    Uma rodada de entregas no banco atual. Retorna as contagens de entregas
+    (`deliveries`, `failed`) e de eventos entregues (`events`); nenhuma
+    entrega quando não há nada pendente.
+    """
+    config = config or get_config()
+    now = timezone.now()
+    stats = {'deliveries': 0, 'failed': 0, 'events': 0}
+
+    subscriptions = {subscription.pk: subscription for subscription in ready_subscriptions(now)}
+    if not subscriptions:
+        return stats
+    events = list(OutboxEvent.objects.filter(
+        subscription_id__in=list(subscriptions)
+    ).order_by('pk')[:config['BATCH_SIZE']])
+    if not events:
+        return stats
+
+    # Eventos pendentes de cada webhook, até MAX_EVENTS_PER_DELIVERY por entrega
+    pending = defaultdict(list)
+    for event in events:
+        if len(pending[event.subscription_id]) < config['MAX_EVENTS_PER_DELIVERY']:
+            pending[event.subscription_id].append(event)
+    deliveries = [(subscriptions[subscription_id], selected) for subscription_id, selected in pending.items()]
+
+    with ThreadPoolExecutor(max_workers=config['MAX_WORKERS']) as executor:
+        results = list(executor.map(lambda item: deliver(pool, *item), deliveries))
+
+    for (subscription, selected), error in zip(deliveries, results):
+        stats['deliveries'] += 1
+        if error is None:
+            OutboxEvent.objects.filter(pk__in=[event.pk for event in selected]).delete()
+            if subscription.failure_count or subscription.last_error:
+                WebhookSubscription.objects.filter(pk=subscription.pk).update(
+                    failure_count=0, next_attempt_at=None, last_error='',
+                )
+            stats['events'] += len(selected)
+            continue
+        stats['failed'] += 1
+        failures = subscription.failure_count + 1
+        WebhookSubscription.objects.filter(pk=subscription.pk).update(
+            failure_count=failures,
+            next_attempt_at=now + backoff(failures, config),
+            last_error=error[:1000],
+            is_active=failures < config['MAX_FAILURES'],
+        )
+    return stats
+
+
+def prune_expired(config=None):
+    """Remove eventos mais antigos que `RETENTION_DAYS` (não entregues a tempo)"""
+    config = config or get_config()
+    cutoff = timezone.now() - timedelta(days=config['RETENTION_DAYS'])
+    expired = OutboxEvent.objects.filter(created_at__lt=cutoff)
+    user_ids = set(expired.values_list('user_id', flat=True).distinct())
+    if not user_ids:
+        return 0
+    deleted, _ = expired.filter(user_id__in=settled_users(user_ids)).delete()
+    return deleted
+
+
+def dispatch_pending(pool, config=None):
+    """Entrega tudo o que está pendente em todos os bancos; retorna as contagens somadas"""
+    config = config or get_config()
+    totals = {'deliveries': 0, 'failed': 0, 'events': 0}
+    for _ in iter_shards():
+        while True:
+            stats = dispatch_batch(pool, config)
+            for name, value in stats.items():
+                totals[name] += value
+            if not stats['deliveries']:
+                break
+        prune_expired(config)
+    return totals
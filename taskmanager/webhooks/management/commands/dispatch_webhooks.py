@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from webhooks.dispatcher import ConnectionPool, dispatch_pending, get_config
+
+
+class Command(BaseCommand):
+    help = 'Entrega os eventos do outbox aos webhooks (continuamente, ou uma vez com --once)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Entrega o que está pendente e sai')
+        parser.add_argument(
+            '--interval', type=float, default=2.0,
+            help='Segundos de espera quando não há eventos pendentes'
+        )
+
+    def handle(self, *args, **options):
+        config = get_config()
+        pool = ConnectionPool(timeout=config['TIMEOUT'])
+        try:
+            while True:
+                totals = dispatch_pending(pool, config)
+                if totals['deliveries'] or options['once']:
+                    self.stdout.write(
+                        f"{totals['events']} eventos em {totals['deliveries']} entregas "
+                        f"({totals['failed']} falhas)."
+                    )
+                if options['once']:
+                    break
+                if not totals['deliveries']:
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            pool.close()
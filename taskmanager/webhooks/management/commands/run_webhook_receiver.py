@@ -0,0 +1,31 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from webhooks.receiver import StandInReceiver
+
+
+class Command(BaseCommand):
+    help = 'Receptor HTTP local de webhooks, que exibe as entregas recebidas (para testes)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1', help='Endereço de escuta')
+        parser.add_argument('--port', type=int, default=8099, help='Porta de escuta')
+        parser.add_argument('--secret', default=None, help='Segredo do webhook, para verificar a assinatura')
+
+    def handle(self, *args, **options):
+        receiver = StandInReceiver(options['host'], options['port'], options['secret']).start()
+        self.stdout.write(self.style.SUCCESS(f'Recebendo em {receiver.url} (Ctrl+C para sair)'))
+        shown = 0
+        try:
+            while True:
+                time.sleep(0.5)
+                deliveries = receiver.deliveries[shown:]
+                shown += len(deliveries)
+                for delivery in deliveries:
+                    self.stdout.write(json.dumps(delivery, indent=2, ensure_ascii=False))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            receiver.stop()
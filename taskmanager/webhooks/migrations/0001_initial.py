@@ -0,0 +1,57 @@
+# Generated by Django 5.2.5 on 2026-10-19 16:26
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookSubscription',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(help_text='Endereço que recebe os eventos via POST', max_length=500, verbose_name='URL')),
+                ('secret', models.CharField(help_text='Chave da assinatura HMAC-SHA256 das entregas', max_length=64, verbose_name='Segredo')),
+                ('event_types', models.JSONField(blank=True, default=list, help_text='Tipos de evento entregues; vazio entrega todos', verbose_name='Eventos')),
+                ('is_active', models.BooleanField(default=True, help_text='Desativada automaticamente após falhas consecutivas', verbose_name='Ativa')),
+                ('last_event_id', models.BigIntegerField(default=0, verbose_name='Último Evento Entregue')),
+                ('failure_count', models.PositiveIntegerField(default=0, verbose_name='Falhas Consecutivas')),
+                ('next_attempt_at', models.DateTimeField(blank=True, help_text='Preenchida após uma falha (espera exponencial)', null=True, verbose_name='Próxima Tentativa')),
+                ('last_error', models.TextField(blank=True, verbose_name='Último Erro')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='webhook_subscriptions', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Webhook',
+                'verbose_name_plural': 'Webhooks',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(max_length=32, verbose_name='Tipo')),
+                ('object_id', models.BigIntegerField(verbose_name='ID do Objeto')),
+                ('payload', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Dados')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='outbox_events', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Evento do Outbox',
+                'verbose_name_plural': 'Eventos do Outbox',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['user', 'id'], name='outbox_user_id_idx'), models.Index(fields=['created_at'], name='outbox_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.5 on 2026-10-19 17:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fan_out_pending_events(apps, schema_editor):
+    """
+    Copia cada evento ainda não entregue (posterior ao antigo cursor) para
+    cada webhook que aceita o tipo e remove os eventos sem webhook. O prazo
+    de retenção das cópias recomeça na migração.
+    """
+    WebhookSubscription = apps.get_model('webhooks', 'WebhookSubscription')
+    OutboxEvent = apps.get_model('webhooks', 'OutboxEvent')
+    alias = schema_editor.connection.alias
+    events = OutboxEvent.objects.using(alias).filter(subscription__isnull=True)
+
+    for subscription in WebhookSubscription.objects.using(alias).iterator():
+        pending = events.filter(
+            user_id=subscription.user_id, pk__gt=subscription.last_event_id,
+        ).order_by('pk')
+        if subscription.event_types:
+            pending = pending.filter(event_type__in=subscription.event_types)
+        batch = []
+        for event in pending.iterator():
+            batch.append(OutboxEvent(
+                user_id=event.user_id, subscription_id=subscription.pk, event_type=event.event_type,
+                object_id=event.object_id, payload=event.payload,
+            ))
+            if len(batch) == 500:
+                OutboxEvent.objects.using(alias).bulk_create(batch)
+                batch = []
+        OutboxEvent.objects.using(alias).bulk_create(batch)
+    events.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webhooks', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboxevent',
+            name='subscription',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='pending_events', to='webhooks.webhooksubscription', verbose_name='Webhook'),
+        ),
+        migrations.RunPython(fan_out_pending_events, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='outboxevent',
+            name='subscription',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pending_events', to='webhooks.webhooksubscription', verbose_name='Webhook'),
+        ),
+        migrations.RemoveIndex(
+            model_name='outboxevent',
+            name='outbox_user_id_idx',
+        ),
+        migrations.AddIndex(
+            model_name='outboxevent',
+            index=models.Index(fields=['subscription', 'id'], name='outbox_subscription_id_idx'),
+        ),
+        migrations.RemoveField(
+            model_name='webhooksubscription',
+            name='last_event_id',
+        ),
+    ]
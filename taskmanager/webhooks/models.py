@@ -0,0 +1,122 @@
+from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+
+EVENT_TYPES = [
+    'task.created', 'task.updated', 'task.deleted', 'task.completed', 'task.uncompleted',
+    'subtask.created', 'subtask.updated', 'subtask.deleted',
+    'list.created', 'list.updated', 'list.deleted',
+]
+
+
+class WebhookSubscription(models.Model):
+    """Destino (URL) que recebe os eventos do usuário por push, em lotes"""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='webhook_subscriptions',
+        verbose_name="Usuário"
+    )
+    url = models.URLField(
+        max_length=500,
+        verbose_name="URL",
+        help_text="Endereço que recebe os eventos via POST"
+    )
+    secret = models.CharField(
+        max_length=64,
+        verbose_name="Segredo",
+        help_text="Chave da assinatura HMAC-SHA256 das entregas"
+    )
+    event_types = models.JSONField(
+        default=list,
+        blank=True,
+        verbose_name="Eventos",
+        help_text="Tipos de evento entregues; vazio entrega todos"
+    )
+    is_active = models.BooleanField(
+        default=True,
+        verbose_name="Ativa",
+        help_text="Desativada automaticamente após falhas consecutivas"
+    )
+    failure_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Falhas Consecutivas"
+    )
+    next_attempt_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Próxima Tentativa",
+        help_text="Preenchida após uma falha (espera exponencial)"
+    )
+    last_error = models.TextField(
+        blank=True,
+        verbose_name="Último Erro"
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Criado em"
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Atualizado em"
+    )
+
+    class Meta:
+        verbose_name = "Webhook"
+        verbose_name_plural = "Webhooks"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return self.url
+
+    def accepts(self, event_type):
+        return not self.event_types or event_type in self.event_types
+
+
+class OutboxEvent(models.Model):
+    """
+    Evento de alteração pendente de entrega a um webhook: gravado na mesma
+    transação da alteração (uma linha por webhook que aceita o tipo) e
+    removido pelo `dispatch_webhooks` quando a entrega é confirmada.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='outbox_events',
+        verbose_name="Usuário"
+    )
+    subscription = models.ForeignKey(
+        WebhookSubscription,
+        on_delete=models.CASCADE,
+        related_name='pending_events',
+        verbose_name="Webhook"
+    )
+    event_type = models.CharField(
+        max_length=32,
+        verbose_name="Tipo"
+    )
+    object_id = models.BigIntegerField(
+        verbose_name="ID do Objeto"
+    )
+    payload = models.JSONField(
+        encoder=DjangoJSONEncoder,
+        verbose_name="Dados"
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Criado em"
+    )
+
+    class Meta:
+        verbose_name = "Evento do Outbox"
+        verbose_name_plural = "Eventos do Outbox"
+        ordering = ['id']
+        indexes = [
+            # Leitura do dispatcher: eventos pendentes de cada webhook, em ordem
+            models.Index(fields=['subscription', 'id'], name='outbox_subscription_id_idx'),
+            models.Index(fields=['created_at'], name='outbox_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} #{self.object_id}"
@@ -0,0 +1,100 @@
+"""
+Outbox transacional: cada alteração de tarefa, subtarefa ou lista grava um
+`OutboxEvent` por webhook ativo do usuário que aceita o tipo, na mesma
+transação (e no mesmo banco) da alteração. Se a transação é desfeita, os
+eventos também são; o `dispatch_webhooks` entrega depois apenas o que foi
+confirmado e remove cada evento quando sua entrega é confirmada.
+
+Os webhooks são consultados na própria transação (uma consulta pelo índice
+do usuário), e não em um cache por processo: um webhook recém-criado passa a
+receber eventos de todos os processos imediatamente.
+"""
+from django.db import transaction
+
+from taskmanager.sharding import current_shard
+from .models import OutboxEvent, WebhookSubscription
+
+
+TASK_FIELDS = [
+    'id', 'title', 'completed', 'completed_at', 'due_date', 'priority',
+    'task_list_id', 'category_id', 'version', 'updated_at',
+]
+SUBTASK_FIELDS = ['id', 'task_id', 'title', 'completed', 'completed_at', 'order', 'version', 'updated_at']
+LIST_FIELDS = ['id', 'name', 'description', 'auto_suggestion', 'updated_at']
+
+
+def subscriptions_for(user_id, event_type):
+    """IDs dos webhooks ativos do usuário que aceitam o tipo"""
+    return [
+        pk for pk, event_types in WebhookSubscription.objects.filter(
+            user_id=user_id, is_active=True
+        ).values_list('pk', 'event_types')
+        if not event_types or event_type in event_types
+    ]
+
+
+def snapshot(instance, fields):
+    """Dados do objeto para o evento; chaves estrangeiras sem o sufixo `_id`"""
+    return {
+        (name[:-3] if name.endswith('_id') and name != 'id' else name): getattr(instance, name)
+        for name in fields
+    }
+
+
+def _record(user_id, event_type, items):
+    """Um evento por par (ID do objeto, dados) e webhook interessado, em um INSERT"""
+    subscription_ids = subscriptions_for(user_id, event_type) if items else []
+    if subscription_ids:
+        OutboxEvent.objects.bulk_create([
+            OutboxEvent(
+                user_id=user_id, subscription_id=subscription_id, event_type=event_type,
+                object_id=object_id, payload=payload,
+            )
+            for subscription_id in subscription_ids
+            for object_id, payload in items
+        ])
+
+
+def emit(user_id, event_type, object_id, payload):
+    """Grava um evento na transação atual (chamar dentro do atomic da alteração)"""
+    _record(user_id, event_type, [(object_id, payload)])
+
+
+def emit_many(user_id, event_type, payloads):
+    """Grava um evento por item de `payloads` (cada um com `id`)"""
+    _record(user_id, event_type, [(payload['id'], payload) for payload in payloads])
+
+
+class OutboxMixin:
+    """
+    Views do DRF que gravam `<tipo>.created`, `.updated` e `.deleted` no
+    outbox, na mesma transação da criação, alteração ou exclusão.
+    """
+    outbox_type = None
+    outbox_fields = ['id']
+
+    def outbox_payload(self, instance):
+        return snapshot(instance, self.outbox_fields)
+
+    def perform_create(self, serializer):
+        with transaction.atomic(using=current_shard()):
+            super().perform_create(serializer)
+            instance = serializer.instance
+            emit(self.request.user.pk, f'{self.outbox_type}.created', instance.pk,
+                 self.outbox_payload(instance))
+
+    def perform_update(self, serializer):
+        version = getattr(serializer.instance, 'version', None)
+        with transaction.atomic(using=current_shard()):
+            super().perform_update(serializer)
+            instance = serializer.instance
+            # Modelos versionados: sem alteração gravada, sem evento
+            if version is None or instance.version != version:
+                emit(self.request.user.pk, f'{self.outbox_type}.updated', instance.pk,
+                     self.outbox_payload(instance))
+
+    def perform_destroy(self, instance):
+        pk = instance.pk
+        with transaction.atomic(using=current_shard()):
+            super().perform_destroy(instance)
+            emit(self.request.user.pk, f'{self.outbox_type}.deleted', pk, {'id': pk})
@@ -0,0 +1,93 @@
+"""
+Receptor HTTP local que faz o papel de uma integração, para testar o
+dispatcher sem serviços externos::
+
+    with StandInReceiver(secret='...') as receiver:
+        subscription.url = receiver.url
+        ...
+        dispatch_batch(pool)
+        receiver.deliveries  # corpos recebidos, com a assinatura verificada
+
+`fail_next(n, status)` faz as próximas `n` entregas falharem. Também
+disponível como `python manage.py run_webhook_receiver`.
+"""
+import hmac
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+
+from .dispatcher import sign
+
+
+class StandInReceiver:
+    """Servidor HTTP em uma thread, que guarda as entregas recebidas"""
+
+    def __init__(self, host='127.0.0.1', port=0, secret=None):
+        self.secret = secret
+        self.deliveries = []
+        self.connections = set()
+        self._failures = []
+        self._lock = Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}/'
+
+    def fail_next(self, count=1, status=500):
+        with self._lock:
+            self._failures += [status] * count
+
+    def _handler_class(self):
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                status = receiver.receive(self.client_address, self.headers, body)
+                self.send_response(status)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def receive(self, client_address, headers, body):
+        with self._lock:
+            self.connections.add(client_address)
+            if self._failures:
+                return self._failures.pop(0)
+        if self.secret is not None:
+            expected = sign(self.secret, headers.get('X-Webhook-Timestamp', ''), body)
+            if not hmac.compare_digest(expected, headers.get('X-Webhook-Signature', '')):
+                return 401
+        with self._lock:
+            self.deliveries.append(json.loads(body))
+        return 204
+
+    @property
+    def events(self):
+        with self._lock:
+            return [event for delivery in self.deliveries for event in delivery['events']]
+
+    def start(self):
+        self._thread = Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
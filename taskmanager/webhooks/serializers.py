@@ -0,0 +1,62 @@
+import ipaddress
+import secrets
+from urllib.parse import urlsplit
+
+from rest_framework import serializers
+
+from .dispatcher import get_config
+from .models import EVENT_TYPES, WebhookSubscription
+
+
+class WebhookSubscriptionSerializer(serializers.ModelSerializer):
+    """Serializer para webhooks; o segredo só é exibido na criação"""
+
+    class Meta:
+        model = WebhookSubscription
+        fields = ['id', 'url', 'event_types', 'is_active', 'secret', 'failure_count',
+                  'next_attempt_at', 'last_error', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'secret', 'failure_count', 'next_attempt_at', 'last_error',
+                            'created_at', 'updated_at']
+
+    def validate_url(self, value):
+        if get_config()['ALLOW_LOCAL_URLS']:
+            return value
+        parts = urlsplit(value)
+        if parts.scheme != 'https':
+            raise serializers.ValidationError('Use uma URL https://.')
+        host = parts.hostname or ''
+        try:
+            address = ipaddress.ip_address(host)
+        except ValueError:
+            address = None
+        if host == 'localhost' or host.endswith('.localhost') or (address and not address.is_global):
+            raise serializers.ValidationError('Endereços locais ou privados não são permitidos.')
+        return value
+
+    def validate_event_types(self, value):
+        if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+            raise serializers.ValidationError('Envie uma lista de tipos de evento.')
+        unknown = sorted(set(value) - set(EVENT_TYPES))
+        if unknown:
+            raise serializers.ValidationError(
+                f'Tipos inválidos: {", ".join(unknown)}. Use: {", ".join(EVENT_TYPES)}.'
+            )
+        return sorted(set(value))
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if not self.context.get('show_secret'):
+            data.pop('secret', None)
+        return data
+
+    def create(self, validated_data):
+        # Recebe os eventos das alterações gravadas depois da criação
+        return WebhookSubscription.objects.create(
+            user=self.context['request'].user, secret=secrets.token_urlsafe(32), **validated_data
+        )
+
+    def update(self, instance, validated_data):
+        if validated_data.get('is_active') and not instance.is_active:
+            # Reativação: recomeça a contagem de falhas e tenta imediatamente
+            validated_data.update(failure_count=0, next_attempt_at=None, last_error='')
+        return super().update(instance, validated_data)
@@ -0,0 +1,148 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from tags.models import Tag
+from tasks.models import Task
+
+from . import dispatcher
+from .models import OutboxEvent, WebhookSubscription
+
+
+class WebhookTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('ana', password='senha-segura-1')
+        self.subscription = WebhookSubscription.objects.create(
+            user=self.user, url='https://example.com/hook', secret='segredo',
+        )
+
+    def moving(self):
+        return mock.patch.object(
+            dispatcher, 'get_user_shards', return_value={self.user.pk: ('default', True)}
+        )
+
+
+class ShardMovingTests(WebhookTestCase):
+    def test_subscriptions_of_moving_users_are_not_ready(self):
+        with self.moving():
+            self.assertEqual(dispatcher.ready_subscriptions(timezone.now()), [])
+        self.assertEqual(dispatcher.ready_subscriptions(timezone.now()), [self.subscription])
+
+    def test_expired_events_of_moving_users_are_kept(self):
+        event = OutboxEvent.objects.create(
+            user=self.user, subscription=self.subscription, event_type='task.created',
+            object_id=1, payload={'id': 1},
+        )
+        OutboxEvent.objects.filter(pk=event.pk).update(created_at=timezone.now() - timedelta(days=30))
+
+        with self.moving():
+            self.assertEqual(dispatcher.prune_expired(), 0)
+        self.assertEqual(dispatcher.prune_expired(), 1)
+
+
+class OutboxTests(WebhookTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_task(self, title='Relatório'):
+        return self.client.post('/api/tasks/', {'title': title}, format='json').data['id']
+
+    def test_new_subscription_receives_events_immediately(self):
+        self.subscription.delete()
+        self.create_task()
+        subscription = WebhookSubscription.objects.create(
+            user=self.user, url='https://example.com/novo', secret='segredo',
+        )
+
+        task_id = self.create_task('Reunião')
+
+        self.assertEqual(
+            list(OutboxEvent.objects.values_list('subscription_id', 'event_type', 'object_id')),
+            [(subscription.pk, 'task.created', task_id)],
+        )
+
+    def test_one_event_per_subscription_accepting_the_type(self):
+        only_completed = WebhookSubscription.objects.create(
+            user=self.user, url='https://example.com/concluidas', secret='segredo',
+            event_types=['task.completed'],
+        )
+        WebhookSubscription.objects.create(
+            user=self.user, url='https://example.com/inativo', secret='segredo', is_active=False,
+        )
+
+        task_id = self.create_task()
+        self.client.post(f'/api/tasks/{task_id}/complete/')
+
+        self.assertEqual(sorted(OutboxEvent.objects.values_list('subscription_id', 'event_type')), sorted([
+            (self.subscription.pk, 'task.created'),
+            (self.subscription.pk, 'task.completed'),
+            (only_completed.pk, 'task.completed'),
+        ]))
+
+    def test_merge_tags_emits_updates_for_affected_tasks(self):
+        target = Tag.objects.create(user=self.user, name='urgente')
+        source = Tag.objects.create(user=self.user, name='importante')
+        tagged = Task.objects.create(user=self.user, title='Relatório')
+        Task.objects.create(user=self.user, title='Reunião')
+        tagged.tags.add(source)
+
+        self.client.post(f'/api/tags/{target.pk}/merge/', {'source_tags': [source.pk]}, format='json')
+
+        event = OutboxEvent.objects.get()
+        self.assertEqual((event.event_type, event.object_id), ('task.updated', tagged.pk))
+        self.assertEqual(event.payload['tags'], [target.pk])
+
+
+class DispatcherTests(WebhookTestCase):
+    def event(self, **fields):
+        return OutboxEvent.objects.create(
+            user=self.user, subscription=self.subscription, event_type='task.created',
+            object_id=1, payload={'id': 1}, **fields,
+        )
+
+    def dispatch(self, error=None):
+        delivered = []
+
+        def deliver(pool, subscription, events):
+            delivered.append([event.pk for event in events])
+            return error
+
+        with mock.patch.object(dispatcher, 'deliver', deliver):
+            stats = dispatcher.dispatch_batch(pool=None)
+        return stats, delivered
+
+    def test_delivered_events_are_removed(self):
+        first, second = self.event(), self.event()
+
+        stats, delivered = self.dispatch()
+
+        self.assertEqual(delivered, [[first.pk, second.pk]])
+        self.assertEqual(stats, {'deliveries': 1, 'failed': 0, 'events': 2})
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_event_committed_after_a_later_id_is_still_delivered(self):
+        later = self.event(pk=10)
+        self.dispatch()
+
+        # Transação que reservou um ID menor e só foi confirmada depois da entrega
+        earlier = self.event(pk=5)
+        _, delivered = self.dispatch()
+
+        self.assertEqual(delivered, [[earlier.pk]])
+
+    def test_failed_delivery_keeps_events_and_backs_off(self):
+        event = self.event()
+
+        stats, _ = self.dispatch(error='HTTP 500')
+
+        self.assertEqual(stats['failed'], 1)
+        self.assertTrue(OutboxEvent.objects.filter(pk=event.pk).exists())
+        self.subscription.refresh_from_db()
+        self.assertEqual((self.subscription.failure_count, self.subscription.last_error), (1, 'HTTP 500'))
+        self.assertEqual(dispatcher.ready_subscriptions(timezone.now()), [])
@@ -0,0 +1,19 @@
+from rest_framework import viewsets
+from rest_framework.permissions import IsAuthenticated
+
+from .models import WebhookSubscription
+from .serializers import WebhookSubscriptionSerializer
+
+
+class WebhookSubscriptionViewSet(viewsets.ModelViewSet):
+    """ViewSet para webhooks (entrega por push das alterações do usuário)"""
+    serializer_class = WebhookSubscriptionSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return WebhookSubscription.objects.filter(user=self.request.user)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['show_secret'] = self.action == 'create'
+        return context